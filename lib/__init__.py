@@ -0,0 +1,6 @@
+"""
+Módulos Python compartidos por los scripts de ticks y el backtester directo.
+
+Los equivalentes TypeScript viven en este mismo directorio (lib/*.ts);
+los módulos Python usan snake_case (lib/ticks-db.ts -> lib/ticks_store.py).
+"""
@@ -9,7 +9,9 @@
  * - Grid de promedios
  */
 
-import { describe, it, expect, beforeEach } from "vitest";
+import { describe, it, expect, beforeEach, afterAll } from "vitest";
+import * as fs from "fs";
+import * as path from "path";
 import {
   BacktestEngine,
   BacktestConfig,
@@ -342,3 +344,57 @@ describe("BacktestEngine", () => {
     });
   });
 });
+
+// ==================== TOTALES DE REFERENCIA ====================
+
+describe("Totales de referencia (tests/fixtures/backtest-parity.json)", () => {
+  // Este caso es la fuente de los totales del fixture. Con UPDATE_PARITY_FIXTURE=1 no
+  // compara: escribe los totales de este motor y expectedSource = "ts". Los tests de
+  // lib/backtest_engine.py comparan contra esos mismos totales.
+  const fixturePath = path.join(__dirname, "../tests/fixtures/backtest-parity.json");
+  const fixture = JSON.parse(fs.readFileSync(fixturePath, "utf-8"));
+  const update = Boolean(process.env.UPDATE_PARITY_FIXTURE);
+
+  afterAll(() => {
+    if (update) {
+      fixture.expectedSource = "ts";
+      fs.writeFileSync(fixturePath, JSON.stringify(fixture));
+    }
+  });
+
+  for (const testCase of fixture.cases) {
+    const { config, expected } = testCase;
+    it(`${config.strategyName} da los totales de referencia`, () => {
+      const engine = new BacktestEngine(config as BacktestConfig);
+
+      fixture.signals.forEach((signal: { side: Side; timestamp: string; ticks: number[][] }, i: number) => {
+        const [firstTs, firstBid, firstAsk] = signal.ticks[0];
+        const entryPrice = (firstBid + firstAsk) / 2;
+        engine.startSignal(signal.side, entryPrice, i, new Date(signal.timestamp));
+        engine.openInitialOrders(entryPrice, new Date(firstTs));
+
+        for (const [ts, bid, ask] of signal.ticks) {
+          engine.processTick(createTick(bid, ask, new Date(ts)));
+        }
+
+        if (engine.hasOpenPositions()) {
+          const [lastTs, lastBid, lastAsk] = signal.ticks[signal.ticks.length - 1];
+          engine.closeRemainingPositions(signal.side === "BUY" ? lastBid : lastAsk, new Date(lastTs));
+        }
+      });
+
+      const results = engine.getResults();
+      if (update) {
+        testCase.expected = {
+          totalTrades: results.totalTrades,
+          totalProfit: results.totalProfit,
+          maxDrawdown: results.maxDrawdown,
+        };
+        return;
+      }
+      expect(results.totalTrades).toBe(expected.totalTrades);
+      expect(results.totalProfit).toBe(expected.totalProfit);
+      expect(results.maxDrawdown).toBe(expected.maxDrawdown);
+    });
+  }
+});
@@ -0,0 +1,291 @@
+"""
+Caché persistente de resultados de backtest por señal
+=====================================================
+
+Cada par (señal, estrategia) se simula con un motor nuevo y se guarda en
+SQLite un SignalRecord compacto bajo una clave de contenido:
+
+    sha256(señal, BacktestConfig sin strategyName, versión de los ticks, ENGINE_VERSION)
+
+La versión de los ticks son las entradas del índice (index.json del tick
+store o ticks-index.json de los shards) de los días que cubre la ventana,
+así que reescribir un día invalida las señales de ese día. ENGINE_VERSION
+(lib/backtest_engine.py) invalida todo cuando cambia el motor. Ni el
+índice de la señal ni el nombre de la estrategia forman parte de la clave:
+la misma configuración con otro nombre (p.ej. en sweep_parameters.py)
+reutiliza sus resultados.
+
+SignalRecord no guarda las operaciones: solo las columnas de RunningTotals
+(profit, peak, mínimo, drawdown, profit y pips de cada trade, meses) y la
+curva de equity en arrays numpy. Leerlo cuesta mucho menos que
+deserializar un PartialResult con sus SimulatedTrade/TradeDetail, y
+RunningTotals.concat da las mismas métricas que merge_partials.
+
+    BacktestResultCache(
+        key      TEXT PRIMARY KEY,
+        payload  BLOB,      -- SignalRecord (pickle + zlib)
+        bytes    INTEGER,
+        lastUsed INTEGER    -- contador de accesos para el LRU
+    )
+
+Al superar el presupuesto se borran las entradas usadas hace más tiempo.
+run_cached solo simula los pares que faltan y une todo con
+RunningTotals.concat y merge_curves (resultados sin trades ni
+tradeDetails, con equityCurve):
+
+    with ResultCache(path, budget_mb=512) as cache:
+        results, stats = run_cached(configs, replay, cache, versions, workers=8)
+        cache.stats()  # hits, misses, evictions, entries, bytes
+"""
+
+import hashlib
+import json
+import math
+import pickle
+import sqlite3
+import zlib
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from lib.backtest_engine import (
+    ENGINE_VERSION,
+    BacktestConfig,
+    BacktestResult,
+    EquityPoint,
+    PartialResult,
+    RunningTotals,
+)
+from lib.backtest_parallel import DEFAULT_CHUNK, STRATEGY_GROUP, UnitStats, WorkUnit, execute_units
+from lib.ticks_store import MS_PER_DAY, DayTicks, day_key, to_epoch_ms
+
+CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "backtest-cache.sqlite"
+DEFAULT_BUDGET_MB = 512
+CACHE_TABLE = "BacktestResultCache"
+QUERY_BATCH = 500  # claves por SELECT ... IN (...)
+COMPRESS_LEVEL = 1  # zlib: casi la misma talla que el nivel 6 en un tercio del tiempo
+RECORD_VERSION = 2  # formato de SignalRecord (forma parte de la clave)
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {CACHE_TABLE} (
+    key TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    lastUsed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {CACHE_TABLE}_lastUsed ON {CACHE_TABLE} (lastUsed);
+"""
+
+
+def tick_version(source, window: DayTicks) -> list:
+    """Entradas del índice de los días que cubre la ventana (TickStore o ShardTicks)"""
+    first, last = int(window.ts[0]) // MS_PER_DAY, int(window.ts[-1]) // MS_PER_DAY
+    return [window.price_scale] + [source.day_entry(day_key(day * MS_PER_DAY)) for day in range(first, last + 1)]
+
+
+def signal_key(signal, config: BacktestConfig, version, engine_version: int = ENGINE_VERSION) -> str:
+    """Clave de contenido de un par (señal, estrategia); el nombre de la estrategia no cuenta"""
+    content = {
+        "signal": asdict(signal),
+        "config": {k: v for k, v in asdict(config).items() if k != "strategyName"},
+        "ticks": version,
+        "engine": engine_version,
+        "record": RECORD_VERSION,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class SignalRecord:
+    """Resultado guardado de un par (señal, estrategia): RunningTotals y la curva de equity"""
+    totals: RunningTotals
+    curve_ts: np.ndarray  # epoch ms de cada punto
+    curve: np.ndarray  # (puntos x 3): equity, balance, drawdown
+
+    @classmethod
+    def from_partial(cls, partial: PartialResult) -> "SignalRecord":
+        points = partial.equityCurve
+        return cls(
+            RunningTotals.empty().extend([partial]),
+            np.array([to_epoch_ms(p.timestamp) for p in points], dtype=np.int64),
+            np.array([(p.equity, p.balance, p.drawdown) for p in points], dtype=np.float64).reshape(-1, 3),
+        )
+
+
+def merge_curves(records: list[SignalRecord]) -> list[EquityPoint]:
+    """Curva de equity de los registros seguidos (mismos desplazamientos que combine_partials)"""
+    offset, peak = 0.0, 0.0
+    ts_parts, value_parts = [], []
+    for record in records:
+        merged = record.totals.merged
+        equity = record.curve[:, 0] + offset
+        ts_parts.append(record.curve_ts)
+        value_parts.append(np.column_stack([
+            equity, record.curve[:, 1] + offset, np.maximum(record.curve[:, 2], peak - equity),
+        ]))
+        if merged.minEquity < math.inf:
+            peak = max(peak, merged.peakEquity + offset)
+        offset += merged.profit
+    if not ts_parts:
+        return []
+    values = np.concatenate(value_parts)
+    return [
+        EquityPoint(datetime.fromtimestamp(ms / 1000, tz=timezone.utc), equity, balance, drawdown)
+        for ms, (equity, balance, drawdown) in zip(np.concatenate(ts_parts).tolist(), values.tolist())
+    ]
+
+
+class ResultCache:
+    """SignalRecord por clave en SQLite con LRU por tamaño"""
+
+    def __init__(self, path: Path = CACHE_PATH, budget_mb: float = DEFAULT_BUDGET_MB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(SCHEMA_SQL)
+        self._clock = self.conn.execute(f"SELECT COALESCE(MAX(lastUsed), 0) FROM {CACHE_TABLE}").fetchone()[0]
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, keys: list[str]) -> dict[str, SignalRecord]:
+        """Resultados guardados de las claves que estén (y las marca como usadas)"""
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        for a in range(0, len(unique), QUERY_BATCH):
+            batch = unique[a:a + QUERY_BATCH]
+            rows = self.conn.execute(
+                f"SELECT key, payload FROM {CACHE_TABLE} WHERE key IN ({','.join('?' * len(batch))})", batch)
+            for key, payload in rows:
+                found[key] = pickle.loads(zlib.decompress(payload))
+        if found:
+            used = self._tick()
+            self.conn.executemany(f"UPDATE {CACHE_TABLE} SET lastUsed = ? WHERE key = ?",
+                                  [(used, key) for key in found])
+            self.conn.commit()
+        self._stats["hits"] += sum(1 for key in keys if key in found)
+        self._stats["misses"] += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: dict[str, SignalRecord]):
+        """Guarda resultados nuevos y expulsa los menos usados si se pasa del presupuesto"""
+        if not items:
+            return
+        used = self._tick()
+        rows = []
+        for key, record in items.items():
+            payload = zlib.compress(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+            rows.append((key, payload, len(payload), used))
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {CACHE_TABLE} (key, payload, bytes, lastUsed) VALUES (?, ?, ?, ?)", rows)
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute(f"SELECT COALESCE(SUM(bytes), 0) FROM {CACHE_TABLE}").fetchone()[0]
+        if total <= self.budget_bytes:
+            return
+        expired = []
+        for key, size in self.conn.execute(f"SELECT key, bytes FROM {CACHE_TABLE} ORDER BY lastUsed, key"):
+            if total <= self.budget_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self.conn.executemany(f"DELETE FROM {CACHE_TABLE} WHERE key = ?", expired)
+        self._stats["evictions"] += len(expired)
+
+    def stats(self) -> dict:
+        entries, size = self.conn.execute(f"SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM {CACHE_TABLE}").fetchone()
+        return {**self._stats, "entries": entries, "bytes": size, "budgetBytes": self.budget_bytes}
+
+    def clear(self):
+        self.conn.execute(f"DELETE FROM {CACHE_TABLE}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def plan_missing_units(missing: list[tuple[int, ...]], chunk_size: int = DEFAULT_CHUNK,
+                       group_size: int = STRATEGY_GROUP) -> list[WorkUnit]:
+    """
+    Unidades per_signal para las estrategias que faltan en cada señal: las
+    señales seguidas con las mismas estrategias pendientes van en tramos de
+    chunk_size
+    """
+    units = []
+    k = 0
+    while k < len(missing):
+        strategies = missing[k]
+        stop = k + 1
+        while stop < len(missing) and stop - k < chunk_size and missing[stop] == strategies:
+            stop += 1
+        for g in range(0, len(strategies), group_size):
+            units.append(WorkUnit(strategies[g:g + group_size], k, stop, per_signal=True))
+        k = stop
+    return units
+
+
+def cached_records(configs: list[BacktestConfig], replay: list[tuple], cache: ResultCache, versions: list,
+                   workers: int = 1, chunk_size: int = DEFAULT_CHUNK,
+                   on_unit=None) -> tuple[list[list[SignalRecord]], list[UnitStats]]:
+    """
+    SignalRecord de cada par (señal, estrategia): de la caché o simulado
+    (y guardado) si no está
+
+    Args:
+        versions: Versión de los ticks de cada señal del replay (tick_version)
+
+    Returns:
+        ([señal][configuración] -> SignalRecord, estadísticas de las
+        unidades simuladas)
+    """
+    keys = [[signal_key(signal, config, version) for config in configs]
+            for (signal, _), version in zip(replay, versions)]
+    found = cache.get_many([key for row in keys for key in row])
+    missing = [tuple(s for s, key in enumerate(row) if key not in found) for row in keys]
+    units = plan_missing_units(missing, chunk_size)
+    partials, stats = execute_units(configs, replay, units, workers, on_unit)
+
+    computed = {}
+    for unit in units:
+        for k, per_strategy in enumerate(partials[unit], unit.start):
+            for s, partial in zip(unit.strategies, per_strategy):
+                computed[keys[k][s]] = SignalRecord.from_partial(partial)
+    cache.put_many(computed)
+    return [[found.get(key) or computed[key] for key in row] for row in keys], stats
+
+
+def run_cached(configs: list[BacktestConfig], replay: list[tuple], cache: ResultCache, versions: list,
+               workers: int = 1, chunk_size: int = DEFAULT_CHUNK,
+               on_unit=None) -> tuple[list[BacktestResult], list[UnitStats]]:
+    """
+    Como run_units, pero solo simula los pares (señal, estrategia) que no
+    están en la caché. Las métricas y equityCurve son las de run_units; los
+    resultados no traen trades ni tradeDetails.
+
+    Args:
+        versions: Versión de los ticks de cada señal del replay (tick_version)
+
+    Returns:
+        (resultados por configuración, estadísticas de las unidades simuladas)
+    """
+    records, stats = cached_records(configs, replay, cache, versions, workers, chunk_size, on_unit)
+    results = []
+    for s, config in enumerate(configs):
+        column = [row[s] for row in records]
+        result = RunningTotals.concat([record.totals for record in column]).result(config)
+        result.equityCurve = merge_curves(column)
+        results.append(result)
+    return results, stats
@@ -0,0 +1,1284 @@
+"""
+Motor de backtesting en Python
+==============================
+
+Port de lib/backtest-engine.ts con la misma API (camelCase, como la usan
+run_backtests_direct.py y el optimizador TS):
+
+    engine = BacktestEngine(BacktestConfig(strategyName="GRID_10", lotajeBase=0.03,
+                                           numOrders=1, pipsDistance=10, maxLevels=30,
+                                           takeProfitPips=10))
+    engine.startSignal("BUY", 2650.0, 0, signal_ts)
+    engine.openInitialOrders(2650.0, signal_ts)
+    engine.processTick({"timestamp": ts, "bid": 2650.1, "ask": 2650.3, "spread": 0.2})
+    results = engine.getResults()
+
+La semántica es la del motor TS, incluidas sus rarezas (los cierres con las
+posiciones vacías también cuentan como TradeDetail, los niveles se pueden
+reabrir tras un cierre, etc.), y los cálculos que allí se hacen con
+decimal.js (precision 20, ROUND_HALF_UP) se hacen aquí con decimal.Decimal
+partiendo del mismo texto que Number.toString. Los totales de
+tests/fixtures/backtest-parity.json los genera el motor TS (expectedSource =
+"ts") y processTick de este módulo los reproduce exactamente.
+
+Además de processTick hay un kernel numpy, processTicks(ts, bid, ask), que
+procesa la ventana de ticks de una señal saltando de evento en evento: con
+el mínimo/máximo por bloques de la ventana (_TickIndex) busca el siguiente
+tick que puede cambiar el estado (TP, nivel del grid, trailing SL, stop
+loss), aplica el equity/drawdown de la racha intermedia a partir de su
+máximo, mínimo y mayor caída y ejecuta solo ese tick con la lógica escalar.
+Entre eventos no se recorre cada tick, así que una ventana tranquila cuesta
+poco más que construir el índice. El resultado (trades, profit) es el mismo
+que llamando a processTick en cada tick; el equity flotante se calcula en
+float, así que maxDrawdown puede diferir en el orden de 1e-9.
+
+Con numba instalado processTicks usa por defecto scan_grid de
+lib/backtest_kernel.py compilado: recorre los ticks en un bucle escalar
+(trailing SL incluido) y solo vuelve a Python en los ticks que cambian las
+posiciones. BacktestEngine(config, kernel="numpy" | "jit" | "python")
+fuerza una implementación; MultiBacktestEngine usa siempre la de numpy y
+solo agrupa por estrategias el cribado de bloques y el equity de los
+bloques sin eventos (la detección de eventos sigue siendo por estrategia).
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Context, Decimal
+
+import numpy as np
+
+from lib.backtest_kernel import HAS_NUMBA, SCAN_EVENT, new_buffers, scan_grid, scan_grid_py
+from lib.ticks_store import DayTicks, to_epoch_ms
+
+PIP_VALUE = 0.10  # 1 pip ≈ 0.10 USD (XAU/USD típico)
+DEFAULT_CAPITAL = 10000
+EQUITY_POINT_MS = 60_000  # un punto de la curva de equity como mucho cada minuto
+SCAN_BLOCK = 4096  # ticks que se procesan seguidos cuando no se pueden buscar eventos
+INDEX_BLOCK = 64  # ticks por bloque del resumen min/max de _TickIndex
+INDEX_CHUNK = 256  # bloques del resumen que se revisan de una vez
+MULTI_BLOCK = 1024  # ticks por paso de MultiBacktestEngine (múltiplo de INDEX_BLOCK)
+SL_MARGIN = 1e-6  # margen del filtro vectorizado del SL fijo (se confirma con Decimal)
+KERNELS = ("numpy", "jit", "python")  # implementaciones de processTicks
+DEFAULT_KERNEL = "jit" if HAS_NUMBA else "numpy"
+ENGINE_VERSION = 1  # subir cuando cambien los resultados (invalida lib/backtest_cache.py)
+
+# Misma configuración que lib/decimal-utils.ts
+_CTX = Context(prec=20, rounding=ROUND_HALF_UP)
+_PIP = Decimal("0.1")
+
+
+# ==================== DECIMAL (decimal.js) ====================
+
+def _dec(value: float) -> Decimal:
+    """new Decimal(number): parte del texto corto del float, como Number.toString"""
+    return Decimal(repr(float(value)))
+
+
+def _to_number(value: Decimal) -> float:
+    return float(str(value))
+
+
+def _diff_pips(a: float, b: float) -> float:
+    """Finance.toNumber(Finance.div(Finance.sub(a, b), PIP_VALUE))"""
+    return _to_number(_CTX.divide(_CTX.subtract(_dec(a), _dec(b)), _PIP))
+
+
+def _pips_profit(pips: float, lot: float) -> float:
+    """Finance.toNumber(Finance.div(Finance.mul(pips, lot), PIP_VALUE))"""
+    return _to_number(_CTX.divide(_CTX.multiply(_dec(pips), _dec(lot)), _PIP))
+
+
+def _to_ms(value) -> int:
+    if isinstance(value, datetime):
+        return to_epoch_ms(value)
+    return int(value)
+
+
+def _to_dt(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def _tick_field(tick, name: str):
+    return tick[name] if isinstance(tick, dict) else getattr(tick, name)
+
+
+def _js_pow(base: float, exp: float) -> float:
+    """Math.pow: NaN en lugar de complejo, Infinity en lugar de OverflowError"""
+    try:
+        return math.pow(base, exp)
+    except ValueError:
+        return math.nan
+    except OverflowError:
+        return math.inf
+
+
+def _event_matrix(q: np.ndarray, tp, level, act, back, buffer, entry_sl, stop, quiet):
+    """
+    Ticks en los que cada estrategia puede cambiar de estado
+
+    Precios y umbrales en forma BUY (negados para SELL), un umbral por
+    estrategia (arrays (S,)) y q con los precios del bloque (B,).
+
+    Returns:
+        (events, quiet_tp) de forma (S, B): quiet_tp son los ticks que solo
+        generan un cierre vacío en el TP (estrategias sin posiciones)
+    """
+    prices = q[None, :]
+
+    def col(v):
+        return np.asarray(v, dtype=np.float64)[:, None]
+
+    quiet = np.asarray(quiet, dtype=bool)[:, None]
+    tp_hit = prices >= col(tp)
+    events = prices <= col(level)
+    events |= (prices >= col(act)) & ((prices - col(back)) - col(buffer) > col(entry_sl))
+    events |= prices <= col(entry_sl)
+    events |= prices <= col(stop)
+    events |= tp_hit & ~quiet
+    return events, tp_hit & quiet
+
+
+def _candidate_bounds(tp, level, act, back, buffer, entry_sl, stop, quiet) -> tuple[float, float]:
+    """
+    Umbrales (lo, hi) de una fila de _scan_row: cualquier evento de
+    _event_matrix cumple q <= lo o q >= hi (el del trailing con holgura)
+    """
+    lo = max(level, entry_sl, stop)
+    trailing = math.inf
+    if act < math.inf:
+        trailing = max(act, entry_sl + back + buffer - SL_MARGIN)
+    return lo, min(math.inf if quiet else tp, trailing)
+
+
+class _TickIndex:
+    """
+    Resumen por bloques de INDEX_BLOCK ticks de los precios en forma BUY de
+    una ventana: mínimo, máximo y mayor caída (máximo acumulado - precio)
+    de cada bloque. Se construye una vez por ventana; con él la búsqueda del
+    siguiente tick que cruza un umbral y el rango/drawdown de una racha sin
+    eventos miran un valor por bloque en lugar de cada tick.
+    """
+
+    def __init__(self, q: np.ndarray):
+        self.q = q
+        full = len(q) // INDEX_BLOCK
+        blocks = [q[:full * INDEX_BLOCK].reshape(full, INDEX_BLOCK)]
+        if len(q) > full * INDEX_BLOCK:
+            blocks.append(q[full * INDEX_BLOCK:][None, :])
+        self.block_max = np.concatenate([b.max(axis=1) for b in blocks])
+        self.block_min = np.concatenate([b.min(axis=1) for b in blocks])
+        self.block_drop = np.concatenate([(np.maximum.accumulate(b, axis=1) - b).max(axis=1) for b in blocks])
+
+    def next_candidate(self, i: int, end: int, lo: float, hi: float) -> int:
+        """Primer tick de [i, end) con q <= lo o q >= hi (end si no hay)"""
+        q = self.q
+        head = min(end, (i // INDEX_BLOCK + 1) * INDEX_BLOCK)
+        hit = np.flatnonzero((q[i:head] <= lo) | (q[i:head] >= hi))
+        if len(hit):
+            return i + int(hit[0])
+
+        block, last = head // INDEX_BLOCK, (end - 1) // INDEX_BLOCK
+        while head < end and block <= last:
+            stop = min(last + 1, block + INDEX_CHUNK)
+            hits = np.flatnonzero((self.block_min[block:stop] <= lo) | (self.block_max[block:stop] >= hi))
+            if not len(hits):
+                block = stop
+                continue
+            block += int(hits[0])
+            start = block * INDEX_BLOCK
+            seg = q[start:min(end, start + INDEX_BLOCK)]
+            hit = np.flatnonzero((seg <= lo) | (seg >= hi))
+            if len(hit):
+                return start + int(hit[0])
+            block += 1
+        return end
+
+    def at_least(self, i: int, j: int, threshold: float) -> np.ndarray:
+        """Índices de [i, j) con q >= threshold"""
+        a, b = i // INDEX_BLOCK, -(-j // INDEX_BLOCK)
+        found = []
+        for block in a + np.flatnonzero(self.block_max[a:b] >= threshold):
+            start = max(i, int(block) * INDEX_BLOCK)
+            seg = self.q[start:min(j, (int(block) + 1) * INDEX_BLOCK)]
+            found.append(start + np.flatnonzero(seg >= threshold))
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def stats(self, i: int, j: int) -> tuple[float, float, float]:
+        """(máximo, mínimo, mayor caída desde un máximo previo) de q en [i, j)"""
+        q = self.q
+        first, last = -(-i // INDEX_BLOCK), j // INDEX_BLOCK
+        if first >= last:
+            seg = q[i:j]
+            return float(seg.max()), float(seg.min()), float((np.maximum.accumulate(seg) - seg).max())
+
+        high, low, drop = -math.inf, math.inf, 0.0
+        head = q[i:first * INDEX_BLOCK]
+        if len(head):
+            high, low = float(head.max()), float(head.min())
+            drop = float((np.maximum.accumulate(head) - head).max())
+
+        block_max = self.block_max[first:last]
+        block_min = self.block_min[first:last]
+        before = np.maximum.accumulate(np.concatenate(([high], block_max[:-1])))
+        drop = max(drop, float(self.block_drop[first:last].max()), float((before - block_min).max()))
+        high, low = max(high, float(block_max.max())), min(low, float(block_min.min()))
+
+        tail = q[last * INDEX_BLOCK:j]
+        if len(tail):
+            drop = max(drop, float((np.maximum(np.maximum.accumulate(tail), high) - tail).max()))
+            high, low = max(high, float(tail.max())), min(low, float(tail.min()))
+        return high, low, drop
+
+
+# ==================== TIPOS ====================
+
+@dataclass
+class BacktestConfig:
+    strategyName: str
+    lotajeBase: float
+    numOrders: int
+    pipsDistance: float
+    maxLevels: int
+    takeProfitPips: float
+    useStopLoss: bool = False
+    stopLossPips: float | None = None
+    useTrailingSL: bool | None = None  # None = activado
+    trailingSLPercent: float | None = None  # None = 50
+    restrictionType: str | None = None  # "RIESGO" | "SIN_PROMEDIOS" | "SOLO_1_PROMEDIO"
+    initialCapital: float | None = None
+    filters: dict | None = None
+
+
+@dataclass
+class SimulatedTrade:
+    id: str
+    type: str  # "OPEN" | "AVERAGE" | "CLOSE" | "TAKE_PROFIT" | "STOP_LOSS"
+    side: str
+    price: float
+    lotSize: float
+    level: int
+    profit: float
+    profitPips: float
+    timestamp: datetime
+    signalIndex: int | None = None
+
+
+@dataclass
+class TradeLevel:
+    level: int
+    openPrice: float
+    closePrice: float
+    lotSize: float
+    profit: float
+    profitPips: float
+    openTime: datetime
+    closeTime: datetime
+
+
+@dataclass
+class TradeDetail:
+    signalIndex: int
+    signalTimestamp: datetime
+    signalSide: str
+    signalPrice: float
+    entryPrice: float
+    entryTime: datetime
+    exitPrice: float
+    exitTime: datetime
+    exitReason: str  # "TAKE_PROFIT" | "STOP_LOSS" | "TRAILING_SL" | "SIGNAL_CLOSE"
+    totalLots: float
+    avgPrice: float
+    totalProfit: float
+    totalProfitPips: float
+    durationMinutes: float
+    maxLevels: int
+    levels: list[TradeLevel] = field(default_factory=list)
+
+
+@dataclass
+class EquityPoint:
+    timestamp: datetime
+    equity: float
+    balance: float
+    drawdown: float
+
+
+@dataclass
+class BacktestResult:
+    totalTrades: int
+    totalProfit: float
+    totalProfitPips: float
+    winRate: float
+    maxDrawdown: float
+    profitFactor: float
+    initialCapital: float
+    finalCapital: float
+    profitPercent: float
+    maxDrawdownPercent: float
+    sharpeRatio: float
+    sortinoRatio: float
+    calmarRatio: float
+    expectancy: float
+    avgWin: float
+    avgLoss: float
+    rewardRiskRatio: float
+    maxConsecutiveWins: int
+    maxConsecutiveLosses: int
+    profitableTrades: int  # trades con profit > 0
+    profitFactorByMonth: list[dict]
+    trades: list[SimulatedTrade]
+    tradeDetails: list[TradeDetail]
+    equityCurve: list[EquityPoint]
+
+
+@dataclass
+class PartialResult:
+    """
+    Estado final de un motor que solo ha visto un tramo de las señales;
+    merge_partials une los tramos en orden. Equity relativo al capital
+    inicial del motor del tramo.
+    """
+    trades: list[SimulatedTrade]
+    tradeDetails: list[TradeDetail]
+    equityCurve: list[EquityPoint]
+    profit: float  # balance final - capital inicial
+    peakEquity: float
+    minEquity: float  # inf si el tramo no tuvo ticks
+    maxDrawdown: float  # mayor caída dentro del tramo
+
+
+# ==================== MÉTRICAS ====================
+
+def trade_month(detail: TradeDetail) -> str:
+    """Mes (UTC) con el que se agrupa un trade en profitFactorByMonth"""
+    return detail.signalTimestamp.astimezone(timezone.utc).strftime("%Y-%m")
+
+
+def curve_days(first: datetime, last: datetime) -> float:
+    """Días entre el primer y el último punto de la curva (para Calmar, mínimo 1)"""
+    return max(1, (last - first).total_seconds() / 86400)
+
+
+def result_metrics(config: BacktestConfig, profits: list[float], pips: list[float], months: list[str],
+                   days: float, max_drawdown: float) -> dict:
+    """
+    Métricas de BacktestResult (sin las listas) a partir de totalProfit,
+    totalProfitPips y trade_month de cada TradeDetail en orden
+    """
+    initial = config.initialCapital or DEFAULT_CAPITAL
+    total_profit = sum(profits)
+    final_capital = initial + total_profit
+    profit_percent = (total_profit / initial) * 100
+    max_dd_percent = (max_drawdown / initial) * 100
+
+    winning = [p for p in profits if p > 0]
+    losing = [p for p in profits if p < 0]
+    win_rate = len(winning) / len(profits) * 100 if profits else 0
+    total_winning = sum(winning)
+    total_losing = sum(abs(p) for p in losing)
+    profit_factor = total_winning / total_losing if total_losing > 0 else 0
+    total_pips = sum(pips)
+
+    # Sharpe / Sortino sobre el retorno de cada trade
+    returns = [p / initial for p in profits]
+    risk_free_daily = 0.04 / 252
+    avg_return = sum(returns) / len(returns) if returns else 0
+    variance = (sum((r - avg_return) ** 2 for r in returns) / (len(returns) - 1)
+                if len(returns) > 1 else 0)
+    std_dev = math.sqrt(variance)
+    sharpe = (avg_return - risk_free_daily) / std_dev * math.sqrt(252) if std_dev > 0 else 0
+
+    negative = [r for r in returns if r < 0]
+    downside_variance = sum(r ** 2 for r in negative) / len(negative) if len(negative) > 1 else 0
+    downside_dev = math.sqrt(downside_variance)
+    sortino = (avg_return - risk_free_daily) / downside_dev * math.sqrt(252) if downside_dev > 0 else 0
+
+    # Calmar
+    annualized = (_js_pow(final_capital / initial, 252 / days) - 1) * 100
+    calmar = annualized / max_dd_percent if max_dd_percent > 0 else 0
+
+    # Expectancy
+    win_rate_dec = win_rate / 100
+    avg_win = total_winning / len(winning) if winning else 0
+    avg_loss = total_losing / len(losing) if losing else 0
+    expectancy = win_rate_dec * avg_win - (1 - win_rate_dec) * avg_loss
+    reward_risk = avg_win / avg_loss if avg_loss > 0 else 0
+
+    # Rachas (profit >= 0 cuenta como ganadora)
+    max_wins = max_losses = wins = losses = 0
+    for p in profits:
+        if p >= 0:
+            wins, losses = wins + 1, 0
+            max_wins = max(max_wins, wins)
+        else:
+            wins, losses = 0, losses + 1
+            max_losses = max(max_losses, losses)
+
+    # Profit factor por mes
+    monthly: dict[str, dict] = {}
+    for month, p in zip(months, profits):
+        data = monthly.setdefault(month, {"wins": 0, "losses": 0, "profit": 0})
+        if p >= 0:
+            data["wins"] += p
+        else:
+            data["losses"] += abs(p)
+        data["profit"] += p
+    by_month = [
+        {
+            "month": month,
+            "profitFactor": (data["wins"] / data["losses"] if data["losses"] > 0
+                             else math.inf if data["wins"] > 0 else 0),
+            "profit": data["profit"],
+        }
+        for month, data in sorted(monthly.items())
+    ]
+
+    return {
+        "totalTrades": len(profits),
+        "totalProfit": total_profit,
+        "totalProfitPips": total_pips,
+        "winRate": win_rate,
+        "maxDrawdown": max_drawdown,
+        "profitFactor": profit_factor,
+        "initialCapital": initial,
+        "finalCapital": final_capital,
+        "profitPercent": profit_percent,
+        "maxDrawdownPercent": max_dd_percent,
+        "sharpeRatio": sharpe,
+        "sortinoRatio": sortino,
+        "calmarRatio": calmar,
+        "expectancy": expectancy,
+        "avgWin": avg_win,
+        "avgLoss": avg_loss,
+        "rewardRiskRatio": reward_risk,
+        "maxConsecutiveWins": max_wins,
+        "maxConsecutiveLosses": max_losses,
+        "profitableTrades": len(winning),
+        "profitFactorByMonth": by_month,
+    }
+
+
+# ==================== MOTOR ====================
+
+class BacktestEngine:
+    def __init__(self, config: BacktestConfig, kernel: str | None = None):
+        """
+        Args:
+            config: Configuración de la estrategia
+            kernel: Implementación de processTicks: "numpy" (_TickIndex),
+                "jit" (scan_grid compilado, necesita numba) o "python"
+                (scan_grid sin compilar, referencia para tests). Por
+                defecto "jit" si numba está instalado, si no "numpy".
+        """
+        self.config = config
+        self.kernel = kernel or DEFAULT_KERNEL
+        if self.kernel not in KERNELS:
+            raise ValueError(f"Kernel desconocido: {self.kernel} (opciones: {', '.join(KERNELS)})")
+        if self.kernel == "jit" and not HAS_NUMBA:
+            raise ValueError("El kernel jit necesita numba (pip install numba)")
+        self._entry_price: float | None = None
+        self._side: str | None = None
+        self._entry_open = False
+        self._positions: list[SimulatedTrade] = []  # operaciones vivas en orden de apertura
+        self._entry_sl: float | None = None  # trailing SL virtual
+        self._total_levels = 0
+
+        self._trades: list[SimulatedTrade] = []
+        self._trade_details: list[TradeDetail] = []
+        self._equity_curve: list[EquityPoint] = []
+        self._last_point_ms: int | None = None
+
+        # Señal actual (timestamps en epoch ms)
+        self._signal_index = 0
+        self._signal_ms: int | None = None
+        self._signal_price: float | None = None
+        self._entry_ms: int | None = None
+
+        self._balance = float(config.initialCapital or DEFAULT_CAPITAL)
+        self._equity = 0.0
+        self._peak_equity = 0.0
+        self._min_equity = math.inf  # para merge_partials
+        self._max_drawdown = 0.0
+
+    # ==================== SEÑALES ====================
+
+    def startSignal(self, side: str, price: float, signalIndex: int = 0,
+                    signalTimestamp: datetime | None = None):
+        if price <= 0:
+            raise ValueError(f"Precio de entrada invalido: {price}. La senal {signalIndex} no tiene precio valido.")
+        self._signal_index = signalIndex
+        self._signal_ms = _to_ms(signalTimestamp or datetime.now(timezone.utc))
+        self._signal_price = price
+
+        self._side = side
+        self._entry_price = price
+        self._entry_open = False
+        self._entry_sl = None
+        self._positions = []
+        self._total_levels = self._calculate_max_levels()
+
+    def _calculate_max_levels(self) -> int:
+        max_levels = self.config.maxLevels
+        restriction = self.config.restrictionType
+        if restriction == "RIESGO":
+            return min(max_levels, 1)
+        if restriction == "SIN_PROMEDIOS":
+            return 1
+        if restriction == "SOLO_1_PROMEDIO":
+            return min(max_levels, 2)
+        return max_levels
+
+    def openInitialOrders(self, currentPrice: float, tickTimestamp: datetime | None = None) -> list[SimulatedTrade]:
+        timestamp = tickTimestamp or datetime.now(timezone.utc)
+        self._entry_ms = _to_ms(timestamp)
+        trades = [
+            SimulatedTrade(f"trade_{self._entry_ms}_{i}", "OPEN", self._side, currentPrice,
+                           self.config.lotajeBase, i, 0.0, 0.0, timestamp)
+            for i in range(self.config.numOrders)
+        ]
+        self._positions = list(trades)
+        self._entry_open = True
+        self._entry_sl = None
+        return trades
+
+    def hasOpenPositions(self) -> bool:
+        return self._entry_open and len(self._positions) > 0
+
+    def closeRemainingPositions(self, lastPrice: float, closeTimestamp: datetime) -> list[SimulatedTrade]:
+        """Cierre por fin de señal (los ticks se acaban con el trade abierto)"""
+        if not self._entry_open or not self._positions:
+            return []
+        return self._close_positions(lastPrice, _to_ms(closeTimestamp), "SIGNAL_CLOSE")
+
+    # ==================== TICKS ====================
+
+    def processTick(self, tick) -> list[SimulatedTrade] | None:
+        """Procesa un tick (dict u objeto con timestamp, bid, ask)"""
+        if not self._entry_price or not self._side:
+            return None
+        price = _tick_field(tick, "bid" if self._side == "BUY" else "ask")
+        return self._step(float(price), _to_ms(_tick_field(tick, "timestamp")))
+
+    def _step(self, price: float, ts: int) -> list[SimulatedTrade] | None:
+        buy = self._side == "BUY"
+
+        # 1. Trailing SL virtual
+        self._update_trailing_stop_loss(price)
+
+        # 2. SL virtual de la entrada
+        if self._entry_sl is not None and (price <= self._entry_sl if buy else price >= self._entry_sl):
+            return self._close_positions(price, ts, "STOP_LOSS")
+
+        # 2b. Stop loss fijo de emergencia
+        stop_loss = self.config.stopLossPips
+        if stop_loss and stop_loss > 0:
+            loss_pips = _diff_pips(self._entry_price, price) if buy else _diff_pips(price, self._entry_price)
+            if loss_pips >= stop_loss and self._entry_open:
+                return self._close_positions(price, ts, "STOP_LOSS")
+
+        # 3. Precio promedio
+        avg_price = self._average_price()
+        if avg_price is None:
+            return None
+
+        # 4. Take profit desde el promedio
+        tp_price = self._tp_price(avg_price)
+        if price >= tp_price if buy else price <= tp_price:
+            return self._close_positions(price, ts, "TAKE_PROFIT")
+
+        # 5. Niveles del grid
+        self._manage_grid_levels(price, ts)
+
+        # 6. Equity y drawdown
+        self._update_equity_metrics(price, ts)
+        return None
+
+    def _trailing_params(self) -> tuple[float, float, float]:
+        """(activateDistance, backDistance, buffer) del trailing SL"""
+        activate = self.config.takeProfitPips * PIP_VALUE
+        percent = self.config.trailingSLPercent
+        back = (activate * (50 if percent is None else percent)) / 100
+        return activate, back, 1 * PIP_VALUE
+
+    def _trailing_active(self) -> bool:
+        return self._entry_open and bool(self._entry_price) and self.config.useTrailingSL is not False
+
+    def _update_trailing_stop_loss(self, price: float):
+        if not self._trailing_active():
+            return
+        activate, back, buffer = self._trailing_params()
+        if self._side == "BUY":
+            if price >= self._entry_price + activate:
+                target = price - back - buffer
+                if self._entry_sl is None or target > self._entry_sl:
+                    self._entry_sl = target
+        else:
+            if price <= self._entry_price - activate:
+                target = price + back + buffer
+                if self._entry_sl is None or target < self._entry_sl:
+                    self._entry_sl = target
+
+    def _average_price(self) -> float | None:
+        if not self._positions:
+            return self._entry_price
+        total_lots = 0
+        weighted = 0
+        for trade in self._positions:
+            total_lots += trade.lotSize
+            weighted += trade.price * trade.lotSize
+        if total_lots == 0:
+            return None
+        return weighted / total_lots
+
+    def _tp_price(self, avg_price: float) -> float:
+        distance = _CTX.multiply(_dec(self.config.takeProfitPips), _PIP)
+        if self._side == "BUY":
+            return _to_number(_CTX.add(_dec(avg_price), distance))
+        return _to_number(_CTX.subtract(_dec(avg_price), distance))
+
+    def _level_price(self, level: int) -> float:
+        """Precio de un nivel (distancia FIJA desde la entrada)"""
+        grid = self.config.pipsDistance * PIP_VALUE
+        if self._side == "BUY":
+            return self._entry_price - (level * grid)
+        return self._entry_price + (level * grid)
+
+    def _free_levels(self) -> list[int]:
+        live = {t.level for t in self._positions}
+        return [lvl for lvl in range(1, self._total_levels) if lvl not in live]
+
+    def _manage_grid_levels(self, price: float, ts: int):
+        buy = self._side == "BUY"
+        for level in self._free_levels():
+            level_price = self._level_price(level)
+            if price <= level_price if buy else price >= level_price:
+                # Se abre en el precio EXACTO del nivel
+                self._positions.append(SimulatedTrade(
+                    f"avg_{ts}_{level}", "AVERAGE", self._side, level_price,
+                    self.config.lotajeBase, level, 0.0, 0.0, _to_dt(ts),
+                ))
+
+    def _close_positions(self, price: float, ts: int, reason: str) -> list[SimulatedTrade]:
+        """
+        Cierra todas las operaciones vivas (closeAllLevelsInProfit con
+        reason="TAKE_PROFIT", closeAllPositions con STOP_LOSS / SIGNAL_CLOSE)
+        """
+        buy = self._side == "BUY"
+        close_time = _to_dt(ts)
+        trade_type = "STOP_LOSS" if reason == "STOP_LOSS" else "CLOSE"
+        closing, levels = [], []
+        total_profit = 0
+        total_pips = 0
+        total_lots = 0
+        weighted = 0
+
+        for trade in self._positions:
+            pips = _diff_pips(price, trade.price) if buy else _diff_pips(trade.price, price)
+            profit = _pips_profit(pips, trade.lotSize)
+            closed = SimulatedTrade(trade.id, trade_type, trade.side, trade.price, trade.lotSize,
+                                    trade.level, profit, pips, trade.timestamp, trade.signalIndex)
+            closing.append(closed)
+            total_profit += profit
+            total_pips += pips
+            total_lots += trade.lotSize
+            weighted += trade.price * trade.lotSize
+            levels.append(TradeLevel(trade.level, trade.price, price, trade.lotSize,
+                                     profit, pips, trade.timestamp, close_time))
+        self._trades.extend(closing)
+
+        if self._entry_ms is not None and self._signal_ms is not None:
+            if reason == "STOP_LOSS" and self._entry_sl is not None:
+                reason = "TRAILING_SL"
+            avg = weighted / total_lots if total_lots > 0 else self._entry_price
+            self._trade_details.append(TradeDetail(
+                signalIndex=self._signal_index,
+                signalTimestamp=_to_dt(self._signal_ms),
+                signalSide=self._side,
+                signalPrice=self._signal_price,
+                entryPrice=avg,
+                entryTime=_to_dt(self._entry_ms),
+                exitPrice=price,
+                exitTime=close_time,
+                exitReason=reason,
+                totalLots=total_lots,
+                avgPrice=avg,
+                totalProfit=total_profit,
+                totalProfitPips=total_pips,
+                durationMinutes=(ts - self._entry_ms) / 60000,
+                maxLevels=len(levels),
+                levels=levels,
+            ))
+            self._balance += total_profit
+
+        self._positions = []
+        self._entry_open = False
+        self._entry_sl = None
+        return closing
+
+    def _update_equity_metrics(self, price: float, ts: int):
+        buy = self._side == "BUY"
+        floating = 0
+        for trade in self._positions:
+            pips = _diff_pips(price, trade.price) if buy else _diff_pips(trade.price, price)
+            floating += _pips_profit(pips, trade.lotSize)
+
+        self._equity = self._balance + floating
+        if self._equity > self._peak_equity:
+            self._peak_equity = self._equity
+        if self._equity < self._min_equity:
+            self._min_equity = self._equity
+        drawdown = self._peak_equity - self._equity
+        if drawdown > self._max_drawdown:
+            self._max_drawdown = drawdown
+
+        if self._entry_open and (self._last_point_ms is None or ts - self._last_point_ms >= EQUITY_POINT_MS):
+            self._add_equity_point(ts, self._equity, drawdown)
+
+    def _add_equity_point(self, ts: int, equity: float, drawdown: float):
+        self._equity_curve.append(EquityPoint(_to_dt(ts), equity, self._balance, drawdown))
+        self._last_point_ms = ts
+
+    # ==================== KERNEL VECTORIZADO ====================
+
+    def processWindow(self, window: DayTicks):
+        """processTicks sobre una ventana del tick store"""
+        self.processTicks(window.ts, window.bid_prices(), window.ask_prices())
+
+    def processTicks(self, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        """
+        Equivalente a llamar a processTick con cada tick de la ventana
+
+        Args:
+            ts: Timestamps epoch ms ordenados
+            bid, ask: Precios (float)
+        """
+        if not self._entry_price or not self._side:
+            return
+        ts = np.asarray(ts, dtype=np.int64)
+        prices = np.asarray(bid if self._side == "BUY" else ask, dtype=np.float64)
+        if not len(prices):
+            return
+        if self.kernel == "numpy":
+            self._process_range(ts, prices, _TickIndex(self._oriented(prices)), 0, len(prices))
+        else:
+            self._scan_range(ts, prices, self._oriented(prices), 0, len(prices))
+
+    def _oriented(self, prices: np.ndarray) -> np.ndarray:
+        """Precios en forma BUY (negados para SELL): todas las comparaciones van en un sentido"""
+        return prices if self._side == "BUY" else -prices
+
+    def _process_range(self, ts: np.ndarray, prices: np.ndarray, index: _TickIndex, i: int, end: int):
+        """Procesa los ticks [i, end) saltando de evento en evento"""
+        while i < end:
+            row = self._scan_row()
+            if row is None:
+                # Lotes a 0: sin promedio, cada tick se procesa por separado
+                stop = min(end, i + SCAN_BLOCK)
+                for k in range(i, stop):
+                    self._step(float(prices[k]), int(ts[k]))
+                i = stop
+                continue
+
+            j = self._next_event(index, row, i, end)
+            self._quiet_run(index, ts, prices, i, j, row)
+            if j < end:
+                self._step(float(prices[j]), int(ts[j]))
+                j += 1
+            i = j
+
+    def _scan_range(self, ts: np.ndarray, prices: np.ndarray, q: np.ndarray, i: int, end: int):
+        """Procesa los ticks [i, end) con scan_grid; solo los eventos pasan por _step"""
+        scan = scan_grid if self.kernel == "jit" else scan_grid_py
+        buffers = new_buffers()
+        point_idx, point_equity, point_drawdown, tp_idx = buffers
+        sign = 1.0 if self._side == "BUY" else -1.0
+        while i < end:
+            row = self._scan_row()
+            if row is None:
+                stop = min(end, i + SCAN_BLOCK)
+                for k in range(i, stop):
+                    self._step(float(prices[k]), int(ts[k]))
+                i = stop
+                continue
+
+            lots, offset = self._position_sums() if self._positions else (0.0, 0.0)
+            last_point = -1 if self._last_point_ms is None else self._last_point_ms
+            (j, reason, entry_sl, self._equity, self._peak_equity, self._min_equity, self._max_drawdown,
+             _, n_points, n_tp) = scan(
+                q, ts, i, end, *row, sign * self._entry_price, lots, offset, self._balance, self._equity,
+                self._peak_equity, self._min_equity, self._max_drawdown, last_point, self._entry_open, *buffers,
+            )
+            if entry_sl > -math.inf:
+                self._entry_sl = sign * entry_sl
+            for k, equity, drawdown in zip(point_idx[:n_points].tolist(), point_equity[:n_points].tolist(),
+                                           point_drawdown[:n_points].tolist()):
+                self._add_equity_point(int(ts[k]), equity, drawdown)
+            if n_tp:
+                self._empty_closes(prices[tp_idx[:n_tp]], ts[tp_idx[:n_tp]])
+            if reason == SCAN_EVENT:
+                self._step(float(prices[j]), int(ts[j]))
+                j += 1
+            i = j
+
+    def _next_event(self, index: _TickIndex, row: tuple, i: int, end: int) -> int:
+        """Primer tick de [i, end) que cambia el estado según _event_matrix (end si no hay)"""
+        lo, hi = _candidate_bounds(*row)
+        while i < end:
+            i = index.next_candidate(i, end, lo, hi)
+            if i >= end:
+                break
+            # El umbral del trailing es holgado: se confirma hasta el final del bloque
+            stop = min(end, (i // INDEX_BLOCK + 1) * INDEX_BLOCK)
+            events, _ = _event_matrix(index.q[i:stop], *(np.array([v]) for v in row))
+            hit = np.flatnonzero(events[0])
+            if len(hit):
+                return i + int(hit[0])
+            i = stop
+        return end
+
+    def _scan_row(self) -> tuple | None:
+        """
+        Umbrales del estado actual en forma BUY para _event_matrix:
+        (tp, nivel, activación trailing, backDistance, buffer, entrySL,
+        SL fijo, quiet). None si el promedio no está definido (lotes a 0).
+
+        quiet: sin posiciones ni entrada abierta; el TP solo añade un
+        TradeDetail vacío y no hay trailing ni SL.
+        """
+        avg_price = self._average_price()
+        if avg_price is None:
+            return None
+        sign = 1.0 if self._side == "BUY" else -1.0
+        free = self._free_levels()
+        level = sign * self._level_price(free[0]) if free else -math.inf
+        quiet = not self._positions and not self._entry_open
+        activate, back, buffer = self._trailing_params()
+
+        act = math.inf
+        if not quiet and self._trailing_active():
+            act = sign * (self._entry_price + sign * activate)
+        entry_sl = -math.inf if self._entry_sl is None else sign * self._entry_sl
+        stop = -math.inf
+        stop_loss = self.config.stopLossPips
+        if stop_loss and stop_loss > 0 and self._entry_open:
+            # Filtro holgado; _step confirma con el cálculo Decimal
+            stop = sign * self._entry_price - stop_loss * PIP_VALUE + SL_MARGIN
+        return sign * self._tp_price(avg_price), level, act, back, buffer, entry_sl, stop, quiet
+
+    def _quiet_run(self, index: _TickIndex, ts: np.ndarray, prices: np.ndarray, i: int, j: int, row: tuple):
+        """Racha [i, j) sin eventos: cierres vacíos en el TP y equity del resto"""
+        if i >= j:
+            return
+        if not row[-1]:
+            self._apply_range(index, ts, i, j)
+            return
+        # Sin posiciones ni entrada abierta: equity constante y sin puntos en la curva
+        hits = index.at_least(i, j, row[0])
+        if len(hits):
+            self._empty_closes(prices[hits], ts[hits])
+        if j - i > len(hits):
+            self._peak_equity = max(self._peak_equity, self._balance)
+            self._min_equity = min(self._min_equity, self._balance)
+            self._max_drawdown = max(self._max_drawdown, self._peak_equity - self._balance)
+            self._equity = self._balance
+
+    def _empty_closes(self, prices: np.ndarray, ts: np.ndarray):
+        """Cierres en el TP sin posiciones: un TradeDetail vacío por tick"""
+        if self._entry_ms is None or self._signal_ms is None or not len(prices):
+            return
+        signal_time = _to_dt(self._signal_ms)
+        entry_time = _to_dt(self._entry_ms)
+        for price, tick_ms in zip(prices.tolist(), ts.tolist()):
+            self._trade_details.append(TradeDetail(
+                self._signal_index, signal_time, self._side, self._signal_price,
+                self._entry_price, entry_time, price, _to_dt(tick_ms), "TAKE_PROFIT",
+                0, self._entry_price, 0, 0, (tick_ms - self._entry_ms) / 60000, 0, [],
+            ))
+
+    def _position_sums(self) -> tuple[float, float]:
+        """(Σ lotes, Σ lote * (entry - precio) en forma BUY) de las posiciones vivas"""
+        sign = 1.0 if self._side == "BUY" else -1.0
+        lots = sum(t.lotSize for t in self._positions)
+        offset = sum(t.lotSize * sign * (self._entry_price - t.price) for t in self._positions)
+        return lots, offset
+
+    def _equity_at(self, q: float, sums: tuple[float, float]) -> float:
+        """Equity en float con el precio q en forma BUY (updateEquityMetrics sin Decimal)"""
+        if not self._positions:
+            return self._balance
+        lots, offset = sums
+        sign = 1.0 if self._side == "BUY" else -1.0
+        return self._balance + ((q - sign * self._entry_price) * lots + offset) / PIP_VALUE / PIP_VALUE
+
+    def _range_summary(self, index: _TickIndex, i: int, j: int) -> tuple[float, float, float, float]:
+        """(equity máximo, mínimo, último, mayor caída) de la racha [i, j)"""
+        high, low, drop = index.stats(i, j)
+        sums = self._position_sums()
+        slope = sums[0] / PIP_VALUE / PIP_VALUE if self._positions else 0.0
+        return (self._equity_at(high, sums), self._equity_at(low, sums),
+                self._equity_at(float(index.q[j - 1]), sums), drop * slope)
+
+    def _apply_range(self, index: _TickIndex, ts: np.ndarray, i: int, j: int,
+                     summary: tuple[float, float, float, float] | None = None):
+        """
+        Peak, drawdown y curva de equity de la racha [i, j) sin eventos
+
+        El equity es creciente con el precio en forma BUY, así que el peak
+        sale del máximo de la racha y el drawdown del mínimo y de la mayor
+        caída de _TickIndex; solo los puntos de la curva miran ticks sueltos.
+        """
+        high, low, last, drop = summary or self._range_summary(index, i, j)
+        start_peak = self._peak_equity
+        self._max_drawdown = max(self._max_drawdown, start_peak - low, drop)
+        self._peak_equity = max(start_peak, high)
+        self._min_equity = min(self._min_equity, low)
+        self._equity = last
+
+        if not self._entry_open:
+            return
+        points = []
+        k = i
+        while k < j:
+            if points or self._last_point_ms is not None:
+                last_ms = int(ts[points[-1]]) if points else self._last_point_ms
+                k = max(i, int(np.searchsorted(ts, last_ms + EQUITY_POINT_MS, side="left")))
+                if k >= j:
+                    break
+            points.append(k)
+        if not points:
+            return
+
+        # Máximo acumulado de la racha en cada punto: máximos de los tramos entre puntos
+        sums = self._position_sums()
+        points = np.array(points)
+        starts = np.concatenate(([0], points[:-1] + 1 - i))
+        run_max = np.maximum.accumulate(np.maximum.reduceat(index.q[i:points[-1] + 1], starts))
+        for k, high in zip(points.tolist(), run_max.tolist()):
+            equity = self._equity_at(float(index.q[k]), sums)
+            peak = max(start_peak, self._equity_at(high, sums))
+            self._add_equity_point(int(ts[k]), equity, peak - equity)
+
+    # ==================== RESULTADOS ====================
+
+    def getResults(self) -> BacktestResult:
+        details = self._trade_details
+        curve = self._equity_curve
+        metrics = result_metrics(
+            self.config,
+            [d.totalProfit for d in details],
+            [d.totalProfitPips for d in details],
+            [trade_month(d) for d in details],
+            curve_days(curve[0].timestamp, curve[-1].timestamp) if len(curve) > 1 else 1,
+            self._max_drawdown,
+        )
+        return BacktestResult(**metrics, trades=self._trades, tradeDetails=details, equityCurve=curve)
+
+    def getPartialResults(self) -> PartialResult:
+        """Estado del motor para merge_partials (ejecución por tramos de señales)"""
+        initial = float(self.config.initialCapital or DEFAULT_CAPITAL)
+        return PartialResult(
+            self._trades, self._trade_details, self._equity_curve, self._balance - initial,
+            self._peak_equity, self._min_equity, self._max_drawdown,
+        )
+
+
+class MultiBacktestEngine:
+    """
+    Varias configuraciones recorriendo juntas la misma ventana de ticks
+
+    Misma interfaz que BacktestEngine (startSignal, openInitialOrders,
+    processWindow, closeRemainingPositions...) pero con una lista de
+    configuraciones; getResults() devuelve un resultado por configuración,
+    igual que ejecutando cada una por separado.
+
+    El _TickIndex de la ventana se construye una sola vez para todas. En
+    cada paso de MULTI_BLOCK ticks se comprueba a la vez, con el mínimo y
+    máximo por bloques, qué estrategias pueden cruzar algún umbral. El eje
+    de estrategias solo está vectorizado ahí y en el equity de los bloques
+    tranquilos: las matrices (estrategias x niveles) de lotes y precio de
+    apertura solo sirven para calcular juntas ese equity. Las estrategias
+    con algún evento en el bloque buscan y ejecutan sus eventos una a una
+    (_process_range, la misma lógica escalar de BacktestEngine), así que
+    con muchos eventos la ganancia frente a ejecutarlas por separado es
+    solo el índice compartido.
+
+    Siempre usa el kernel numpy, también con numba instalado: el paso
+    compartido por bloques es lo que aprovecha simular juntas las
+    estrategias, y scan_grid (jit) recorre cada estrategia por separado.
+    """
+
+    def __init__(self, configs: list[BacktestConfig]):
+        self.configs = list(configs)
+        self.engines = [BacktestEngine(c, "numpy") for c in self.configs]
+        self.level_lots = np.zeros((len(self.engines), 1))
+        self.level_prices = np.zeros((len(self.engines), 1))
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def startSignal(self, side: str, price: float, signalIndex: int = 0,
+                    signalTimestamp: datetime | None = None):
+        signalTimestamp = signalTimestamp or datetime.now(timezone.utc)
+        for engine in self.engines:
+            engine.startSignal(side, price, signalIndex, signalTimestamp)
+
+    def openInitialOrders(self, currentPrice: float,
+                          tickTimestamp: datetime | None = None) -> list[list[SimulatedTrade]]:
+        tickTimestamp = tickTimestamp or datetime.now(timezone.utc)
+        trades = [engine.openInitialOrders(currentPrice, tickTimestamp) for engine in self.engines]
+        width = max(max(e._total_levels, e.config.numOrders, 1) for e in self.engines)
+        self.level_lots = np.zeros((len(self.engines), width))
+        self.level_prices = np.zeros((len(self.engines), width))
+        for s in range(len(self.engines)):
+            self._sync(s)
+        return trades
+
+    def hasOpenPositions(self) -> bool:
+        return any(engine.hasOpenPositions() for engine in self.engines)
+
+    def closeRemainingPositions(self, lastPrice: float, closeTimestamp: datetime) -> list[list[SimulatedTrade]]:
+        closed = [engine.closeRemainingPositions(lastPrice, closeTimestamp) for engine in self.engines]
+        for s in range(len(self.engines)):
+            self._sync(s)
+        return closed
+
+    def processTick(self, tick) -> list:
+        results = [engine.processTick(tick) for engine in self.engines]
+        for s in range(len(self.engines)):
+            self._sync(s)
+        return results
+
+    def processWindow(self, window: DayTicks):
+        self.processTicks(window.ts, window.bid_prices(), window.ask_prices())
+
+    def processTicks(self, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        """Equivale a BacktestEngine.processTicks en cada configuración"""
+        lead = self.engines[0] if self.engines else None
+        if lead is None or not lead._entry_price or not lead._side:
+            return
+        ts = np.asarray(ts, dtype=np.int64)
+        prices = np.asarray(bid if lead._side == "BUY" else ask, dtype=np.float64)
+        if not len(prices):
+            return
+        index = _TickIndex(lead._oriented(prices))
+        n = len(prices)
+
+        i = 0
+        while i < n:
+            stop = min(n, i + MULTI_BLOCK)
+            rows = [engine._scan_row() for engine in self.engines]
+            vectorized = [s for s, row in enumerate(rows) if row is not None]
+            for s, row in enumerate(rows):
+                if row is None:
+                    self.engines[s]._process_range(ts, prices, index, i, stop)
+                    self._sync(s)
+            if vectorized:
+                self._process_block(index, ts, prices, i, stop, vectorized, [rows[s] for s in vectorized])
+            i = stop
+
+    def _process_block(self, index: _TickIndex, ts, prices, i: int, stop: int,
+                       strategies: list[int], rows: list[tuple]):
+        bounds = np.array([_candidate_bounds(*row) for row in rows])
+        a, b = i // INDEX_BLOCK, -(-stop // INDEX_BLOCK)
+        busy = ((index.block_min[None, a:b] <= bounds[:, :1])
+                | (index.block_max[None, a:b] >= bounds[:, 1:])).any(axis=1)
+        calm = [s for k, s in enumerate(strategies) if not busy[k] and not rows[k][-1]]
+        summaries = self._range_summaries(calm, index, i, stop) if calm else {}
+
+        for k, s in enumerate(strategies):
+            engine = self.engines[s]
+            if busy[k]:
+                engine._process_range(ts, prices, index, i, stop)
+                self._sync(s)
+            elif s in summaries:
+                engine._apply_range(index, ts, i, stop, summaries[s])
+            else:
+                engine._quiet_run(index, ts, prices, i, stop, rows[k])
+
+    def _range_summaries(self, strategies: list[int], index: _TickIndex, i: int, stop: int) -> dict:
+        """Resumen de _apply_range de la racha [i, stop) para varias estrategias a la vez"""
+        high, low, drop = index.stats(i, stop)
+        equity = self._equity_matrix(strategies, np.array([high, low, index.q[stop - 1]]))
+        slope = self.level_lots[strategies].sum(axis=1) / PIP_VALUE / PIP_VALUE
+        return {s: (*equity[k].tolist(), drop * float(slope[k])) for k, s in enumerate(strategies)}
+
+    def _equity_matrix(self, strategies: list[int], q: np.ndarray) -> np.ndarray:
+        """Equity (estrategias x precios en forma BUY) con las matrices de niveles"""
+        lead = self.engines[strategies[0]]
+        sign = 1.0 if lead._side == "BUY" else -1.0
+        lots = self.level_lots[strategies]
+        offset = (lots * (sign * (lead._entry_price - self.level_prices[strategies]))).sum(axis=1)
+        move = q - sign * lead._entry_price
+        floating = (move[None, :] * lots.sum(axis=1)[:, None] + offset[:, None]) / PIP_VALUE / PIP_VALUE
+        balance = np.array([self.engines[s]._balance for s in strategies])
+        return balance[:, None] + floating
+
+    def _sync(self, s: int):
+        """Copia las posiciones vivas de la estrategia s a las matrices de niveles"""
+        self.level_lots[s] = 0
+        self.level_prices[s] = 0
+        for trade in self.engines[s]._positions:
+            self.level_lots[s, trade.level] = trade.lotSize
+            self.level_prices[s, trade.level] = trade.price
+
+    def getResults(self) -> list[BacktestResult]:
+        return [engine.getResults() for engine in self.engines]
+
+    def getPartialResults(self) -> list[PartialResult]:
+        return [engine.getPartialResults() for engine in self.engines]
+
+
+def run_signal(engine: BacktestEngine | MultiBacktestEngine, signal, index: int, window: DayTicks,
+               entry_price: float | None = None, entry_ms: int | None = None):
+    """
+    Una señal completa como runSingleBacktest de lib/optimizer.ts: abre en
+    entry_price (o signal.entryPrice), recorre la ventana con el kernel y
+    cierra al último tick si sigue abierta
+    """
+    price = entry_price if entry_price is not None else signal.entryPrice
+    engine.startSignal(signal.side, price, index, signal.timestamp)
+    engine.openInitialOrders(price, _to_dt(entry_ms) if entry_ms is not None else signal.timestamp)
+    engine.processWindow(window)
+    if engine.hasOpenPositions() and len(window):
+        last = len(window) - 1
+        close_price = float(window.bid_prices()[last] if signal.side == "BUY" else window.ask_prices()[last])
+        engine.closeRemainingPositions(close_price, signal.closeTimestamp or _to_dt(int(window.ts[last])))
+
+
+def combine_partials(partials: list[PartialResult], start: PartialResult | None = None) -> PartialResult:
+    """
+    Une en orden los tramos de partials en un solo PartialResult
+
+    El equity de cada tramo se desplaza con el profit acumulado de los
+    anteriores y el drawdown combina el peak previo con el mínimo y la caída
+    interna del tramo. Cada tramo empieza la curva de equity sin el último
+    punto del anterior.
+
+    Args:
+        start: Resultado de una llamada anterior que se continúa (mismo
+            orden de operaciones que unir todos los tramos de una vez)
+    """
+    if start is None:
+        trades, details, curve = [], [], []
+        offset, peak, low, max_dd = 0.0, 0.0, math.inf, 0.0
+    else:
+        trades, details, curve = list(start.trades), list(start.tradeDetails), list(start.equityCurve)
+        offset, peak, low, max_dd = start.profit, start.peakEquity, start.minEquity, start.maxDrawdown
+    for part in partials:
+        start_peak = peak
+        curve.extend(
+            EquityPoint(p.timestamp, p.equity + offset, p.balance + offset,
+                        max(p.drawdown, start_peak - (p.equity + offset)))
+            for p in part.equityCurve
+        )
+        if part.minEquity < math.inf:
+            max_dd = max(max_dd, start_peak - (part.minEquity + offset), part.maxDrawdown)
+            peak = max(start_peak, part.peakEquity + offset)
+            low = min(low, part.minEquity + offset)
+        trades.extend(part.trades)
+        details.extend(part.tradeDetails)
+        offset += part.profit
+    return PartialResult(trades, details, curve, offset, peak, low, max_dd)
+
+
+def merge_partials(config: BacktestConfig, partials: list[PartialResult],
+                   start: PartialResult | None = None) -> BacktestResult:
+    """
+    Resultado de ejecutar seguidos los tramos de señales de partials (en
+    orden), cada uno calculado con un motor nuevo
+
+    Trades y profit son los de un único motor y maxDrawdown coincide salvo
+    redondeo (orden de 1e-9); ver combine_partials (start continúa una unión
+    anterior).
+    """
+    merged = combine_partials(partials, start)
+    engine = BacktestEngine(config)
+    engine._trades = merged.trades
+    engine._trade_details = merged.tradeDetails
+    engine._equity_curve = merged.equityCurve
+    engine._peak_equity = merged.peakEquity
+    engine._max_drawdown = merged.maxDrawdown
+    engine._balance += merged.profit
+    return engine.getResults()
+
+
+@dataclass
+class RunningTotals:
+    """
+    Resumen compacto de unos tramos unidos: lo que necesitan
+    combine_partials y result_metrics, sin las listas de operaciones
+    """
+
+    merged: PartialResult  # combine_partials con las listas vacías
+    profits: np.ndarray  # totalProfit de cada TradeDetail, en orden
+    pips: np.ndarray  # totalProfitPips
+    months: list[tuple[str, int]]  # trade_month por rachas: (mes, nº de trades seguidos)
+    points: int = 0  # puntos de la curva de equity
+    first_point: datetime | None = None  # timestamps del primer y último punto (Calmar)
+    last_point: datetime | None = None
+
+    @classmethod
+    def empty(cls) -> "RunningTotals":
+        return cls(combine_partials([]), np.empty(0), np.empty(0), [])
+
+    def extend(self, partials: list[PartialResult]) -> "RunningTotals":
+        """Acumulado tras sumar partials (en orden) a continuación"""
+        merged = combine_partials(partials, self.merged)
+        details, curve = merged.tradeDetails, merged.equityCurve
+        months = list(self.months)
+        for detail in details:
+            month = trade_month(detail)
+            if months and months[-1][0] == month:
+                months[-1] = (month, months[-1][1] + 1)
+            else:
+                months.append((month, 1))
+        return RunningTotals(
+            PartialResult([], [], [], merged.profit, merged.peakEquity, merged.minEquity, merged.maxDrawdown),
+            np.concatenate([self.profits, [d.totalProfit for d in details]]),
+            np.concatenate([self.pips, [d.totalProfitPips for d in details]]),
+            months,
+            self.points + len(curve),
+            self.first_point if self.points else (curve[0].timestamp if curve else None),
+            curve[-1].timestamp if curve else self.last_point,
+        )
+
+    def then(self, other: "RunningTotals") -> "RunningTotals":
+        """Acumulado de self seguido de other (calculado desde RunningTotals.empty())"""
+        return RunningTotals.concat([self, other])
+
+    @classmethod
+    def concat(cls, parts: list["RunningTotals"]) -> "RunningTotals":
+        """Acumulado de parts seguidos (como then uno tras otro, copiando las columnas una sola vez)"""
+        if not parts:
+            return cls.empty()
+        merged = combine_partials([part.merged for part in parts[1:]], parts[0].merged)
+        months: list[tuple[str, int]] = []
+        for part in parts:
+            for month, count in part.months:
+                if months and months[-1][0] == month:
+                    months[-1] = (month, months[-1][1] + count)
+                else:
+                    months.append((month, count))
+        with_points = [part for part in parts if part.points]
+        return RunningTotals(
+            merged,
+            np.concatenate([part.profits for part in parts]),
+            np.concatenate([part.pips for part in parts]),
+            months,
+            sum(part.points for part in parts),
+            with_points[0].first_point if with_points else None,
+            with_points[-1].last_point if with_points else None,
+        )
+
+    def result(self, config: BacktestConfig) -> BacktestResult:
+        """Métricas como getResults (sin las listas de operaciones)"""
+        metrics = result_metrics(
+            config,
+            self.profits.tolist(),
+            self.pips.tolist(),
+            [month for month, count in self.months for _ in range(count)],
+            curve_days(self.first_point, self.last_point) if self.points > 1 else 1,
+            self.merged.maxDrawdown,
+        )
+        return BacktestResult(**metrics, trades=[], tradeDetails=[], equityCurve=[])
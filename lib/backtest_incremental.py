@@ -0,0 +1,156 @@
+"""
+Backtest incremental: solo se simulan las señales nuevas
+========================================================
+
+Los CSV de señales crecen cada día y las señales antiguas no cambian. Tras
+cada ejecución se guarda, por estrategia, el acumulado de los tramos
+completos de chunk_size señales (RunningTotals: profit, peak, mínimo y
+drawdown de combine_partials, y el profit, los pips y el mes de cada trade
+como columnas numpy), junto con la huella de cada señal incluida. En la
+siguiente ejecución:
+
+- Si las señales guardadas siguen siendo el principio del replay, solo se
+  simulan los tramos desde la última frontera de tramo (el último tramo
+  incompleto se repite) y se suman a lo guardado.
+- Una estrategia nueva o con otra configuración se simula entera.
+- Si cambia una señal guardada, el tamaño de tramo o ENGINE_VERSION, se
+  empieza de cero (igual que con rebuild=True).
+
+Los tramos y el orden de las operaciones son los mismos que en run_units con
+el mismo chunk_size y las métricas salen de result_metrics con las mismas
+columnas, así que son idénticas bit a bit a las de simularlo todo. El
+estado no guarda las operaciones: los resultados traen trades,
+tradeDetails y equityCurve vacías.
+
+    state = load_state(path)
+    results, stats, state, summary = run_incremental(configs, replay, versions, state, workers=8)
+    save_state(path, state)
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from lib.backtest_engine import ENGINE_VERSION, BacktestConfig, BacktestResult, RunningTotals
+from lib.backtest_parallel import DEFAULT_CHUNK, STRATEGY_GROUP, UnitStats, WorkUnit, execute_units
+
+
+@dataclass
+class IncrementalState:
+    chunk_size: int
+    engine_version: int = ENGINE_VERSION
+    signals: list[str] = field(default_factory=list)  # huella de cada señal ya sumada, en orden
+    strategies: dict[str, tuple[str, RunningTotals]] = field(default_factory=dict)  # nombre -> (huella, acumulado)
+
+
+@dataclass
+class IncrementalStats:
+    stored: int  # señales que venían del estado guardado
+    simulated: int  # señales simuladas a partir de ahí
+    rebuilt: list[str]  # estrategias simuladas desde el principio
+    reason: str | None = None  # por qué se descartó el estado, si se descartó
+
+
+def _fingerprint(content) -> str:
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def signal_fingerprint(signal, version) -> str:
+    """Huella de una señal y de la versión de sus ticks (lib/backtest_cache.tick_version)"""
+    return _fingerprint({"signal": asdict(signal), "ticks": version})
+
+
+def config_fingerprint(config: BacktestConfig) -> str:
+    return _fingerprint(asdict(config))
+
+
+def load_state(path: Path) -> IncrementalState | None:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_state(path: Path, state: IncrementalState):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _stale_reason(state: IncrementalState, fingerprints: list[str], chunk_size: int) -> str | None:
+    if state.engine_version != ENGINE_VERSION:
+        return f"versión del motor {state.engine_version} -> {ENGINE_VERSION}"
+    if state.chunk_size != chunk_size:
+        return f"tamaño de tramo {state.chunk_size} -> {chunk_size}"
+    if state.signals != fingerprints[:len(state.signals)]:
+        return "las señales guardadas han cambiado"
+    return None
+
+
+def run_incremental(configs: list[BacktestConfig], replay: list[tuple], versions: list,
+                    state: IncrementalState | None, workers: int = 1, chunk_size: int = DEFAULT_CHUNK,
+                    on_unit=None, rebuild: bool = False,
+                    ) -> tuple[list[BacktestResult], list[UnitStats], IncrementalState, IncrementalStats]:
+    """
+    Como run_units, pero continuando desde el estado guardado
+
+    Args:
+        versions: Versión de los ticks de cada señal del replay (tick_version)
+        state: Estado de la ejecución anterior (load_state) o None
+        rebuild: Ignorar el estado y simularlo todo
+
+    Returns:
+        (resultados por configuración, estadísticas de las unidades, estado
+        nuevo para save_state, resumen de lo reutilizado)
+    """
+    fingerprints = [signal_fingerprint(signal, version) for (signal, _), version in zip(replay, versions)]
+    reason = "--rebuild" if rebuild and state is not None else None
+    if state is not None and reason is None:
+        reason = _stale_reason(state, fingerprints, chunk_size)
+    if state is None or reason is not None:
+        state = IncrementalState(chunk_size)
+    done = len(state.signals)
+    n = len(replay)
+
+    # Estrategias que continúan desde done y estrategias que empiezan de cero
+    totals: list[RunningTotals] = []
+    begin: dict[int, list[int]] = {}
+    rebuilt = []
+    for s, config in enumerate(configs):
+        saved = state.strategies.get(config.strategyName)
+        resume = saved is not None and saved[0] == config_fingerprint(config)
+        totals.append(saved[1] if resume else RunningTotals.empty())
+        begin.setdefault(done if resume else 0, []).append(s)
+        if not resume and done:
+            rebuilt.append(config.strategyName)
+
+    units = [
+        WorkUnit(tuple(strategies[g:g + STRATEGY_GROUP]), a, min(n, a + chunk_size))
+        for first, strategies in sorted(begin.items())
+        for a in range(first, n, chunk_size)
+        for g in range(0, len(strategies), STRATEGY_GROUP)
+    ]
+    partials, stats = execute_units(configs, replay, units, workers, on_unit)
+
+    by_config: list[list] = [[] for _ in configs]
+    for unit in units:
+        for s, partial in zip(unit.strategies, partials[unit]):
+            by_config[s].append((unit.stop - unit.start == chunk_size, partial))
+
+    # Los tramos completos pasan al estado; el último incompleto solo al resultado
+    complete = n // chunk_size * chunk_size
+    new_state = IncrementalState(chunk_size, signals=fingerprints[:complete])
+    results = []
+    for s, config in enumerate(configs):
+        stored = totals[s].extend([partial for is_full, partial in by_config[s] if is_full])
+        new_state.strategies[config.strategyName] = (config_fingerprint(config), stored)
+        tail = stored.extend([partial for is_full, partial in by_config[s] if not is_full])
+        results.append(tail.result(config))
+    return results, stats, new_state, IncrementalStats(done, n - done, rebuilt, reason)
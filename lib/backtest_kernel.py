@@ -0,0 +1,122 @@
+"""
+Kernel escalar del grid, compilable con numba
+=============================================
+
+scan_grid recorre los ticks de una ventana desde i y hace, tick a tick, todo
+lo que no cambia las posiciones: mover el trailing SL virtual, los cierres
+vacíos en el TP sin entrada abierta (rareza del motor TS) y el equity,
+peak, drawdown y puntos de la curva. Se detiene en el primer tick que abre
+un nivel, toca el TP con entrada abierta o puede disparar un stop; ese tick
+lo ejecuta BacktestEngine._step con los cálculos Decimal.
+
+Precios y umbrales van en forma BUY (negados para SELL), como en
+_event_matrix. Solo usa escalares y arrays numpy para que numba lo compile
+en modo nopython:
+
+    from lib.backtest_kernel import HAS_NUMBA, scan_grid   # compilado si hay numba
+    from lib.backtest_kernel import scan_grid_py           # la misma función en Python
+
+Sin numba scan_grid es None y el motor usa el kernel numpy (_TickIndex);
+scan_grid_py sirve de referencia en los tests de paridad.
+
+Requisitos (opcional):
+    pip install numba
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba no instalado: el motor usa el kernel numpy
+    njit = None
+    HAS_NUMBA = False
+
+PIP_VALUE = 0.10  # los mismos valores que lib/backtest_engine.py
+EQUITY_POINT_MS = 60_000
+BUFFER_SIZE = 4096  # puntos de equity / cierres vacíos por llamada
+
+# Motivo de parada de scan_grid
+SCAN_END = 0  # se llegó a end
+SCAN_EVENT = 1  # el tick j cambia las posiciones o puede disparar un stop
+SCAN_FULL = 2  # buffers llenos: volver a llamar desde j
+
+
+def scan_grid(q, ts, i, end, tp, level, act, back, buffer, entry_sl, stop, quiet,
+              entry_q, lots, offset, balance, equity, peak, min_equity, max_drawdown,
+              last_point, entry_open, point_idx, point_equity, point_drawdown, tp_idx):
+    """
+    Avanza desde el tick i hasta el siguiente evento
+
+    Args:
+        q, ts: Precios en forma BUY (float64) y timestamps ms (int64)
+        tp, level, act, back, buffer, entry_sl, stop, quiet: Fila de
+            BacktestEngine._scan_row (entry_sl = -inf si no hay trailing SL)
+        entry_q, lots, offset: Entrada en forma BUY y (Σ lotes, Σ lote *
+            (entry - precio)) de las posiciones vivas
+        balance, equity, peak, min_equity, max_drawdown: Métricas del motor
+        last_point: Último punto de la curva (ms, -1 si no hay)
+        entry_open: Entrada abierta (la curva solo avanza con ella)
+        point_idx, point_equity, point_drawdown, tp_idx: Buffers de salida
+
+    Returns:
+        (j, motivo, entry_sl, equity, peak, min_equity, max_drawdown,
+        last_point, nº de puntos, nº de cierres vacíos)
+    """
+    n_points = 0
+    n_tp = 0
+    j = i
+    while j < end:
+        price = q[j]
+        # 1. Trailing SL virtual
+        if price >= act:
+            target = price - back - buffer
+            if target > entry_sl:
+                entry_sl = target
+        # 2. Stops y niveles: los ejecuta _step
+        if price <= entry_sl or price <= stop or price <= level:
+            return (j, SCAN_EVENT, entry_sl, equity, peak, min_equity, max_drawdown,
+                    last_point, n_points, n_tp)
+        # 3. Take profit: sin entrada abierta solo deja un TradeDetail vacío
+        if price >= tp:
+            if not quiet:
+                return (j, SCAN_EVENT, entry_sl, equity, peak, min_equity, max_drawdown,
+                        last_point, n_points, n_tp)
+            if n_tp == len(tp_idx):
+                return (j, SCAN_FULL, entry_sl, equity, peak, min_equity, max_drawdown,
+                        last_point, n_points, n_tp)
+            tp_idx[n_tp] = j
+            n_tp += 1
+            j += 1
+            continue
+        # 4. Equity y drawdown
+        equity = balance + ((price - entry_q) * lots + offset) / PIP_VALUE / PIP_VALUE if lots != 0 else balance
+        if equity > peak:
+            peak = equity
+        if equity < min_equity:
+            min_equity = equity
+        drawdown = peak - equity
+        if drawdown > max_drawdown:
+            max_drawdown = drawdown
+        if entry_open and (last_point < 0 or ts[j] - last_point >= EQUITY_POINT_MS):
+            if n_points == len(point_idx):
+                return (j, SCAN_FULL, entry_sl, equity, peak, min_equity, max_drawdown,
+                        last_point, n_points, n_tp)
+            point_idx[n_points] = j
+            point_equity[n_points] = equity
+            point_drawdown[n_points] = drawdown
+            n_points += 1
+            last_point = ts[j]
+        j += 1
+    return (end, SCAN_END, entry_sl, equity, peak, min_equity, max_drawdown,
+            last_point, n_points, n_tp)
+
+
+scan_grid_py = scan_grid
+scan_grid = njit(cache=True, nogil=True)(scan_grid_py) if HAS_NUMBA else None
+
+
+def new_buffers(size: int = BUFFER_SIZE) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(point_idx, point_equity, point_drawdown, tp_idx) para scan_grid"""
+    return (np.empty(size, dtype=np.int64), np.empty(size, dtype=np.float64),
+            np.empty(size, dtype=np.float64), np.empty(size, dtype=np.int64))
@@ -0,0 +1,164 @@
+"""
+Monte Carlo del orden de las señales: distribución del drawdown
+===============================================================
+
+El maxDrawdown de un backtest sale de un solo orden histórico de las
+señales. Aquí se toma el P&L de cada señal (signal_pnl, la suma de sus
+TradeDetail) y se generan muchos órdenes alternativos:
+
+- bootstrap:    n señales con reemplazamiento (también cambia el profit final)
+- permutation:  las mismas n señales en otro orden (mismo profit final)
+
+Cada lote de órdenes es una matriz (órdenes x señales) y todo se calcula
+con operaciones numpy por filas, sin bucles por orden ni por señal:
+
+    equity   = cumsum(P&L)                      (desde 0 = capital inicial)
+    peak     = maximum.accumulate(max(equity, 0))
+    drawdown = peak - equity                    -> máximo por fila
+    bajo el agua: drawdown > 0                  -> racha más larga y fracción
+    ruina:   equity <= -ruin_fraction x capital inicial en algún momento
+
+El drawdown es entre señales (al cierre de cada una): no incluye el
+drawdown flotante dentro de una señal que sí mide el motor tick a tick,
+así que el valor histórico de path_stats puede quedar por debajo del
+maxDrawdown de BacktestResult.
+
+Los lotes se limitan a batch_bytes para que 10.000 órdenes x varios miles
+de señales no necesiten varios GB a la vez.
+
+    pnl = signal_pnl(result, len(replay))
+    mc = monte_carlo(pnl, resamples=10_000, method="permutation", seed=1)
+    mc.summary()  # percentiles de maxDrawdown y tiempo bajo el agua, probabilidad de ruina
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from lib.backtest_engine import DEFAULT_CAPITAL, BacktestResult
+
+METHODS = ("bootstrap", "permutation")
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_RUIN = 0.5  # fracción del capital inicial perdida que cuenta como ruina
+BATCH_BYTES = 64 * 1024 * 1024  # tamaño de cada matriz float64 de un lote
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+
+
+@dataclass
+class PathStats:
+    """Métricas de cada camino de equity (una fila por camino)"""
+    max_drawdown: np.ndarray  # $
+    longest_underwater: np.ndarray  # racha más larga de señales por debajo del máximo anterior
+    underwater_fraction: np.ndarray  # fracción de señales por debajo del máximo anterior
+    final_profit: np.ndarray  # $
+    ruined: np.ndarray  # bool: tocó el nivel de ruina
+
+
+@dataclass
+class MonteCarloResult:
+    method: str
+    resamples: int
+    signals: int
+    ruin_level: float  # pérdida ($) que cuenta como ruina
+    historical: PathStats  # el orden original (una fila)
+    paths: PathStats  # una fila por orden generado
+
+    @property
+    def ruin_probability(self) -> float:
+        return float(self.paths.ruined.mean()) if self.resamples else 0.0
+
+    def summary(self, percentiles: tuple = PERCENTILES) -> dict:
+        """Percentiles de cada distribución, el valor histórico y la probabilidad de ruina"""
+        def describe(values: np.ndarray, historical: np.ndarray) -> dict:
+            points = np.percentile(values, percentiles) if len(values) else [0.0] * len(percentiles)
+            return {
+                "historical": float(historical[0]),
+                "mean": float(values.mean()) if len(values) else 0.0,
+                **{f"p{p:g}": float(v) for p, v in zip(percentiles, points)},
+            }
+
+        return {
+            "method": self.method,
+            "resamples": self.resamples,
+            "signals": self.signals,
+            "maxDrawdown": describe(self.paths.max_drawdown, self.historical.max_drawdown),
+            "longestUnderwater": describe(self.paths.longest_underwater, self.historical.longest_underwater),
+            "underwaterFraction": describe(self.paths.underwater_fraction, self.historical.underwater_fraction),
+            "finalProfit": describe(self.paths.final_profit, self.historical.final_profit),
+            "ruinLevel": self.ruin_level,
+            "ruinProbability": self.ruin_probability,
+        }
+
+
+def signal_pnl(result: BacktestResult, n_signals: int) -> np.ndarray:
+    """P&L de cada señal (suma del totalProfit de sus TradeDetail), en orden de signalIndex"""
+    index = np.fromiter((d.signalIndex for d in result.tradeDetails), dtype=np.int64, count=len(result.tradeDetails))
+    profit = np.fromiter((d.totalProfit for d in result.tradeDetails), dtype=np.float64,
+                         count=len(result.tradeDetails))
+    return np.bincount(index, weights=profit, minlength=n_signals).astype(np.float64)
+
+
+def path_stats(paths: np.ndarray, ruin_level: float) -> PathStats:
+    """Métricas de una matriz (caminos x señales) de P&L por señal"""
+    paths = np.atleast_2d(paths)
+    rows, n = paths.shape
+    if n == 0:
+        zeros = np.zeros(rows)
+        return PathStats(zeros, zeros.astype(np.int64), zeros, zeros, np.zeros(rows, dtype=bool))
+    equity = np.cumsum(paths, axis=1)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0), axis=1)
+    drawdown -= equity
+    underwater = drawdown > 0
+    # Longitud de la racha bajo el agua en cada señal: distancia a la última señal en máximos
+    position = np.arange(n)
+    last_high = np.maximum.accumulate(np.where(underwater, -1, position), axis=1)
+    runs = np.where(underwater, position - last_high, 0)
+    return PathStats(
+        drawdown.max(axis=1),
+        runs.max(axis=1),
+        underwater.mean(axis=1),
+        equity[:, -1].copy(),
+        equity.min(axis=1) <= -ruin_level,
+    )
+
+
+def _resample(pnl: np.ndarray, rows: int, method: str, rng: np.random.Generator) -> np.ndarray:
+    if method == "bootstrap":
+        return pnl[rng.integers(0, len(pnl), size=(rows, len(pnl)))]
+    return rng.permuted(np.broadcast_to(pnl, (rows, len(pnl))), axis=1)
+
+
+def _concat(stats: list[PathStats]) -> PathStats:
+    return PathStats(*(np.concatenate([getattr(s, name) for s in stats]) for name in PathStats.__dataclass_fields__))
+
+
+def monte_carlo(pnl: np.ndarray, resamples: int = DEFAULT_RESAMPLES, method: str = "bootstrap",
+                initial_capital: float | None = None, ruin_fraction: float = DEFAULT_RUIN,
+                seed: int | None = None, batch_bytes: int = BATCH_BYTES) -> MonteCarloResult:
+    """
+    Distribuciones de drawdown, tiempo bajo el agua y ruina sobre órdenes
+    alternativos de las señales
+
+    Args:
+        pnl: P&L de cada señal en el orden histórico (signal_pnl)
+        resamples: Órdenes generados
+        method: "bootstrap" (con reemplazamiento) o "permutation"
+        initial_capital: Capital inicial (el de la configuración)
+        ruin_fraction: Pérdida, como fracción del capital inicial, que
+            cuenta como ruina
+        seed: Semilla del generador (mismos órdenes con la misma semilla)
+        batch_bytes: Tamaño máximo de la matriz de cada lote
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método no válido: {method} (uno de {', '.join(METHODS)})")
+    pnl = np.asarray(pnl, dtype=np.float64)
+    ruin_level = (initial_capital or DEFAULT_CAPITAL) * ruin_fraction
+    rng = np.random.default_rng(seed)
+    rows = max(1, batch_bytes // (8 * max(1, len(pnl))))
+    batches = []
+    for start in range(0, resamples, rows):
+        count = min(rows, resamples - start)
+        sample = _resample(pnl, count, method, rng) if len(pnl) else np.zeros((count, 0))
+        batches.append(path_stats(sample, ruin_level))
+    paths = _concat(batches) if batches else path_stats(np.zeros((0, len(pnl))), ruin_level)
+    return MonteCarloResult(method, resamples, len(pnl), ruin_level, path_stats(pnl, ruin_level), paths)
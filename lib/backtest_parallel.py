@@ -0,0 +1,344 @@
+"""
+Backtests en paralelo por unidades (estrategias, tramo de señales)
+==================================================================
+
+Las ventanas de ticks de todas las señales se copian una vez a un único
+bloque de multiprocessing.shared_memory:
+
+    [ ts int64 * N | bid int32 * N | ask int32 * N ]   N = ticks de todas las ventanas
+
+Cada worker abre el bloque al arrancar y usa vistas numpy de solo lectura;
+a los procesos solo viajan por pickle las señales, las configuraciones y
+los rangos de cada unidad. Una unidad es un grupo fijo de STRATEGY_GROUP
+estrategias (simuladas juntas con MultiBacktestEngine) sobre un tramo de
+chunk_size señales, y devuelve un PartialResult por estrategia.
+
+Las unidades no dependen del número de workers y merge_partials las une en
+orden de señal, así que el resultado es idéntico con --workers 1 (todas las
+unidades en el propio proceso) y con cualquier número de procesos.
+
+    results, workers = run_units(configs, replay, workers=8)
+
+Con tick_cache (un CacheServer de lib/ticks_cache.py) no se copia nada: a
+los workers solo llega el rango [primer tick, último tick] de cada señal y
+sacan la ventana de los días de la caché, que cada día carga una sola vez
+para todos los procesos (y para todas las llamadas que reutilicen el
+servidor). Con level > 0 diezman la ventana al vuelo igual que el tick
+store, así que el resultado es el mismo que con la copia.
+
+    with start_cache_server(store.root) as server:
+        results, workers = run_units(configs, replay, workers=8, tick_cache=server)
+        server.stats()
+
+UnitExecutor mantiene el bloque y los procesos abiertos entre tandas de
+unidades (lib/backtest_sweep.py decide la siguiente tanda con los
+resultados de la anterior). Con WorkUnit.totals cada worker devuelve un
+RunningTotals en lugar del PartialResult, sin las listas de operaciones.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from lib.backtest_engine import (
+    BacktestConfig,
+    BacktestResult,
+    MultiBacktestEngine,
+    RunningTotals,
+    merge_partials,
+    run_signal,
+)
+from lib.ticks_cache import TickCacheClient
+from lib.ticks_store import PRICE_DTYPE, TS_DTYPE, DayTicks
+
+STRATEGY_GROUP = 8  # estrategias por unidad
+DEFAULT_CHUNK = 25  # señales por unidad
+TICK_BYTES = np.dtype(TS_DTYPE).itemsize + 2 * np.dtype(PRICE_DTYPE).itemsize
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    strategies: tuple[int, ...]  # índices en la lista de configuraciones
+    start: int  # señales [start, stop) del replay
+    stop: int
+    per_signal: bool = False  # un motor nuevo y un PartialResult por señal
+    totals: bool = False  # RunningTotals en lugar de PartialResult
+
+
+@dataclass
+class UnitStats:
+    unit: WorkUnit
+    pid: int
+    ticks: int  # ticks x estrategias simulados
+    seconds: float
+
+
+def plan_units(n_configs: int, n_signals: int, chunk_size: int = DEFAULT_CHUNK,
+               group_size: int = STRATEGY_GROUP) -> list[WorkUnit]:
+    """Unidades en orden (tramo de señales, grupo de estrategias)"""
+    groups = [tuple(range(g, min(n_configs, g + group_size))) for g in range(0, n_configs, group_size)]
+    return [
+        WorkUnit(group, start, min(n_signals, start + chunk_size))
+        for start in range(0, n_signals, chunk_size)
+        for group in groups
+    ]
+
+
+def block_views(buffer, n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vistas ts/bid/ask de un bloque [ts | bid | ask] de n ticks"""
+    ts_bytes = n * np.dtype(TS_DTYPE).itemsize
+    price_bytes = n * np.dtype(PRICE_DTYPE).itemsize
+    ts = np.frombuffer(buffer, dtype=TS_DTYPE, count=n)
+    bid = np.frombuffer(buffer, dtype=PRICE_DTYPE, count=n, offset=ts_bytes)
+    ask = np.frombuffer(buffer, dtype=PRICE_DTYPE, count=n, offset=ts_bytes + price_bytes)
+    return ts, bid, ask
+
+
+class SharedWindows:
+    """Ventanas de replay concatenadas en un bloque de memoria compartida"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, offsets: np.ndarray, price_scale: int, owner: bool):
+        self.shm = shm
+        self.offsets = offsets
+        self.price_scale = price_scale
+        self.owner = owner
+        self.ts, self.bid, self.ask = block_views(shm.buf, int(offsets[-1]))
+
+    @classmethod
+    def create(cls, windows: list[DayTicks]) -> "SharedWindows":
+        scales = {w.price_scale for w in windows}
+        if len(scales) > 1:
+            raise ValueError(f"Ventanas con distinta escala de precios: {sorted(scales)}")
+        offsets = np.concatenate(([0], np.cumsum([len(w) for w in windows]))).astype(np.int64)
+        n = int(offsets[-1])
+        shm = shared_memory.SharedMemory(create=True, size=max(1, n * TICK_BYTES))
+        shared = cls(shm, offsets, scales.pop() if scales else 1000, owner=True)
+        for k, window in enumerate(windows):
+            a, b = offsets[k], offsets[k + 1]
+            shared.ts[a:b], shared.bid[a:b], shared.ask[a:b] = window.ts, window.bid, window.ask
+        return shared
+
+    @classmethod
+    def attach(cls, name: str, offsets: np.ndarray, price_scale: int) -> "SharedWindows":
+        # Los workers son hijos del proceso que creó el bloque y comparten su
+        # resource_tracker: el registro de abrirlo no se deshace aquí
+        shared = cls(shared_memory.SharedMemory(name=name), offsets, price_scale, owner=False)
+        for view in (shared.ts, shared.bid, shared.ask):
+            view.setflags(write=False)
+        return shared
+
+    def spec(self) -> tuple:
+        """Argumentos de attach() para los workers"""
+        return self.shm.name, self.offsets, self.price_scale
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def window(self, k: int) -> DayTicks:
+        a, b = self.offsets[k], self.offsets[k + 1]
+        return DayTicks(self.ts[a:b], self.bid[a:b], self.ask[a:b], self.price_scale)
+
+    def close(self):
+        self.ts = self.bid = self.ask = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CachedWindows:
+    """Ventanas de replay leídas por (símbolo, día) de la caché de ticks compartida"""
+
+    def __init__(self, client: TickCacheClient, ranges: np.ndarray, level: int = 0):
+        self.client = client
+        self.ranges = ranges  # (primer, último) timestamp de cada ventana
+        self.level = level
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def window(self, k: int) -> DayTicks:
+        start, end = self.ranges[k]
+        return self.client.window(int(start), int(end), self.level)
+
+
+def window_ranges(windows: list[DayTicks]) -> np.ndarray:
+    """
+    Rango de cada ventana para CachedWindows
+
+    Entre su primer y su último tick una ventana tiene todos los ticks del
+    store, y las diezmadas conservan los extremos de la completa, así que
+    el rango basta para reconstruirlas.
+    """
+    return np.array([(w.ts[0], w.ts[-1]) for w in windows], dtype=np.int64).reshape(-1, 2)
+
+
+class _UnitRunner:
+    """Ejecuta unidades con las señales y ventanas de un proceso"""
+
+    def __init__(self, configs: list[BacktestConfig], signals: list, windows):
+        self.configs = configs
+        self.signals = signals
+        self.windows = windows  # SharedWindows, CachedWindows o lista de DayTicks
+
+    def window(self, k: int) -> DayTicks:
+        return self.windows[k] if isinstance(self.windows, list) else self.windows.window(k)
+
+    def run(self, unit: WorkUnit):
+        """
+        Returns:
+            (PartialResult por estrategia, o con per_signal una lista así por
+            señal, o RunningTotals con totals; UnitStats)
+        """
+        start = time.perf_counter()
+        configs = [self.configs[s] for s in unit.strategies]
+        engine = MultiBacktestEngine(configs)
+        per_signal = []
+        ticks = 0
+        for k in range(unit.start, unit.stop):
+            window = self.window(k)
+            run_signal(engine, self.signals[k], k, window, entry_ms=int(window.ts[0]))
+            ticks += len(window)
+            if unit.per_signal:
+                per_signal.append(engine.getPartialResults())
+                engine = MultiBacktestEngine(configs)
+        if unit.per_signal:
+            result = [self._pack(unit, partials) for partials in per_signal]
+        else:
+            result = self._pack(unit, engine.getPartialResults())
+        stats = UnitStats(unit, os.getpid(), ticks * len(unit.strategies), time.perf_counter() - start)
+        return result, stats
+
+    @staticmethod
+    def _pack(unit: WorkUnit, partials: list) -> list:
+        return [RunningTotals.empty().extend([partial]) for partial in partials] if unit.totals else partials
+
+
+_runner: _UnitRunner | None = None  # runner del proceso worker
+
+
+def _init_worker(configs: list[BacktestConfig], signals: list, spec: tuple):
+    global _runner
+    _runner = _UnitRunner(configs, signals, SharedWindows.attach(*spec))
+
+
+def _init_cached_worker(configs: list[BacktestConfig], signals: list, address, authkey: bytes,
+                        symbol: str, ranges: np.ndarray, level: int):
+    global _runner
+    client = TickCacheClient(address, authkey, symbol)
+    _runner = _UnitRunner(configs, signals, CachedWindows(client, ranges, level))
+
+
+def _run_unit(unit: WorkUnit):
+    return _runner.run(unit)
+
+
+class UnitExecutor:
+    """
+    Ejecuta unidades de unas configuraciones y un replay fijos; los workers
+    y la memoria compartida se crean una vez y sirven para varias tandas
+
+    Con tick_cache los workers leen las ventanas de la caché de ticks
+    (level es el nivel diezmado de las ventanas de replay) en lugar de una
+    copia en memoria compartida.
+    """
+
+    def __init__(self, configs: list[BacktestConfig], replay: list[tuple], workers: int = 1,
+                 tick_cache=None, level: int = 0):
+        signals = [signal for signal, _ in replay]
+        windows = [window for _, window in replay]
+        self._runner = self._shared = self._pool = None
+        if workers <= 1:
+            self._runner = _UnitRunner(configs, signals, windows)
+        elif tick_cache is not None:
+            self._pool = ProcessPoolExecutor(workers, initializer=_init_cached_worker,
+                                             initargs=(configs, signals, tick_cache.address, tick_cache.authkey,
+                                                       tick_cache.symbol, window_ranges(windows), level))
+        else:
+            self._shared = SharedWindows.create(windows)
+            self._pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                             initargs=(configs, signals, self._shared.spec()))
+
+    def imap(self, units: list[WorkUnit]):
+        """(unidad, resultado de _UnitRunner.run, UnitStats) según van terminando"""
+        if self._pool is None:
+            for unit in units:
+                yield unit, *self._runner.run(unit)
+            return
+        futures = {self._pool.submit(_run_unit, unit): unit for unit in units}
+        for future in as_completed(futures):
+            yield futures[future], *future.result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def execute_units(configs: list[BacktestConfig], replay: list[tuple], units: list[WorkUnit],
+                  workers: int = 1, on_unit=None, tick_cache=None, level: int = 0) -> tuple[dict, list[UnitStats]]:
+    """
+    Ejecuta unidades ya planificadas (en este proceso o en workers procesos)
+
+    Returns:
+        ({unidad: resultado de _UnitRunner.run}, estadísticas de cada unidad)
+    """
+    partials: dict[WorkUnit, list] = {}
+    stats: list[UnitStats] = []
+    if not units:
+        return partials, stats
+    with UnitExecutor(configs, replay, workers, tick_cache, level) as executor:
+        for unit, result, unit_stats in executor.imap(units):
+            partials[unit] = result
+            stats.append(unit_stats)
+            if on_unit:
+                on_unit(len(stats), len(units), unit_stats)
+    return partials, stats
+
+
+def run_units(configs: list[BacktestConfig], replay: list[tuple], workers: int = 1,
+              chunk_size: int = DEFAULT_CHUNK, on_unit=None, tick_cache=None,
+              level: int = 0) -> tuple[list[BacktestResult], list[UnitStats]]:
+    """
+    Ejecuta todas las configuraciones sobre el replay por unidades
+
+    Args:
+        configs: Configuraciones (el orden del resultado es el mismo)
+        replay: Lista de (señal, ventana) con al menos un tick por ventana
+        workers: Procesos (1 = en este proceso, sin memoria compartida)
+        chunk_size: Señales por unidad
+        on_unit: Llamada con (hechas, total, UnitStats) al terminar cada unidad
+        tick_cache: CacheServer del que leen los workers (None = copia en
+            memoria compartida)
+        level: Nivel diezmado de las ventanas de replay (para tick_cache)
+
+    Returns:
+        (resultados por configuración, estadísticas de cada unidad)
+    """
+    units = plan_units(len(configs), len(replay), chunk_size)
+    partials, stats = execute_units(configs, replay, units, workers, on_unit, tick_cache, level)
+
+    # Une los tramos de cada estrategia en orden de señal
+    by_config: list[list] = [[] for _ in configs]
+    for unit in units:
+        for s, partial in zip(unit.strategies, partials[unit]):
+            by_config[s].append(partial)
+    return [merge_partials(config, parts) for config, parts in zip(configs, by_config)], stats
@@ -0,0 +1,250 @@
+"""
+Barrido de parámetros del grid con poda temprana
+================================================
+
+Genera configuraciones a partir de rangos de pipsDistance, maxLevels,
+takeProfitPips, lotajeBase, numOrders y stopLossPips (stopLossPips 0 =
+sin stop loss) y las simula por etapas de señales sobre el mismo replay:
+
+- grid: producto cartesiano de los rangos.
+- random: n combinaciones distintas del producto (con semilla), sin
+  generar el producto entero.
+- halving (successive halving): en cada etapa solo sigue la mejor
+  1/eta parte de las configuraciones según rank_by.
+
+Las etapas terminan en first, first * factor, first * factor²... señales y
+la última en todas. Al acabar cada etapa (menos la última) se descartan
+las configuraciones con un drawdown mayor que max_drawdown (el drawdown
+solo puede crecer con más señales) y, con margin, las dominadas: otra
+configuración viva tiene un drawdown igual o menor y al menos margin de
+profit más.
+
+Cada etapa se reparte en unidades de lib/backtest_parallel.py (grupos de
+estrategias por tramos de señales) con WorkUnit.totals, así que de los
+workers solo vuelven RunningTotals; las etapas se encadenan con
+RunningTotals.then y las métricas salen de result_metrics, iguales a las de
+run_units salvo redondeo del drawdown (orden de 1e-9). Los procesos y la
+memoria compartida se reutilizan en todas las etapas (UnitExecutor); con
+tick_cache los workers leen las ventanas de la caché de ticks compartida
+(lib/ticks_cache.py).
+
+    space = grid_space(ranges)  # o random_space(ranges, 500, seed=1)
+    configs = [sweep_config(params) for params in space]
+    entries = run_sweep(configs, replay, stage_stops(len(replay), 10, 3), workers=8,
+                        max_drawdown=2000, keep=1 / 3, on_entry=print)
+"""
+
+import itertools
+import math
+import random
+from dataclasses import dataclass
+
+from lib.backtest_engine import BacktestConfig, BacktestResult, RunningTotals
+from lib.backtest_parallel import DEFAULT_CHUNK, STRATEGY_GROUP, UnitExecutor, UnitStats, WorkUnit
+
+PARAMETERS = ("pipsDistance", "maxLevels", "takeProfitPips", "lotajeBase", "numOrders", "stopLossPips")
+INTEGER_PARAMETERS = ("maxLevels", "numOrders")
+RANK_METRICS = ("totalProfit", "profitFactor", "sharpeRatio", "sortinoRatio", "calmarRatio", "expectancy")
+
+COMPLETE = "complete"  # simulada con todas las señales
+DRAWDOWN = "drawdown"  # descartada por superar max_drawdown
+DOMINATED = "dominated"  # descartada por dominada
+HALVED = "halved"  # fuera del corte de successive halving
+
+
+@dataclass
+class SweepEntry:
+    index: int  # posición en la lista de configuraciones
+    config: BacktestConfig
+    signals: int  # señales simuladas (menos que el replay si se descartó)
+    status: str  # COMPLETE, DRAWDOWN, DOMINATED o HALVED
+    result: BacktestResult  # sin las listas de operaciones
+
+
+def parse_range(text: str, integer: bool = False) -> list:
+    """
+    Valores de un rango: "8:20:2" (inicio:fin:paso, fin incluido; paso 1
+    si se omite), "8,10,12" o "8"
+    """
+    cast = int if integer else float
+    if ":" in text:
+        parts = [float(p) for p in text.split(":")]
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Rango no válido: {text!r} (inicio:fin[:paso])")
+        first, last, step = parts if len(parts) == 3 else (*parts, 1.0)
+        if step <= 0 or last < first:
+            raise ValueError(f"Rango no válido: {text!r}")
+        count = math.floor((last - first) / step + 1e-9) + 1
+        values = [cast(round(first + k * step, 10)) for k in range(count)]
+    else:
+        values = [cast(float(p)) for p in text.split(",") if p.strip()]
+    if not values:
+        raise ValueError(f"Rango vacío: {text!r}")
+    return list(dict.fromkeys(values))
+
+
+def space_size(ranges: dict[str, list]) -> int:
+    return math.prod(len(ranges[name]) for name in PARAMETERS)
+
+
+def grid_space(ranges: dict[str, list]) -> list[dict]:
+    """Todas las combinaciones de los rangos (en orden de PARAMETERS)"""
+    return [dict(zip(PARAMETERS, values)) for values in itertools.product(*(ranges[name] for name in PARAMETERS))]
+
+
+def random_space(ranges: dict[str, list], n: int, seed: int | None = None) -> list[dict]:
+    """n combinaciones distintas del producto de los rangos, elegidas al azar"""
+    sizes = [len(ranges[name]) for name in PARAMETERS]
+    picks = random.Random(seed).sample(range(math.prod(sizes)), min(n, math.prod(sizes)))
+    space = []
+    for pick in picks:
+        params = {}
+        for name, size in zip(reversed(PARAMETERS), reversed(sizes)):
+            pick, k = divmod(pick, size)
+            params[name] = ranges[name][k]
+        space.append({name: params[name] for name in PARAMETERS})
+    return space
+
+
+def config_name(params: dict) -> str:
+    return (f"P{params['pipsDistance']:g}_L{params['maxLevels']}_TP{params['takeProfitPips']:g}"
+            f"_LOT{params['lotajeBase']:g}_N{params['numOrders']}_SL{params['stopLossPips']:g}")
+
+
+def sweep_config(params: dict, initial_capital: float | None = None) -> BacktestConfig:
+    stop_loss = params["stopLossPips"]
+    return BacktestConfig(
+        strategyName=config_name(params),
+        lotajeBase=params["lotajeBase"],
+        numOrders=params["numOrders"],
+        pipsDistance=params["pipsDistance"],
+        maxLevels=params["maxLevels"],
+        takeProfitPips=params["takeProfitPips"],
+        useStopLoss=stop_loss > 0,
+        stopLossPips=stop_loss,
+        initialCapital=initial_capital,
+    )
+
+
+def stage_stops(n_signals: int, first: int, factor: float) -> list[int]:
+    """Señales al final de cada etapa: first, first * factor, ... y n_signals"""
+    if first <= 0 or factor <= 1:
+        raise ValueError("first debe ser > 0 y factor > 1")
+    stops = []
+    stop = float(first)
+    while stop < n_signals:
+        if not stops or int(stop) > stops[-1]:
+            stops.append(int(stop))
+        stop *= factor
+    return stops + [n_signals] if n_signals else stops
+
+
+def dominated(points: dict[int, tuple[float, float]], margin: float) -> set[int]:
+    """
+    Claves de points {clave: (profit, drawdown)} para las que otra tiene un
+    drawdown igual o menor y al menos margin de profit más
+    """
+    out = set()
+    best = -math.inf
+    # Con el mismo drawdown la de más profit va antes y domina a las demás
+    for key, (profit, _) in sorted(points.items(), key=lambda item: (item[1][1], -item[1][0])):
+        if best >= profit + margin:
+            out.add(key)
+        best = max(best, profit)
+    return out
+
+
+def rank_value(result: BacktestResult, rank_by: str) -> tuple:
+    """Clave de orden (de mejor a peor): la métrica de mayor a menor y el drawdown de menor a mayor"""
+    return -getattr(result, rank_by), result.maxDrawdown
+
+
+def run_sweep(configs: list[BacktestConfig], replay: list[tuple], stops: list[int], workers: int = 1,
+              max_drawdown: float | None = None, margin: float | None = None, keep: float | None = None,
+              rank_by: str = "totalProfit", chunk_size: int = DEFAULT_CHUNK, group_size: int = STRATEGY_GROUP,
+              on_entry=None, on_unit=None, tick_cache=None,
+              level: int = 0) -> tuple[list[SweepEntry], list[UnitStats]]:
+    """
+    Simula las configuraciones por etapas descartando las peores al final
+    de cada una
+
+    Args:
+        stops: Señales al final de cada etapa (stage_stops); la última
+            etapa debería acabar en len(replay)
+        max_drawdown: Descartar las que superen este drawdown ($)
+        margin: Descartar las dominadas por al menos este profit ($)
+        keep: Fracción que sigue tras cada etapa (successive halving, 1/eta)
+        rank_by: Métrica de BacktestResult para keep y el orden final
+        on_entry: Llamada con cada SweepEntry en cuanto se conoce
+        on_unit: Llamada con (hechas, total, UnitStats) por unidad terminada
+        tick_cache, level: Como en run_units (lib/backtest_parallel.py)
+
+    Returns:
+        (una entrada por configuración de mejor a peor, estadísticas de las
+        unidades); primero las completas y después las descartadas por orden
+        de señales simuladas
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"Métrica no válida: {rank_by} (una de {', '.join(RANK_METRICS)})")
+    totals = [RunningTotals.empty() for _ in configs]
+    alive = list(range(len(configs)))
+    entries: list[SweepEntry] = []
+    stats: list[UnitStats] = []
+
+    def finish(s: int, signals: int, status: str, result: BacktestResult | None = None):
+        entry = SweepEntry(s, configs[s], signals, status, result or totals[s].result(configs[s]))
+        entries.append(entry)
+        if on_entry:
+            on_entry(entry)
+
+    with UnitExecutor(configs, replay, workers, tick_cache, level) as executor:
+        start = 0
+        for stage, stop in enumerate(stops):
+            last = stage == len(stops) - 1
+            groups = [tuple(alive[g:g + group_size]) for g in range(0, len(alive), group_size)]
+            units = [WorkUnit(group, a, min(stop, a + chunk_size), totals=True)
+                     for a in range(start, stop, chunk_size) for group in groups]
+            pending = {group: sum(1 for unit in units if unit.strategies == group) for group in groups}
+            chunks: dict[tuple, dict[int, list[RunningTotals]]] = {group: {} for group in groups}
+            for unit, result, unit_stats in executor.imap(units):
+                stats.append(unit_stats)
+                if on_unit:
+                    on_unit(len(stats), len(units), unit_stats)
+                chunks[unit.strategies][unit.start] = result
+                pending[unit.strategies] -= 1
+                if pending[unit.strategies]:
+                    continue
+                # Grupo terminado: sus tramos en orden de señal
+                for a in sorted(chunks[unit.strategies]):
+                    for s, part in zip(unit.strategies, chunks[unit.strategies][a]):
+                        totals[s] = totals[s].then(part)
+                if last:
+                    for s in unit.strategies:
+                        finish(s, stop, COMPLETE)
+            start = stop
+            if last:
+                break
+
+            # Poda al final de la etapa
+            if max_drawdown is not None:
+                for s in [s for s in alive if totals[s].merged.maxDrawdown > max_drawdown]:
+                    finish(s, stop, DRAWDOWN)
+                    alive.remove(s)
+            if margin is not None:
+                points = {s: (float(totals[s].profits.sum()), totals[s].merged.maxDrawdown) for s in alive}
+                for s in sorted(dominated(points, margin)):
+                    finish(s, stop, DOMINATED)
+                    alive.remove(s)
+            if keep is not None and alive:
+                results = {s: totals[s].result(configs[s]) for s in alive}
+                ranked = sorted(alive, key=lambda s: rank_value(results[s], rank_by))
+                for s in sorted(ranked[max(1, math.ceil(len(ranked) * keep)):]):
+                    finish(s, stop, HALVED, results[s])
+                    alive.remove(s)
+            if not alive:
+                break
+
+    complete = sorted((e for e in entries if e.status == COMPLETE), key=lambda e: rank_value(e.result, rank_by))
+    pruned = sorted((e for e in entries if e.status != COMPLETE),
+                    key=lambda e: (-e.signals, rank_value(e.result, rank_by)))
+    return complete + pruned, stats
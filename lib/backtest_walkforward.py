@@ -0,0 +1,197 @@
+"""
+Walk-forward: optimizar en unos meses y validar en el siguiente
+===============================================================
+
+Las señales del replay (en orden cronológico) se agrupan por mes UTC. Cada
+ventana entrena en train_months meses seguidos (o, con anchored, en todos
+los anteriores) y prueba en los test_months siguientes; la siguiente
+ventana avanza test_months meses. Los meses son los que tienen señales.
+
+Cada par (señal, configuración) se simula una sola vez con un motor nuevo
+(unidades per_signal de lib/backtest_parallel.py, o cached_records de
+lib/backtest_cache.py para reutilizar la caché entre ejecuciones) y se
+guarda como RunningTotals. Una ventana encadena con RunningTotals.concat
+los de sus señales, así que el coste de simular crece con las señales y no
+con ventanas x señales. Las ventanas se evalúan en paralelo: cada worker
+recibe la tabla una vez al arrancar.
+
+En cada ventana se ordenan las configuraciones por rank_by en train y las
+top mejores se evalúan en test. El resultado fuera de muestra encadena el
+test de la mejor de cada ventana.
+
+    windows = plan_windows(signal_months(replay), train_months=3)
+    results, out_of_sample, stats = run_walk_forward(configs, replay, windows, workers=8, top=3)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import timezone
+
+from lib.backtest_cache import ResultCache, cached_records, plan_missing_units
+from lib.backtest_engine import BacktestConfig, BacktestResult, RunningTotals
+from lib.backtest_parallel import DEFAULT_CHUNK, UnitStats, execute_units
+from lib.backtest_sweep import RANK_METRICS, rank_value
+
+
+@dataclass(frozen=True)
+class WalkForwardWindow:
+    train_start: int  # señales [train_start, train_stop) del replay
+    train_stop: int
+    test_start: int  # señales [test_start, test_stop)
+    test_stop: int
+    train_months: tuple[str, ...]
+    test_months: tuple[str, ...]
+
+
+@dataclass
+class WindowPick:
+    index: int  # posición en la lista de configuraciones
+    train: BacktestResult  # sin las listas de operaciones
+    test: BacktestResult
+
+
+@dataclass
+class WindowResult:
+    window: WalkForwardWindow
+    picks: list[WindowPick]  # las mejores en train, de mejor a peor
+
+
+def signal_months(replay: list[tuple]) -> list[str]:
+    """Mes (UTC, "%Y-%m") de cada señal del replay"""
+    return [signal.timestamp.astimezone(timezone.utc).strftime("%Y-%m") for signal, _ in replay]
+
+
+def plan_windows(months: list[str], train_months: int, test_months: int = 1,
+                 anchored: bool = False) -> list[WalkForwardWindow]:
+    """
+    Ventanas de entrenamiento y prueba sobre el mes de cada señal (en orden)
+
+    Args:
+        train_months: Meses de entrenamiento (con anchored, los primeros)
+        test_months: Meses de prueba; también lo que avanza cada ventana
+        anchored: Entrenar desde el primer mes en lugar de en una ventana móvil
+    """
+    if train_months < 1 or test_months < 1:
+        raise ValueError("train_months y test_months deben ser >= 1")
+    if any(a > b for a, b in zip(months, months[1:])):
+        raise ValueError("Las señales no están en orden cronológico")
+    distinct = list(dict.fromkeys(months))
+    first = {month: months.index(month) for month in distinct}
+    bound = [first[month] for month in distinct] + [len(months)]
+
+    windows = []
+    for i in range(train_months, len(distinct), test_months):
+        start = 0 if anchored else i - train_months
+        stop = min(len(distinct), i + test_months)
+        windows.append(WalkForwardWindow(
+            bound[start], bound[i], bound[i], bound[stop],
+            tuple(distinct[start:i]), tuple(distinct[i:stop]),
+        ))
+    return windows
+
+
+def signal_totals(configs: list[BacktestConfig], replay: list[tuple], workers: int = 1,
+                  chunk_size: int = DEFAULT_CHUNK, cache: ResultCache | None = None, versions: list | None = None,
+                  on_unit=None) -> tuple[list[list[RunningTotals]], list[UnitStats]]:
+    """
+    RunningTotals de cada par (señal, configuración), cada uno con un motor
+    nuevo
+
+    Args:
+        cache: Caché de resultados (con versions, la tick_version de cada
+            señal); sin ella se simula todo
+
+    Returns:
+        ([señal][configuración] -> RunningTotals, estadísticas de las unidades)
+    """
+    if cache is not None:
+        records, stats = cached_records(configs, replay, cache, versions, workers, chunk_size, on_unit)
+        return [[record.totals for record in row] for row in records], stats
+    everything = tuple(range(len(configs)))
+    units = [replace(unit, totals=True) for unit in plan_missing_units([everything] * len(replay), chunk_size)]
+    totals, stats = execute_units(configs, replay, units, workers, on_unit)
+    table: list[list] = [[None] * len(configs) for _ in replay]
+    for unit in units:
+        for k, per_strategy in enumerate(totals[unit], unit.start):
+            for s, part in zip(unit.strategies, per_strategy):
+                table[k][s] = part
+    return table, stats
+
+
+def _span(table: list[list[RunningTotals]], s: int, start: int, stop: int) -> RunningTotals:
+    return RunningTotals.concat([table[k][s] for k in range(start, stop)])
+
+
+def evaluate_window(configs: list[BacktestConfig], table: list[list[RunningTotals]], window: WalkForwardWindow,
+                    top: int = 1, rank_by: str = "totalProfit") -> WindowResult:
+    """Ordena las configuraciones en train y evalúa las top mejores en test"""
+    train = [_span(table, s, window.train_start, window.train_stop).result(config)
+             for s, config in enumerate(configs)]
+    best = sorted(range(len(configs)), key=lambda s: rank_value(train[s], rank_by))[:top]
+    return WindowResult(window, [
+        WindowPick(s, train[s], _span(table, s, window.test_start, window.test_stop).result(configs[s]))
+        for s in best
+    ])
+
+
+_evaluator: tuple | None = None  # (configs, tabla) del proceso worker
+
+
+def _init_evaluator(configs: list[BacktestConfig], table: list[list[RunningTotals]]):
+    global _evaluator
+    _evaluator = (configs, table)
+
+
+def _evaluate(window: WalkForwardWindow, top: int, rank_by: str) -> WindowResult:
+    return evaluate_window(*_evaluator, window, top, rank_by)
+
+
+def run_walk_forward(configs: list[BacktestConfig], replay: list[tuple], windows: list[WalkForwardWindow],
+                     workers: int = 1, top: int = 1, rank_by: str = "totalProfit",
+                     chunk_size: int = DEFAULT_CHUNK, cache: ResultCache | None = None,
+                     versions: list | None = None, on_unit=None,
+                     on_window=None) -> tuple[list[WindowResult], BacktestResult | None, list[UnitStats]]:
+    """
+    Simula cada señal una vez y evalúa las ventanas (en workers procesos)
+
+    Args:
+        windows: Ventanas de plan_windows sobre signal_months(replay)
+        top: Configuraciones que se evalúan en test por ventana
+        rank_by: Métrica de BacktestResult para elegir en train
+        cache: Caché de resultados por señal (ver signal_totals)
+        on_window: Llamada con cada WindowResult, en orden de ventana
+
+    Returns:
+        (resultado de cada ventana, resultado fuera de muestra de la mejor
+        de cada ventana encadenada o None sin ventanas, estadísticas de las
+        unidades simuladas)
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"Métrica no válida: {rank_by} (una de {', '.join(RANK_METRICS)})")
+    if not windows:
+        return [], None, []
+    # Solo se simulan las señales que entran en alguna ventana
+    first = min(w.train_start for w in windows)
+    last = max(w.test_stop for w in windows)
+    table, stats = signal_totals(configs, replay[first:last], workers, chunk_size, cache,
+                                 versions[first:last] if versions is not None else None, on_unit)
+    table = [None] * first + table
+
+    results = []
+    if workers <= 1:
+        for window in windows:
+            results.append(evaluate_window(configs, table, window, top, rank_by))
+            if on_window:
+                on_window(results[-1])
+    else:
+        with ProcessPoolExecutor(min(workers, len(windows)), initializer=_init_evaluator,
+                                 initargs=(configs, table)) as pool:
+            futures = [pool.submit(_evaluate, window, top, rank_by) for window in windows]
+            for future in futures:
+                results.append(future.result())
+                if on_window:
+                    on_window(results[-1])
+
+    picks = [(result.picks[0].index, result.window) for result in results if result.picks]
+    out_of_sample = RunningTotals.concat([_span(table, s, w.test_start, w.test_stop) for s, w in picks])
+    return results, out_of_sample.result(configs[picks[0][0]] if picks else configs[0]), stats
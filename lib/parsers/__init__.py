@@ -0,0 +1,4 @@
+"""
+Parsers Python de señales y ticks (equivalentes de signals-csv.ts y
+ticks-loader.ts de este directorio)
+"""
@@ -0,0 +1,115 @@
+"""
+Parser de señales desde CSV
+===========================
+
+Port de lib/parsers/signals-csv.ts. Formato esperado:
+
+    ts_utc;kind;side;price_hint;range_id;message_id;confidence
+
+Las columnas extra (signal_number en signals_intradia.csv) se ignoran.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+
+@dataclass
+class RawSignal:
+    timestamp: datetime
+    kind: str  # "range_open" | "range_close"
+    side: str | None
+    priceHint: float | None
+    rangeId: str
+    messageId: int
+    confidence: float | None
+
+
+@dataclass
+class TradingSignal:
+    id: str
+    timestamp: datetime
+    side: str
+    entryPrice: float  # 0 = hay que enriquecerlo con ticks reales
+    rangeId: str
+    confidence: float
+    closeTimestamp: datetime | None = None
+    closePrice: float | None = None
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """ISO 8601 como new Date(); sin zona se toma como UTC"""
+    ts = datetime.fromisoformat(value.strip())
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _parse_float(value: str) -> float | None:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_csv_line(line: str) -> RawSignal | None:
+    parts = line.split(";")
+    if len(parts) < 7:
+        return None
+    ts_utc, kind, side, price_hint, range_id, message_id, confidence = parts[:7]
+    try:
+        timestamp = _parse_timestamp(ts_utc)
+    except ValueError:
+        return None
+    try:
+        message = int(message_id) if message_id else 0
+    except ValueError:
+        message = 0
+    return RawSignal(
+        timestamp=timestamp,
+        kind=kind,
+        side=side if side in ("BUY", "SELL") else None,
+        priceHint=_parse_float(price_hint),
+        rangeId=range_id or "",
+        messageId=message,
+        confidence=_parse_float(confidence),
+    )
+
+
+def parseSignalsCsv(content: str) -> list[RawSignal]:
+    """Parsea el contenido completo del CSV (la primera línea es la cabecera)"""
+    signals = []
+    for line in content.strip().split("\n")[1:]:
+        line = line.strip()
+        if not line:
+            continue
+        signal = _parse_csv_line(line)
+        if signal:
+            signals.append(signal)
+    return signals
+
+
+def groupSignalsByRange(rawSignals: list[RawSignal]) -> list[TradingSignal]:
+    """Empareja range_open/range_close por rangeId y ordena por timestamp"""
+    ranges: dict[str, dict] = {}
+    for signal in rawSignals:
+        if signal.kind == "range_open":
+            ranges[signal.rangeId] = {"open": signal}
+        elif signal.kind == "range_close" and signal.rangeId in ranges:
+            ranges[signal.rangeId]["close"] = signal
+
+    trading_signals = []
+    for range_id, pair in ranges.items():
+        open_, close = pair["open"], pair.get("close")
+        # Solo hace falta el side: el precio se puede enriquecer después
+        if not open_.side:
+            continue
+        trading_signals.append(TradingSignal(
+            id=range_id,
+            timestamp=open_.timestamp,
+            side=open_.side,
+            entryPrice=open_.priceHint or 0,
+            rangeId=range_id,
+            confidence=open_.confidence or 0.95,
+            closeTimestamp=close.timestamp if close else None,
+            closePrice=(open_.priceHint or 0) if close else None,
+        ))
+
+    return sorted(trading_signals, key=lambda s: s.timestamp)
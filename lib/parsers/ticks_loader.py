@@ -0,0 +1,225 @@
+"""
+Loader de ticks reales para el backtester Python
+================================================
+
+Port de lib/parsers/ticks-loader.ts. En lugar de cargar el CSV del año
+entero, cada búsqueda abre solo los días que necesita:
+
+- TickStore (lib/ticks_store.py): días binarios con mmap.
+- ShardTicks: los .csv.gz de data/ticks a través de data/ticks-index.json
+  (seek + descompresión del día cuando el índice tiene byteOffset).
+
+Las funciones reciben cualquiera de los dos como store (window() y days()).
+"""
+
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from lib.parsers.signals_csv import TradingSignal
+from lib.ticks_csv import block_timestamps_ms, parse_tick_block
+from lib.ticks_shards import INDEX_PATH, TICKS_DIR, load_index, read_day_text
+from lib.ticks_store import (
+    MS_PER_DAY,
+    PRICE_SCALE,
+    DayTicks,
+    TickStore,
+    day_key,
+    empty_ticks,
+    level_step,
+    scale_prices,
+    to_epoch_ms,
+)
+
+PRICE_TOLERANCE_MS = 5 * 60 * 1000  # distancia máxima al tick más cercano
+MAX_SIGNAL_DURATION_MS = 24 * 60 * 60 * 1000
+SHARD_CACHE_DAYS = 8  # días parseados que se mantienen en memoria
+
+
+class ShardTicks:
+    """
+    Días de los shards .csv.gz con la interfaz de lectura de TickStore
+
+    Cada día se parsea una sola vez y se guarda (LRU de SHARD_CACHE_DAYS),
+    así que las ventanas de señales del mismo día no vuelven a descomprimir.
+    """
+
+    def __init__(self, ticks_dir: Path = TICKS_DIR, index_path: Path = INDEX_PATH,
+                 cache_days: int = SHARD_CACHE_DAYS):
+        self.ticks_dir = Path(ticks_dir)
+        self.price_scale = PRICE_SCALE
+        self.cache_days = cache_days
+        self._entries = {}
+        for entry in load_index(index_path).get("days", []):
+            if (self.ticks_dir / entry["file"]).exists():
+                self._entries.setdefault(entry["date"], []).append(entry)
+        self._days: OrderedDict[str, DayTicks] = OrderedDict()
+
+    def days(self) -> list[str]:
+        return sorted(self._entries)
+
+    def has_day(self, date: str) -> bool:
+        return date in self._entries
+
+    def day_entry(self, date: str) -> dict | None:
+        """Entradas de ticks-index.json de un día (una por fichero), como TickStore.day_entry"""
+        if date not in self._entries:
+            return None
+        return {"date": date, "files": self._entries[date]}
+
+    def load_day(self, date: str) -> DayTicks:
+        if date in self._days:
+            self._days.move_to_end(date)
+            return self._days[date]
+        if date not in self._entries:
+            return empty_ticks()
+
+        ts_parts, bid_parts, ask_parts = [], [], []
+        for entry in self._entries[date]:
+            block = parse_tick_block(read_day_text(entry, self.ticks_dir).encode())
+            ts, valid = block_timestamps_ms(block)
+            ts_parts.append(ts[valid])
+            bid_parts.append(block.bid[valid])
+            ask_parts.append(block.ask[valid])
+        ts = np.concatenate(ts_parts)
+        order = np.argsort(ts, kind="stable")
+        day = DayTicks(
+            ts[order],
+            scale_prices(np.concatenate(bid_parts)[order], self.price_scale),
+            scale_prices(np.concatenate(ask_parts)[order], self.price_scale),
+            self.price_scale,
+        )
+
+        self._days[date] = day
+        while len(self._days) > self.cache_days:
+            self._days.popitem(last=False)
+        return day
+
+    def window(self, start_ms: int, end_ms: int, level: int = 0) -> DayTicks:
+        """Ticks en [start_ms, end_ms], como TickStore.window (con level, diezmados al vuelo)"""
+        parts = []
+        day = start_ms // MS_PER_DAY * MS_PER_DAY
+        while day <= end_ms:
+            ticks = self.load_day(day_key(day))
+            if level:
+                part = ticks.decimated_slice(start_ms, end_ms, level_step(level, self.price_scale))
+            else:
+                part = ticks.slice(start_ms, end_ms)
+            if len(part):
+                parts.append(part)
+            day += MS_PER_DAY
+
+        if not parts:
+            return empty_ticks(self.price_scale)
+        if len(parts) == 1:
+            return parts[0]
+        return DayTicks(
+            np.concatenate([p.ts for p in parts]),
+            np.concatenate([p.bid for p in parts]),
+            np.concatenate([p.ask for p in parts]),
+            self.price_scale,
+        )
+
+
+def open_tick_source(source: str = "auto", store_dir: Path | None = None,
+                     ticks_dir: Path = TICKS_DIR, index_path: Path = INDEX_PATH) -> TickStore | ShardTicks:
+    """
+    Fuente de ticks: "store" (tick store binario), "shards" (.csv.gz +
+    ticks-index.json) o "auto" (el store si tiene días, si no los shards)
+    """
+    if source in ("auto", "store"):
+        store = TickStore(store_dir) if store_dir else TickStore()
+        if source == "store" or store.days():
+            return store
+    return ShardTicks(ticks_dir, index_path)
+
+
+def getTicksInRange(startTime: datetime, endTime: datetime,
+                    store: TickStore | ShardTicks | None = None) -> DayTicks:
+    """Ticks en [startTime, endTime] (vistas mmap si no cruza medianoche)"""
+    store = store or open_tick_source()
+    return store.window(to_epoch_ms(startTime), to_epoch_ms(endTime))
+
+
+def getTicksForSignal(signalTimestamp: datetime, closeTimestamp: datetime | None = None,
+                      maxDurationMs: int = MAX_SIGNAL_DURATION_MS,
+                      store: TickStore | ShardTicks | None = None, level: int = 0) -> DayTicks:
+    """
+    Ticks desde la señal hasta su cierre (como mucho maxDurationMs)
+
+    Con level > 0 la ventana es la diezmada de ese nivel (aproximada, ver
+    lib/ticks_store.py); conserva el primer y el último tick de la completa.
+    """
+    start = to_epoch_ms(signalTimestamp)
+    end = start + maxDurationMs
+    if closeTimestamp is not None:
+        end = min(to_epoch_ms(closeTimestamp), end)
+    store = store or open_tick_source()
+    return store.window(start, end, level)
+
+
+def hasTicksData(store: TickStore | ShardTicks | None = None) -> bool:
+    """Comprueba si hay días de ticks (tick store o shards indexados)"""
+    store = store or open_tick_source()
+    return len(store.days()) > 0
+
+
+def getMarketPriceAt(timestamp: datetime, store: TickStore | ShardTicks | None = None,
+                     toleranceMs: int = PRICE_TOLERANCE_MS) -> dict | None:
+    """
+    Precio del tick más cercano a timestamp
+
+    Returns:
+        {"bid", "ask", "spread"} o None si no hay tick a menos de toleranceMs
+    """
+    store = store or open_tick_source()
+    target = to_epoch_ms(timestamp)
+    window = store.window(target - toleranceMs, target + toleranceMs)
+    if not len(window):
+        return None
+
+    # Primer tick >= target; el anterior gana solo si está estrictamente más cerca
+    best = min(int(np.searchsorted(window.ts, target, side="left")), len(window) - 1)
+    if best > 0 and abs(int(window.ts[best - 1]) - target) < abs(int(window.ts[best]) - target):
+        best -= 1
+    if abs(int(window.ts[best]) - target) > toleranceMs:
+        return None
+
+    bid = int(window.bid[best]) / window.price_scale
+    ask = int(window.ask[best]) / window.price_scale
+    return {"bid": bid, "ask": ask, "spread": (int(window.ask[best]) - int(window.bid[best])) / window.price_scale}
+
+
+def enrichSignalsWithRealPrices(signals: list[TradingSignal],
+                                store: TickStore | ShardTicks | None = None,
+                                filterUnavailable: bool = True) -> list[TradingSignal]:
+    """
+    Usa como precio de entrada el precio medio (bid + ask) / 2 del tick más
+    cercano a cada señal
+
+    Las señales sin tick cercano se descartan si filterUnavailable; si no,
+    se mantienen solo las que ya traían precio.
+    """
+    store = store or open_tick_source()
+    enriched_signals = []
+    enriched = unavailable = 0
+
+    for signal in signals:
+        market = getMarketPriceAt(signal.timestamp, store)
+        if market:
+            enriched_signals.append(replace(
+                signal,
+                entryPrice=(market["bid"] + market["ask"]) / 2,
+                confidence=min(signal.confidence + 0.05, 1.0),
+            ))
+            enriched += 1
+        else:
+            unavailable += 1
+            if not filterUnavailable and signal.entryPrice > 0:
+                enriched_signals.append(signal)
+
+    print(f"[TicksLoader] Enriquecidas: {enriched}, Sin precio: {unavailable}, Total: {len(enriched_signals)}")
+    return enriched_signals
@@ -0,0 +1,330 @@
+"""
+Caché de ticks compartida entre procesos
+========================================
+
+Cuando varios procesos de backtest leen los mismos días, cada uno los
+decodificaría por su cuenta (.npy, .tkd o concatenaciones). Aquí un proceso
+servidor es dueño de los días ya decodificados, cada uno en un bloque de
+multiprocessing.shared_memory:
+
+    [ ts int64 * n | bid int32 * n | ask int32 * n ]
+
+Los workers se conectan al servidor (BaseManager sobre socket local), piden
+(símbolo, día) y reciben el nombre del bloque; lo abren y usan vistas
+numpy de solo lectura, sin copiar. El servidor mantiene un LRU con un
+presupuesto de memoria: al expulsar un día se hace unlink del bloque, pero
+los workers que ya lo tenían abierto siguen usándolo hasta soltarlo. Cada
+cliente mantiene abiertos como mucho ATTACHED_DAYS días.
+
+lib/backtest_parallel.py lo usa con run_units(..., tick_cache=server): los
+workers sacan la ventana de cada señal de los días de la caché en lugar de
+una copia de todas las ventanas.
+
+    server = start_cache_server(budget_mb=2048)
+    # en cada worker (address y authkey se pasan al crear el proceso):
+    client = TickCacheClient(server.address, server.authkey)
+    window = client.window(start_ms, end_ms)
+    server.stats()  # hits, misses, evictions, bytes...
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.managers import BaseManager
+from pathlib import Path
+
+import numpy as np
+
+from lib.ticks_store import (
+    DEFAULT_SYMBOL,
+    MS_PER_DAY,
+    PRICE_DTYPE,
+    STORE_DIR,
+    TS_DTYPE,
+    DayTicks,
+    TickStore,
+    day_key,
+    empty_ticks,
+    level_step,
+)
+
+DEFAULT_BUDGET_MB = 1024
+ATTACH_RETRIES = 5
+ATTACHED_DAYS = 8  # días abiertos a la vez por cliente
+TICK_BYTES = np.dtype(TS_DTYPE).itemsize + 2 * np.dtype(PRICE_DTYPE).itemsize
+
+_cache = None  # TickCache del proceso servidor
+
+
+def day_views(buffer, n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vistas ts/bid/ask de un bloque [ts | bid | ask] de n ticks"""
+    ts_bytes = n * np.dtype(TS_DTYPE).itemsize
+    price_bytes = n * np.dtype(PRICE_DTYPE).itemsize
+    ts = np.frombuffer(buffer, dtype=TS_DTYPE, count=n)
+    bid = np.frombuffer(buffer, dtype=PRICE_DTYPE, count=n, offset=ts_bytes)
+    ask = np.frombuffer(buffer, dtype=PRICE_DTYPE, count=n, offset=ts_bytes + price_bytes)
+    return ts, bid, ask
+
+
+class _AttachedDay(shared_memory.SharedMemory):
+    """
+    Bloque abierto por un worker: close() suelta la referencia aunque queden
+    vistas numpy vivas; el mapeo se libera cuando muere la última
+    """
+
+    def close(self):
+        try:
+            super().close()
+        except BufferError:
+            pass
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Abre un bloque sin registrarlo en el resource_tracker, que lo borraría
+    al salir el worker. Registrarlo y deshacerlo después no vale: si el
+    worker comparte tracker con el servidor (ambos hijos del mismo proceso)
+    se perdería también el registro del servidor.
+    """
+    if sys.version_info >= (3, 13):
+        return _AttachedDay(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return _AttachedDay(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class TickCache:
+    """Registro LRU de días en memoria compartida (vive en el proceso servidor)"""
+
+    def __init__(self, root: Path = STORE_DIR, budget_bytes: int = DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.budget_bytes = budget_bytes
+        self._stores: dict[str, TickStore] = {}
+        self._entries: OrderedDict[tuple, tuple[shared_memory.SharedMemory, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()  # el manager atiende cada conexión en un hilo
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _store(self, symbol: str) -> TickStore:
+        with self._lock:
+            if symbol not in self._stores:
+                store = TickStore(self.root, symbol)
+                store.load_index()
+                self._stores[symbol] = store
+            return self._stores[symbol]
+
+    def get(self, symbol: str, date: str) -> tuple[str, int, int] | None:
+        """
+        Bloque de un día, cargándolo si no está
+
+        El día se lee del disco sin el lock, así que los demás clientes
+        siguen recibiendo aciertos mientras tanto; si dos cargan el mismo
+        día a la vez se queda el primero.
+
+        Returns:
+            (nombre del bloque, nº de ticks, priceScale) o None si el día no existe
+        """
+        key = (symbol, date)
+        store = self._store(symbol)
+        with self._lock:
+            if key in self._entries:
+                return self._hit(key, store)
+            self._stats["misses"] += 1
+
+        if not store.has_day(date):
+            return None
+        day = store.load_day(date)
+        n = len(day)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, n * TICK_BYTES))
+        ts, bid, ask = day_views(shm.buf, n)
+        ts[:], bid[:], ask[:] = day.ts, day.bid, day.ask
+        del ts, bid, ask  # sin vistas vivas el bloque se puede cerrar al expulsarlo
+
+        with self._lock:
+            if key in self._entries:
+                shm.close()
+                shm.unlink()
+                shm, n = self._entries[key]
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = (shm, n)
+                self._bytes += shm.size
+                self._evict()
+            return shm.name, n, store.price_scale
+
+    def _hit(self, key: tuple, store: TickStore) -> tuple[str, int, int]:
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        shm, n = self._entries[key]
+        return shm.name, n, store.price_scale
+
+    def _evict(self):
+        # El día recién cargado (el último) se queda aunque supere el presupuesto
+        while self._bytes > self.budget_bytes and len(self._entries) > 1:
+            _, (shm, _) = self._entries.popitem(last=False)
+            self._bytes -= shm.size
+            self._stats["evictions"] += 1
+            shm.close()
+            shm.unlink()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "budgetBytes": self.budget_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            for shm, _ in self._entries.values():
+                shm.close()
+                shm.unlink()
+            self._entries.clear()
+            self._bytes = 0
+
+
+def _init_cache(root: str, budget_bytes: int):
+    global _cache
+    _cache = TickCache(Path(root), budget_bytes)
+
+
+def _get_cache() -> TickCache:
+    return _cache
+
+
+class TickCacheManager(BaseManager):
+    pass
+
+
+TickCacheManager.register("get_cache", callable=_get_cache)
+
+
+@dataclass
+class CacheServer:
+    """Proceso servidor arrancado; address, authkey y symbol son lo que necesita un worker"""
+
+    manager: TickCacheManager
+    address: object
+    authkey: bytes
+    symbol: str = DEFAULT_SYMBOL
+
+    def stats(self) -> dict:
+        return self.manager.get_cache().stats()
+
+    def shutdown(self):
+        self.manager.get_cache().clear()
+        self.manager.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+def start_cache_server(root: Path = STORE_DIR, budget_mb: int = DEFAULT_BUDGET_MB,
+                       symbol: str = DEFAULT_SYMBOL, address=None) -> CacheServer:
+    """Arranca el proceso servidor de la caché (socket local, clave aleatoria)"""
+    authkey = os.urandom(32)
+    manager = TickCacheManager(address=address, authkey=authkey)
+    manager.start(_init_cache, (str(root), budget_mb * 1024 * 1024))
+    return CacheServer(manager, manager.address, authkey, symbol)
+
+
+class TickCacheClient:
+    """
+    Acceso de un worker a la caché con la misma interfaz de lectura que
+    TickStore (load_day, window)
+    """
+
+    def __init__(self, address, authkey: bytes, symbol: str = DEFAULT_SYMBOL,
+                 max_attached: int = ATTACHED_DAYS):
+        manager = TickCacheManager(address=address, authkey=authkey)
+        manager.connect()
+        self._cache = manager.get_cache()
+        self.symbol = symbol
+        self.max_attached = max_attached
+        self._attached: OrderedDict[tuple, tuple[shared_memory.SharedMemory, DayTicks]] = OrderedDict()
+
+    def load_day(self, date: str, symbol: str | None = None) -> DayTicks:
+        """Vistas de solo lectura sobre el bloque compartido del día"""
+        key = (symbol or self.symbol, date)
+        for attempt in range(ATTACH_RETRIES):
+            found = self._cache.get(*key)
+            if found is None:
+                return empty_ticks()
+            name, n, price_scale = found
+
+            attached = self._attached.get(key)
+            if attached is not None and attached[0].name == name:
+                self._attached.move_to_end(key)
+                return attached[1]
+            try:
+                shm = _attach(name)
+                break
+            except FileNotFoundError:
+                # Otro worker forzó su expulsión entre get() y la apertura
+                if attempt == ATTACH_RETRIES - 1:
+                    raise
+        if attached is not None:
+            # El servidor lo expulsó y volvió a cargarlo con otro nombre
+            self._attached.pop(key)[0].close()
+
+        views = day_views(shm.buf, n)
+        for view in views:
+            view.setflags(write=False)
+        day = DayTicks(*views, price_scale=price_scale)
+        self._attached[key] = (shm, day)
+        while len(self._attached) > self.max_attached:
+            self._attached.popitem(last=False)[1][0].close()
+        return day
+
+    def has_day(self, date: str, symbol: str | None = None) -> bool:
+        return len(self.load_day(date, symbol=symbol)) > 0
+
+    def window(self, start_ms: int, end_ms: int, level: int = 0, symbol: str | None = None) -> DayTicks:
+        """
+        Ticks en [start_ms, end_ms], como TickStore.window
+
+        Con level diezma al vuelo el tramo de cada día: el resultado es el
+        mismo que el de TickStore.window con d<level>.npy (y igual de
+        APROXIMADO).
+        """
+        parts = []
+        day = start_ms // MS_PER_DAY * MS_PER_DAY
+        while day <= end_ms:
+            ticks = self.load_day(day_key(day), symbol)
+            if level:
+                part = ticks.decimated_slice(start_ms, end_ms, level_step(level, ticks.price_scale))
+            else:
+                part = ticks.slice(start_ms, end_ms)
+            if len(part):
+                parts.append(part)
+            day += MS_PER_DAY
+
+        if not parts:
+            return empty_ticks()
+        if len(parts) == 1:
+            return parts[0]
+        return DayTicks(
+            np.concatenate([p.ts for p in parts]),
+            np.concatenate([p.bid for p in parts]),
+            np.concatenate([p.ask for p in parts]),
+            parts[0].price_scale,
+        )
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def close(self):
+        for shm, _ in self._attached.values():
+            shm.close()
+        self._attached.clear()
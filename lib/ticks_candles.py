@@ -0,0 +1,251 @@
+"""
+Pirámide de velas OHLC precalculada por día
+===========================================
+
+Al escribir un día de ticks se generan en la misma pasada velas de 1s, 1m,
+5m, 15m, 1h y 1d (OHLC del bid, número de ticks y spread medio). La de 1s
+sale de los ticks y cada resolución siguiente de la anterior, así que el coste
+extra es una fracción del de escribir los ticks.
+
+Estructura (junto al tick store):
+
+    data/ticks-store/candles/XAUUSD/
+        index.json            # un registro por día con OHLC diario
+        2024-06-03/1s.npy     # array estructurado CANDLE_DTYPE
+        2024-06-03/1m.npy
+        ...
+
+Los precios van en enteros escalados (priceScale del store) y los ficheros se
+abren con mmap:
+
+    candles = CandleStore().load("15m", start_ms, end_ms)
+    closes = candles["close"] / 1000
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from lib.ticks_store import (
+    DEFAULT_SYMBOL,
+    MS_PER_DAY,
+    PRICE_SCALE,
+    STORE_DIR,
+    TS_DTYPE,
+    day_key,
+    ms_to_iso,
+    scale_prices,
+    to_epoch_ms,
+)
+
+CANDLES_DIR = STORE_DIR / "candles"
+INDEX_FILE = "index.json"
+
+# Resoluciones en orden: cada una se agrega desde la anterior
+RESOLUTIONS = {
+    "1s": 1_000,
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "1d": MS_PER_DAY,
+}
+
+CANDLE_DTYPE = np.dtype([
+    ("ts", TS_DTYPE),      # inicio de la vela, epoch ms
+    ("open", np.int32),    # bid * priceScale
+    ("high", np.int32),
+    ("low", np.int32),
+    ("close", np.int32),
+    ("ticks", np.int32),   # volumen = número de ticks
+    ("spread", np.float32),  # spread medio (ask - bid) * priceScale
+])
+
+
+def _bucket_starts(bucket: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+
+
+def candles_from_ticks(ts: np.ndarray, bid: np.ndarray, ask: np.ndarray, step_ms: int) -> np.ndarray:
+    """Velas de step_ms a partir de ticks ordenados (bid/ask enteros escalados)"""
+    if len(ts) == 0:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    bucket = ts // step_ms * step_ms
+    starts = _bucket_starts(bucket)
+    ends = np.append(starts[1:], len(ts))
+
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out["ts"] = bucket[starts]
+    out["open"] = bid[starts]
+    out["close"] = bid[ends - 1]
+    out["high"] = np.maximum.reduceat(bid, starts)
+    out["low"] = np.minimum.reduceat(bid, starts)
+    out["ticks"] = ends - starts
+    spread_sum = np.add.reduceat(ask.astype(np.int64) - bid, starts)
+    out["spread"] = spread_sum / out["ticks"]
+    return out
+
+
+def aggregate_candles(candles: np.ndarray, step_ms: int) -> np.ndarray:
+    """Agrega velas ordenadas a una resolución mayor (múltiplo de la actual)"""
+    if len(candles) == 0:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    bucket = candles["ts"] // step_ms * step_ms
+    starts = _bucket_starts(bucket)
+    ends = np.append(starts[1:], len(candles))
+
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out["ts"] = bucket[starts]
+    out["open"] = candles["open"][starts]
+    out["close"] = candles["close"][ends - 1]
+    out["high"] = np.maximum.reduceat(candles["high"], starts)
+    out["low"] = np.minimum.reduceat(candles["low"], starts)
+    ticks = np.add.reduceat(candles["ticks"].astype(np.int64), starts)
+    out["ticks"] = ticks
+    weighted = np.add.reduceat(candles["spread"].astype(np.float64) * candles["ticks"], starts)
+    out["spread"] = weighted / ticks
+    return out
+
+
+def build_pyramid(ts: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> dict[str, np.ndarray]:
+    """Todas las resoluciones de RESOLUTIONS a partir de los ticks de un día"""
+    pyramid = {}
+    previous = None
+    for name, step in RESOLUTIONS.items():
+        if previous is None:
+            previous = candles_from_ticks(ts, bid, ask, step)
+        else:
+            previous = aggregate_candles(previous, step)
+        pyramid[name] = previous
+    return pyramid
+
+
+class CandleStore:
+    """Velas por día y resolución con índice JSON propio"""
+
+    def __init__(self, root: Path = CANDLES_DIR, symbol: str = DEFAULT_SYMBOL,
+                 price_scale: int = PRICE_SCALE):
+        self.root = Path(root)
+        self.symbol = symbol
+        self.price_scale = price_scale
+        self._index: dict | None = None
+
+    # ==================== ÍNDICE ====================
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / self.symbol / INDEX_FILE
+
+    def load_index(self) -> dict:
+        if self._index is None:
+            if self.index_path.exists():
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+                self.price_scale = self._index.get("priceScale", self.price_scale)
+            else:
+                self._index = {"symbol": self.symbol, "priceScale": self.price_scale, "days": []}
+        return self._index
+
+    def save_index(self):
+        days = sorted(self.load_index()["days"], key=lambda d: d["date"])
+        self._index = {
+            **self._index,
+            "generated": ms_to_iso(to_epoch_ms(datetime.now(timezone.utc))),
+            "symbol": self.symbol,
+            "priceScale": self.price_scale,
+            "resolutions": list(RESOLUTIONS),
+            "totalDays": len(days),
+            "days": days,
+        }
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def day_entry(self, date: str) -> dict | None:
+        for entry in self.load_index()["days"]:
+            if entry["date"] == date:
+                return entry
+        return None
+
+    def days(self) -> list[str]:
+        return [d["date"] for d in self.load_index()["days"]]
+
+    # ==================== ESCRITURA ====================
+
+    def day_dir(self, date: str) -> Path:
+        return self.root / self.symbol / date
+
+    def write_day(self, date: str, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray,
+                  save_index: bool = True) -> dict:
+        """
+        Genera y guarda la pirámide de un día (reemplaza la anterior)
+
+        Args:
+            date: Día UTC YYYY-MM-DD
+            ts: Timestamps epoch ms ordenados
+            bid, ask: Precios float o enteros ya escalados
+        """
+        if len(ts) == 0:
+            raise ValueError(f"Día {date} sin ticks")
+        ts = np.asarray(ts, dtype=TS_DTYPE)
+        pyramid = build_pyramid(
+            ts, scale_prices(bid, self.price_scale), scale_prices(ask, self.price_scale)
+        )
+
+        day_dir = self.day_dir(date)
+        day_dir.mkdir(parents=True, exist_ok=True)
+        for name, candles in pyramid.items():
+            tmp = day_dir / f"{name}.tmp.npy"
+            np.save(tmp, candles)
+            os.replace(tmp, day_dir / f"{name}.npy")
+
+        daily = pyramid["1d"][0]
+        scale = self.price_scale
+        entry = {
+            "date": date,
+            "ticks": int(daily["ticks"]),
+            "open": int(daily["open"]) / scale,
+            "high": int(daily["high"]) / scale,
+            "low": int(daily["low"]) / scale,
+            "close": int(daily["close"]) / scale,
+            "meanSpread": round(float(daily["spread"]) / scale, 5),
+            "bars": {name: int(len(c)) for name, c in pyramid.items()},
+        }
+        days = self.load_index()["days"]
+        self._index["days"] = [d for d in days if d["date"] != date] + [entry]
+        if save_index:
+            self.save_index()
+        return entry
+
+    # ==================== LECTURA ====================
+
+    def load_day(self, resolution: str, date: str) -> np.ndarray:
+        """Velas de un día (mmap de solo lectura)"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Resolución desconocida: {resolution} (válidas: {', '.join(RESOLUTIONS)})")
+        path = self.day_dir(date) / f"{resolution}.npy"
+        if not path.exists():
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.load(path, mmap_mode="r")
+
+    def load(self, resolution: str, start_ms: int, end_ms: int) -> np.ndarray:
+        """Velas cuyo inicio cae en [start_ms, end_ms]"""
+        parts = []
+        day = start_ms // MS_PER_DAY * MS_PER_DAY
+        while day <= end_ms:
+            candles = self.load_day(resolution, day_key(day))
+            if len(candles):
+                lo = int(np.searchsorted(candles["ts"], start_ms, side="left"))
+                hi = int(np.searchsorted(candles["ts"], end_ms, side="right"))
+                if hi > lo:
+                    parts.append(candles[lo:hi])
+            day += MS_PER_DAY
+
+        if not parts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
@@ -0,0 +1,153 @@
+"""
+Codec delta/entero para los ticks de un día
+===========================================
+
+Los ticks del oro se mueven en pasos pequeños: entre dos ticks seguidos el
+tiempo avanza unos pocos ms y el bid unos pocos puntos, y el spread casi no
+cambia. El codec guarda cada día como:
+
+    cabecera   magic "TKD1", flags, n, priceScale, ts0 (int64), bid0 (int32)
+    cuerpo     varint(diff(ts))            n-1 valores, ms >= 0
+               varint(zigzag(diff(bid)))   n-1 valores, puntos
+               varint(zigzag(ask - bid))   n valores, spread en puntos
+
+Los varint son LEB128 (7 bits por byte) y se codifican/decodifican con
+operaciones vectorizadas de numpy, sin bucles por tick. Con FLAG_ZLIB el
+cuerpo va además comprimido con zlib.
+
+    data = encode_ticks(ts, bid, ask, 1000)   # bid/ask enteros escalados
+    ts, bid, ask = decode_ticks(data)
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"TKD1"
+HEADER = struct.Struct("<4sBIIqi")  # magic, flags, n, priceScale, ts0, bid0
+FLAG_ZLIB = 1
+ZLIB_LEVEL = 6
+MAX_VARINT_BYTES = 10  # 64 bits / 7
+
+
+def zigzag_encode(values: np.ndarray) -> np.ndarray:
+    """Enteros con signo -> sin signo (0, -1, 1, -2... -> 0, 1, 2, 3...)"""
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def zigzag_decode(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.uint64)
+    return (values >> np.uint64(1)).view(np.int64) ^ -(values & np.uint64(1)).view(np.int64)
+
+
+def varint_encode(values: np.ndarray) -> bytes:
+    """LEB128 vectorizado de enteros sin signo"""
+    values = np.asarray(values, dtype=np.uint64)
+    if len(values) == 0:
+        return b""
+    # Bytes por valor: 1 + nº de grupos de 7 bits por encima del primero
+    nbytes = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        nbytes += rest > 0
+        rest >>= np.uint64(7)
+
+    starts = np.concatenate(([0], np.cumsum(nbytes)[:-1]))
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max())):
+        has = nbytes > k
+        group = (values[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (nbytes[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + k] = group | more
+    return out.tobytes()
+
+
+def varint_decode(data: bytes | np.ndarray, count: int | None = None) -> np.ndarray:
+    """Decodifica LEB128 (todos los valores, o comprueba que son count)"""
+    raw = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    if len(raw) == 0:
+        values = np.empty(0, dtype=np.uint64)
+    else:
+        ends = np.flatnonzero(raw < 0x80)
+        if len(ends) == 0 or ends[-1] != len(raw) - 1:
+            raise ValueError("varint truncado")
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        if int(np.max(ends - starts)) >= MAX_VARINT_BYTES:
+            raise ValueError("varint de más de 64 bits")
+        # Posición de cada byte dentro de su valor
+        value_id = np.repeat(np.arange(len(starts)), ends - starts + 1)
+        shift = (np.arange(len(raw)) - starts[value_id]).astype(np.uint64) * np.uint64(7)
+        groups = (raw & 0x7F).astype(np.uint64) << shift
+        values = np.add.reduceat(groups, starts)
+    if count is not None and len(values) != count:
+        raise ValueError(f"Se esperaban {count} varint y hay {len(values)}")
+    return values
+
+
+def encode_ticks(ts: np.ndarray, bid: np.ndarray, ask: np.ndarray, price_scale: int,
+                 compress: bool = True) -> bytes:
+    """
+    Codifica los ticks de un día
+
+    Args:
+        ts: Timestamps epoch ms ordenados
+        bid, ask: Precios enteros escalados
+        price_scale: Escala de los precios (se guarda en la cabecera)
+        compress: Comprimir el cuerpo con zlib (FLAG_ZLIB)
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    bid = np.asarray(bid, dtype=np.int64)
+    ask = np.asarray(ask, dtype=np.int64)
+    n = len(ts)
+    if len(bid) != n or len(ask) != n:
+        raise ValueError("ts, bid y ask deben tener la misma longitud")
+    if n == 0:
+        return HEADER.pack(MAGIC, 0, 0, price_scale, 0, 0)
+
+    dts = np.diff(ts)
+    if (dts < 0).any():
+        raise ValueError("Los timestamps deben estar ordenados")
+    body = b"".join((
+        varint_encode(dts.view(np.uint64)),
+        varint_encode(zigzag_encode(np.diff(bid))),
+        varint_encode(zigzag_encode(ask - bid)),
+    ))
+    flags = 0
+    if compress:
+        body = zlib.compress(body, ZLIB_LEVEL)
+        flags |= FLAG_ZLIB
+    return HEADER.pack(MAGIC, flags, n, price_scale, int(ts[0]), int(bid[0])) + body
+
+
+def decode_header(data: bytes) -> dict:
+    magic, flags, n, price_scale, ts0, bid0 = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"No es un bloque de ticks {MAGIC!r}: {magic!r}")
+    return {"flags": flags, "ticks": n, "priceScale": price_scale, "ts0": ts0, "bid0": bid0}
+
+
+def decode_ticks(data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Decodifica un bloque de encode_ticks -> (ts int64, bid int32, ask int32)"""
+    header = decode_header(data)
+    n = header["ticks"]
+    if n == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int32)
+
+    body = data[HEADER.size:]
+    if header["flags"] & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    values = varint_decode(body, count=3 * n - 2)
+
+    ts = np.empty(n, dtype=np.int64)
+    ts[0] = header["ts0"]
+    np.cumsum(values[:n - 1].view(np.int64), out=ts[1:])
+    ts[1:] += header["ts0"]
+
+    bid = np.empty(n, dtype=np.int64)
+    bid[0] = header["bid0"]
+    np.cumsum(zigzag_decode(values[n - 1:2 * n - 2]), out=bid[1:])
+    bid[1:] += header["bid0"]
+    ask = bid + zigzag_decode(values[2 * n - 2:])
+    return ts, bid.astype(np.int32), ask.astype(np.int32)
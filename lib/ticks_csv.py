@@ -0,0 +1,235 @@
+"""
+Parser vectorizado por bloques para los CSV de ticks
+====================================================
+
+Lee el stream (gzip o texto ya descomprimido) en bloques grandes cortados en
+fin de línea y parsea cada bloque entero a arrays numpy de una vez:
+
+    for block in iter_tick_blocks(path):
+        block.timestamps  # np.ndarray de bytes (S), tal cual en el CSV
+        block.bid, block.ask, block.spread  # float64
+        block.accepted, block.rejected
+
+El filtrado (filas mal formadas, bid <= 0, ask <= 0) se hace en un paso
+vectorizado. Si un bloque tiene algo fuera de lo normal (espacios, bytes no
+ASCII, número de campos distinto de 4, números que numpy no acepta) se parsea
+ese bloque línea a línea con parse_tick_fields(), que replica exactamente a
+parse_tick_line() de scripts/migrate_ticks_python.py: los contadores
+aceptados/rechazados son siempre los mismos que con el parser por línea.
+"""
+
+import gzip
+import io
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from lib.ticks_shards import decompress_members
+from lib.ticks_store import to_epoch_ms
+
+READ_BLOCK_SIZE = 8 * 1024 * 1024  # 8 MB de texto por bloque
+
+_NEWLINE = ord("\n")
+_COMMA = ord(",")
+# Bytes permitidos en las columnas numéricas del camino rápido
+_NUMERIC_BYTES = np.zeros(256, dtype=bool)
+_NUMERIC_BYTES[[ord(c) for c in "0123456789.+-eE"]] = True
+_NUMERIC_BYTES[0] = True  # relleno de los arrays S
+# Camino rápido: ASCII imprimible sin espacios + saltos de línea
+_FAST_BYTES = np.zeros(256, dtype=bool)
+_FAST_BYTES[0x21:0x7F] = True
+_FAST_BYTES[_NEWLINE] = True
+
+
+@dataclass
+class TickBlock:
+    timestamps: np.ndarray  # dtype S, texto original del CSV
+    bid: np.ndarray
+    ask: np.ndarray
+    spread: np.ndarray
+    accepted: int
+    rejected: int  # líneas no vacías (y que no son cabecera) descartadas
+    vectorized: bool = True
+
+    def __len__(self) -> int:
+        return len(self.bid)
+
+    def timestamps_ms(self) -> np.ndarray:
+        """Timestamps como epoch ms (int64); admite 'Z' final"""
+        ts = self.timestamps
+        if len(ts) and ts[0].endswith(b"Z"):
+            ts = np.char.rstrip(ts, b"Z")
+        return ts.astype("datetime64[ms]").astype(np.int64)
+
+    def timestamp_strings(self) -> list[str]:
+        return np.char.decode(self.timestamps, "ascii").tolist()
+
+
+def block_timestamps_ms(block: TickBlock) -> tuple[np.ndarray, np.ndarray]:
+    """Timestamps epoch ms del bloque y máscara de filas con timestamp válido"""
+    try:
+        return block.timestamps_ms(), np.ones(len(block), dtype=bool)
+    except ValueError:
+        ts = np.zeros(len(block), dtype=np.int64)
+        valid = np.zeros(len(block), dtype=bool)
+        for i, raw in enumerate(block.timestamp_strings()):
+            try:
+                ts[i] = to_epoch_ms(datetime.fromisoformat(raw.rstrip("Z")))
+                valid[i] = True
+            except ValueError:
+                pass
+        return ts, valid
+
+
+def parse_tick_fields(line: str) -> tuple[str, float, float, float] | None:
+    """Parser de referencia por línea (misma semántica que parse_tick_line)"""
+    line = line.strip()
+    if not line or line.startswith("timestamp"):
+        return None
+
+    parts = line.split(",")
+    if len(parts) < 4:
+        return None
+
+    try:
+        timestamp = parts[0]
+        bid = float(parts[1])
+        ask = float(parts[2])
+        spread = float(parts[3])
+
+        if bid <= 0 or ask <= 0:
+            return None
+
+        return (timestamp, bid, ask, spread)
+    except (ValueError, IndexError):
+        return None
+
+
+def _parse_block_lines(block: bytes) -> TickBlock:
+    """Camino lento: línea a línea con la semántica de TextIOWrapper + parse_tick_fields"""
+    text = block.decode("utf-8", errors="ignore")
+    rows = []
+    rejected = 0
+    for line in text.split("\n"):
+        tick = parse_tick_fields(line)
+        if tick:
+            rows.append(tick)
+        elif line.strip() and not line.strip().startswith("timestamp"):
+            rejected += 1
+
+    if not rows:
+        return _empty_block(rejected)
+
+    ts, bid, ask, spread = zip(*rows)
+    return TickBlock(
+        timestamps=np.array([t.encode("utf-8") for t in ts], dtype="S"),
+        bid=np.array(bid, dtype=np.float64),
+        ask=np.array(ask, dtype=np.float64),
+        spread=np.array(spread, dtype=np.float64),
+        accepted=len(rows),
+        rejected=rejected,
+        vectorized=False,
+    )
+
+
+def _empty_block(rejected: int = 0) -> TickBlock:
+    empty = np.empty(0, dtype=np.float64)
+    return TickBlock(np.empty(0, dtype="S1"), empty, empty, empty, 0, rejected)
+
+
+def parse_tick_block(block: bytes) -> TickBlock:
+    """
+    Parsea un bloque de líneas completas del CSV de ticks
+
+    Args:
+        block: Bytes terminados en fin de línea (el último salto es opcional)
+    """
+    if b"\r" in block:
+        # Misma normalización que el modo texto universal de Python
+        block = block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+    if block.startswith(b"timestamp"):
+        nl = block.find(b"\n")
+        block = b"" if nl < 0 else block[nl + 1:]
+
+    # Líneas vacías: se ignoran igual que en el parser por línea
+    block = block.strip(b"\n")
+    while b"\n\n" in block:
+        block = block.replace(b"\n\n", b"\n")
+    if not block:
+        return _empty_block()
+
+    raw = np.frombuffer(block, dtype=np.uint8)
+    if not _FAST_BYTES[raw].all():
+        return _parse_block_lines(block)
+
+    # Exactamente 3 comas por línea y ninguna línea que empiece por 't'
+    newlines = np.flatnonzero(raw == _NEWLINE)
+    n_lines = len(newlines) + 1
+    commas = np.flatnonzero(raw == _COMMA)
+    commas_before = np.searchsorted(commas, np.append(newlines, len(raw)))
+    commas_per_line = np.diff(commas_before, prepend=0)
+    line_starts = np.concatenate(([0], newlines + 1))
+    if np.any(commas_per_line != 3) or np.any(raw[line_starts] == ord("t")):
+        return _parse_block_lines(block)
+
+    fields = np.array(block.replace(b"\n", b",").split(b","), dtype="S").reshape(n_lines, 4)
+    numeric = fields[:, 1:]
+    if not np.all(_NUMERIC_BYTES[numeric.view(np.uint8)]) or np.any(numeric == b""):
+        return _parse_block_lines(block)
+
+    try:
+        values = numeric.astype(np.float64)
+    except ValueError:
+        return _parse_block_lines(block)
+
+    valid = (values[:, 0] > 0) & (values[:, 1] > 0)
+    accepted = int(np.count_nonzero(valid))
+    if accepted != n_lines:
+        fields = fields[valid]
+        values = values[valid]
+
+    return TickBlock(
+        timestamps=fields[:, 0].copy(),
+        bid=values[:, 0].copy(),
+        ask=values[:, 1].copy(),
+        spread=values[:, 2].copy(),
+        accepted=accepted,
+        rejected=n_lines - accepted,
+    )
+
+
+def iter_text_blocks(stream, block_size: int = READ_BLOCK_SIZE):
+    """Lee un stream binario en bloques cortados en el último salto de línea"""
+    pending = b""
+    while True:
+        chunk = stream.read(block_size)
+        if not chunk:
+            break
+        data = pending + chunk
+        # El último byte se excluye: un \r final puede ser la mitad de un \r\n
+        cut = max(data.rfind(b"\n", 0, len(data) - 1), data.rfind(b"\r", 0, len(data) - 1))
+        if cut < 0:
+            pending = data
+            continue
+        pending = data[cut + 1:]
+        yield data[:cut + 1]
+    if pending:
+        yield pending
+
+
+def iter_tick_blocks(path: Path, block_size: int = READ_BLOCK_SIZE):
+    """Itera TickBlocks de un .csv.gz (o .csv) completo"""
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        for block in iter_text_blocks(f, block_size):
+            yield parse_tick_block(block)
+
+
+def iter_member_tick_blocks(raw: bytes, block_size: int = READ_BLOCK_SIZE):
+    """Itera TickBlocks de bytes gzip (uno o varios miembros, p.ej. un día)"""
+    for block in iter_text_blocks(io.BytesIO(decompress_members(raw)), block_size):
+        yield parse_tick_block(block)
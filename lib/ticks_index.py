@@ -0,0 +1,291 @@
+"""
+Construcción incremental de data/ticks-index.json
+=================================================
+
+Equivalente en Python de lib/generate-ticks-index.ts, con tres añadidos:
+
+- Cada shard se recorre miembro gzip a miembro gzip: si un día ocupa sus
+  propios miembros (formato de ShardWriter) su entrada lleva byteOffset/
+  byteLength; si no (gzip de un solo miembro) queda solo startLine/endLine.
+- Estadísticas por día en el índice (ticks, minBid, maxBid, meanSpread),
+  para comprobar cobertura sin abrir los ticks.
+- Firma por fichero (tamaño + mtime, opcionalmente sha256) en
+  index["files"]: solo se reescanean los shards que han cambiado.
+
+La numeración de líneas es la del generador TS: la cabecera es la línea 0 y
+cada día va desde su primera línea con tick hasta la línea anterior al
+primer tick del día siguiente.
+"""
+
+import hashlib
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from lib.ticks_csv import parse_tick_block
+from lib.ticks_shards import iso_z
+
+READ_CHUNK = 4 * 1024 * 1024  # bytes comprimidos por lectura
+STAT_DECIMALS = 5
+
+
+def file_signature(path: Path, checksum: bool = False) -> dict:
+    """Firma de un shard para detectar cambios (tamaño + mtime y opcionalmente sha256)"""
+    st = Path(path).stat()
+    sig = {"size": st.st_size, "mtimeNs": st.st_mtime_ns}
+    if checksum:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                h.update(chunk)
+        sig["sha256"] = h.hexdigest()
+    return sig
+
+
+def same_signature(recorded: dict | None, current: dict) -> bool:
+    """Compara sha256 si las dos firmas lo tienen; si no, tamaño + mtime"""
+    if not recorded:
+        return False
+    if "sha256" in current and "sha256" in recorded:
+        return recorded.get("sha256") == current["sha256"]
+    return recorded.get("size") == current["size"] and recorded.get("mtimeNs") == current["mtimeNs"]
+
+
+def day_stats(bid: np.ndarray, ask: np.ndarray) -> dict:
+    """Estadísticas por día que se guardan en la entrada del índice"""
+    return {
+        "ticks": int(len(bid)),
+        "minBid": round(float(np.min(bid)), STAT_DECIMALS),
+        "maxBid": round(float(np.max(bid)), STAT_DECIMALS),
+        "meanSpread": round(float(np.mean(ask - bid)), STAT_DECIMALS),
+    }
+
+
+def iter_members_text(path: Path, chunk_size: int = READ_CHUNK):
+    """
+    Descomprime un gzip (multi-miembro o no) en streaming
+
+    Yields:
+        (member, offset, length, text): length es None mientras el miembro
+        no ha terminado; el último trozo de cada miembro lleva su longitud
+    """
+    with open(path, "rb") as f:
+        member = 0
+        offset = 0       # offset comprimido del miembro actual
+        consumed = 0     # bytes comprimidos entregados al miembro actual
+        d = zlib.decompressobj(wbits=31)
+        data = f.read(chunk_size)
+        while data:
+            text = d.decompress(data)
+            if d.eof:
+                used = len(data) - len(d.unused_data)
+                consumed += used
+                yield member, offset, consumed, text + d.flush()
+                data = d.unused_data
+                offset += consumed
+                consumed = 0
+                member += 1
+                d = zlib.decompressobj(wbits=31)
+                if not data:
+                    data = f.read(chunk_size)
+                continue
+            consumed += len(data)
+            if text:
+                yield member, offset, None, text
+            data = f.read(chunk_size)
+
+
+class _DayScan:
+    """Acumulador de un día mientras se recorre el shard"""
+
+    def __init__(self, date: str, start_line: int):
+        self.date = date
+        self.start_line = start_line
+        self.end_line = start_line
+        self.first_ts: bytes | None = None
+        self.last_ts: bytes | None = None
+        self.ticks = 0
+        self.min_bid = np.inf
+        self.max_bid = -np.inf
+        self.spread_sum = 0.0
+        self.members: list[int] = []
+
+    def add(self, text: bytes, member: int):
+        if not self.members or self.members[-1] != member:
+            self.members.append(member)
+        block = parse_tick_block(text)
+        if not len(block):
+            return
+        if self.first_ts is None:
+            self.first_ts = block.timestamps[0]
+        self.last_ts = block.timestamps[-1]
+        self.ticks += len(block)
+        self.min_bid = min(self.min_bid, float(block.bid.min()))
+        self.max_bid = max(self.max_bid, float(block.bid.max()))
+        self.spread_sum += float(np.sum(block.ask - block.bid))
+
+    def entry(self, filename: str) -> dict:
+        return {
+            "date": self.date,
+            "file": filename,
+            "startLine": self.start_line,
+            "endLine": self.end_line,
+            "firstTimestamp": iso_z(self.first_ts.decode()),
+            "lastTimestamp": iso_z(self.last_ts.decode()),
+            "ticks": self.ticks,
+            "minBid": round(self.min_bid, STAT_DECIMALS),
+            "maxBid": round(self.max_bid, STAT_DECIMALS),
+            "meanSpread": round(self.spread_sum / self.ticks, STAT_DECIMALS),
+        }
+
+
+def _date_prefixes(lines: list[bytes]) -> np.ndarray:
+    """Primeros 10 bytes de cada línea si parecen YYYY-MM-DD, b'' si no"""
+    arr = np.array(lines, dtype="S12") if lines else np.empty(0, dtype="S12")
+    raw = arr.view(np.uint8).reshape(len(arr), 12)
+    is_date = (raw[:, 4] == ord("-")) & (raw[:, 7] == ord("-"))
+    return np.where(is_date, arr.astype("S10"), b"")
+
+
+class _ShardScanner:
+    """Recorre las líneas de un shard manteniendo la numeración del generador TS"""
+
+    def __init__(self):
+        self.days: list[_DayScan] = []
+        self.current: _DayScan | None = None
+        self.line_no = 0
+
+    def _starts_day(self, line: bytes, date: bytes) -> bool:
+        return (
+            date != b""
+            and (self.current is None or date.decode() != self.current.date)
+            and len(parse_tick_block(line)) > 0
+        )
+
+    def _open_day(self, date: bytes):
+        if self.current is not None:
+            self.current.end_line = self.line_no - 1
+        self.current = _DayScan(date.decode(), self.line_no)
+        self.days.append(self.current)
+
+    def feed(self, lines: list[bytes], member: int):
+        """Procesa líneas completas que terminan en el miembro indicado"""
+        dates = _date_prefixes(lines)
+        # Candidatos a cambio de día: líneas con fecha distinta de la anterior con fecha
+        dated = np.flatnonzero(dates != b"")
+        prev = np.concatenate(([self.current.date.encode() if self.current else b""], dates[dated][:-1]))
+        candidates = dated[dates[dated] != prev].tolist()
+
+        seg_start = 0
+        for i in candidates:
+            if not self._starts_day(lines[i], dates[i]):
+                # Caso raro (primer tick del día inválido): línea a línea
+                return self._feed_slow(lines[seg_start:], dates[seg_start:], member)
+            self._add_segment(lines[seg_start:i], member)
+            self.line_no += i - seg_start
+            self._open_day(dates[i])
+            seg_start = i
+        self._add_segment(lines[seg_start:], member)
+        self.line_no += len(lines) - seg_start
+
+    def _feed_slow(self, lines: list[bytes], dates: np.ndarray, member: int):
+        seg_start = 0
+        for i, (line, date) in enumerate(zip(lines, dates)):
+            if self._starts_day(line, date):
+                self._add_segment(lines[seg_start:i], member)
+                self.line_no += i - seg_start
+                self._open_day(date)
+                seg_start = i
+        self._add_segment(lines[seg_start:], member)
+        self.line_no += len(lines) - seg_start
+
+    def _add_segment(self, lines: list[bytes], member: int):
+        if lines and self.current is not None:
+            self.current.add(b"\n".join(lines), member)
+
+    def finish(self):
+        if self.current is not None:
+            self.current.end_line = self.line_no - 1
+
+
+def scan_shard(path: Path) -> list[dict]:
+    """
+    Recorre un shard y devuelve sus entradas por día (con stats y, si es
+    posible, byteOffset/byteLength)
+    """
+    path = Path(path)
+    scanner = _ShardScanner()
+    member_span: dict[int, tuple[int, int]] = {}
+    split_members: set[int] = set()  # miembros con una línea partida entre dos
+    rest = b""
+
+    for member, offset, length, text in iter_members_text(path):
+        lines = (rest + text).split(b"\n")
+        rest = lines.pop()
+        if length is not None:
+            member_span[member] = (offset, length)
+            if rest:
+                split_members.update((member, member + 1))
+        if lines:
+            scanner.feed(lines, member)
+    if rest:
+        scanner.feed([rest], max(member_span, default=0))
+    scanner.finish()
+
+    members_days: dict[int, set] = {}
+    for day in scanner.days:
+        for m in day.members:
+            members_days.setdefault(m, set()).add(day.date)
+
+    entries = []
+    for day in scanner.days:
+        if not day.ticks:
+            continue
+        entry = day.entry(path.name)
+        members = day.members
+        own_members = all(
+            m in member_span and m not in split_members and members_days[m] == {day.date}
+            for m in members
+        )
+        if own_members and members == list(range(members[0], members[-1] + 1)):
+            first_offset = member_span[members[0]][0]
+            last_offset, last_length = member_span[members[-1]]
+            entry["byteOffset"] = first_offset
+            entry["byteLength"] = last_offset + last_length - first_offset
+        entries.append(entry)
+    return entries
+
+
+def scan_shard_job(args: tuple) -> tuple[str, list[dict], dict]:
+    """Trabajo de un worker: (path, checksum) -> (nombre, entradas, firma)"""
+    path, checksum = args
+    path = Path(path)
+    return path.name, scan_shard(path), file_signature(path, checksum)
+
+
+def plan_index_update(files: list[Path], index: dict, checksum: bool = False) -> tuple[list[Path], list[Path]]:
+    """
+    Separa los shards en (a_escanear, sin_cambios) comparando firmas
+
+    Un shard se reescanea si su firma no coincide con la registrada o si
+    alguna de sus entradas no tiene estadísticas. Con checksum solo se
+    calcula el sha256 de los shards que ya lo tienen registrado; los demás
+    se comparan por tamaño + mtime.
+    """
+    recorded = index.get("files", {})
+    entries_by_file: dict[str, list[dict]] = {}
+    for entry in index.get("days", []):
+        entries_by_file.setdefault(entry["file"], []).append(entry)
+
+    changed, unchanged = [], []
+    for path in files:
+        entries = entries_by_file.get(path.name, [])
+        signature = recorded.get(path.name) or {}
+        current = file_signature(path, checksum and "sha256" in signature)
+        if (same_signature(signature, current) and entries
+                and all("ticks" in e for e in entries)):
+            unchanged.append(path)
+        else:
+            changed.append(path)
+    return changed, unchanged
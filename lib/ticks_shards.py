@@ -0,0 +1,210 @@
+"""
+Shards de ticks .csv.gz con acceso aleatorio por día
+====================================================
+
+Los ficheros anuales (XAUUSD_YYYY.csv.gz) se escriben como gzip multi-miembro:
+un miembro con la cabecera y uno (o varios) por día. Cada miembro se puede
+descomprimir por separado, así que data/ticks-index.json guarda, además de
+startLine/endLine, el rango de bytes comprimidos del día:
+
+    {
+      "date": "2024-06-03",
+      "file": "XAUUSD_2024.csv.gz",
+      "startLine": 15922,
+      "endLine": 190514,
+      "byteOffset": 48213,
+      "byteLength": 1734410,
+      ...
+    }
+
+Leer un día es un seek + descomprimir byteLength bytes: O(tamaño del día) en
+lugar de descomprimir el año desde el principio. Para gzip/zlib (Node y Python)
+el fichero sigue siendo un .csv.gz normal, así que los lectores existentes no
+cambian.
+"""
+
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+TICKS_DIR = Path(__file__).resolve().parent.parent / "data" / "ticks"
+INDEX_PATH = Path(__file__).resolve().parent.parent / "data" / "ticks-index.json"
+CSV_HEADER = "timestamp,bid,ask,spread\n"
+MAX_MEMBER_LINES = 250_000  # Días muy activos se parten en varios miembros
+COMPRESS_LEVEL = 6
+
+
+def iso_z(timestamp: str) -> str:
+    """Normaliza un timestamp del CSV al formato del índice (ms + Z)"""
+    ts = timestamp.rstrip("Z")
+    dt = datetime.fromisoformat(ts).replace(tzinfo=timezone.utc)
+    return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class ShardWriter:
+    """
+    Escribe un shard anual como gzip multi-miembro
+
+    Uso:
+        with ShardWriter(path) as writer:
+            entry = writer.write_day("2024-06-03", lines)
+    """
+
+    def __init__(self, path: Path, header: str = CSV_HEADER):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._fh = open(self.tmp_path, "wb")
+        self.line = 0
+        self.entries: list[dict] = []
+        if header:
+            self._write_member(header.encode("utf-8"))
+            self.line = 1
+
+    def _write_member(self, data: bytes) -> tuple[int, int]:
+        offset = self._fh.tell()
+        self._fh.write(gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0))
+        return offset, self._fh.tell() - offset
+
+    def copy_member(self, entry: dict, raw: bytes) -> dict:
+        """Copia los bytes comprimidos de un día ya existente sin recomprimir"""
+        offset = self._fh.tell()
+        self._fh.write(raw)
+        n_lines = entry["endLine"] - entry["startLine"] + 1
+        new_entry = {
+            **entry,
+            "file": self.path.name,
+            "startLine": self.line,
+            "endLine": self.line + n_lines - 1,
+            "byteOffset": offset,
+            "byteLength": len(raw),
+        }
+        self.line += n_lines
+        self.entries.append(new_entry)
+        return new_entry
+
+    def write_day(self, date: str, lines: list[str], first_ts: str | None = None,
+                  last_ts: str | None = None, **stats) -> dict:
+        """
+        Escribe las líneas de un día (sin salto final) como miembro(s) gzip
+
+        Returns:
+            Entrada del índice con startLine/endLine y byteOffset/byteLength
+        """
+        if not lines:
+            raise ValueError(f"Día {date} sin líneas")
+
+        offset = self._fh.tell()
+        for i in range(0, len(lines), MAX_MEMBER_LINES):
+            chunk = lines[i:i + MAX_MEMBER_LINES]
+            self._write_member(("\n".join(chunk) + "\n").encode("utf-8"))
+
+        entry = {
+            "date": date,
+            "file": self.path.name,
+            "startLine": self.line,
+            "endLine": self.line + len(lines) - 1,
+            "firstTimestamp": iso_z(first_ts or lines[0].split(",", 1)[0]),
+            "lastTimestamp": iso_z(last_ts or lines[-1].split(",", 1)[0]),
+            "byteOffset": offset,
+            "byteLength": self._fh.tell() - offset,
+            **stats,
+        }
+        self.line += len(lines)
+        self.entries.append(entry)
+        return entry
+
+    def close(self):
+        """Cierra y publica el shard de forma atómica"""
+        if not self._fh.closed:
+            self._fh.close()
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if not self._fh.closed:
+            self._fh.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def read_member_bytes(path: Path, entry: dict) -> bytes:
+    """Bytes comprimidos de un día (uno o varios miembros gzip)"""
+    with open(path, "rb") as f:
+        f.seek(entry["byteOffset"])
+        return f.read(entry["byteLength"])
+
+
+def decompress_members(raw: bytes) -> bytes:
+    """Descomprime una secuencia de miembros gzip concatenados"""
+    out = []
+    while raw:
+        d = zlib.decompressobj(wbits=31)
+        out.append(d.decompress(raw))
+        raw = d.unused_data
+    return b"".join(out)
+
+
+def read_day_text(entry: dict, ticks_dir: Path = TICKS_DIR) -> str:
+    """
+    Texto CSV (sin cabecera) de un día del índice
+
+    Con byteOffset: seek + descompresión del día. Sin él (índice antiguo):
+    se recorre el fichero hasta endLine.
+    """
+    path = Path(ticks_dir) / entry["file"]
+    if "byteOffset" in entry:
+        return decompress_members(read_member_bytes(path, entry)).decode("utf-8", errors="ignore")
+
+    lines = []
+    with gzip.open(path, "rt", encoding="utf-8", errors="ignore") as f:
+        for n, line in enumerate(f):
+            if n > entry["endLine"]:
+                break
+            if n >= entry["startLine"]:
+                lines.append(line)
+    return "".join(lines)
+
+
+def is_seekable_index(days: list[dict]) -> bool:
+    return bool(days) and all("byteOffset" in d for d in days)
+
+
+# ==================== ÍNDICE ====================
+
+
+def load_index(path: Path = INDEX_PATH) -> dict:
+    if not Path(path).exists():
+        return {"days": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_index(days: list[dict], path: Path = INDEX_PATH, **extra) -> dict:
+    """Escribe ticks-index.json (mismo formato que lib/generate-ticks-index.ts)"""
+    days = sorted(days, key=lambda d: (d["date"], d["file"], d["startLine"]))
+    index = {
+        "generated": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        "totalDays": len(days),
+        **extra,
+        "days": days,
+    }
+    tmp = Path(path).with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, path)
+    return index
+
+
+def replace_file_entries(days: list[dict], filename: str, entries: list[dict]) -> list[dict]:
+    """Sustituye las entradas de un fichero por las nuevas"""
+    return [d for d in days if d["file"] != filename] + list(entries)
@@ -0,0 +1,439 @@
+"""
+Esquema compacto de ticks en SQLite
+===================================
+
+Alternativa a la tabla TickData de Prisma (timestamp ISO en texto, bid/ask/
+spread REAL, rowid + dos índices secundarios):
+
+    TickSymbol(id INTEGER PRIMARY KEY, name TEXT UNIQUE, priceScale INTEGER)
+
+    TickDataCompact(
+        symbolId INTEGER,   -- TickSymbol.id
+        ts       INTEGER,   -- epoch ms UTC
+        seq      INTEGER,   -- orden de llegada dentro del mismo ms
+        bid      INTEGER,   -- precio * priceScale
+        ask      INTEGER,
+        PRIMARY KEY (symbolId, ts, seq)
+    ) WITHOUT ROWID
+
+La tabla es el propio B-tree de la clave primaria, así que la ventana de una
+señal (symbolId, ts BETWEEN a AND b) es un único recorrido por hojas
+contiguas, sin saltar de un índice a la tabla. El spread no se guarda: lo
+calcula la vista TickDataCompactView con la misma fórmula que el CSV
+((ask - bid) * 100).
+"""
+
+import itertools
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+
+from lib.ticks_store import (
+    MS_PER_DAY,
+    PRICE_DTYPE,
+    PRICE_SCALE,
+    TS_DTYPE,
+    DayTicks,
+    day_key,
+    day_start_ms,
+    empty_ticks,
+)
+
+TICKDATA_TABLE = "TickData"
+COMPACT_TABLE = "TickDataCompact"
+SYMBOL_TABLE = "TickSymbol"
+COMPACT_VIEW = "TickDataCompactView"
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {SYMBOL_TABLE} (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    priceScale INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS {COMPACT_TABLE} (
+    symbolId INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    bid INTEGER NOT NULL,
+    ask INTEGER NOT NULL,
+    PRIMARY KEY (symbolId, ts, seq)
+) WITHOUT ROWID;
+
+CREATE VIEW IF NOT EXISTS {COMPACT_VIEW} AS
+SELECT
+    s.name AS symbol,
+    t.ts AS ts,
+    t.bid * 1.0 / s.priceScale AS bid,
+    t.ask * 1.0 / s.priceScale AS ask,
+    (t.ask - t.bid) * 100.0 / s.priceScale AS spread
+FROM {COMPACT_TABLE} t
+JOIN {SYMBOL_TABLE} s ON s.id = t.symbolId;
+"""
+
+INSERT_TICKDATA_SQL = f"INSERT INTO {TICKDATA_TABLE} (symbol, timestamp, bid, ask, spread) VALUES (?, ?, ?, ?, ?)"
+INSERT_COMPACT_SQL = f"INSERT INTO {COMPACT_TABLE} (symbolId, ts, seq, bid, ask) VALUES (?, ?, ?, ?, ?)"
+# Para filas cuyo ms ya existe en la tabla: siguiente seq libre
+INSERT_NEXT_SEQ_SQL = f"""
+INSERT INTO {COMPACT_TABLE} (symbolId, ts, seq, bid, ask)
+VALUES (?1, ?2, (SELECT COALESCE(MAX(seq) + 1, 0) FROM {COMPACT_TABLE} WHERE symbolId = ?1 AND ts = ?2), ?3, ?4)
+"""
+
+
+def create_compact_schema(conn: sqlite3.Connection):
+    conn.executescript(SCHEMA_SQL)
+
+
+def get_symbol_id(conn: sqlite3.Connection, symbol: str, price_scale: int = PRICE_SCALE) -> int:
+    """Id del símbolo (lo crea si no existe)"""
+    row = conn.execute(f"SELECT id, priceScale FROM {SYMBOL_TABLE} WHERE name = ?", (symbol,)).fetchone()
+    if row:
+        if row[1] != price_scale:
+            raise ValueError(f"{symbol} ya existe con priceScale={row[1]} (pedido {price_scale})")
+        return row[0]
+    cur = conn.execute(f"INSERT INTO {SYMBOL_TABLE} (name, priceScale) VALUES (?, ?)", (symbol, price_scale))
+    return cur.lastrowid
+
+
+def symbol_scale(conn: sqlite3.Connection, symbol: str) -> tuple[int, int] | None:
+    row = conn.execute(f"SELECT id, priceScale FROM {SYMBOL_TABLE} WHERE name = ?", (symbol,)).fetchone()
+    return (row[0], row[1]) if row else None
+
+
+# ==================== CONVERSIONES ====================
+
+
+def parse_timestamps_ms(values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Timestamps de TickData (texto ISO en sus variantes o epoch ms) a int64
+
+    Returns:
+        (ms, valid): valid marca las filas que se han podido interpretar
+    """
+    n = len(values)
+    ms = np.zeros(n, dtype=np.int64)
+    valid = np.ones(n, dtype=bool)
+    if n == 0:
+        return ms, valid
+
+    if all(isinstance(v, str) for v in values):
+        text = np.array(values, dtype=str)
+        text = np.char.replace(np.char.replace(np.char.strip(text), " ", "T"), "+00:00", "")
+        text = np.char.rstrip(text, "Z")
+        try:
+            return text.astype("datetime64[ms]").astype(np.int64), valid
+        except ValueError:
+            pass  # alguna fila rara: se interpreta una a una
+
+    for i, v in enumerate(values):
+        try:
+            if isinstance(v, (int, float)):
+                ms[i] = int(v)
+            else:
+                dt = datetime.fromisoformat(str(v).strip().replace(" ", "T").replace("Z", "+00:00"))
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=timezone.utc)
+                ms[i] = round(dt.timestamp() * 1000)
+        except (TypeError, ValueError):
+            valid[i] = False
+    return ms, valid
+
+
+def scale_prices_exact(values: np.ndarray, price_scale: int = PRICE_SCALE) -> tuple[np.ndarray, int]:
+    """
+    Precios float -> enteros escalados
+
+    Returns:
+        (enteros, inexactos): inexactos cuenta los precios que no caben en la
+        escala sin redondeo (más decimales que priceScale)
+    """
+    scaled = np.asarray(values, dtype=np.float64) * price_scale
+    ints = np.rint(scaled).astype(np.int64)
+    inexact = int(np.count_nonzero(np.abs(scaled - ints) > 1e-6))
+    return ints, inexact
+
+
+def sequence_numbers(ts: np.ndarray, prev_ts: int | None = None, prev_seq: int = -1) -> np.ndarray:
+    """
+    seq de cada tick: 0, 1, 2... dentro de cada ms (ts ordenado)
+
+    prev_ts/prev_seq es el último tick ya insertado, para continuar la
+    numeración cuando un mismo ms queda partido entre dos lotes.
+    """
+    n = len(ts)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.arange(n, dtype=np.int64)
+    new_run = np.ones(n, dtype=bool)
+    new_run[1:] = ts[1:] != ts[:-1]
+    run_start = np.maximum.accumulate(np.where(new_run, idx, 0))
+    seq = idx - run_start
+    if prev_ts is not None and ts[0] == prev_ts:
+        seq[run_start == 0] += prev_seq + 1
+    return seq
+
+
+def insert_compact_batch(conn: sqlite3.Connection, symbol_id: int, ts: np.ndarray, seq: np.ndarray,
+                         bid: np.ndarray, ask: np.ndarray) -> int:
+    """
+    Inserta un lote ya numerado; si algún (ts, seq) choca con filas previas
+    (p.ej. el mismo ms en otro formato de texto) el lote se repite asignando
+    el siguiente seq libre de cada ms. No se pierde ninguna fila.
+    """
+    rows = zip(itertools.repeat(symbol_id), ts.tolist(), seq.tolist(), bid.tolist(), ask.tolist())
+    conn.execute("SAVEPOINT compact_batch")
+    try:
+        conn.executemany(INSERT_COMPACT_SQL, rows)
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO compact_batch")
+        conn.executemany(
+            INSERT_NEXT_SEQ_SQL,
+            zip(itertools.repeat(symbol_id), ts.tolist(), bid.tolist(), ask.tolist()),
+        )
+    conn.execute("RELEASE compact_batch")
+    return len(ts)
+
+
+# ==================== CARGA MASIVA ====================
+
+
+def unique_tick_order(ts: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> np.ndarray:
+    """
+    Índices de los ticks únicos por (ts, bid, ask), ordenados por ts
+
+    Dentro de un mismo ms se conserva el orden de llegada; de cada grupo de
+    duplicados exactos se queda el primero.
+    """
+    n = len(ts)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    by_key = np.lexsort((np.arange(n), ask, bid, ts))
+    dup = np.zeros(n, dtype=bool)
+    dup[1:] = (
+        (ts[by_key[1:]] == ts[by_key[:-1]])
+        & (bid[by_key[1:]] == bid[by_key[:-1]])
+        & (ask[by_key[1:]] == ask[by_key[:-1]])
+    )
+    keep = np.sort(by_key[~dup])
+    return keep[np.argsort(ts[keep], kind="stable")]
+
+
+class TickBulkLoader:
+    """
+    Carga masiva por días sin INSERT OR IGNORE
+
+    Al crearse lee una sola vez el rango [min, max] de ts que ya hay en la BD
+    para cada día. Cada día cargado se deduplica y ordena en memoria; si el
+    día ya tiene ticks, una sola consulta trae los (ts, bid, ask) de la BD
+    dentro del rango de los nuevos y solo se saltan los que ya están. El
+    resto (también los que rellenan huecos dentro del rango) se inserta en
+    orden de clave: ticks aceptados = inserted + duplicates + existing.
+
+    Destino: TickData (compact=False) o TickDataCompact (compact=True). Con
+    TickData los índices secundarios se pueden borrar durante la carga y
+    recrear al final (drop_indexes/rebuild_indexes); TickDataCompact no tiene
+    índices aparte, la propia tabla es el B-tree de la clave.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, symbol: str, compact: bool = False,
+                 price_scale: int = PRICE_SCALE):
+        self.conn = conn
+        self.symbol = symbol
+        self.compact = compact
+        self.price_scale = price_scale
+        if compact:
+            create_compact_schema(conn)
+            self.symbol_id = get_symbol_id(conn, symbol, price_scale)
+        self.ranges = self._existing_day_ranges()
+        self._pending: dict[str, tuple[int, int]] = {}
+        self._index_sql: list[str] = []
+
+    @property
+    def table(self) -> str:
+        return COMPACT_TABLE if self.compact else TICKDATA_TABLE
+
+    def _existing_day_ranges(self) -> dict[str, tuple[int, int]]:
+        """Rango de ts por día ya presente en la BD (un único recorrido)"""
+        if self.compact:
+            rows = self.conn.execute(
+                f"SELECT ts / {MS_PER_DAY}, MIN(ts), MAX(ts) FROM {COMPACT_TABLE} "
+                "WHERE symbolId = ? GROUP BY 1",
+                (self.symbol_id,),
+            ).fetchall()
+            return {day_key(day * MS_PER_DAY): (lo, hi) for day, lo, hi in rows}
+
+        rows = self.conn.execute(
+            f"SELECT substr(timestamp, 1, 10), MIN(timestamp), MAX(timestamp) FROM {TICKDATA_TABLE} "
+            "WHERE symbol = ? GROUP BY 1",
+            (self.symbol,),
+        ).fetchall()
+        if not rows:
+            return {}
+        lo, lo_valid = parse_timestamps_ms([r[1] for r in rows])
+        hi, hi_valid = parse_timestamps_ms([r[2] for r in rows])
+        return {
+            r[0]: (int(lo[i]), int(hi[i]))
+            for i, r in enumerate(rows)
+            if lo_valid[i] and hi_valid[i]
+        }
+
+    def drop_indexes(self):
+        """Borra los índices secundarios de la tabla destino (se guardan para recrearlos)"""
+        rows = self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (self.table,),
+        ).fetchall()
+        for name, sql in rows:
+            self.conn.execute(f'DROP INDEX "{name}"')
+            self._index_sql.append(sql)
+        self.conn.commit()
+        return [name for name, _ in rows]
+
+    def rebuild_indexes(self):
+        for sql in self._index_sql:
+            self.conn.execute(sql)
+        self.conn.commit()
+        self._index_sql = []
+
+    def _existing_keys(self, date: str, lo: int, hi: int) -> tuple[set, dict[int, int]]:
+        """
+        Ticks de la BD con ts en [lo, hi] del día (una consulta)
+
+        Returns:
+            (claves, max_seq): claves son los (ts, bid, ask) ya cargados (bid/ask
+            en la unidad de la tabla) y max_seq el mayor seq de cada ms
+            (solo TickDataCompact)
+        """
+        if self.compact:
+            rows = self.conn.execute(
+                f"SELECT ts, seq, bid, ask FROM {COMPACT_TABLE} WHERE symbolId = ? AND ts BETWEEN ? AND ?",
+                (self.symbol_id, lo, hi),
+            ).fetchall()
+            max_seq: dict[int, int] = {}
+            for ts, seq, _, _ in rows:
+                max_seq[ts] = max(seq, max_seq.get(ts, -1))
+            return {(ts, bid, ask) for ts, _, bid, ask in rows}, max_seq
+
+        # El texto ISO de TickData ordena como la fecha: el día es un rango del índice
+        rows = self.conn.execute(
+            f"SELECT timestamp, bid, ask FROM {TICKDATA_TABLE} "
+            "WHERE symbol = ? AND timestamp >= ? AND timestamp < ?",
+            (self.symbol, date, day_key(day_start_ms(date) + MS_PER_DAY)),
+        ).fetchall()
+        if not rows:
+            return set(), {}
+        ms, valid = parse_timestamps_ms([r[0] for r in rows])
+        return {
+            (int(ms[i]), r[1], r[2])
+            for i, r in enumerate(rows)
+            if valid[i] and lo <= ms[i] <= hi
+        }, {}
+
+    def load_day(self, date: str, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray,
+                 spread: np.ndarray, ts_text: np.ndarray) -> tuple[int, int, int]:
+        """
+        Inserta los ticks nuevos de un día (sin commit)
+
+        Returns:
+            (inserted, duplicates, existing): duplicates son los duplicados
+            exactos dentro del propio día; existing, los que ya estaban en la
+            BD con el mismo (ts, bid, ask)
+        """
+        keep = unique_tick_order(ts, bid, ask)
+        duplicates = len(ts) - len(keep)
+        if len(keep) == 0:
+            return 0, duplicates, 0
+
+        ts = ts[keep]
+        bid, ask, spread, ts_text = bid[keep], ask[keep], spread[keep], ts_text[keep]
+        if self.compact:
+            bid, _ = scale_prices_exact(bid, self.price_scale)
+            ask, _ = scale_prices_exact(ask, self.price_scale)
+
+        existing_range = self._pending.get(date) or self.ranges.get(date)
+        max_seq: dict[int, int] = {}
+        existing = 0
+        if existing_range is not None:
+            keys, max_seq = self._existing_keys(date, int(ts[0]), int(ts[-1]))
+            if keys:
+                new = np.fromiter(
+                    (key not in keys for key in zip(ts.tolist(), bid.tolist(), ask.tolist())),
+                    dtype=bool, count=len(ts),
+                )
+                existing = int(len(ts) - np.count_nonzero(new))
+                ts, bid, ask, spread, ts_text = ts[new], bid[new], ask[new], spread[new], ts_text[new]
+        if len(ts) == 0:
+            return 0, duplicates, existing
+
+        if self.compact:
+            seq = sequence_numbers(ts)
+            if max_seq:
+                # Un ms que ya está en la BD sigue su numeración
+                seq += np.fromiter((max_seq.get(t, -1) + 1 for t in ts.tolist()), dtype=np.int64, count=len(ts))
+            rows = zip(itertools.repeat(self.symbol_id), ts.tolist(), seq.tolist(), bid.tolist(), ask.tolist())
+            self.conn.executemany(INSERT_COMPACT_SQL, rows)
+        else:
+            rows = zip(
+                itertools.repeat(self.symbol), np.char.decode(ts_text, "ascii").tolist(),
+                bid.tolist(), ask.tolist(), spread.tolist(),
+            )
+            self.conn.executemany(INSERT_TICKDATA_SQL, rows)
+
+        lo, hi = int(ts[0]), int(ts[-1])
+        if existing_range is not None:
+            lo, hi = min(lo, existing_range[0]), max(hi, existing_range[1])
+        self._pending[date] = (lo, hi)
+        return len(ts), duplicates, existing
+
+    def commit(self):
+        self.conn.commit()
+        self.ranges.update(self._pending)
+        self._pending = {}
+
+    def rollback(self):
+        self.conn.rollback()
+        self._pending = {}
+
+
+# ==================== LECTURA ====================
+
+
+def load_window(conn: sqlite3.Connection, symbol: str, start_ms: int, end_ms: int) -> DayTicks:
+    """
+    Ticks en [start_ms, end_ms] como DayTicks (un único range scan de la PK)
+
+    Misma semántica que TickStore.window(), para poder usar una u otra fuente.
+    """
+    found = symbol_scale(conn, symbol)
+    if found is None:
+        raise KeyError(f"Símbolo {symbol} no está en {SYMBOL_TABLE}")
+    symbol_id, price_scale = found
+
+    rows = conn.execute(
+        f"SELECT ts, bid, ask FROM {COMPACT_TABLE} "
+        "WHERE symbolId = ? AND ts BETWEEN ? AND ? ORDER BY ts, seq",
+        (symbol_id, start_ms, end_ms),
+    ).fetchall()
+    if not rows:
+        return empty_ticks(price_scale)
+    data = np.array(rows, dtype=np.int64)
+    return DayTicks(
+        ts=data[:, 0].astype(TS_DTYPE),
+        bid=data[:, 1].astype(PRICE_DTYPE),
+        ask=data[:, 2].astype(PRICE_DTYPE),
+        price_scale=price_scale,
+    )
+
+
+def table_size_bytes(conn: sqlite3.Connection, name: str) -> int | None:
+    """Bytes ocupados por una tabla y sus índices (None si no hay dbstat)"""
+    try:
+        row = conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = ?1 "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?1)",
+            (name,),
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0]
@@ -0,0 +1,418 @@
+"""
+Tick store columnar binario (memory-mapped)
+===========================================
+
+Sustituye a los CSV anuales comprimidos (data/ticks/XAUUSD_YYYY.csv.gz) por
+un conjunto de ficheros por día con columnas de ancho fijo:
+
+    data/ticks-store/
+        index.json                  # equivalente a data/ticks-index.json
+        XAUUSD/2024-06-03/ts.npy    # int64, epoch en milisegundos (UTC)
+        XAUUSD/2024-06-03/bid.npy   # int32, precio * priceScale
+        XAUUSD/2024-06-03/ask.npy   # int32, precio * priceScale
+
+Los .npy se abren con mmap (np.load(..., mmap_mode="r")), así que leer la
+ventana de una señal solo toca las páginas de ese rango y devuelve vistas
+numpy sin copiar.
+
+Con codec="delta" cada día se guarda en un único ticks.tkd (deltas enteros,
+lib/ticks_codec.py): ocupa bastante menos a cambio de decodificar el día
+entero al leerlo. Los dos formatos pueden convivir en el mismo store.
+
+Niveles diezmados (APROXIMADOS): al escribir un día se guarda también, para
+1, 5 y 10 puntos, d<N>.npy con los índices de los ticks en los que el bid o
+el ask cambia de tramo de N puntos. window(start, end, level=N) devuelve
+solo esos ticks más el primero y el último de la ventana; los descartados
+están a menos de N puntos del último tick que se conserva. Un backtest con
+un nivel por debajo de su pipsDistance (decimation_level) cruza los mismos
+niveles del grid, pero NO es exacto: el motor cuenta cada tick más allá
+del TP y el trailing SL sigue cada nuevo máximo, así que trades, profit y
+drawdown cambian. Sirve para barridos rápidos, no para resultados finales.
+
+Uso:
+    store = TickStore()
+    day = store.load_day("2024-06-03")
+    window = store.window(start_ms, end_ms)
+    coarse = store.window(start_ms, end_ms, level=decimation_level(10))  # aproximado
+    bids = window.bid_prices()
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from lib import ticks_codec
+
+STORE_DIR = Path(__file__).resolve().parent.parent / "data" / "ticks-store"
+INDEX_FILE = "index.json"
+DEFAULT_SYMBOL = "XAUUSD"
+PRICE_SCALE = 1000  # 3 decimales: suficiente para XAUUSD (digits 2-3)
+MS_PER_DAY = 86_400_000
+
+TS_DTYPE = np.int64
+PRICE_DTYPE = np.int32
+COLUMNS = ("ts", "bid", "ask")
+CODECS = ("npy", "delta")
+DELTA_FILE = "ticks.tkd"
+
+POINT = 0.01  # punto de precio del XAUUSD (2 decimales)
+POINTS_PER_PIP = 10  # PIP_VALUE = 0.10 en el motor de backtest
+DECIMATION_LEVELS = (1, 5, 10)  # en puntos
+
+
+def to_epoch_ms(value: datetime) -> int:
+    """Convierte un datetime (naive = UTC) a epoch en milisegundos"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(round(value.timestamp() * 1000))
+
+
+def ms_to_iso(ms: int) -> str:
+    """Formatea epoch ms como ISO con Z (mismo formato que ticks-index.json)"""
+    dt = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def day_key(ms: int) -> str:
+    """Día UTC (YYYY-MM-DD) de un epoch ms"""
+    return datetime.fromtimestamp(ms // MS_PER_DAY * 86400, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def day_start_ms(date: str) -> int:
+    """Epoch ms de las 00:00 UTC de un día YYYY-MM-DD"""
+    return to_epoch_ms(datetime.strptime(date, "%Y-%m-%d"))
+
+
+def split_by_day(ts: np.ndarray):
+    """
+    Divide un array de timestamps ordenado en tramos por día UTC
+
+    Yields:
+        (date, start, end) con ts[start:end] perteneciente a date
+    """
+    if len(ts) == 0:
+        return
+    days = ts // MS_PER_DAY
+    cuts = np.flatnonzero(np.diff(days)) + 1
+    starts = np.concatenate(([0], cuts))
+    ends = np.concatenate((cuts, [len(ts)]))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield day_key(int(ts[start])), start, end
+
+
+def scale_prices(prices: np.ndarray, price_scale: int = PRICE_SCALE) -> np.ndarray:
+    """Convierte precios float a enteros escalados (redondeo al punto más cercano)"""
+    prices = np.asarray(prices)
+    if np.issubdtype(prices.dtype, np.integer):
+        return prices.astype(PRICE_DTYPE, copy=False)
+    return np.rint(prices * price_scale).astype(PRICE_DTYPE)
+
+
+def decimate(bid: np.ndarray, ask: np.ndarray, step: int) -> np.ndarray:
+    """
+    Índices de los ticks que se conservan al diezmar con tramos de step
+    (enteros escalados)
+
+    Se guarda el primer y el último tick y cada tick en el que bid // step o
+    ask // step cambia respecto al anterior. Entre dos ticks guardados el
+    precio no sale del tramo del primero.
+    """
+    if len(bid) == 0:
+        return np.empty(0, dtype=np.int64)
+    bid_step = np.asarray(bid) // step
+    ask_step = np.asarray(ask) // step
+    keep = np.empty(len(bid), dtype=bool)
+    keep[0] = True
+    keep[1:] = (bid_step[1:] != bid_step[:-1]) | (ask_step[1:] != ask_step[:-1])
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+
+def decimation_level(pips_distance: float, levels: tuple[int, ...] = DECIMATION_LEVELS) -> int:
+    """
+    Nivel diezmado más grueso cuya resolución queda por debajo de
+    pips_distance (0 = todos los ticks)
+    """
+    usable = [n for n in levels if n < pips_distance * POINTS_PER_PIP]
+    return max(usable, default=0)
+
+
+def level_step(level: int, price_scale: int = PRICE_SCALE) -> int:
+    """Tamaño del tramo de un nivel en enteros escalados"""
+    return max(1, round(level * POINT * price_scale))
+
+
+@dataclass
+class DayTicks:
+    """Columnas de ticks de uno o varios días (vistas mmap cuando es posible)"""
+
+    ts: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    price_scale: int = PRICE_SCALE
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def bid_prices(self) -> np.ndarray:
+        return self.bid / self.price_scale
+
+    def ask_prices(self) -> np.ndarray:
+        return self.ask / self.price_scale
+
+    def spread_prices(self) -> np.ndarray:
+        return (self.ask - self.bid) / self.price_scale
+
+    def bounds(self, start_ms: int, end_ms: int) -> tuple[int, int]:
+        """Posiciones [lo, hi) de los ticks en [start_ms, end_ms]"""
+        lo = int(np.searchsorted(self.ts, start_ms, side="left"))
+        hi = int(np.searchsorted(self.ts, end_ms, side="right"))
+        return lo, hi
+
+    def slice(self, start_ms: int, end_ms: int) -> "DayTicks":
+        """Sub-ventana [start_ms, end_ms] por búsqueda binaria (sin copiar)"""
+        lo, hi = self.bounds(start_ms, end_ms)
+        return DayTicks(self.ts[lo:hi], self.bid[lo:hi], self.ask[lo:hi], self.price_scale)
+
+    def decimated_slice(self, start_ms: int, end_ms: int, step: int,
+                        keep: np.ndarray | None = None) -> "DayTicks":
+        """
+        Sub-ventana [start_ms, end_ms] diezmada con tramos de step (copia)
+
+        Se quedan el primer y el último tick de la ventana y los que cambian
+        de tramo. keep son los índices ya diezmados del día entero (d<N>.npy):
+        como el criterio solo mira el tick anterior, el resultado es el mismo
+        que diezmar la ventana.
+        """
+        lo, hi = self.bounds(start_ms, end_ms)
+        if hi - lo <= 2:
+            return self.slice(start_ms, end_ms)
+        if keep is None:
+            take = lo + decimate(self.bid[lo:hi], self.ask[lo:hi], step)
+        else:
+            inner = keep[np.searchsorted(keep, lo, side="right"):np.searchsorted(keep, hi - 1, side="left")]
+            take = np.concatenate(([lo], inner, [hi - 1]))
+        return DayTicks(self.ts[take], self.bid[take], self.ask[take], self.price_scale)
+
+
+def empty_ticks(price_scale: int = PRICE_SCALE) -> DayTicks:
+    return DayTicks(
+        np.empty(0, TS_DTYPE), np.empty(0, PRICE_DTYPE), np.empty(0, PRICE_DTYPE), price_scale
+    )
+
+
+class TickStore:
+    """Store columnar por día con índice JSON"""
+
+    def __init__(self, root: Path = STORE_DIR, symbol: str = DEFAULT_SYMBOL,
+                 price_scale: int = PRICE_SCALE, codec: str = "npy",
+                 decimation: tuple[int, ...] = DECIMATION_LEVELS):
+        if codec not in CODECS:
+            raise ValueError(f"Codec desconocido: {codec} (válidos: {', '.join(CODECS)})")
+        self.root = Path(root)
+        self.symbol = symbol
+        self.price_scale = price_scale
+        self.codec = codec  # formato con el que se escriben los días
+        self.decimation = tuple(decimation)  # niveles diezmados que se generan al escribir
+        self._index: dict | None = None
+
+    # ==================== ÍNDICE ====================
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILE
+
+    def load_index(self) -> dict:
+        if self._index is None:
+            if self.index_path.exists():
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+                self.price_scale = self._index.get("priceScale", self.price_scale)
+            else:
+                self._index = {"symbol": self.symbol, "priceScale": self.price_scale, "days": []}
+        return self._index
+
+    def save_index(self):
+        days = sorted(self.load_index()["days"], key=lambda d: d["date"])
+        index = {
+            **self._index,
+            "generated": ms_to_iso(to_epoch_ms(datetime.now(timezone.utc))),
+            "symbol": self.symbol,
+            "priceScale": self.price_scale,
+            "totalDays": len(days),
+            "days": days,
+        }
+        self._index = index
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def day_entry(self, date: str) -> dict | None:
+        for entry in self.load_index()["days"]:
+            if entry["date"] == date:
+                return entry
+        return None
+
+    def _set_day_entry(self, entry: dict):
+        days = self.load_index()["days"]
+        for i, existing in enumerate(days):
+            if existing["date"] == entry["date"]:
+                days[i] = {**existing, **entry}
+                return
+        days.append(entry)
+
+    def rebuild_index(self) -> dict:
+        """Regenera index.json recorriendo los directorios de días"""
+        self._index = {"symbol": self.symbol, "priceScale": self.price_scale, "days": []}
+        symbol_dir = self.root / self.symbol
+        if symbol_dir.exists():
+            for day_dir in sorted(p for p in symbol_dir.iterdir() if p.is_dir()):
+                day = self.load_day(day_dir.name)
+                if len(day):
+                    entry = self._build_entry(day_dir.name, day.ts)
+                    levels = {int(p.stem[1:]): len(np.load(p, mmap_mode="r")) for p in day_dir.glob("d*.npy")}
+                    entry["decimated"] = {str(level): levels[level] for level in sorted(levels)}
+                    self._set_day_entry(entry)
+        self.save_index()
+        return self._index
+
+    def days(self) -> list[str]:
+        return [d["date"] for d in self.load_index()["days"]]
+
+    # ==================== ESCRITURA ====================
+
+    def day_dir(self, date: str) -> Path:
+        return self.root / self.symbol / date
+
+    def level_path(self, date: str, level: int) -> Path:
+        """Índices del nivel diezmado level dentro del día"""
+        return self.day_dir(date) / f"d{level}.npy"
+
+    def _write_levels(self, date: str, bid: np.ndarray, ask: np.ndarray) -> dict[str, int]:
+        """Escribe d<N>.npy de cada nivel de self.decimation y borra los de otros niveles"""
+        counts = {}
+        for level in self.decimation:
+            keep = decimate(bid, ask, level_step(level, self.price_scale)).astype(np.int32)
+            tmp = self.day_dir(date) / f"d{level}.tmp.npy"
+            np.save(tmp, keep)
+            os.replace(tmp, self.level_path(date, level))
+            counts[str(level)] = int(len(keep))
+        # Índices de otro nivel ya no apuntan a los ticks nuevos
+        for path in self.day_dir(date).glob("d*.npy"):
+            if path.stem[1:] not in counts:
+                path.unlink()
+        return counts
+
+    def _write_columns(self, day_dir: Path, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        day_dir.mkdir(parents=True, exist_ok=True)
+        if self.codec == "delta":
+            tmp = day_dir / f"{DELTA_FILE}.tmp"
+            tmp.write_bytes(ticks_codec.encode_ticks(ts, bid, ask, self.price_scale))
+            os.replace(tmp, day_dir / DELTA_FILE)
+            stale = [day_dir / f"{name}.npy" for name in COLUMNS]
+        else:
+            for name, values in zip(COLUMNS, (ts, bid, ask)):
+                tmp = day_dir / f"{name}.tmp.npy"
+                np.save(tmp, values)
+                os.replace(tmp, day_dir / f"{name}.npy")
+            stale = [day_dir / DELTA_FILE]
+        # El día queda en un solo formato
+        for path in stale:
+            path.unlink(missing_ok=True)
+
+    def _build_entry(self, date: str, ts: np.ndarray) -> dict:
+        return {
+            "date": date,
+            "file": f"{self.symbol}/{date}",
+            "ticks": int(len(ts)),
+            "firstTimestamp": ms_to_iso(int(ts[0])),
+            "lastTimestamp": ms_to_iso(int(ts[-1])),
+        }
+
+    def write_day(self, date: str, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray,
+                  save_index: bool = True) -> dict:
+        """
+        Escribe (o reemplaza) los ticks de un día
+
+        Args:
+            date: Día UTC YYYY-MM-DD
+            ts: Timestamps epoch ms ordenados
+            bid, ask: Precios float o enteros ya escalados
+
+        Returns:
+            Entrada del índice para ese día
+        """
+        ts = np.ascontiguousarray(ts, dtype=TS_DTYPE)
+        bid = scale_prices(bid, self.price_scale)
+        ask = scale_prices(ask, self.price_scale)
+        if len(ts) == 0:
+            raise ValueError(f"Día {date} sin ticks")
+
+        self._write_columns(self.day_dir(date), ts, bid, ask)
+        entry = self._build_entry(date, ts)
+        entry["decimated"] = self._write_levels(date, bid, ask)
+        self._set_day_entry(entry)
+        if save_index:
+            self.save_index()
+        return entry
+
+    # ==================== LECTURA ====================
+
+    def has_day(self, date: str) -> bool:
+        day_dir = self.day_dir(date)
+        return (day_dir / "ts.npy").exists() or (day_dir / DELTA_FILE).exists()
+
+    def load_day(self, date: str) -> DayTicks:
+        """Abre un día con mmap (vistas de solo lectura) o lo decodifica si es .tkd"""
+        day_dir = self.day_dir(date)
+        if not (day_dir / "ts.npy").exists():
+            if (day_dir / DELTA_FILE).exists():
+                ts, bid, ask = ticks_codec.decode_ticks((day_dir / DELTA_FILE).read_bytes())
+                return DayTicks(ts, bid, ask, self.price_scale)
+            return empty_ticks(self.price_scale)
+        cols = [np.load(day_dir / f"{name}.npy", mmap_mode="r") for name in COLUMNS]
+        return DayTicks(*cols, price_scale=self.price_scale)
+
+    def window(self, start_ms: int, end_ms: int, level: int = 0) -> DayTicks:
+        """
+        Ticks en [start_ms, end_ms]
+
+        Si la ventana cae en un solo día el resultado son vistas mmap (sin
+        copia); si cruza medianoche se concatenan los tramos de cada día.
+        Con level (puntos) devuelve el tramo diezmado de cada día, que es
+        APROXIMADO (ver el docstring del módulo): con d<level>.npy si el día
+        lo tiene y diezmando al vuelo si no.
+        """
+        self.load_index()
+        parts = []
+        day = start_ms // MS_PER_DAY * MS_PER_DAY
+        while day <= end_ms:
+            date = day_key(day)
+            if self.has_day(date):
+                if level:
+                    path = self.level_path(date, level)
+                    keep = np.load(path, mmap_mode="r") if path.exists() else None
+                    part = self.load_day(date).decimated_slice(
+                        start_ms, end_ms, level_step(level, self.price_scale), keep)
+                else:
+                    part = self.load_day(date).slice(start_ms, end_ms)
+                if len(part):
+                    parts.append(part)
+            day += MS_PER_DAY
+
+        if not parts:
+            return empty_ticks(self.price_scale)
+        if len(parts) == 1:
+            return parts[0]
+        return DayTicks(
+            np.concatenate([p.ts for p in parts]),
+            np.concatenate([p.bid for p in parts]),
+            np.concatenate([p.ask for p in parts]),
+            self.price_scale,
+        )
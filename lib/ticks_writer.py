@@ -0,0 +1,310 @@
+"""
+Escritura en streaming de ticks a los shards anuales
+====================================================
+
+Recibe los ticks por trozos (p.ej. cada semana de copy_ticks_range de MT5)
+y los añade directamente al shard del año como bloques gzip por día, sin
+acumular el periodo completo en memoria:
+
+    with StreamingShardWriter(OUTPUT_DIR, "XAUUSDSTDc") as writer:
+        for ticks in chunks:
+            writer.write_chunk(ticks["time_msc"], ticks["bid"], ticks["ask"])
+
+La memoria máxima es O(un trozo + el día en curso). El formato de las líneas
+es el mismo que escribía pandas (timestamp ISO sin ceros finales, precios con
+5 decimales) pero generado con operaciones vectorizadas de numpy.
+
+StreamingStoreWriter tiene la misma interfaz pero escribe las columnas
+directamente en el tick store binario, sin generar texto:
+
+    with StreamingStoreWriter(TickStore()) as writer:
+        for ticks in chunks:
+            writer.write_chunk(ticks["time_msc"], ticks["bid"], ticks["ask"])
+"""
+
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from lib.ticks_candles import CandleStore
+from lib.ticks_index import day_stats, file_signature
+from lib.ticks_shards import (
+    INDEX_PATH,
+    ShardWriter,
+    is_seekable_index,
+    load_index,
+    read_member_bytes,
+    replace_file_entries,
+    save_index,
+)
+from lib.ticks_store import TickStore, ms_to_iso, split_by_day
+
+PRICE_DECIMALS = 5
+
+
+def format_timestamps(ts_ms: np.ndarray) -> np.ndarray:
+    """epoch ms -> 'YYYY-MM-DDTHH:MM:SS.fff' sin ceros finales (como strftime + rstrip)"""
+    iso = np.datetime_as_string(np.asarray(ts_ms, dtype="datetime64[ms]"), unit="ms")
+    return np.char.rstrip(np.char.rstrip(iso, "0"), ".")
+
+
+def format_prices(values: np.ndarray, decimals: int = PRICE_DECIMALS) -> np.ndarray:
+    """Equivalente vectorizado de '%.5f' (aritmética entera, sin objetos por fila)"""
+    factor = 10 ** decimals
+    scaled = np.rint(np.abs(values) * factor).astype(np.int64)
+    integer = (scaled // factor).astype(str)
+    fraction = np.char.zfill((scaled % factor).astype(str), decimals)
+    text = np.char.add(np.char.add(integer, "."), fraction)
+    negative = (values < 0) & (scaled > 0)
+    if negative.any():
+        text = np.where(negative, np.char.add("-", text), text)
+    return text
+
+
+def format_tick_lines(ts_ms: np.ndarray, bid: np.ndarray, ask: np.ndarray) -> list[str]:
+    """Líneas CSV 'timestamp,bid,ask,spread' (spread en pips = (ask - bid) * 100)"""
+    bid = np.asarray(bid, dtype=np.float64)
+    ask = np.asarray(ask, dtype=np.float64)
+    columns = [
+        format_timestamps(ts_ms),
+        format_prices(bid),
+        format_prices(ask),
+        format_prices((ask - bid) * 100),
+    ]
+    lines = columns[0]
+    for col in columns[1:]:
+        lines = np.char.add(np.char.add(lines, ","), col)
+    return lines.tolist()
+
+
+class DayStreamWriter(ABC):
+    """
+    Base de los escritores en streaming: agrupa los trozos por día UTC y
+    llama a write_day() con cada día en cuanto llega un tick de un día
+    posterior. Solo se retiene en memoria el día en curso.
+    """
+
+    def __init__(self, candles: CandleStore | None = None):
+        self.candles = candles  # pirámide de velas por día en la misma pasada
+        self.total_ticks = 0
+        self._day: str | None = None
+        self._day_parts: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def write_chunk(self, ts_ms: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        """Añade un trozo de ticks ordenado por tiempo"""
+        ts_ms = np.asarray(ts_ms, dtype=np.int64)
+        if len(ts_ms) == 0:
+            return
+
+        for day, start, end in split_by_day(ts_ms):
+            if day != self._day:
+                self._flush_day()
+                self._day = day
+            self._day_parts.append((ts_ms[start:end], bid[start:end], ask[start:end]))
+
+    def _flush_day(self):
+        if not self._day_parts:
+            return
+        ts = np.concatenate([p[0] for p in self._day_parts])
+        bid = np.concatenate([p[1] for p in self._day_parts])
+        ask = np.concatenate([p[2] for p in self._day_parts])
+        self._day_parts = []
+
+        self.write_day(self._day, ts, bid, ask)
+        if self.candles is not None:
+            self.candles.write_day(self._day, ts, bid, ask, save_index=False)
+        self.total_ticks += len(ts)
+
+    @abstractmethod
+    def write_day(self, date: str, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        """Guarda los ticks completos de un día (llamado una vez por día, en orden)"""
+
+    def _finish(self):
+        if self.candles is not None:
+            self.candles.save_index()
+
+    def close(self):
+        self._flush_day()
+        self._finish()
+
+    def abort(self):
+        self._day_parts = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class StreamingStoreWriter(DayStreamWriter):
+    """
+    Escribe los trozos directamente en el tick store binario (lib/ticks_store.py)
+
+    Las columnas time_msc/bid/ask del array de MT5 pasan a .npy por día sin
+    crear objetos por fila. Un día que ya estaba en el store se reemplaza.
+    """
+
+    def __init__(self, store: TickStore, candles: CandleStore | None = None):
+        super().__init__(candles)
+        self.store = store
+        self.days_written: list[str] = []
+
+    def write_day(self, date: str, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        self.store.write_day(date, ts, bid, ask, save_index=False)
+        self.days_written.append(date)
+
+    def _finish(self):
+        self.store.save_index()
+        super()._finish()
+
+    def abort(self):
+        # Los días ya escritos están completos: se publican en el índice
+        super().abort()
+        self._finish()
+
+
+class StreamingShardWriter(DayStreamWriter):
+    """
+    Añade ticks por trozos a los shards anuales {prefix}_{YYYY}.csv.gz
+
+    Cada día se escribe como uno o varios miembros gzip en cuanto llega un
+    tick de un día posterior. Las entradas del índice se generan día a día y
+    ticks-index.json se guarda al cerrar cada shard (cuando el fichero ya está
+    publicado y los byteOffset son válidos).
+
+    Con merge=True los shards existentes no se sobrescriben: los días ya
+    guardados se copian (sin recomprimir) intercalados por fecha con los
+    nuevos, y un día descargado de nuevo sustituye al anterior.
+    """
+
+    def __init__(self, output_dir: Path, prefix: str, index_path: Path = INDEX_PATH,
+                 merge: bool = False, candles: CandleStore | None = None):
+        super().__init__(candles)
+        self.output_dir = Path(output_dir)
+        self.prefix = prefix
+        self.index_path = index_path
+        index = load_index(index_path)
+        self.index_days = index["days"]
+        self.index_files = index.get("files", {})
+        self.merge = merge
+        self.files: list[Path] = []
+
+        self._writer: ShardWriter | None = None
+        self._year: int | None = None
+        self._existing: list[dict] = []  # días del shard anterior aún por copiar
+        self._existing_path: Path | None = None
+
+    def shard_path(self, year: int) -> Path:
+        return self.output_dir / f"{self.prefix}_{year}.csv.gz"
+
+    def write_day(self, date: str, ts: np.ndarray, bid: np.ndarray, ask: np.ndarray):
+        year = int(date[:4])
+        if year != self._year:
+            self._close_shard()
+            self._open_shard(year)
+
+        self._copy_existing(before=date)
+        self._existing = [e for e in self._existing if e["date"] != date]
+        self._writer.write_day(
+            date,
+            format_tick_lines(ts, bid, ask),
+            first_ts=ms_to_iso(int(ts[0])),
+            last_ts=ms_to_iso(int(ts[-1])),
+            **day_stats(bid, ask),
+        )
+
+    def _open_shard(self, year: int):
+        path = self.shard_path(year)
+        self._existing = []
+        if self.merge and path.exists():
+            entries = [d for d in self.index_days if d["file"] == path.name]
+            if not is_seekable_index(entries) and entries:
+                raise ValueError(
+                    f"{path.name} no tiene byteOffset en el índice; "
+                    "conviértelo antes con scripts/convert_ticks.py --format seekable"
+                )
+            self._existing = sorted(entries, key=lambda d: d["startLine"])
+            self._existing_path = path
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._writer = ShardWriter(path)
+        self._year = year
+
+    def _copy_existing(self, before: str | None = None):
+        """Copia los días existentes anteriores a 'before' (todos si es None)"""
+        while self._existing and (before is None or self._existing[0]["date"] < before):
+            entry = self._existing.pop(0)
+            self._writer.copy_member(entry, read_member_bytes(self._existing_path, entry))
+
+    def _close_shard(self):
+        if self._writer is None:
+            return
+        self._copy_existing()
+        self._writer.close()
+        path = self._writer.path
+        self.index_days = replace_file_entries(self.index_days, path.name, self._writer.entries)
+        # Firma del shard (con sha256): build_ticks_index.py no lo vuelve a escanear, ni con --checksum
+        self.index_files[path.name] = file_signature(path, checksum=True)
+        save_index(self.index_days, self.index_path, files=self.index_files)
+        self.files.append(path)
+        size_mb = path.stat().st_size / 1024 / 1024
+        print(f"Archivo creado: {path} ({size_mb:.1f} MB, {len(self._writer.entries)} días)")
+        self._writer = None
+        self._year = None
+
+    def _finish(self):
+        self._close_shard()
+        super()._finish()
+
+    def abort(self):
+        super().abort()
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+
+
+# ==================== SINCRONIZACIÓN INCREMENTAL ====================
+
+
+def sync_ranges(indexed_dates, start: date, end: date) -> list[tuple[date, date]]:
+    """
+    Rangos de días (inclusivos) que faltan en el índice dentro de [start, end]
+
+    Se consideran pendientes los días laborables sin entrada y, como
+    incompleto, el último día indexado (pudo descargarse a mitad de sesión)
+    junto con todo lo posterior. Los fines de semana solo se descargan si
+    quedan dentro de un rango pendiente, así los huecos normales del mercado
+    no generan peticiones.
+    """
+    indexed = set(indexed_dates)
+    last = max((d for d in indexed if start.isoformat() <= d <= end.isoformat()), default=None)
+
+    pending = []
+    day = start
+    while day <= end:
+        key = day.isoformat()
+        if (last is not None and key >= last) or (key not in indexed and day.weekday() < 5):
+            pending.append(day)
+        day += timedelta(days=1)
+
+    ranges: list[tuple[date, date]] = []
+    for day in pending:
+        if ranges and _only_weekend_between(ranges[-1][1], day):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def _only_weekend_between(a: date, b: date) -> bool:
+    gap = a + timedelta(days=1)
+    while gap < b:
+        if gap.weekday() < 5:
+            return False
+        gap += timedelta(days=1)
+    return True
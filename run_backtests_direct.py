@@ -2,21 +2,92 @@
 """
 Ejecutar backtests directamente sin servidor HTTP
 Usa el motor de backtest directamente para mayor velocidad
+
+Con --ticks real (por defecto) cada señal se reproduce con sus ticks reales,
+desde su timestamp hasta closeTimestamp (máx. 24h), como lib/optimizer.ts.
+Las ventanas se leen una sola vez del tick store (data/ticks-store) o, si no
+existe, de los .csv.gz de data/ticks vía data/ticks-index.json, y se
+reutilizan en todas las estrategias. Con --ticks synthetic se usan 100 ticks
+sintéticos por señal (ruido determinista con crc32).
+
+Por defecto todas las estrategias se simulan juntas (MultiBacktestEngine):
+cada ventana se recorre una sola vez sea cual sea el número de estrategias.
+Con --per-strategy se hace una pasada por estrategia, como antes.
+
+Con ticks reales el trabajo se reparte en unidades (grupo de estrategias,
+tramo de --chunk señales) que --workers procesos ejecutan en paralelo con
+las ventanas en memoria compartida (lib/backtest_parallel.py). El
+resultado es el mismo con cualquier número de workers. Con el tick store y
+más de un worker las ventanas no se copian: un proceso servidor guarda los
+días en memoria compartida (lib/ticks_cache.py, hasta --tick-cache-mb) y
+cada worker saca de ahí la ventana de cada señal; al final se muestran los
+aciertos, fallos y expulsiones de esa caché.
+
+Con --cache los resultados de cada (señal, estrategia) se guardan en SQLite
+(lib/backtest_cache.py) con una clave de la señal, la configuración, la
+versión de los ticks en el índice y la versión del motor (no el nombre de
+la estrategia): al repetir solo se simulan los pares que faltan y se
+muestra la tasa de aciertos. La caché guarda métricas y curva, no las
+operaciones.
+
+Con --incremental se guarda en el directorio de resultados el estado de
+cada estrategia tras los tramos completos de señales
+(lib/backtest_incremental.py) y la siguiente ejecución solo simula las
+señales nuevas, con el mismo resultado que simularlas todas. --rebuild
+descarta el estado guardado.
+
+Con --monte-carlo N se generan N órdenes alternativos del P&L por señal de
+cada estrategia (lib/backtest_montecarlo.py) y se guardan en cada JSON los
+percentiles del drawdown, del tiempo bajo el agua y la probabilidad de ruina.
+
+Con --decimation N (1, 5 o 10 puntos) cada estrategia se simula con el nivel
+diezmado más grueso, hasta N, cuya resolución queda por debajo de su
+pipsDistance (lib/ticks_store.py): muchos menos ticks, pero el resultado es
+APROXIMADO (trades, profit y drawdown cambian) y se marca como tal en la
+salida, en cada JSON y en el ranking. Sirve para explorar, no para comparar
+con resultados exactos.
+
+Uso:
+    python run_backtests_direct.py
+    python run_backtests_direct.py --limit 0 --source shards
+    python run_backtests_direct.py --ticks synthetic
+    python run_backtests_direct.py --per-strategy
+    python run_backtests_direct.py --limit 0 --workers 8
+    python run_backtests_direct.py --limit 0 --cache
+    python run_backtests_direct.py --limit 0 --incremental
+    python run_backtests_direct.py --limit 0 --incremental --rebuild
+    python run_backtests_direct.py --limit 0 --monte-carlo 10000 --mc-method permutation
+    python run_backtests_direct.py --limit 0 --decimation 10
 """
 
-import csv
+import argparse
 import json
 import sys
-from datetime import datetime
+import time
+import zlib
+from collections import defaultdict
 from pathlib import Path
 
 # Añadir el directorio del proyecto al path
 sys.path.insert(0, str(Path(__file__).parent))
 
 # Importar componentes del backtest
-from lib.backtest_engine import BacktestEngine, BacktestConfig
-from lib.parsers.signals_csv import parseSignalsCsv, groupSignalsByRange
-from lib.parsers.ticks_loader import enrichSignalsWithRealPrices, hasTicksData
+from lib.backtest_cache import CACHE_PATH, DEFAULT_BUDGET_MB, ResultCache, run_cached, tick_version  # noqa: E402
+from lib.backtest_engine import BacktestConfig, BacktestEngine, MultiBacktestEngine, run_signal  # noqa: E402
+from lib.backtest_incremental import load_state, run_incremental, save_state  # noqa: E402
+from lib.backtest_montecarlo import DEFAULT_RUIN, METHODS, monte_carlo, signal_pnl  # noqa: E402
+from lib.backtest_parallel import DEFAULT_CHUNK, run_units  # noqa: E402
+from lib.parsers.signals_csv import groupSignalsByRange, parseSignalsCsv  # noqa: E402
+from lib.parsers.ticks_loader import (  # noqa: E402
+    enrichSignalsWithRealPrices,
+    getTicksForSignal,
+    hasTicksData,
+    open_tick_source,
+)
+from lib.ticks_cache import DEFAULT_BUDGET_MB as TICK_CACHE_MB  # noqa: E402
+from lib.ticks_cache import start_cache_server  # noqa: E402
+from lib.ticks_shards import INDEX_PATH, TICKS_DIR  # noqa: E402
+from lib.ticks_store import DECIMATION_LEVELS, TickStore, decimation_level  # noqa: E402
 
 # Configuración
 SIGNAL_FILE = "signals_intradia.csv"
@@ -57,6 +128,7 @@ STRATEGIES = [
     {"name": "AGRESIVO_2", "grupo": "AGRESIVO", "config": {"pipsDistance": 6, "maxLevels": 45, "takeProfitPips": 6, "lotajeBase": 0.05, "numOrders": 1, "useStopLoss": False}},
 ]
 
+
 def load_signals(filepath: str, limit: int = None):
     """Carga señales desde CSV"""
     with open(filepath, 'r', encoding='utf-8') as f:
@@ -70,10 +142,64 @@ def load_signals(filepath: str, limit: int = None):
 
     return trading_signals
 
-def run_backtest(signals, config_dict):
-    """Ejecuta un backtest con la configuración dada"""
-    # Crear configuración
-    config = BacktestConfig(
+
+def load_windows(signals, source):
+    """
+    Enriquece las señales con el precio real y lee la ventana de ticks de
+    cada una (una sola vez para todas las estrategias)
+
+    Returns:
+        Lista de (señal, ventana) con al menos un tick
+    """
+    signals = enrichSignalsWithRealPrices(signals, source)
+    replay = []
+    for signal in signals:
+        window = getTicksForSignal(signal.timestamp, signal.closeTimestamp, store=source)
+        if len(window):
+            replay.append((signal, window))
+    return replay
+
+
+def level_windows(replay, source, level):
+    """
+    Ventanas diezmadas (aproximadas) de las señales de replay
+
+    Conservan el primer y el último tick de la ventana completa, así que
+    salen las mismas señales en el mismo orden que en replay.
+    """
+    return [
+        (signal, getTicksForSignal(signal.timestamp, signal.closeTimestamp, store=source, level=level))
+        for signal, _ in replay
+    ]
+
+
+def strategy_levels(config_dicts, max_level):
+    """Nivel diezmado de cada estrategia: el más grueso hasta max_level por debajo de su pipsDistance"""
+    levels = tuple(level for level in DECIMATION_LEVELS if level <= max_level)
+    return [decimation_level(c.get("pipsDistance", 10), levels) for c in config_dicts]
+
+
+def approx_label(level):
+    return f" [APROXIMADO d{level}]" if level else ""
+
+
+def synthetic_ticks(signal):
+    """100 ticks sintéticos alrededor del precio de la señal (ruido determinista)"""
+    ticks = []
+    for i in range(100):
+        noise = (zlib.crc32(f"{signal.id}{i}".encode()) % 100 - 50) / 500
+        tick_price = signal.entryPrice * (1 + noise * 0.001)
+        ticks.append({
+            "timestamp": signal.timestamp,
+            "bid": tick_price,
+            "ask": tick_price + 0.1,
+            "spread": 0.1,
+        })
+    return ticks
+
+
+def make_config(config_dict):
+    return BacktestConfig(
         strategyName=config_dict.get("name", "Test"),
         lotajeBase=config_dict.get("lotajeBase", 0.03),
         numOrders=config_dict.get("numOrders", 1),
@@ -82,111 +208,368 @@ def run_backtest(signals, config_dict):
         takeProfitPips=config_dict.get("takeProfitPips", 20),
         stopLossPips=config_dict.get("stopLossPips", 0),
         useStopLoss=config_dict.get("useStopLoss", False),
+        initialCapital=INITIAL_CAPITAL,
     )
 
-    # Crear engine
-    engine = BacktestEngine(config)
 
-    # Simular cada señal con ticks sintéticos (más rápido)
+def run_backtest(signals, config_dict, replay=None):
+    """
+    Ejecuta un backtest con la configuración dada
+
+    Args:
+        signals: Señales (modo sintético)
+        replay: Lista de (señal, ventana) de load_windows (modo ticks reales)
+
+    Returns:
+        (resultados, ticks procesados)
+    """
+    return _run_engine(BacktestEngine(make_config(config_dict)), signals, replay)
+
+
+def run_all(signals, config_dicts, replay=None):
+    """
+    Ejecuta todas las configuraciones en una sola pasada por señal
+
+    Returns:
+        (lista de resultados en el orden de config_dicts, ticks procesados)
+    """
+    engine = MultiBacktestEngine([make_config(c) for c in config_dicts])
+    return _run_engine(engine, signals, replay)
+
+
+def _run_engine(engine, signals, replay):
+    processed = 0
+
+    if replay is not None:
+        for i, (signal, window) in enumerate(replay):
+            run_signal(engine, signal, i, window, entry_ms=int(window.ts[0]))
+            processed += len(window)
+        return engine.getResults(), processed
+
     for signal in signals:
         engine.startSignal(signal.side, signal.entryPrice)
         engine.openInitialOrders(signal.entryPrice)
-
-        # Generar ticks sintéticos
-        duration_ms = 30 * 60 * 1000  # 30 min
-        if signal.closeTimestamp:
-            duration_ms = max(60000, signal.closeTimestamp.timestamp() - signal.timestamp.timestamp())
-
-        # Simular movimiento de precio
-        num_ticks = 100
-        for i in range(num_ticks):
-            progress = i / num_ticks
-            noise = (hash(f"{signal.id}{i}") % 100 - 50) / 500  # Ruido determinista
-            tick_price = signal.entryPrice * (1 + noise * 0.001)
-
-            tick = {
-                "timestamp": signal.timestamp,
-                "bid": tick_price,
-                "ask": tick_price + 0.1,
-                "spread": 0.1
-            }
+        for tick in synthetic_ticks(signal):
             engine.processTick(tick)
+            processed += 1
+    return engine.getResults(), processed
+
+
+def open_tick_cache(source, workers, budget_mb):
+    """
+    Servidor de la caché de ticks compartida para los workers
+
+    Solo con el tick store y más de un worker; None si no se usa (los
+    workers reciben entonces una copia de las ventanas).
+    """
+    if workers <= 1 or budget_mb <= 0 or not isinstance(source, TickStore):
+        return None
+    return start_cache_server(source.root, budget_mb, source.symbol)
+
+
+def print_tick_cache(stats):
+    """Aciertos de la caché de ticks compartida"""
+    lookups = stats["hits"] + stats["misses"]
+    ratio = stats["hits"] / lookups if lookups else 0
+    print(f"  Caché de ticks: {stats['hits']:,}/{lookups:,} días servidos de memoria ({ratio:.1%}), "
+          f"{stats['misses']:,} leídos del store, {stats['evictions']:,} expulsados, "
+          f"{stats['entries']:,} en memoria ({stats['bytes'] / 1024 / 1024:.1f} de "
+          f"{stats['budgetBytes'] / 1024 / 1024:.0f} MB)")
+
+
+def run_levels(config_dicts, levels, replays, workers, chunk, tick_cache=None):
+    """
+    run_units por grupos de estrategias con el mismo nivel diezmado
+
+    Returns:
+        (resultados en el orden de config_dicts, UnitStats de todos los grupos)
+    """
+    results = [None] * len(config_dicts)
+    unit_stats = []
+    for level in sorted(set(levels)):
+        group = [i for i, lv in enumerate(levels) if lv == level]
+        if len(replays) > 1:
+            ticks = sum(len(w) for _, w in replays[level])
+            print(f"  Nivel {f'd{level} (APROXIMADO)' if level else 'completo'}: "
+                  f"{len(group)} estrategias, {ticks:,} ticks", flush=True)
+        group_results, group_stats = run_units([make_config(config_dicts[i]) for i in group], replays[level],
+                                               workers, chunk, on_unit=print_unit, tick_cache=tick_cache,
+                                               level=level)
+        for i, result in zip(group, group_results):
+            results[i] = result
+        unit_stats.extend(group_stats)
+    return results, unit_stats
+
+
+def print_unit(done, total, stats):
+    """Progreso de run_units: una línea por unidad terminada"""
+    unit = stats.unit
+    speed = stats.ticks / stats.seconds if stats.seconds else 0
+    print(f"  [{done}/{total}] señales {unit.start}-{unit.stop - 1}, "
+          f"estrategias {unit.strategies[0] + 1}-{unit.strategies[-1] + 1}: "
+          f"{stats.seconds:.2f}s, {speed:,.0f} ticks/s (pid {stats.pid})", flush=True)
+
+
+def print_workers(unit_stats):
+    """Throughput de cada proceso worker"""
+    by_pid = defaultdict(lambda: [0, 0, 0.0])
+    for stats in unit_stats:
+        totals = by_pid[stats.pid]
+        totals[0] += 1
+        totals[1] += stats.ticks
+        totals[2] += stats.seconds
+    for pid, (units, ticks, seconds) in sorted(by_pid.items()):
+        print(f"  pid {pid}: {units} unidades, {ticks:,} ticks x estrategia, "
+              f"{ticks / seconds if seconds else 0:,.0f} ticks/s")
+
+
+def print_cache(stats):
+    """Aciertos de la caché de resultados"""
+    lookups = stats["hits"] + stats["misses"]
+    ratio = stats["hits"] / lookups if lookups else 0
+    print(f"  Caché: {stats['hits']:,}/{lookups:,} aciertos ({ratio:.1%}), {stats['misses']:,} simulados, "
+          f"{stats['entries']:,} entradas, {stats['bytes'] / 1024 / 1024:.1f} MB, "
+          f"{stats['evictions']:,} expulsadas")
+
+
+def print_incremental(summary, state_path):
+    """Señales reutilizadas del estado incremental"""
+    if summary.reason:
+        print(f"  Incremental: estado descartado ({summary.reason})")
+    print(f"  Incremental: {summary.stored} señales guardadas, {summary.simulated} simuladas"
+          + (f", desde cero: {', '.join(summary.rebuilt)}" if summary.rebuilt else "")
+          + f" (estado en {state_path})")
+
+
+def print_monte_carlo(summary):
+    """Percentiles de Monte Carlo de una estrategia"""
+    dd, under = summary["maxDrawdown"], summary["longestUnderwater"]
+    print(f"      Monte Carlo ({summary['resamples']:,} {summary['method']}): DD p50 ${dd['p50']:.2f}, "
+          f"p95 ${dd['p95']:.2f}, p99 ${dd['p99']:.2f} (histórico ${dd['historical']:.2f}); "
+          f"bajo el agua p95 {under['p95']:.0f} señales; ruina {summary['ruinProbability']:.2%}")
 
-    return engine.getResults()
 
 def main():
+    parser = argparse.ArgumentParser(description="Backtests directos de las estrategias con señales intradía")
+    parser.add_argument("--signals", default=SIGNAL_FILE, help="CSV de señales")
+    parser.add_argument("--limit", type=int, default=SIGNAL_LIMIT, help="Máximo de señales (0 = todas)")
+    parser.add_argument("--ticks", choices=["real", "synthetic"], default="real",
+                        help="Ticks reales de cada señal o 100 ticks sintéticos")
+    parser.add_argument("--source", choices=["auto", "store", "shards"], default="auto",
+                        help="Origen de los ticks reales (auto: tick store si tiene días, si no .csv.gz)")
+    parser.add_argument("--store", type=Path, default=None, help="Directorio del tick store")
+    parser.add_argument("--ticks-dir", type=Path, default=TICKS_DIR, help="Directorio con los .csv.gz")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="ticks-index.json de los .csv.gz")
+    parser.add_argument("--results-dir", type=Path, default=RESULTS_DIR, help="Directorio de resultados")
+    parser.add_argument("--per-strategy", action="store_true",
+                        help="Una pasada por estrategia en vez de todas juntas")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos en paralelo con ticks reales (1 = en este proceso)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="Señales por unidad de trabajo")
+    parser.add_argument("--tick-cache-mb", type=int, default=TICK_CACHE_MB,
+                        help="Con el tick store y --workers > 1: memoria de la caché de días compartida por "
+                             "los workers (0 = copiar las ventanas a memoria compartida)")
+    parser.add_argument("--cache", type=Path, nargs="?", const=CACHE_PATH, default=None,
+                        help=f"Caché SQLite de resultados por señal (por defecto {CACHE_PATH})")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_BUDGET_MB, help="Tamaño máximo de la caché (MB)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Simular solo las señales nuevas desde la última ejecución")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Con --incremental: descartar el estado guardado y simularlo todo")
+    parser.add_argument("--monte-carlo", type=int, default=0, metavar="N",
+                        help="Órdenes alternativos de las señales para la distribución del drawdown (0 = no)")
+    parser.add_argument("--mc-method", choices=METHODS, default="bootstrap", help="Remuestreo de Monte Carlo")
+    parser.add_argument("--ruin", type=float, default=DEFAULT_RUIN,
+                        help="Pérdida (fracción del capital inicial) que cuenta como ruina")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de Monte Carlo")
+    parser.add_argument("--decimation", type=int, choices=(0, *DECIMATION_LEVELS), default=0, metavar="N",
+                        help="APROXIMADO: cada estrategia usa el nivel diezmado más grueso (puntos, hasta N) "
+                             "por debajo de su pipsDistance; cambia trades, profit y drawdown (0 = ticks completos)")
+    args = parser.parse_args()
+    if args.rebuild:
+        args.incremental = True
+    if args.incremental and (args.cache or args.per_strategy or args.ticks != "real"):
+        parser.error("--incremental no se combina con --cache, --per-strategy ni --ticks synthetic")
+    if args.monte_carlo and (args.incremental or args.cache or args.ticks != "real"):
+        parser.error("--monte-carlo necesita ticks reales y las operaciones "
+                     "(no se combina con --incremental ni --cache)")
+    if args.decimation and (args.incremental or args.cache or args.ticks != "real"):
+        parser.error("--decimation da resultados aproximados: necesita ticks reales "
+                     "y no se combina con --incremental ni --cache")
+
     print("=== BACKTESTS DIRECTOS CON SEÑALES INTRADÍA ===")
-    print(f"Archivo: {SIGNAL_FILE}")
-    print(f"Límite: {SIGNAL_LIMIT} señales")
+    print(f"Archivo: {args.signals}")
+    print(f"Límite: {args.limit or 'todas'} señales")
     print(f"Estrategias: {len(STRATEGIES)}")
+    print(f"Ticks: {args.ticks}")
+    if args.decimation:
+        print(f"Diezmado: hasta {args.decimation} puntos por estrategia (RESULTADOS APROXIMADOS)")
     print()
 
     # Crear directorio de resultados
-    RESULTS_DIR.mkdir(exist_ok=True)
+    args.results_dir.mkdir(exist_ok=True)
 
     # Cargar señales
     print("Cargando señales...")
-    signals = load_signals(SIGNAL_FILE, SIGNAL_LIMIT)
+    signals = load_signals(args.signals, args.limit)
     print(f"Cargadas {len(signals)} señales")
+
+    configs = [{"name": s["name"], **s["config"]} for s in STRATEGIES]
+    levels = strategy_levels(configs, args.decimation)
+    replay = None
+    replays = {}
+    source = None
+    load_time = 0.0
+    if args.ticks == "real":
+        source = open_tick_source(args.source, args.store, args.ticks_dir, args.index)
+        if not hasTicksData(source):
+            print("No hay ticks (ni tick store ni data/ticks indexado); usa --ticks synthetic")
+            sys.exit(1)
+        start = time.perf_counter()
+        replay = load_windows(signals, source)
+        load_time = time.perf_counter() - start
+        window_ticks = sum(len(w) for _, w in replay)
+        print(f"Ventanas: {len(replay)} señales con ticks, {window_ticks:,} ticks "
+              f"({type(source).__name__}, {load_time:.2f}s)")
+        replays[0] = replay
+        for level in sorted(set(levels) - {0}):
+            start = time.perf_counter()
+            replays[level] = level_windows(replay, source, level)
+            load_time += time.perf_counter() - start
+            level_ticks = sum(len(w) for _, w in replays[level])
+            print(f"  Diezmado d{level} (APROXIMADO): {level_ticks:,} ticks "
+                  f"({level_ticks / window_ticks if window_ticks else 0:.1%}), "
+                  f"{levels.count(level)} estrategias")
+    else:
+        signals = [s for s in signals if s.entryPrice > 0]
+        print(f"Con precio: {len(signals)} señales")
     print()
 
-    # Ejecutar cada estrategia
+    # Ejecutar las estrategias
     all_results = []
+    start = time.perf_counter()
+    if args.per_strategy:
+        outcomes = []
+        for i, (config, level) in enumerate(zip(configs, levels), 1):
+            print(f"[{i}/{len(configs)}] {config['name']}{approx_label(level)}...", flush=True)
+            outcomes.append(run_backtest(signals, config, replays.get(level, replay)))
+        results_list = [results for results, _ in outcomes]
+        total_ticks = sum(processed for _, processed in outcomes)
+    elif replay is not None and args.incremental:
+        state_path = args.results_dir / f"incremental-{Path(args.signals).stem}.pickle"
+        print(f"Simulando {len(configs)} estrategias con {args.workers} worker(s), "
+              f"{args.chunk} señales por unidad, en modo incremental...", flush=True)
+        versions = [tick_version(source, window) for _, window in replay]
+        results_list, unit_stats, state, summary = run_incremental(
+            [make_config(c) for c in configs], replay, versions, load_state(state_path),
+            args.workers, args.chunk, on_unit=print_unit, rebuild=args.rebuild)
+        save_state(state_path, state)
+        print_incremental(summary, state_path)
+        total_ticks = sum(stats.ticks for stats in unit_stats)
+        print_workers(unit_stats)
+    elif replay is not None and args.cache:
+        print(f"Simulando {len(configs)} estrategias con {args.workers} worker(s) y caché {args.cache}...",
+              flush=True)
+        versions = [tick_version(source, window) for _, window in replay]
+        with ResultCache(args.cache, args.cache_mb) as cache:
+            results_list, unit_stats = run_cached([make_config(c) for c in configs], replay, cache, versions,
+                                                  args.workers, args.chunk, on_unit=print_unit)
+            print_cache(cache.stats())
+        total_ticks = sum(stats.ticks for stats in unit_stats)
+        print_workers(unit_stats)
+    elif replay is not None:
+        print(f"Simulando {len(configs)} estrategias con {args.workers} worker(s), "
+              f"{args.chunk} señales por unidad...", flush=True)
+        tick_cache = open_tick_cache(source, args.workers, args.tick_cache_mb)
+        try:
+            results_list, unit_stats = run_levels(configs, levels, replays, args.workers, args.chunk, tick_cache)
+            if tick_cache:
+                print_tick_cache(tick_cache.stats())
+        finally:
+            if tick_cache:
+                tick_cache.shutdown()
+        total_ticks = sum(stats.ticks for stats in unit_stats)
+        print_workers(unit_stats)
+    else:
+        print(f"Simulando {len(configs)} estrategias en una pasada...", flush=True)
+        results_list, processed = run_all(signals, configs, replay)
+        total_ticks = processed * len(configs)
+    sim_time = time.perf_counter() - start
+    print()
 
-    for i, strategy in enumerate(STRATEGIES, 1):
+    for i, (strategy, results, level) in enumerate(zip(STRATEGIES, results_list, levels), 1):
         name = strategy["name"]
         grupo = strategy["grupo"]
         config = strategy["config"]
+        print(f"[{i}/{len(STRATEGIES)}] {name}: Trades: {results.totalTrades}, "
+              f"Profit: ${results.totalProfit:.2f}, DD: ${results.maxDrawdown:.2f}{approx_label(level)}")
+        mc_summary = None
+        if args.monte_carlo:
+            mc = monte_carlo(signal_pnl(results, len(replay)), args.monte_carlo, args.mc_method,
+                             results.initialCapital, args.ruin, args.seed)
+            mc_summary = mc.summary()
+            print_monte_carlo(mc_summary)
 
-        print(f"[{i}/{len(STRATEGIES)}] {name}...", end=" ", flush=True)
-
-        try:
-            results = run_backtest(signals, config)
-            print(f"OK - Trades: {results.totalTrades}, Profit: ${results.totalProfit:.2f}, DD: ${results.maxDrawdown:.2f}")
-
-            # Guardar resultado individual
-            result_file = RESULTS_DIR / f"{name}.json"
-            with open(result_file, 'w') as f:
-                json.dump({
-                    "name": name,
-                    "grupo": grupo,
-                    "config": config,
-                    "results": {
-                        "totalProfit": results.totalProfit,
-                        "totalTrades": results.totalTrades,
-                        "maxDrawdown": results.maxDrawdown,
-                        "profitableTrades": results.profitableTrades,
-                    }
-                }, f, indent=2)
-
-            all_results.append({
+        # Guardar resultado individual
+        result_file = args.results_dir / f"{name}.json"
+        with open(result_file, 'w') as f:
+            json.dump({
                 "name": name,
                 "grupo": grupo,
-                "profit": results.totalProfit,
-                "trades": results.totalTrades,
-                "maxDD": results.maxDrawdown,
-            })
+                "config": config,
+                "ticks": args.ticks,
+                "decimation": level,
+                "approximate": bool(level),
+                "results": {
+                    "totalProfit": results.totalProfit,
+                    "totalTrades": results.totalTrades,
+                    "maxDrawdown": results.maxDrawdown,
+                    "profitableTrades": results.profitableTrades,
+                },
+                **({"monteCarlo": mc_summary} if mc_summary else {}),
+            }, f, indent=2)
 
-        except Exception as e:
-            print(f"ERROR: {e}")
+        all_results.append({
+            "name": name,
+            "grupo": grupo,
+            "profit": results.totalProfit,
+            "trades": results.totalTrades,
+            "maxDD": results.maxDrawdown,
+            "level": level,
+        })
+
+    # Tiempos
+    print()
+    print("=== TIEMPOS ===")
+    print(f"Carga de ticks: {load_time:.2f}s")
+    print(f"Simulación:     {sim_time:.2f}s ({total_ticks:,} ticks x estrategia, "
+          f"{total_ticks / sim_time if sim_time else 0:,.0f} ticks/s)")
 
     # Ranking
     print()
     print("=== RANKING POR PROFIT ===")
     all_results.sort(key=lambda x: x["profit"], reverse=True)
 
-    ranking_file = RESULTS_DIR / "ranking.md"
+    n_signals = len(replay) if replay is not None else len(signals)
+    ranking_file = args.results_dir / "ranking.md"
     with open(ranking_file, 'w') as f:
-        f.write(f"# Ranking por Profit ({SIGNAL_LIMIT} señales, ticks sintéticos)\n\n")
+        f.write(f"# Ranking por Profit ({n_signals} señales, ticks {'reales' if replay is not None else 'sintéticos'})\n\n")
+        if any(levels):
+            f.write("Las estrategias marcadas con dN se simularon con ticks diezmados a N puntos: "
+                    "resultados APROXIMADOS.\n\n")
         f.write("| Pos | Estrategia | Grupo | Profit | Trades | Max DD |\n")
         f.write("|-----|-----------|-------|--------|--------|--------|\n")
 
         for i, r in enumerate(all_results, 1):
-            print(f"{i:2d}. {r['name']:15s} | {r['grupo']:12s} | ${r['profit']:8.2f} | {r['trades']:5d} | ${r['maxDD']:8.2f}")
-            f.write(f"| {i} | {r['name']} | {r['grupo']} | ${r['profit']:.2f} | {r['trades']} | ${r['maxDD']:.2f} |\n")
+            label = approx_label(r["level"])
+            print(f"{i:2d}. {r['name']:15s} | {r['grupo']:12s} | ${r['profit']:8.2f} | {r['trades']:5d} | "
+                  f"${r['maxDD']:8.2f}{label}")
+            f.write(f"| {i} | {r['name']}{label} | {r['grupo']} | ${r['profit']:.2f} | {r['trades']} | "
+                    f"${r['maxDD']:.2f} |\n")
 
     print()
-    print(f"Resultados guardados en: {RESULTS_DIR}")
+    print(f"Resultados guardados en: {args.results_dir}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los kernels de processTicks (numpy, jit y python)
+==============================================================
+
+Simula una configuración de grid con una señal por día (BUY y SELL
+alternos, desde el primer tick del día hasta el último) sobre los días del
+tick store, o sobre días sintéticos si no hay store, con cada kernel de
+lib/backtest_engine.py:
+
+- numpy:   _TickIndex (siempre disponible)
+- jit:     scan_grid compilado con numba (se omite si numba no está)
+- python:  scan_grid sin compilar (lento, solo como referencia)
+
+Comprueba que todos dan los mismos trades y profit y muestra ticks/s. La
+compilación de numba se mide aparte con una ventana de calentamiento. Con
+--output guarda la tabla en JSON.
+
+Uso:
+    python scripts/benchmark_grid_kernel.py --year 2024
+    python scripts/benchmark_grid_kernel.py --days 20 --kernels numpy,python
+    python scripts/benchmark_grid_kernel.py --synthetic 30 --output benchmark_grid_kernel.json
+
+Requisitos:
+    pip install numpy
+    pip install numba   (opcional, kernel jit)
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.backtest_engine import KERNELS, BacktestConfig, BacktestEngine, run_signal  # noqa: E402
+from lib.backtest_kernel import HAS_NUMBA  # noqa: E402
+from lib.parsers.signals_csv import TradingSignal  # noqa: E402
+from lib.ticks_store import MS_PER_DAY, STORE_DIR, DayTicks, TickStore, scale_prices  # noqa: E402
+
+
+def store_days(store: TickStore, year: str | None, limit: int) -> list[DayTicks]:
+    days = [d for d in store.days() if year is None or d.startswith(year)]
+    if limit:
+        days = days[:limit]
+    return [day for day in (store.load_day(d) for d in days) if len(day)]
+
+
+def synthetic_days(n_days: int, ticks_per_day: int = 100_000, seed: int = 0) -> list[DayTicks]:
+    """Paseo aleatorio de precios alrededor de 2300 con ticks cada ~0.8s"""
+    rng = np.random.default_rng(seed)
+    start = 1704067200000  # 2024-01-01
+    days, price = [], 2300.0
+    for k in range(n_days):
+        ts = start + k * MS_PER_DAY + np.sort(rng.integers(0, MS_PER_DAY, ticks_per_day))
+        bid = price + np.cumsum(rng.integers(-30, 31, ticks_per_day)) / 1000
+        price = float(bid[-1])
+        days.append(DayTicks(ts.astype(np.int64), scale_prices(bid), scale_prices(bid + 0.2)))
+    return days
+
+
+def day_signals(days: list[DayTicks]) -> list[tuple[TradingSignal, DayTicks]]:
+    replay = []
+    for k, day in enumerate(days):
+        start = datetime.fromtimestamp(int(day.ts[0]) / 1000, tz=timezone.utc)
+        side = "BUY" if k % 2 == 0 else "SELL"
+        entry = float((day.bid_prices()[0] + day.ask_prices()[0]) / 2)
+        replay.append((TradingSignal(str(k), start, side, entry, str(k), 1.0), day))
+    return replay
+
+
+def run(config: BacktestConfig, replay, kernel: str):
+    engine = BacktestEngine(config, kernel)
+    start = time.perf_counter()
+    for k, (signal, window) in enumerate(replay):
+        run_signal(engine, signal, k, window, entry_ms=int(window.ts[0]))
+    return engine.getResults(), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los kernels de processTicks con una señal por día")
+    parser.add_argument("--store", type=Path, default=STORE_DIR, help="Directorio del tick store")
+    parser.add_argument("--year", default=None, help="Solo los días de este año (p.ej. 2024)")
+    parser.add_argument("--days", type=int, default=0, help="Máximo de días (0 = todos)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Usar N días sintéticos en vez del store")
+    parser.add_argument("--kernels", default="numpy,jit", help=f"Kernels separados por comas ({', '.join(KERNELS)})")
+    parser.add_argument("--pips-distance", type=float, default=10)
+    parser.add_argument("--max-levels", type=int, default=30)
+    parser.add_argument("--take-profit", type=float, default=10)
+    parser.add_argument("--num-orders", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    kernels = [k.strip() for k in args.kernels.split(",") if k.strip()]
+    unknown = [k for k in kernels if k not in KERNELS]
+    if unknown:
+        print(f"Kernels desconocidos: {', '.join(unknown)}")
+        sys.exit(1)
+    if "jit" in kernels and not HAS_NUMBA:
+        print("numba no está instalado: se omite el kernel jit (pip install numba)")
+        kernels.remove("jit")
+
+    if args.synthetic:
+        days = synthetic_days(args.synthetic)
+        source = f"{args.synthetic} días sintéticos"
+    else:
+        days = store_days(TickStore(args.store), args.year, args.days)
+        source = f"{args.store} ({args.year or 'todos los años'})"
+    if not days:
+        print("No hay días de ticks; usa --synthetic N")
+        sys.exit(1)
+
+    replay = day_signals(days)
+    n = sum(len(d) for d in days)
+    config = BacktestConfig(strategyName="BENCH", lotajeBase=0.03, numOrders=args.num_orders,
+                            pipsDistance=args.pips_distance, maxLevels=args.max_levels,
+                            takeProfitPips=args.take_profit)
+    print(f"Ticks: {source}, {len(days)} días, {n:,} ticks")
+    print(f"Config: grid {args.pips_distance} pips, {args.max_levels} niveles, TP {args.take_profit} pips")
+
+    rows = []
+    reference = None
+    for kernel in kernels:
+        compile_time = 0.0
+        if kernel == "jit":
+            # La primera llamada compila scan_grid (o lo carga de la caché de numba)
+            start = time.perf_counter()
+            run(config, replay[:1], kernel)
+            compile_time = time.perf_counter() - start
+        results, seconds = run(config, replay, kernel)
+        summary = (results.totalTrades, results.totalProfit)
+        if reference is None:
+            reference = summary
+        elif summary != reference:
+            print(f"❌ {kernel}: {summary} no coincide con {kernels[0]}: {reference}")
+            sys.exit(1)
+        rows.append({
+            "kernel": kernel,
+            "seconds": seconds,
+            "ticksPerSecond": n / seconds if seconds else 0,
+            "compileSeconds": compile_time,
+            "totalTrades": results.totalTrades,
+            "totalProfit": results.totalProfit,
+            "maxDrawdown": results.maxDrawdown,
+        })
+        print(f"  {kernel}: {seconds:.2f}s")
+
+    print("=" * 72)
+    print(f"{'kernel':<8} {'tiempo':>9} {'ticks/s':>14} {'compilación':>12} {'trades':>8} {'profit':>12}")
+    for row in rows:
+        print(f"{row['kernel']:<8} {row['seconds']:>8.2f}s {row['ticksPerSecond']:>14,.0f} "
+              f"{row['compileSeconds']:>11.2f}s {row['totalTrades']:>8} {row['totalProfit']:>12.2f}")
+    print("=" * 72)
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "source": source,
+            "days": len(days),
+            "ticks": n,
+            "config": {"pipsDistance": args.pips_distance, "maxLevels": args.max_levels,
+                       "takeProfitPips": args.take_profit, "numOrders": args.num_orders},
+            "numba": HAS_NUMBA,
+            "results": rows,
+        }, indent=2))
+        print(f"Resultados guardados en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark del codec delta (lib/ticks_codec.py) frente al CSV gzip
+=================================================================
+
+Lee un shard anual .csv.gz, lo parte en días y compara para el año completo:
+
+- csv.gz:      tamaño del shard y tiempo de descomprimir + parsear
+- npy:         ts/bid/ask sin comprimir (formato actual del tick store)
+- delta:       varint sin zlib
+- delta+zlib:  varint + zlib (formato de TickStore(codec="delta"))
+
+Los tiempos de decodificación son de todos los días del año seguidos; cada
+día se comprueba contra los ticks originales.
+
+Uso:
+    python scripts/benchmark_tick_codec.py data/ticks/XAUUSD_2024.csv.gz
+    python scripts/benchmark_tick_codec.py data/ticks/XAUUSD_2024.csv.gz --repeat 5
+
+Requisitos:
+    pip install numpy
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.ticks_codec import decode_ticks, encode_ticks  # noqa: E402
+from lib.ticks_csv import block_timestamps_ms, iter_tick_blocks  # noqa: E402
+from lib.ticks_store import PRICE_SCALE, scale_prices, split_by_day  # noqa: E402
+
+
+def read_shard(path: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Ticks válidos del shard (ts ms, bid y ask escalados), ordenados por tiempo"""
+    ts_parts, bid_parts, ask_parts = [], [], []
+    for block in iter_tick_blocks(path):
+        ts, valid = block_timestamps_ms(block)
+        ts_parts.append(ts[valid])
+        bid_parts.append(block.bid[valid])
+        ask_parts.append(block.ask[valid])
+    ts = np.concatenate(ts_parts)
+    order = np.argsort(ts, kind="stable")
+    return (
+        ts[order],
+        scale_prices(np.concatenate(bid_parts)[order]),
+        scale_prices(np.concatenate(ask_parts)[order]),
+    )
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el codec delta con el CSV gzip en un shard anual")
+    parser.add_argument("shard", type=Path, help="Shard .csv.gz (p.ej. data/ticks/XAUUSD_2024.csv.gz)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medida (se toma la mejor)")
+    args = parser.parse_args()
+
+    if not args.shard.exists():
+        print(f"No existe {args.shard}")
+        sys.exit(1)
+
+    print(f"Shard: {args.shard}")
+    csv_time = best_time(lambda: read_shard(args.shard), args.repeat)
+    ts, bid, ask = read_shard(args.shard)
+    days = [(ts[a:b], bid[a:b], ask[a:b]) for _, a, b in split_by_day(ts)]
+    n = len(ts)
+    print(f"Ticks: {n:,} en {len(days)} días")
+
+    results = [("csv.gz", args.shard.stat().st_size, csv_time)]
+    results.append(("npy", sum(d[0].nbytes + d[1].nbytes + d[2].nbytes for d in days), 0.0))
+
+    for name, compress in (("delta", False), ("delta+zlib", True)):
+        start = time.perf_counter()
+        blocks = [encode_ticks(*day, PRICE_SCALE, compress=compress) for day in days]
+        encode_time = time.perf_counter() - start
+        for block, day in zip(blocks, days):
+            decoded = decode_ticks(block)
+            if not all(np.array_equal(a, b) for a, b in zip(decoded, day)):
+                print(f"❌ {name}: la decodificación no coincide")
+                sys.exit(1)
+        decode_time = best_time(lambda: [decode_ticks(b) for b in blocks], args.repeat)
+        results.append((name, sum(len(b) for b in blocks), decode_time))
+        print(f"  {name}: codificado en {encode_time:.2f}s ({n / encode_time:,.0f} ticks/s)")
+
+    csv_size = results[0][1]
+    print("=" * 72)
+    print(f"{'formato':<12} {'tamaño':>10} {'bytes/tick':>11} {'vs csv.gz':>10} {'lectura':>9} {'ticks/s':>14}")
+    for name, size, seconds in results:
+        speed = f"{n / seconds:,.0f}" if seconds else "mmap"
+        read = f"{seconds:.2f}s" if seconds else "-"
+        print(f"{name:<12} {size / 1024 / 1024:>8.1f}MB {size / n:>11.2f} {size / csv_size:>10.0%} "
+              f"{read:>9} {speed:>14}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
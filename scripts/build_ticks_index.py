@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Genera / actualiza data/ticks-index.json desde Python
+=====================================================
+
+Alternativa a `npx ts-node lib/generate-ticks-index.ts` que:
+
+- Escanea los shards en paralelo (un worker por shard).
+- Solo reescanea los shards que han cambiado desde la última vez (tamaño +
+  mtime guardados en index["files"]; con --checksum, sha256 si el shard lo
+  tiene registrado, como los de download_mt5_ticks.py).
+- Guarda por día ticks, minBid, maxBid y meanSpread, y byteOffset/
+  byteLength cuando el shard tiene un bloque gzip por día.
+
+Uso:
+    python scripts/build_ticks_index.py
+    python scripts/build_ticks_index.py --workers 4 --checksum
+    python scripts/build_ticks_index.py --full
+
+Requisitos:
+    pip install numpy
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.ticks_index import plan_index_update, scan_shard_job  # noqa: E402
+from lib.ticks_shards import INDEX_PATH, TICKS_DIR, load_index, save_index  # noqa: E402
+
+
+def build_index(ticks_dir: Path, index_path: Path, workers: int, checksum: bool = False,
+                full: bool = False) -> dict:
+    files = sorted(ticks_dir.glob("*.csv.gz"))
+    if not files:
+        print(f"No hay archivos .csv.gz en {ticks_dir}")
+        sys.exit(1)
+
+    index = load_index(index_path)
+    if full:
+        changed, unchanged = files, []
+    else:
+        changed, unchanged = plan_index_update(files, index, checksum)
+
+    keep = {f.name for f in unchanged}
+    days = [d for d in index.get("days", []) if d["file"] in keep]
+    signatures = {k: v for k, v in index.get("files", {}).items() if k in keep}
+
+    print(f"Shards: {len(files)} ({len(changed)} a escanear, {len(unchanged)} sin cambios)")
+    start = time.perf_counter()
+
+    jobs = [(str(f), checksum) for f in changed]
+    if workers > 1 and len(jobs) > 1:
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(min(workers, len(jobs))) as pool:
+            results = pool.imap_unordered(scan_shard_job, jobs)
+            days, signatures = _collect(results, days, signatures, start)
+    else:
+        days, signatures = _collect(map(scan_shard_job, jobs), days, signatures, start)
+
+    result = save_index(days, index_path, files=signatures)
+    print(f"Índice: {index_path} ({len(days)} días, {time.perf_counter() - start:.1f}s)")
+    return result
+
+
+def _collect(results, days: list, signatures: dict, start: float):
+    for name, entries, signature in results:
+        days.extend(entries)
+        signatures[name] = signature
+        ticks = sum(e["ticks"] for e in entries)
+        seekable = sum(1 for e in entries if "byteOffset" in e)
+        print(f"  {name}: {len(entries)} días, {ticks:,} ticks, {seekable} con byteOffset "
+              f"[{time.perf_counter() - start:.1f}s]")
+    return days, signatures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera ticks-index.json (incremental y en paralelo)")
+    parser.add_argument("--ticks-dir", type=Path, default=TICKS_DIR, help="Directorio con .csv.gz")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="ticks-index.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Shards escaneados en paralelo (default: nº de CPUs)")
+    parser.add_argument("--checksum", action="store_true",
+                        help="Detectar cambios por sha256 en lugar de tamaño + mtime")
+    parser.add_argument("--full", action="store_true", help="Reescanear todos los shards")
+    args = parser.parse_args()
+
+    build_index(args.ticks_dir, args.index, args.workers, args.checksum, args.full)
+
+
+if __name__ == "__main__":
+    main()
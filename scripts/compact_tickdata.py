@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Convierte la tabla TickData al esquema compacto TickDataCompact
+===============================================================
+
+TickData (Prisma) guarda cada tick con rowid, timestamp ISO en texto y
+bid/ask/spread REAL, más dos índices secundarios. TickDataCompact (ver
+lib/ticks_sqlite.py) guarda epoch ms y precios enteros en una tabla WITHOUT
+ROWID cuya clave primaria es (symbolId, ts, seq): ocupa bastante menos y la
+ventana de una señal es un único range scan.
+
+La conversión es de una sola vez y conserva todas las filas (mismo número de
+ticks, mismo orden por símbolo y timestamp). TickData no se modifica salvo
+con --drop-old.
+
+Uso:
+    python scripts/compact_tickdata.py
+    python scripts/compact_tickdata.py --db prisma/dev.db --output prisma/ticks.db
+    python scripts/compact_tickdata.py --replace --drop-old
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.ticks_sqlite import (  # noqa: E402
+    COMPACT_TABLE,
+    create_compact_schema,
+    get_symbol_id,
+    insert_compact_batch,
+    parse_timestamps_ms,
+    scale_prices_exact,
+    sequence_numbers,
+    table_size_bytes,
+)
+from lib.ticks_store import PRICE_SCALE  # noqa: E402
+
+# Fix encoding para Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+DB_PATH = Path(__file__).resolve().parent.parent / "prisma" / "dev.db"
+BATCH_SIZE = 200_000
+
+
+def convert(src: sqlite3.Connection, dst: sqlite3.Connection, price_scale: int,
+            batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Copia TickData -> TickDataCompact en lotes ordenados por (symbol, timestamp)
+
+    Returns:
+        Contadores: rows, inserted, invalid (timestamp ilegible), inexact
+        (precios redondeados a la escala)
+    """
+    stats = {"rows": 0, "inserted": 0, "invalid": 0, "inexact": 0}
+    # El índice (symbol, timestamp) de Prisma da el orden sin ordenar en memoria
+    cursor = src.execute(
+        "SELECT symbol, timestamp, bid, ask FROM TickData ORDER BY symbol, timestamp, id"
+    )
+    symbol_ids: dict[str, int] = {}
+    prev: tuple[str, int, int] | None = None  # (symbol, ts, seq) del último insertado
+    start = time.time()
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        stats["rows"] += len(rows)
+
+        # Un lote puede contener el final de un símbolo y el principio de otro
+        symbols = [r[0] for r in rows]
+        bounds = [0] + [i for i in range(1, len(rows)) if symbols[i] != symbols[i - 1]] + [len(rows)]
+        for lo, hi in zip(bounds, bounds[1:]):
+            symbol = symbols[lo]
+            if symbol not in symbol_ids:
+                symbol_ids[symbol] = get_symbol_id(dst, symbol, price_scale)
+
+            part = rows[lo:hi]
+            ts, valid = parse_timestamps_ms([r[1] for r in part])
+            bid, inexact_bid = scale_prices_exact([r[2] for r in part], price_scale)
+            ask, inexact_ask = scale_prices_exact([r[3] for r in part], price_scale)
+            stats["inexact"] += inexact_bid + inexact_ask
+            if not valid.all():
+                stats["invalid"] += int(np.count_nonzero(~valid))
+                ts, bid, ask = ts[valid], bid[valid], ask[valid]
+            if len(ts) == 0:
+                continue
+
+            # Orden estable por ms (el texto ISO puede venir en varios formatos)
+            order = np.argsort(ts, kind="stable")
+            ts, bid, ask = ts[order], bid[order], ask[order]
+
+            if prev is not None and prev[0] == symbol:
+                seq = sequence_numbers(ts, prev[1], prev[2])
+            else:
+                seq = sequence_numbers(ts)
+            stats["inserted"] += insert_compact_batch(dst, symbol_ids[symbol], ts, seq, bid, ask)
+            prev = (symbol, int(ts[-1]), int(seq[-1]))
+
+        dst.commit()
+        rate = stats["rows"] / max(time.time() - start, 1e-9)
+        print(f"    {stats['rows']:,} filas ({rate:,.0f} filas/s)", end="\r")
+
+    print()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte TickData al esquema compacto TickDataCompact")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help=f"BD con TickData (default: {DB_PATH})")
+    parser.add_argument("--output", type=Path, help="BD destino (default: la misma que --db)")
+    parser.add_argument("--price-scale", type=int, default=PRICE_SCALE,
+                        help=f"Escala de precios enteros (default: {PRICE_SCALE})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--replace", action="store_true", help="Vaciar TickDataCompact si ya tiene filas")
+    parser.add_argument("--drop-old", action="store_true",
+                        help="Borrar TickData y hacer VACUUM al terminar (solo si el recuento coincide)")
+    args = parser.parse_args()
+
+    if not args.db.exists():
+        print(f"❌ Base de datos no encontrada: {args.db}")
+        sys.exit(1)
+
+    src = sqlite3.connect(str(args.db))
+    dst = sqlite3.connect(str(args.output)) if args.output else src
+    for conn in {id(src): src, id(dst): dst}.values():
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -64000")
+
+    if not src.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='TickData'").fetchone():
+        print("❌ Tabla TickData no existe")
+        sys.exit(1)
+
+    create_compact_schema(dst)
+    existing = dst.execute(f"SELECT COUNT(*) FROM {COMPACT_TABLE}").fetchone()[0]
+    if existing:
+        if not args.replace:
+            print(f"❌ {COMPACT_TABLE} ya tiene {existing:,} filas (usa --replace)")
+            sys.exit(1)
+        dst.execute(f"DELETE FROM {COMPACT_TABLE}")
+        dst.commit()
+
+    old_size = table_size_bytes(src, "TickData")
+    print(f"📦 Convirtiendo TickData -> {COMPACT_TABLE} ({args.output or args.db})")
+    start = time.time()
+    stats = convert(src, dst, args.price_scale, args.batch_size)
+    elapsed = time.time() - start
+
+    total = src.execute("SELECT COUNT(*) FROM TickData").fetchone()[0]
+    compact = dst.execute(f"SELECT COUNT(*) FROM {COMPACT_TABLE}").fetchone()[0]
+    new_size = table_size_bytes(dst, COMPACT_TABLE)
+
+    print("=" * 60)
+    print(f"⏱️  Tiempo: {elapsed:.1f}s")
+    print(f"📝 Filas TickData: {total:,}")
+    print(f"💾 Filas {COMPACT_TABLE}: {compact:,}")
+    if stats["invalid"]:
+        print(f"⚠️  Timestamps ilegibles descartados: {stats['invalid']:,}")
+    if stats["inexact"]:
+        print(f"⚠️  Precios redondeados a 1/{args.price_scale}: {stats['inexact']:,}")
+    if old_size and new_size:
+        print(f"💿 Tamaño: {old_size / 1024 / 1024:.1f} MB -> {new_size / 1024 / 1024:.1f} MB "
+              f"({new_size / old_size:.0%})")
+    print("=" * 60)
+
+    if args.drop_old:
+        if compact != total:
+            print("❌ Los recuentos no coinciden, TickData no se borra")
+            sys.exit(1)
+        src.execute("DROP TABLE TickData")
+        src.commit()
+        src.execute("VACUUM")
+        print("🗑️  TickData borrada y BD compactada")
+
+    src.close()
+    if dst is not src:
+        dst.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Conversión de los CSV anuales de ticks
+======================================
+
+Lee data/ticks/*.csv.gz (timestamp,bid,ask,spread) y lo convierte a:
+
+- store:    ficheros columnar por día en data/ticks-store/ (lib/ticks_store.py)
+            + velas 1s..1d en data/ticks-store/candles/ (lib/ticks_candles.py)
+- seekable: los mismos .csv.gz reescritos como gzip multi-miembro (un bloque
+            por día) + data/ticks-index.json con byteOffset/byteLength
+            (lib/ticks_shards.py)
+
+Uso:
+    python scripts/convert_ticks.py
+    python scripts/convert_ticks.py --input data/ticks --output data/ticks-store
+    python scripts/convert_ticks.py --files XAUUSD_2024.csv.gz
+    python scripts/convert_ticks.py --format seekable
+    python scripts/convert_ticks.py --codec delta   # días en ticks.tkd (lib/ticks_codec.py)
+
+Requisitos:
+    pip install numpy
+"""
+
+import argparse
+import gzip
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.ticks_candles import RESOLUTIONS, CandleStore  # noqa: E402
+from lib.ticks_csv import block_timestamps_ms, iter_tick_blocks  # noqa: E402
+from lib.ticks_shards import (  # noqa: E402
+    INDEX_PATH,
+    ShardWriter,
+    load_index,
+    replace_file_entries,
+    save_index,
+)
+from lib.ticks_store import (  # noqa: E402
+    CODECS,
+    DEFAULT_SYMBOL,
+    STORE_DIR,
+    TickStore,
+    split_by_day,
+)
+
+TICKS_DIR = Path(__file__).resolve().parent.parent / "data" / "ticks"
+
+
+def write_day(store: TickStore, date: str, parts: list, written: set,
+              candles: CandleStore | None = None):
+    """
+    Escribe un día ordenado; si ya se escribió en esta ejecución lo fusiona
+
+    Con candles se genera además la pirámide de velas del día en la misma pasada.
+    """
+    ts = np.concatenate([p[0] for p in parts])
+    bid = np.concatenate([p[1] for p in parts])
+    ask = np.concatenate([p[2] for p in parts])
+
+    if date in written:
+        prev = store.load_day(date)
+        scale = store.price_scale
+        ts = np.concatenate((prev.ts, ts))
+        bid = np.concatenate((prev.bid / scale, bid))
+        ask = np.concatenate((prev.ask / scale, ask))
+
+    order = np.argsort(ts, kind="stable")
+    ts, bid, ask = ts[order], bid[order], ask[order]
+    store.write_day(date, ts, bid, ask, save_index=False)
+    if candles is not None:
+        candles.write_day(date, ts, bid, ask, save_index=False)
+    written.add(date)
+
+
+def convert_file(store: TickStore, file_path: Path, written: set,
+                 candles: CandleStore | None = None) -> tuple[int, int]:
+    """Convierte un .csv.gz al store. Devuelve (ticks, días)"""
+    print(f"  [Convirtiendo] {file_path.name}...")
+    total = 0
+    rejected = 0
+    days = 0
+    current_date = None
+    parts = []
+
+    for block in iter_tick_blocks(file_path):
+        ts, valid = block_timestamps_ms(block)
+        bid, ask = block.bid, block.ask
+        if not valid.all():
+            ts, bid, ask = ts[valid], bid[valid], ask[valid]
+        rejected += block.rejected + int(len(valid) - np.count_nonzero(valid))
+
+        for date, start, end in split_by_day(ts):
+            if date != current_date:
+                if parts:
+                    write_day(store, current_date, parts, written, candles)
+                    days += 1
+                current_date = date
+                parts = []
+            parts.append((ts[start:end], bid[start:end], ask[start:end]))
+            total += end - start
+
+    if parts:
+        write_day(store, current_date, parts, written, candles)
+        days += 1
+
+    print(f"    OK {total:,} ticks en {days} días ({rejected:,} líneas descartadas)")
+    return total, days
+
+
+def reshard_file(src: Path, dst: Path) -> list[dict]:
+    """
+    Reescribe un .csv.gz como gzip multi-miembro con un bloque por día
+
+    Las líneas se copian tal cual; las que no tienen fecha (corruptas) se
+    quedan en el bloque del día en curso.
+    """
+    print(f"  [Reescribiendo] {src.name} -> {dst}")
+    with gzip.open(src, "rt", encoding="utf-8", errors="ignore") as f, ShardWriter(dst) as writer:
+        current_date = None
+        lines: list[str] = []
+
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("timestamp"):
+                continue
+
+            date = line[:10] if line[4:5] == "-" and line[7:8] == "-" else current_date
+            if date != current_date and current_date is not None:
+                writer.write_day(current_date, lines)
+                lines = []
+            current_date = date
+            lines.append(line)
+
+        if lines:
+            writer.write_day(current_date, lines)
+
+    print(f"    OK {len(writer.entries)} días, {dst.stat().st_size / 1024 / 1024:.1f} MB")
+    return writer.entries
+
+
+def convert_seekable(files: list[Path], output_dir: Path, index_path: Path):
+    """Reescribe los shards como bloques por día y actualiza ticks-index.json"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index = load_index(index_path)
+    days = index["days"]
+    # Los shards reescritos pierden su firma: build_ticks_index.py los reescanea
+    signatures = {k: v for k, v in index.get("files", {}).items() if k not in {f.name for f in files}}
+
+    for i, file_path in enumerate(files, 1):
+        print(f"[{i}/{len(files)}] {file_path.name}")
+        entries = reshard_file(file_path, output_dir / file_path.name)
+        days = replace_file_entries(days, file_path.name, entries)
+
+    save_index(days, index_path, files=signatures)
+    print(f"Índice: {index_path} ({len(days)} días)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte ticks .csv.gz al tick store binario")
+    parser.add_argument("--input", type=Path, default=TICKS_DIR, help="Directorio con .csv.gz")
+    parser.add_argument("--format", choices=["store", "seekable"], default="store",
+                        help="store: tick store binario; seekable: .csv.gz por bloques diarios")
+    parser.add_argument("--output", type=Path,
+                        help="Directorio de salida (default: data/ticks-store o el de entrada)")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH,
+                        help="ticks-index.json a actualizar en modo seekable")
+    parser.add_argument("--symbol", default=DEFAULT_SYMBOL, help="Símbolo (default: XAUUSD)")
+    parser.add_argument("--files", nargs="*", help="Solo estos ficheros (por nombre)")
+    parser.add_argument("--codec", choices=CODECS, default="npy",
+                        help="Formato de cada día en el store: npy (mmap) o delta (ticks.tkd)")
+    parser.add_argument("--no-candles", action="store_true",
+                        help="No generar la pirámide de velas (candles/ junto al store)")
+    args = parser.parse_args()
+
+    files = sorted(args.input.glob("*.csv.gz"))
+    if args.files:
+        files = [f for f in files if f.name in set(args.files)]
+
+    if not files:
+        print(f"No hay archivos .csv.gz en {args.input}")
+        sys.exit(1)
+
+    if args.format == "seekable":
+        convert_seekable(files, args.output or args.input, args.index)
+        return
+
+    store = TickStore(args.output or STORE_DIR, symbol=args.symbol, codec=args.codec)
+    store.load_index()
+    candles = None
+    if not args.no_candles:
+        candles = CandleStore(store.root / "candles", symbol=args.symbol, price_scale=store.price_scale)
+        candles.load_index()
+    written: set[str] = set()
+
+    start = time.perf_counter()
+    total_ticks = 0
+    for i, file_path in enumerate(files, 1):
+        print(f"[{i}/{len(files)}] {file_path.name}")
+        ticks, _ = convert_file(store, file_path, written, candles)
+        total_ticks += ticks
+
+    store.save_index()
+    if candles is not None:
+        candles.save_index()
+    elapsed = time.perf_counter() - start
+    rate = total_ticks / elapsed if elapsed > 0 else 0
+    print(f"Completado: {total_ticks:,} ticks, {len(written)} días en {elapsed:.1f}s ({rate:,.0f} ticks/s)")
+    print(f"Índice: {store.index_path}")
+    if candles is not None:
+        print(f"Velas: {candles.index_path} ({', '.join(RESOLUTIONS)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,37 +4,55 @@ Script para descargar ticks históricos de MT5
 =============================================
 
 Descarga datos de ticks de XAUUSD (u otro símbolo) desde MetaTrader 5
-y los guarda en formato CSV comprimido para usar en el backtester.
+y los guarda en el tick store binario (data/ticks-store, ver
+lib/ticks_store.py): las columnas time_msc/bid/ask del array de MT5 se
+escriben por día en .npy sin pasar por texto ni por objetos por fila.
+
+El CSV comprimido (.csv.gz con un miembro gzip por día y rango de bytes en
+data/ticks-index.json) pasa a ser una exportación opcional (--format csv o
+both), generada con operaciones vectorizadas. En ambos casos cada semana
+descargada se escribe en cuanto llega (lib/ticks_writer.py), así que la
+memoria no crece con el periodo descargado.
 
 Uso:
     python scripts/download_mt5_ticks.py
     python scripts/download_mt5_ticks.py --symbol XAUUSD-STDc --days 365
     python scripts/download_mt5_ticks.py --start 2024-01-01 --end 2024-12-31
+    python scripts/download_mt5_ticks.py --sync   # solo días que faltan (cron diario)
+    python scripts/download_mt5_ticks.py --format both   # store + .csv.gz
+    python scripts/download_mt5_ticks.py --codec delta   # store con deltas enteros (.tkd)
 
 Requisitos:
-    pip install MetaTrader5 pandas tqdm
+    pip install MetaTrader5 numpy tqdm
 """
 
 import argparse
-import gzip
-import os
 import sys
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from pathlib import Path
 
 try:
     import MetaTrader5 as mt5
-    import pandas as pd
     from tqdm import tqdm
 except ImportError as e:
     print(f"Error: {e}")
-    print("Instala las dependencias: pip install MetaTrader5 pandas tqdm")
+    print("Instala las dependencias: pip install MetaTrader5 numpy tqdm")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.ticks_candles import CandleStore  # noqa: E402
+from lib.ticks_shards import INDEX_PATH, load_index  # noqa: E402
+from lib.ticks_store import CODECS, TickStore  # noqa: E402
+from lib.ticks_store import DEFAULT_SYMBOL as STORE_SYMBOL  # noqa: E402
+from lib.ticks_writer import StreamingShardWriter, StreamingStoreWriter, sync_ranges  # noqa: E402
+
 # Configuración por defecto
 DEFAULT_SYMBOL = "XAUUSD-STDc"
 DEFAULT_DAYS = 365
 OUTPUT_DIR = Path(__file__).parent.parent / "data" / "ticks"
+FORMATS = ("store", "csv", "both")
 
 
 def init_mt5():
@@ -46,17 +64,17 @@ def init_mt5():
     return True
 
 
-def download_ticks(symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
+def download_ticks(symbol: str, start: datetime, end: datetime):
     """
-    Descarga ticks históricos de MT5
+    Descarga ticks históricos de MT5 semana a semana
 
     Args:
         symbol: Símbolo a descargar (ej: XAUUSD-STDc)
         start: Fecha inicio
         end: Fecha fin
 
-    Returns:
-        DataFrame con columnas: timestamp, bid, ask, spread
+    Yields:
+        Array estructurado de MT5 (time_msc, bid, ask, ...) por cada semana
     """
     print(f"Descargando ticks de {symbol}")
     print(f"Período: {start.date()} a {end.date()}")
@@ -65,14 +83,13 @@ def download_ticks(symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
     symbol_info = mt5.symbol_info(symbol)
     if symbol_info is None:
         print(f"Error: Símbolo {symbol} no encontrado")
-        return pd.DataFrame()
+        return
 
     # Activar símbolo en Market Watch
     if not symbol_info.visible:
         mt5.symbol_select(symbol, True)
 
     # Descargar ticks por chunks (MT5 tiene límite de ticks por petición)
-    all_ticks = []
     current_start = start
     chunk_size = timedelta(days=7)  # Descargar semana a semana
 
@@ -90,76 +107,101 @@ def download_ticks(symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
             )
 
             if ticks is not None and len(ticks) > 0:
-                all_ticks.append(ticks)
+                yield ticks
 
             days_in_chunk = (current_end - current_start).days
             pbar.update(days_in_chunk)
             current_start = current_end
 
-    if not all_ticks:
-        print("No se descargaron ticks")
-        return pd.DataFrame()
-
-    # Combinar todos los chunks
-    import numpy as np
-    all_ticks_np = np.concatenate(all_ticks)
-
-    # Convertir a DataFrame
-    df = pd.DataFrame(all_ticks_np)
-
-    # Procesar columnas
-    df['timestamp'] = pd.to_datetime(df['time_msc'], unit='ms')
-    df['spread'] = (df['ask'] - df['bid']) * 100  # Spread en pips (asumiendo 2 decimales)
-
-    # Seleccionar columnas finales
-    df = df[['timestamp', 'bid', 'ask', 'spread']]
 
-    print(f"Total ticks descargados: {len(df):,}")
-    print(f"Rango de precios: {df['bid'].min():.2f} - {df['bid'].max():.2f}")
+def download_ranges(symbol: str, ranges):
+    """Encadena download_ticks sobre varios rangos de días (inclusivos)"""
+    for first_day, last_day in ranges:
+        start = datetime.combine(first_day, datetime.min.time())
+        # Hasta el último ms del día: el límite de copy_ticks_range es inclusivo
+        end = datetime.combine(last_day + timedelta(days=1), datetime.min.time()) - timedelta(milliseconds=1)
+        yield from download_ticks(symbol, start, end)
 
-    return df
 
-
-def save_ticks(df: pd.DataFrame, symbol: str, start: datetime, end: datetime):
+def plan_sync(symbol: str, start: datetime, end: datetime, fmt: str = "store",
+              store_symbol: str = STORE_SYMBOL) -> list:
     """
-    Guarda ticks en CSV comprimido (optimizado con pandas batch)
+    Rangos que faltan para este símbolo
 
-    Args:
-        df: DataFrame con ticks
-        symbol: Símbolo
-        start: Fecha inicio
-        end: Fecha fin
+    Con el store se consulta su index.json; con CSV, los shards del símbolo
+    en ticks-index.json. Con both basta con que falte en uno de los dos.
     """
-    # Crear directorio si no existe
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Agrupar por año para archivos más manejables
-    df['year'] = df['timestamp'].dt.year
-    years = df['year'].unique()
-
-    for year in sorted(years):
-        year_df = df[df['year'] == year].drop(columns=['year'])
-
-        filename = f"{symbol.replace('-', '')}_{year}.csv.gz"
-        filepath = OUTPUT_DIR / filename
-
-        print(f"Guardando {len(year_df):,} ticks en: {filepath}")
+    indexed_sets = []
+    if fmt in ("store", "both"):
+        indexed_sets.append(set(TickStore(symbol=store_symbol).days()))
+    if fmt in ("csv", "both"):
+        prefix = f"{symbol.replace('-', '')}_"
+        indexed_sets.append({d["date"] for d in load_index(INDEX_PATH)["days"] if d["file"].startswith(prefix)})
+    indexed = sorted(set.intersection(*indexed_sets))
+    ranges = sync_ranges(indexed, start.date(), end.date())
+
+    print(f"Días en el índice: {len(set(indexed))}")
+    for first_day, last_day in ranges:
+        print(f"  Pendiente: {first_day} a {last_day}")
+    return ranges
+
+
+def save_ticks(chunks, symbol: str, merge: bool = False, candles: bool = False,
+               fmt: str = "store", store_symbol: str = STORE_SYMBOL, codec: str = "npy") -> int:
+    """
+    Guarda los ticks en el tick store y/o en CSV comprimido
 
-        # Formatear timestamp como ISO string
-        year_df['timestamp'] = year_df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%S.%f').str.rstrip('0').str.rstrip('.')
+    Cada chunk se escribe en cuanto llega; solo se retiene en memoria el
+    chunk actual y el día que todavía puede continuar en el siguiente.
 
-        # Guardar con pandas (mucho más rápido que iterrows)
-        year_df.to_csv(
-            filepath,
-            index=False,
-            compression='gzip',
-            encoding='utf-8',
-            float_format='%.5f'
-        )
+    Args:
+        chunks: Iterable de arrays estructurados de MT5
+        symbol: Símbolo de MT5 (da nombre a los .csv.gz)
+        merge: CSV: intercalar con los días ya guardados en vez de sobrescribir
+            (el store siempre reemplaza solo los días descargados)
+        candles: Generar también la pirámide de velas de cada día
+        fmt: "store", "csv" o "both"
+        store_symbol: Símbolo lógico del store y de las velas (el mismo que
+            usa convert_ticks.py)
+        codec: Formato de los días en el store ("npy" o "delta")
 
-        # Estadísticas del archivo
-        file_size = filepath.stat().st_size
-        print(f"Archivo creado: {file_size / 1024 / 1024:.1f} MB")
+    Returns:
+        Total de ticks guardados
+    """
+    min_bid = max_bid = None
+
+    candle_store = CandleStore(symbol=store_symbol) if candles else None
+    with ExitStack() as stack:
+        # Las velas se generan una sola vez aunque se escriban los dos formatos
+        writers = []
+        if fmt in ("store", "both"):
+            store = TickStore(symbol=store_symbol, codec=codec)
+            writers.append(stack.enter_context(StreamingStoreWriter(store, candles=candle_store)))
+        if fmt in ("csv", "both"):
+            writers.append(stack.enter_context(StreamingShardWriter(
+                OUTPUT_DIR, symbol.replace('-', ''), merge=merge,
+                candles=candle_store if fmt == "csv" else None,
+            )))
+
+        for ticks in chunks:
+            bid = ticks['bid']
+            for writer in writers:
+                writer.write_chunk(ticks['time_msc'], bid, ticks['ask'])
+            min_bid = bid.min() if min_bid is None else min(min_bid, bid.min())
+            max_bid = bid.max() if max_bid is None else max(max_bid, bid.max())
+
+    total = writers[0].total_ticks
+    if total:
+        print(f"Total ticks guardados: {total:,}")
+        print(f"Rango de precios: {min_bid:.2f} - {max_bid:.2f}")
+        for writer in writers:
+            if isinstance(writer, StreamingStoreWriter):
+                print(f"Tick store actualizado: {writer.store.index_path}")
+            else:
+                print(f"Índice actualizado: {INDEX_PATH}")
+        if candle_store is not None:
+            print(f"Velas actualizadas: {candle_store.index_path}")
+    return total
 
 
 def main():
@@ -185,6 +227,34 @@ def main():
         "--end",
         help="Fecha fin (YYYY-MM-DD)"
     )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Descargar solo los días que faltan en el índice (y el último, "
+             "que puede estar incompleto) y fusionarlos con los shards existentes"
+    )
+    parser.add_argument(
+        "--candles",
+        action="store_true",
+        help="Generar velas 1s/1m/5m/15m/1h/1d de cada día (data/ticks-store/candles)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="store",
+        help="store: tick store binario (default); csv: .csv.gz por año; both: ambos"
+    )
+    parser.add_argument(
+        "--codec",
+        choices=CODECS,
+        default="npy",
+        help="Formato de cada día en el store: npy (mmap) o delta (ticks.tkd, más compacto)"
+    )
+    parser.add_argument(
+        "--store-symbol",
+        default=STORE_SYMBOL,
+        help=f"Símbolo lógico en el tick store y las velas (default: {STORE_SYMBOL})"
+    )
 
     args = parser.parse_args()
 
@@ -204,16 +274,23 @@ def main():
         sys.exit(1)
 
     try:
-        # Descargar ticks
-        df = download_ticks(args.symbol, start_date, end_date)
-
-        if df.empty:
+        if args.sync:
+            ranges = plan_sync(args.symbol, start_date, end_date, args.format, args.store_symbol)
+            if not ranges:
+                print("Índice al día, nada que descargar")
+                return
+            saved = save_ticks(download_ranges(args.symbol, ranges), args.symbol, merge=True,
+                               candles=args.candles, fmt=args.format, store_symbol=args.store_symbol,
+                               codec=args.codec)
+            if saved == 0:
+                print("MT5 no tiene ticks nuevos para los días pendientes")
+        # Descargar y guardar en streaming
+        elif save_ticks(download_ticks(args.symbol, start_date, end_date), args.symbol,
+                        candles=args.candles, fmt=args.format, store_symbol=args.store_symbol,
+                        codec=args.codec) == 0:
             print("No se obtuvieron datos")
             sys.exit(1)
 
-        # Guardar
-        save_ticks(df, args.symbol, start_date, end_date)
-
         print("Descarga completada")
 
     finally:
@@ -4,16 +4,60 @@
 Migracion de ticks de .gz a SQLite usando Python
 Mucho mas eficiente en memoria que Node.js/Prisma
 
-Uso: python scripts/migrate_ticks_python.py
+Uso:
+    python scripts/migrate_ticks_python.py
+    python scripts/migrate_ticks_python.py --workers 8
+    python scripts/migrate_ticks_python.py --vectorized --workers 8
+
+Con --vectorized el .gz se lee en bloques grandes que se parsean enteros a
+arrays numpy (lib/ticks_csv.py), con los mismos contadores de aceptados y
+rechazados que parse_tick_line.
+
+Con --workers N > 1 un pool de procesos descomprime y parsea los ficheros
+(o los bloques diarios si ticks-index.json tiene byteOffset) y envía lotes ya
+validados a un único escritor SQLite por una cola acotada.
+
+Con --bulk cada día se deduplica y ordena en memoria, se compara con una sola
+consulta con los ticks que ya hay en la BD para ese día y se añaden solo los
+nuevos (también los que rellenan huecos), en orden, sin INSERT OR IGNORE y con
+los índices de TickData recreados al final. Cada fichero va en una
+transacción: o entra entero o no entra, y los contadores de
+insertados/duplicados/ya en la BD/rechazados son exactos. Con --compact el
+destino es TickDataCompact (lib/ticks_sqlite.py).
 """
 
+import argparse
 import gzip
-import sqlite3
+import io
+import itertools
+import multiprocessing as mp
 import os
+import queue
+import sqlite3
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.ticks_shards import decompress_members, load_index, read_member_bytes  # noqa: E402
+
+try:
+    import numpy as np
+
+    from lib.ticks_csv import (
+        TickBlock,
+        block_timestamps_ms,
+        iter_text_blocks,
+        iter_tick_blocks,
+        parse_tick_block,
+    )
+    from lib.ticks_sqlite import COMPACT_TABLE, TickBulkLoader, create_compact_schema
+    from lib.ticks_store import split_by_day
+except ImportError:  # numpy no instalado: solo el parser por línea
+    iter_tick_blocks = None
+
 # Fix encoding para Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -23,6 +67,10 @@ TICKS_DIR = Path(r"C:\Users\guill\Projects\trading-bot-saas\data\ticks")
 DB_PATH = Path(r"C:\Users\guill\Projects\trading-bot-saas\prisma\dev.db")  # Ahora apunta a la BD correcta
 BATCH_SIZE = 50000  # Insertar cada 50k ticks
 SYMBOL = "XAUUSD"
+QUEUE_BATCHES = 16  # Lotes en vuelo entre workers y escritor (memoria acotada)
+POLL_S = 1.0  # Espera máxima en la cola antes de comprobar si los workers han fallado
+IDLE_TIMEOUT_S = 600  # Sin mensajes de los workers durante este tiempo: se aborta
+INSERT_SQL = "INSERT OR IGNORE INTO TickData (symbol, timestamp, bid, ask, spread) VALUES (?, ?, ?, ?, ?)"
 
 def parse_tick_line(line: str) -> tuple | None:
     """Parsea una línea del CSV de ticks"""
@@ -99,7 +147,386 @@ def process_gz_file(conn: sqlite3.Connection, cursor: sqlite3.Cursor,
     print(f"    ✅ Completado: {processed:,} procesados, {inserted:,} insertados")
     return processed, inserted
 
+def block_rows(block: "TickBlock"):
+    """Filas (symbol, timestamp, bid, ask, spread) de un bloque para executemany"""
+    return zip(
+        itertools.repeat(SYMBOL),
+        block.timestamp_strings(),
+        block.bid.tolist(),
+        block.ask.tolist(),
+        block.spread.tolist(),
+    )
+
+
+def process_gz_file_vectorized(conn: sqlite3.Connection, cursor: sqlite3.Cursor,
+                               file_path: Path) -> tuple[int, int]:
+    """Igual que process_gz_file pero parseando bloques enteros con numpy"""
+
+    print(f"  [Procesando] {file_path.name} (vectorizado)...")
+
+    processed = 0
+    inserted = 0
+    rejected = 0
+    pending: list = []
+    pending_len = 0
+
+    def flush():
+        nonlocal inserted, pending, pending_len
+        cursor.executemany(INSERT_SQL, itertools.chain.from_iterable(block_rows(b) for b in pending))
+        inserted += cursor.rowcount
+        conn.commit()
+        pending, pending_len = [], 0
+
+    for block in iter_tick_blocks(file_path):
+        processed += block.accepted
+        rejected += block.rejected
+        if block.accepted:
+            pending.append(block)
+            pending_len += block.accepted
+        if pending_len >= BATCH_SIZE:
+            flush()
+            print(f"    📊 {processed:,} procesados, {inserted:,} insertados")
+
+    if pending:
+        flush()
+
+    print(f"    ✅ Completado: {processed:,} procesados, {inserted:,} insertados, {rejected:,} rechazados")
+    return processed, inserted
+
+
+# ==================== CARGA MASIVA ====================
+
+
+def process_gz_file_bulk(loader: "TickBulkLoader", file_path: Path) -> dict:
+    """
+    Carga un .gz por días con TickBulkLoader en una única transacción
+
+    Returns:
+        Contadores exactos: processed (ticks aceptados por el parser),
+        inserted, duplicates (repetidos en el fichero), existing (ya en la
+        BD) y rejected (líneas descartadas)
+    """
+    print(f"  [Procesando] {file_path.name} (bulk)...")
+
+    stats = {"processed": 0, "inserted": 0, "duplicates": 0, "existing": 0, "rejected": 0}
+    current_date = None
+    parts: list = []
+
+    def flush():
+        cols = [np.concatenate([p[i] for p in parts]) for i in range(5)]
+        inserted, duplicates, existing = loader.load_day(current_date, *cols)
+        stats["inserted"] += inserted
+        stats["duplicates"] += duplicates
+        stats["existing"] += existing
+
+    try:
+        for block in iter_tick_blocks(file_path):
+            stats["rejected"] += block.rejected
+            ts, valid = block_timestamps_ms(block)
+            cols = (ts, block.bid, block.ask, block.spread, block.timestamps)
+            if not valid.all():
+                # Sin timestamp interpretable no hay clave: cuenta como rechazada
+                stats["rejected"] += int(len(valid) - np.count_nonzero(valid))
+                cols = tuple(c[valid] for c in cols)
+            stats["processed"] += len(cols[0])
+
+            for date, start, end in split_by_day(cols[0]):
+                if date != current_date:
+                    if parts:
+                        flush()
+                    current_date, parts = date, []
+                parts.append(tuple(c[start:end] for c in cols))
+
+        if parts:
+            flush()
+        loader.commit()
+    except BaseException:
+        loader.rollback()
+        raise
+
+    print(f"    ✅ Completado: {stats['processed']:,} procesados, {stats['inserted']:,} insertados, "
+          f"{stats['duplicates']:,} duplicados, {stats['existing']:,} ya en la BD, "
+          f"{stats['rejected']:,} rechazados")
+    return stats
+
+
+def migrate_bulk(conn: sqlite3.Connection, files: list[Path], compact: bool) -> tuple[int, int]:
+    """Carga masiva de todos los ficheros; los índices se recrean una vez al final"""
+    loader = TickBulkLoader(conn, SYMBOL, compact=compact)
+    print(f"\n⚙️  Modo bulk -> {loader.table}: {len(loader.ranges)} días ya en la BD")
+
+    dropped = loader.drop_indexes()
+    if dropped:
+        print(f"    Índices desactivados durante la carga: {', '.join(dropped)}")
+
+    totals = {"processed": 0, "inserted": 0, "duplicates": 0, "existing": 0, "rejected": 0}
+    try:
+        for i, file_path in enumerate(files, 1):
+            print(f"\n📄 [{i}/{len(files)}] {file_path.name}")
+            try:
+                stats = process_gz_file_bulk(loader, file_path)
+            except Exception as e:
+                print(f"    ❌ Error (fichero no cargado): {e}")
+                continue
+            for key in totals:
+                totals[key] += stats[key]
+    finally:
+        if dropped:
+            t0 = time.perf_counter()
+            loader.rebuild_indexes()
+            print(f"\n    Índices recreados en {time.perf_counter() - t0:.1f}s")
+
+    print(f"\n📈 Bulk: {totals['processed']:,} aceptados = {totals['inserted']:,} insertados "
+          f"+ {totals['duplicates']:,} duplicados + {totals['existing']:,} ya en la BD; "
+          f"{totals['rejected']:,} líneas rechazadas")
+    return totals["processed"], totals["inserted"]
+
+
+# ==================== MODO PARALELO ====================
+
+_batch_queue = None
+_vectorized = False
+
+
+def _init_worker(batch_queue, vectorized=False):
+    global _batch_queue, _vectorized
+    _batch_queue = batch_queue
+    _vectorized = vectorized
+
+
+def build_work_units(files: list[Path], index_path: Path) -> list[tuple]:
+    """
+    Unidades de trabajo: un bloque diario por entrada del índice si el shard
+    es seekable (byteOffset), o el fichero entero si no
+    """
+    days_by_file: dict[str, list[dict]] = {}
+    for entry in load_index(index_path)["days"]:
+        days_by_file.setdefault(entry["file"], []).append(entry)
+
+    units = []
+    for file_path in files:
+        entries = days_by_file.get(file_path.name, [])
+        size = file_path.stat().st_size
+        seekable = entries and all("byteOffset" in e for e in entries)
+        if seekable and max(e["byteOffset"] + e["byteLength"] for e in entries) <= size:
+            units.extend((str(file_path), e["byteOffset"], e["byteLength"]) for e in entries)
+        else:
+            units.append((str(file_path), None, None))
+    return units
+
+
+def _iter_unit_lines(path: str, offset: int | None, length: int | None):
+    if offset is None:
+        with gzip.open(path, 'rt', encoding='utf-8', errors='ignore') as f:
+            yield from f
+    else:
+        entry = {"byteOffset": offset, "byteLength": length}
+        raw = read_member_bytes(Path(path), entry)
+        # Mismo modo texto que gzip.open: corta en "\n" y normaliza "\r\n"/"\r" (splitlines
+        # cortaría además en \x0b, \x1c, \u2028...)
+        yield from io.TextIOWrapper(io.BytesIO(decompress_members(raw)), encoding='utf-8', errors='ignore')
+
+
+def _parse_unit_vectorized(path: str, offset: int | None, length: int | None, stats: dict, send):
+    # Lectura+descompresión (read_s) y parseo (parse_s) por separado, como en el modo por línea
+    t0 = time.perf_counter()
+    if offset is None:
+        stream = gzip.open(path, "rb")
+    else:
+        raw = read_member_bytes(Path(path), {"byteOffset": offset, "byteLength": length})
+        stream = io.BytesIO(decompress_members(raw))
+    stats["read_s"] += time.perf_counter() - t0
+
+    with stream:
+        texts = iter_text_blocks(stream)
+        while True:
+            t0 = time.perf_counter()
+            text = next(texts, None)
+            t1 = time.perf_counter()
+            stats["read_s"] += t1 - t0
+            if text is None:
+                break
+
+            block = parse_tick_block(text)
+            stats["processed"] += block.accepted
+            stats["rejected"] += block.rejected
+            rows = list(block_rows(block))
+            stats["parse_s"] += time.perf_counter() - t1
+            for i in range(0, len(rows), BATCH_SIZE):
+                send(rows[i:i + BATCH_SIZE])
+
+
+def parse_work_unit(unit: tuple) -> dict:
+    """Worker: descomprime y parsea una unidad, enviando lotes al escritor"""
+    path, offset, length = unit
+    stats = {"unit": unit, "processed": 0, "rejected": 0, "read_s": 0.0, "parse_s": 0.0,
+             "blocked_s": 0.0, "error": None}
+    batch = []
+
+    def flush(rows=None):
+        t0 = time.perf_counter()
+        _batch_queue.put(("batch", (unit, batch if rows is None else rows)))
+        stats["blocked_s"] += time.perf_counter() - t0
+
+    try:
+        if _vectorized:
+            _parse_unit_vectorized(path, offset, length, stats, flush)
+            _batch_queue.put(("done", stats))
+            return stats
+
+        lines = _iter_unit_lines(path, offset, length)
+        while True:
+            t0 = time.perf_counter()
+            line = next(lines, None)
+            t1 = time.perf_counter()
+            stats["read_s"] += t1 - t0
+            if line is None:
+                break
+
+            tick = parse_tick_line(line)
+            stats["parse_s"] += time.perf_counter() - t1
+            if tick:
+                batch.append(tick)
+                stats["processed"] += 1
+                if len(batch) >= BATCH_SIZE:
+                    flush()
+                    batch = []
+            elif line.strip() and not line.startswith("timestamp"):
+                stats["rejected"] += 1
+
+        if batch:
+            flush()
+    except Exception as e:
+        stats["error"] = f"{type(e).__name__}: {e}"
+
+    _batch_queue.put(("done", stats))
+    return stats
+
+
+def migrate_parallel(conn: sqlite3.Connection, cursor: sqlite3.Cursor, files: list[Path],
+                     workers: int, index_path: Path,
+                     queue_batches: int = QUEUE_BATCHES,
+                     vectorized: bool = False) -> tuple[int, int]:
+    """
+    Pool de workers (descompresión + parseo) -> cola acotada -> escritor SQLite
+
+    La memoria queda acotada a ~(queue_batches + workers) * BATCH_SIZE ticks.
+    Cada lote se confirma al escribirse, así que una unidad que falla a mitad
+    deja cargados sus lotes anteriores: el error informa de cuántos son.
+    """
+    units = build_work_units(files, index_path)
+    block_units = sum(1 for u in units if u[1] is not None)
+    print(f"\n⚙️  Modo paralelo: {workers} workers, {len(units)} unidades "
+          f"({block_units} bloques diarios, {len(units) - block_units} ficheros completos)")
+
+    ctx = mp.get_context("spawn")
+    batch_queue = ctx.Queue(maxsize=queue_batches)
+
+    processed = inserted = rejected = 0
+    write_s = wait_s = 0.0
+    done = 0
+    read_s = parse_s = blocked_s = 0.0
+    written: dict[tuple, list[int]] = {}  # unidad -> [procesados, insertados] ya confirmados
+    start = time.perf_counter()
+
+    with ctx.Pool(workers, initializer=_init_worker,
+                  initargs=(batch_queue, vectorized)) as pool:
+        result = pool.map_async(parse_work_unit, units, chunksize=1)
+        last_message = time.perf_counter()
+
+        while done < len(units):
+            t0 = time.perf_counter()
+            try:
+                kind, payload = batch_queue.get(timeout=POLL_S)
+            except queue.Empty:
+                wait_s += time.perf_counter() - t0
+                # Un worker que falla fuera de parse_work_unit no envía "done": se ve en el AsyncResult
+                if result.ready() and not result.successful():
+                    try:
+                        result.get()
+                    except Exception as e:
+                        print(f"    ❌ Error en los workers: {type(e).__name__}: {e}")
+                    break
+                if time.perf_counter() - last_message > IDLE_TIMEOUT_S:
+                    print("    ❌ Timeout esperando a los workers")
+                    break
+                continue
+            last_message = time.perf_counter()
+            wait_s += last_message - t0
+
+            if kind == "done":
+                done += 1
+                read_s += payload["read_s"]
+                parse_s += payload["parse_s"]
+                blocked_s += payload["blocked_s"]
+                rejected += payload["rejected"]
+                unit_processed, unit_inserted = written.pop(payload["unit"], (0, 0))
+                if payload["error"]:
+                    partial = (f" (cargada a medias: {unit_processed:,} procesados, "
+                               f"{unit_inserted:,} insertados antes del fallo)" if unit_processed else "")
+                    print(f"    ❌ Error en {payload['unit']}: {payload['error']}{partial}")
+                continue
+
+            unit, rows = payload
+            t0 = time.perf_counter()
+            cursor.executemany(INSERT_SQL, rows)
+            inserted += cursor.rowcount
+            conn.commit()
+            write_s += time.perf_counter() - t0
+            processed += len(rows)
+            counts = written.setdefault(unit, [0, 0])
+            counts[0] += len(rows)
+            counts[1] += cursor.rowcount
+
+            if processed // 500000 != (processed - len(rows)) // 500000:
+                elapsed = time.perf_counter() - start
+                print(f"    📊 {processed:,} procesados, {inserted:,} insertados "
+                      f"({processed / elapsed:,.0f} ticks/s) [{done}/{len(units)} unidades]")
+
+    elapsed = time.perf_counter() - start
+
+    def rate(n, secs):
+        return f"{n / secs:,.0f} ticks/s" if secs > 0 else "-"
+
+    print("\n📈 Throughput por etapa:")
+    print(f"   Lectura+descompresión: {read_s:.1f}s CPU en workers ({rate(processed, read_s)})")
+    print(f"   Parseo+validación:     {parse_s:.1f}s CPU en workers ({rate(processed, parse_s)})")
+    print(f"   Escritura SQLite:      {write_s:.1f}s ({rate(processed, write_s)})")
+    print(f"   Escritor esperando:    {wait_s:.1f}s | Workers bloqueados en cola: {blocked_s:.1f}s")
+    print(f"   Total:                 {elapsed:.1f}s ({rate(processed, elapsed)}), "
+          f"{rejected:,} líneas rechazadas")
+
+    return processed, inserted
+
+
 def main():
+    global TICKS_DIR, DB_PATH
+
+    parser = argparse.ArgumentParser(description="Migración de ticks .gz a SQLite")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos de descompresión/parseo (1 = modo serie)")
+    parser.add_argument("--ticks-dir", type=Path, default=TICKS_DIR, help="Directorio con .csv.gz")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Base de datos SQLite")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="Parser por bloques con numpy (lib/ticks_csv.py)")
+    parser.add_argument("--queue-batches", type=int, default=QUEUE_BATCHES,
+                        help=f"Lotes máximos en cola (default: {QUEUE_BATCHES})")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Carga masiva ordenada por días, sin INSERT OR IGNORE y con recuentos exactos")
+    parser.add_argument("--compact", action="store_true",
+                        help="Con --bulk: cargar en TickDataCompact en lugar de TickData")
+    args = parser.parse_args()
+    if (args.vectorized or args.bulk) and iter_tick_blocks is None:
+        print("❌ --vectorized/--bulk necesitan numpy: pip install numpy")
+        sys.exit(1)
+    if args.compact and not args.bulk:
+        print("❌ --compact solo está disponible con --bulk")
+        sys.exit(1)
+    if args.bulk and args.workers > 1:
+        print("⚠️  --bulk carga en serie (una transacción por fichero); se ignora --workers")
+        args.workers = 1
+    TICKS_DIR, DB_PATH = args.ticks_dir, args.db
+
     print("=" * 60)
     print("MIGRACIÓN DE TICKS: .gz → SQLite (Python)")
     print("=" * 60)
@@ -129,15 +556,18 @@ def main():
     conn = sqlite3.connect(str(DB_PATH))
     cursor = conn.cursor()
 
-    # Verificar tabla existe
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='TickData'")
+    # Tabla destino (TickDataCompact se crea si no existe)
+    table = COMPACT_TABLE if args.compact else "TickData"
+    if args.compact:
+        create_compact_schema(conn)
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
     if not cursor.fetchone():
-        print("❌ Tabla TickData no existe. Ejecuta: npx prisma migrate dev")
+        print(f"❌ Tabla {table} no existe. Ejecuta: npx prisma migrate dev")
         conn.close()
         sys.exit(1)
 
     # Contar ticks actuales
-    cursor.execute("SELECT COUNT(*) FROM TickData")
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
     existing = cursor.fetchone()[0]
     print(f"\n📊 Ticks existentes en BD: {existing:,}")
 
@@ -152,15 +582,26 @@ def main():
     total_processed = 0
     total_inserted = 0
 
-    for i, file_path in enumerate(files, 1):
-        print(f"\n📄 [{i}/{len(files)}] {file_path.name}")
-
-        try:
-            processed, inserted = process_gz_file(conn, cursor, file_path)
-            total_processed += processed
-            total_inserted += inserted
-        except Exception as e:
-            print(f"    ❌ Error: {e}")
+    if args.bulk:
+        total_processed, total_inserted = migrate_bulk(conn, files, args.compact)
+    elif args.workers > 1:
+        total_processed, total_inserted = migrate_parallel(
+            conn, cursor, files, args.workers, TICKS_DIR.parent / "ticks-index.json",
+            args.queue_batches, args.vectorized
+        )
+    else:
+        for i, file_path in enumerate(files, 1):
+            print(f"\n📄 [{i}/{len(files)}] {file_path.name}")
+
+            try:
+                if args.vectorized:
+                    processed, inserted = process_gz_file_vectorized(conn, cursor, file_path)
+                else:
+                    processed, inserted = process_gz_file(conn, cursor, file_path)
+                total_processed += processed
+                total_inserted += inserted
+            except Exception as e:
+                print(f"    ❌ Error: {e}")
 
     # Restaurar configuración de SQLite
     cursor.execute("PRAGMA synchronous = NORMAL")
@@ -172,11 +613,12 @@ def main():
     # Contar total final
     conn = sqlite3.connect(str(DB_PATH))
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM TickData")
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
     final_count = cursor.fetchone()[0]
 
     # Obtener rango de fechas
-    cursor.execute("SELECT MIN(timestamp), MAX(timestamp) FROM TickData")
+    ts_column = "ts" if args.compact else "timestamp"
+    cursor.execute(f"SELECT MIN({ts_column}), MAX({ts_column}) FROM {table}")
     date_range = cursor.fetchone()
     conn.close()
 
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Barrido de parámetros del grid con poda temprana
+================================================
+
+Genera configuraciones a partir de rangos de pipsDistance, maxLevels,
+takeProfitPips, lotajeBase, numOrders y stopLossPips (0 = sin stop loss) y
+las simula con ticks reales en --workers procesos (lib/backtest_sweep.py):
+
+- grid:     todas las combinaciones de los rangos.
+- random:   --samples combinaciones al azar (--seed).
+- halving:  successive halving; tras cada etapa solo sigue la mejor 1/--eta
+            parte según --rank-by (sobre el grid o sobre --samples al azar).
+
+Las etapas acaban en --prune-after, --prune-after x --eta, ... señales y la
+última en todas. Al final de cada etapa se descartan las configuraciones
+con drawdown mayor que --max-dd y, con --prune-margin, las dominadas (otra
+tiene igual o menos drawdown y al menos ese profit más).
+
+Cada configuración terminada (o descartada) se muestra en cuanto se conoce
+con su puesto provisional y se añade a <results-dir>/sweep.csv; al final se
+escribe la tabla de las --top mejores en <results-dir>/ranking.md.
+
+Con el tick store los workers leen las ventanas de la caché de ticks
+compartida (lib/ticks_cache.py, hasta --tick-cache-mb) en lugar de una
+copia; sus aciertos y expulsiones se muestran al final.
+
+Con --decimation N todo el barrido usa un solo nivel diezmado
+(lib/ticks_store.py): el más grueso, hasta N puntos, por debajo del menor
+pipsDistance del barrido, para que la poda compare todas las
+configuraciones con los mismos ticks. El resultado es APROXIMADO y el
+ranking lo indica.
+
+Uso:
+    python scripts/sweep_parameters.py --search grid --max-dd 1500
+    python scripts/sweep_parameters.py --search random --samples 2000 --seed 1 --prune-margin 200
+    python scripts/sweep_parameters.py --search halving --eta 3 --rank-by calmarRatio
+    python scripts/sweep_parameters.py --pips-distance 5:30:5 --take-profit-pips 5,10,20 --stop-loss-pips 0,100
+    python scripts/sweep_parameters.py --search halving --decimation 10
+
+Requisitos:
+    pip install numpy
+"""
+
+import argparse
+import bisect
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.backtest_parallel import DEFAULT_CHUNK  # noqa: E402
+from lib.backtest_sweep import (  # noqa: E402
+    COMPLETE,
+    INTEGER_PARAMETERS,
+    PARAMETERS,
+    RANK_METRICS,
+    grid_space,
+    parse_range,
+    random_space,
+    rank_value,
+    run_sweep,
+    space_size,
+    stage_stops,
+    sweep_config,
+)
+from lib.parsers.ticks_loader import hasTicksData, open_tick_source  # noqa: E402
+from lib.ticks_cache import DEFAULT_BUDGET_MB as TICK_CACHE_MB  # noqa: E402
+from lib.ticks_shards import INDEX_PATH, TICKS_DIR  # noqa: E402
+from lib.ticks_store import DECIMATION_LEVELS  # noqa: E402
+from run_backtests_direct import (  # noqa: E402
+    INITIAL_CAPITAL,
+    SIGNAL_FILE,
+    approx_label,
+    level_windows,
+    load_signals,
+    load_windows,
+    open_tick_cache,
+    print_tick_cache,
+    print_workers,
+    strategy_levels,
+)
+
+RESULTS_DIR = Path("sweep_results")
+SWEEP_GROUP = 16  # estrategias por unidad (más que en run_backtests_direct: hay muchas más)
+
+# Rangos por defecto: alrededor de las estrategias de run_backtests_direct.py
+DEFAULT_RANGES = {
+    "pipsDistance": "5:30:5",
+    "maxLevels": "10:40:10",
+    "takeProfitPips": "5:30:5",
+    "lotajeBase": "0.03",
+    "numOrders": "1:3",
+    "stopLossPips": "0,50,100,200",
+}
+
+CSV_COLUMNS = ["name", "status", "signals", *PARAMETERS, "totalProfit", "totalTrades", "maxDrawdown",
+               "winRate", "profitFactor", "sharpeRatio", "sortinoRatio", "calmarRatio", "expectancy"]
+
+
+def option_name(parameter: str) -> str:
+    """pipsDistance -> pips-distance"""
+    return "".join(f"-{c.lower()}" if c.isupper() else c for c in parameter)
+
+
+def add_range_arguments(parser: argparse.ArgumentParser):
+    """--pips-distance, --max-levels, ... (también los usa scripts/walk_forward.py)"""
+    for parameter in PARAMETERS:
+        parser.add_argument(f"--{option_name(parameter)}", dest=parameter, default=DEFAULT_RANGES[parameter],
+                            help=f"Rango de {parameter}: inicio:fin[:paso] o a,b,c "
+                                 f"(por defecto {DEFAULT_RANGES[parameter]})")
+
+
+def parse_ranges(args) -> dict[str, list]:
+    return {p: parse_range(getattr(args, p), integer=p in INTEGER_PARAMETERS) for p in PARAMETERS}
+
+
+class RankedTable:
+    """Entradas del barrido según llegan: puesto provisional y sweep.csv"""
+
+    def __init__(self, csv_path: Path, rank_by: str, total: int):
+        self.rank_by = rank_by
+        self.total = total
+        self.keys: list[tuple] = []  # rank_value de las completas, ordenadas
+        self.done = 0
+        self.file = open(csv_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_COLUMNS)
+
+    def add(self, entry):
+        self.done += 1
+        config, result = entry.config, entry.result
+        if entry.status == COMPLETE:
+            key = rank_value(result, self.rank_by)
+            bisect.insort(self.keys, key)
+            place = f"puesto {bisect.bisect_left(self.keys, key) + 1}"
+        else:
+            place = f"descartada ({entry.status})"
+        print(f"  [{self.done}/{self.total}] {config.strategyName}: {entry.signals} señales, "
+              f"Profit: ${result.totalProfit:.2f}, DD: ${result.maxDrawdown:.2f}, "
+              f"{self.rank_by}: {getattr(result, self.rank_by):.4g} -> {place}", flush=True)
+        self.writer.writerow([
+            config.strategyName, entry.status, entry.signals,
+            config.pipsDistance, config.maxLevels, config.takeProfitPips, config.lotajeBase, config.numOrders,
+            config.stopLossPips, result.totalProfit, result.totalTrades, result.maxDrawdown, result.winRate,
+            result.profitFactor, result.sharpeRatio, result.sortinoRatio, result.calmarRatio, result.expectancy,
+        ])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def write_ranking(path: Path, entries: list, top: int, rank_by: str, n_signals: int, level: int = 0):
+    complete = [e for e in entries if e.status == COMPLETE][:top]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# Barrido de parámetros: top {len(complete)} por {rank_by} ({n_signals} señales)\n\n")
+        if level:
+            f.write(f"Simulado con ticks diezmados a {level} puntos: resultados APROXIMADOS.\n\n")
+        f.write(f"| Pos | Configuración | Profit | Trades | Max DD | {rank_by} |\n")
+        f.write("|-----|---------------|--------|--------|--------|--------|\n")
+        for i, e in enumerate(complete, 1):
+            r = e.result
+            f.write(f"| {i} | {e.config.strategyName} | ${r.totalProfit:.2f} | {r.totalTrades} | "
+                    f"${r.maxDrawdown:.2f} | {getattr(r, rank_by):.4g} |\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de parámetros del grid con poda temprana")
+    parser.add_argument("--signals", default=SIGNAL_FILE, help="CSV de señales")
+    parser.add_argument("--limit", type=int, default=0, help="Máximo de señales (0 = todas)")
+    parser.add_argument("--source", choices=["auto", "store", "shards"], default="auto",
+                        help="Origen de los ticks (auto = tick store si existe)")
+    parser.add_argument("--store", type=Path, default=None, help="Directorio del tick store")
+    parser.add_argument("--ticks-dir", type=Path, default=TICKS_DIR, help="Directorio con los .csv.gz")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="ticks-index.json de los .csv.gz")
+    add_range_arguments(parser)
+    parser.add_argument("--search", choices=["grid", "random", "halving"], default="grid", help="Tipo de búsqueda")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="Configuraciones al azar (obligatorio con random; con halving, en vez del grid)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de random")
+    parser.add_argument("--prune-after", type=int, default=10, help="Señales de la primera etapa")
+    parser.add_argument("--eta", type=float, default=3, help="Crecimiento de las etapas y 1/fracción de halving")
+    parser.add_argument("--max-dd", type=float, default=None, help="Descartar con drawdown mayor ($)")
+    parser.add_argument("--prune-margin", type=float, default=None,
+                        help="Descartar las dominadas por al menos este profit ($)")
+    parser.add_argument("--rank-by", choices=RANK_METRICS, default="totalProfit", help="Métrica del ranking")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos (por defecto todos)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="Señales por unidad de trabajo")
+    parser.add_argument("--group", type=int, default=SWEEP_GROUP, help="Estrategias por unidad de trabajo")
+    parser.add_argument("--tick-cache-mb", type=int, default=TICK_CACHE_MB,
+                        help="Con el tick store y --workers > 1: memoria de la caché de días compartida por "
+                             "los workers (0 = copiar las ventanas a memoria compartida)")
+    parser.add_argument("--top", type=int, default=20, help="Filas del ranking final")
+    parser.add_argument("--results-dir", type=Path, default=RESULTS_DIR, help="Directorio de resultados")
+    parser.add_argument("--decimation", type=int, choices=(0, *DECIMATION_LEVELS), default=0, metavar="N",
+                        help="APROXIMADO: nivel diezmado más grueso (puntos, hasta N) por debajo del menor "
+                             "pipsDistance; cambia trades, profit y drawdown (0 = ticks completos)")
+    args = parser.parse_args()
+
+    ranges = parse_ranges(args)
+    if args.search == "random" and not args.samples:
+        parser.error("--search random necesita --samples")
+    if args.samples:
+        space = random_space(ranges, args.samples, args.seed)
+    else:
+        space = grid_space(ranges)
+    configs = [sweep_config(params, INITIAL_CAPITAL) for params in space]
+
+    print("=== BARRIDO DE PARÁMETROS ===")
+    for p in PARAMETERS:
+        print(f"  {p}: {', '.join(f'{v:g}' for v in ranges[p])}")
+    print(f"Búsqueda: {args.search}, {len(configs):,} configuraciones (de {space_size(ranges):,} combinaciones)")
+    print()
+
+    signals = load_signals(args.signals, args.limit)
+    source = open_tick_source(args.source, args.store, args.ticks_dir, args.index)
+    if not hasTicksData(source):
+        print("No hay ticks (ni tick store ni data/ticks indexado)")
+        sys.exit(1)
+    start = time.perf_counter()
+    replay = load_windows(signals, source)
+    if not replay:
+        print("Ninguna señal tiene ticks")
+        sys.exit(1)
+    print(f"Ventanas: {len(replay)} señales con ticks, {sum(len(w) for _, w in replay):,} ticks "
+          f"({time.perf_counter() - start:.2f}s)")
+    level = min(strategy_levels([vars(c) for c in configs], args.decimation), default=0)
+    if level:
+        full_ticks = sum(len(w) for _, w in replay)
+        replay = level_windows(replay, source, level)
+        level_ticks = sum(len(w) for _, w in replay)
+        print(f"Diezmado d{level} (RESULTADOS APROXIMADOS): {level_ticks:,} ticks "
+              f"({level_ticks / full_ticks if full_ticks else 0:.1%})")
+    elif args.decimation:
+        print("Diezmado: ningún nivel queda por debajo del menor pipsDistance; se usan todos los ticks")
+
+    stops = stage_stops(len(replay), args.prune_after, args.eta)
+    print(f"Etapas (señales): {', '.join(map(str, stops))}; {args.workers} worker(s)")
+    print()
+
+    args.results_dir.mkdir(parents=True, exist_ok=True)
+    table = RankedTable(args.results_dir / "sweep.csv", args.rank_by, len(configs))
+    tick_cache = open_tick_cache(source, args.workers, args.tick_cache_mb)
+    start = time.perf_counter()
+    try:
+        entries, unit_stats = run_sweep(
+            configs, replay, stops, args.workers,
+            max_drawdown=args.max_dd, margin=args.prune_margin,
+            keep=1 / args.eta if args.search == "halving" else None, rank_by=args.rank_by,
+            chunk_size=args.chunk, group_size=args.group, on_entry=table.add,
+            tick_cache=tick_cache, level=level)
+        tick_stats = tick_cache.stats() if tick_cache else None
+    finally:
+        table.close()
+        if tick_cache:
+            tick_cache.shutdown()
+    elapsed = time.perf_counter() - start
+    simulated = sum(s.unit.stop - s.unit.start for s in unit_stats for _ in s.unit.strategies)
+    total_ticks = sum(s.ticks for s in unit_stats)
+
+    print()
+    print("=== TIEMPOS ===")
+    print(f"Simulación: {elapsed:.2f}s, {simulated:,} de {len(configs) * len(replay):,} señales x configuración "
+          f"({total_ticks / elapsed if elapsed else 0:,.0f} ticks/s)")
+    print_workers(unit_stats)
+    if tick_stats:
+        print_tick_cache(tick_stats)
+
+    print()
+    print(f"=== TOP {args.top} POR {args.rank_by}{approx_label(level)} ===")
+    for i, e in enumerate([e for e in entries if e.status == COMPLETE][:args.top], 1):
+        r = e.result
+        print(f"{i:3d}. {e.config.strategyName:34s} | ${r.totalProfit:9.2f} | {r.totalTrades:6d} | "
+              f"${r.maxDrawdown:8.2f} | {getattr(r, args.rank_by):.4g}")
+    pruned = [e for e in entries if e.status != COMPLETE]
+    if pruned:
+        by_status = {}
+        for e in pruned:
+            by_status[e.status] = by_status.get(e.status, 0) + 1
+        print(f"Descartadas: {', '.join(f'{n} {status}' for status, n in by_status.items())}")
+
+    write_ranking(args.results_dir / "ranking.md", entries, args.top, args.rank_by, len(replay), level)
+    print()
+    print(f"Resultados guardados en: {args.results_dir}")
+
+
+if __name__ == "__main__":
+    main()
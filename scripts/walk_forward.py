@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Walk-forward de las estrategias con señales intradía
+====================================================
+
+Optimiza en --train-months meses de señales, evalúa las --top mejores (por
+--rank-by) en el mes siguiente y avanza --test-months meses
+(lib/backtest_walkforward.py). Con --anchored se entrena siempre desde el
+primer mes.
+
+Las configuraciones son las de run_backtests_direct.py (--search
+strategies) o las de los rangos de scripts/sweep_parameters.py (--search
+grid o random). Cada señal se simula una sola vez por configuración y se
+reutiliza en todas las ventanas que la contienen; con --cache además se
+guardan en la caché de resultados (lib/backtest_cache.py) para la próxima
+ejecución. La simulación y la evaluación de ventanas se reparten en
+--workers procesos.
+
+Escribe una fila por ventana y configuración elegida en
+<results-dir>/walk-forward.csv y el resumen en <results-dir>/walk-forward.md,
+con el resultado fuera de muestra de encadenar la mejor de cada ventana.
+
+Uso:
+    python scripts/walk_forward.py --train-months 3
+    python scripts/walk_forward.py --train-months 6 --anchored --top 5 --rank-by calmarRatio
+    python scripts/walk_forward.py --search random --samples 500 --seed 1 --cache
+
+Requisitos:
+    pip install numpy
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sweep_parameters import add_range_arguments, parse_ranges  # noqa: E402
+
+from lib.backtest_cache import CACHE_PATH, DEFAULT_BUDGET_MB, ResultCache, tick_version  # noqa: E402
+from lib.backtest_parallel import DEFAULT_CHUNK  # noqa: E402
+from lib.backtest_sweep import RANK_METRICS, grid_space, random_space, sweep_config  # noqa: E402
+from lib.backtest_walkforward import plan_windows, run_walk_forward, signal_months  # noqa: E402
+from lib.parsers.ticks_loader import hasTicksData, open_tick_source  # noqa: E402
+from lib.ticks_shards import INDEX_PATH, TICKS_DIR  # noqa: E402
+from run_backtests_direct import (  # noqa: E402
+    INITIAL_CAPITAL,
+    SIGNAL_FILE,
+    STRATEGIES,
+    load_signals,
+    load_windows,
+    make_config,
+    print_cache,
+    print_workers,
+)
+
+RESULTS_DIR = Path("walkforward_results")
+
+CSV_COLUMNS = ["train", "test", "trainSignals", "testSignals", "pick", "name", "trainProfit",
+               "trainMaxDrawdown", "trainMetric", "testProfit", "testTrades", "testMaxDrawdown", "testMetric"]
+
+
+def month_span(months: tuple[str, ...]) -> str:
+    return months[0] if len(months) == 1 else f"{months[0]}..{months[-1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward de las estrategias con señales intradía")
+    parser.add_argument("--signals", default=SIGNAL_FILE, help="CSV de señales")
+    parser.add_argument("--limit", type=int, default=0, help="Máximo de señales (0 = todas)")
+    parser.add_argument("--source", choices=["auto", "store", "shards"], default="auto",
+                        help="Origen de los ticks (auto = tick store si existe)")
+    parser.add_argument("--store", type=Path, default=None, help="Directorio del tick store")
+    parser.add_argument("--ticks-dir", type=Path, default=TICKS_DIR, help="Directorio con los .csv.gz")
+    parser.add_argument("--index", type=Path, default=INDEX_PATH, help="ticks-index.json de los .csv.gz")
+    parser.add_argument("--train-months", type=int, default=3, help="Meses de entrenamiento")
+    parser.add_argument("--test-months", type=int, default=1, help="Meses de prueba (y avance de cada ventana)")
+    parser.add_argument("--anchored", action="store_true", help="Entrenar siempre desde el primer mes")
+    parser.add_argument("--top", type=int, default=3, help="Configuraciones evaluadas en test por ventana")
+    parser.add_argument("--rank-by", choices=RANK_METRICS, default="totalProfit", help="Métrica para elegir")
+    parser.add_argument("--search", choices=["strategies", "grid", "random"], default="strategies",
+                        help="Estrategias de run_backtests_direct.py o rangos de sweep_parameters.py")
+    add_range_arguments(parser)
+    parser.add_argument("--samples", type=int, default=None, help="Configuraciones al azar (--search random)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de random")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos (por defecto todos)")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="Señales por unidad de trabajo")
+    parser.add_argument("--cache", type=Path, nargs="?", const=CACHE_PATH, default=None,
+                        help=f"Reutilizar resultados por señal de la caché (por defecto {CACHE_PATH})")
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_BUDGET_MB, help="Tamaño máximo de la caché (MB)")
+    parser.add_argument("--results-dir", type=Path, default=RESULTS_DIR, help="Directorio de resultados")
+    args = parser.parse_args()
+
+    if args.search == "random" and not args.samples:
+        parser.error("--search random necesita --samples")
+    if args.search == "strategies":
+        configs = [make_config({"name": s["name"], **s["config"]}) for s in STRATEGIES]
+    else:
+        ranges = parse_ranges(args)
+        space = random_space(ranges, args.samples, args.seed) if args.search == "random" else grid_space(ranges)
+        configs = [sweep_config(params, INITIAL_CAPITAL) for params in space]
+
+    print("=== WALK-FORWARD ===")
+    print(f"Configuraciones: {len(configs):,} ({args.search})")
+    print(f"Ventanas: {args.train_months} mes(es) de entrenamiento{' (anclado)' if args.anchored else ''}, "
+          f"{args.test_months} de prueba; top {args.top} por {args.rank_by}")
+    print()
+
+    signals = load_signals(args.signals, args.limit)
+    source = open_tick_source(args.source, args.store, args.ticks_dir, args.index)
+    if not hasTicksData(source):
+        print("No hay ticks (ni tick store ni data/ticks indexado)")
+        sys.exit(1)
+    start = time.perf_counter()
+    replay = load_windows(signals, source)
+    replay.sort(key=lambda item: item[0].timestamp)
+    print(f"Ventanas de ticks: {len(replay)} señales con ticks, {sum(len(w) for _, w in replay):,} ticks "
+          f"({time.perf_counter() - start:.2f}s)")
+
+    windows = plan_windows(signal_months(replay), args.train_months, args.test_months, args.anchored)
+    if not windows:
+        print(f"Hacen falta más de {args.train_months} meses con señales")
+        sys.exit(1)
+    print(f"{len(windows)} ventanas de {windows[0].train_months[0]} a {windows[-1].test_months[-1]}")
+    print()
+
+    args.results_dir.mkdir(parents=True, exist_ok=True)
+    csv_file = open(args.results_dir / "walk-forward.csv", "w", newline="", encoding="utf-8")
+    writer = csv.writer(csv_file)
+    writer.writerow(CSV_COLUMNS)
+
+    def on_window(result):
+        w = result.window
+        train, test = month_span(w.train_months), month_span(w.test_months)
+        print(f"  {train} -> {test} ({w.train_stop - w.train_start} / {w.test_stop - w.test_start} señales):")
+        for i, pick in enumerate(result.picks, 1):
+            print(f"    {i}. {configs[pick.index].strategyName}: train ${pick.train.totalProfit:.2f} "
+                  f"(DD ${pick.train.maxDrawdown:.2f}) -> test ${pick.test.totalProfit:.2f} "
+                  f"(DD ${pick.test.maxDrawdown:.2f}, {pick.test.totalTrades} trades)", flush=True)
+            writer.writerow([
+                train, test, w.train_stop - w.train_start, w.test_stop - w.test_start, i,
+                configs[pick.index].strategyName, pick.train.totalProfit, pick.train.maxDrawdown,
+                getattr(pick.train, args.rank_by), pick.test.totalProfit, pick.test.totalTrades,
+                pick.test.maxDrawdown, getattr(pick.test, args.rank_by),
+            ])
+
+    start = time.perf_counter()
+    try:
+        if args.cache:
+            versions = [tick_version(source, window) for _, window in replay]
+            with ResultCache(args.cache, args.cache_mb) as cache:
+                results, out_of_sample, unit_stats = run_walk_forward(
+                    configs, replay, windows, args.workers, args.top, args.rank_by, args.chunk,
+                    cache=cache, versions=versions, on_window=on_window)
+                print_cache(cache.stats())
+        else:
+            results, out_of_sample, unit_stats = run_walk_forward(
+                configs, replay, windows, args.workers, args.top, args.rank_by, args.chunk, on_window=on_window)
+    finally:
+        csv_file.close()
+    elapsed = time.perf_counter() - start
+
+    print()
+    print("=== FUERA DE MUESTRA (mejor de cada ventana) ===")
+    print(f"Profit: ${out_of_sample.totalProfit:.2f}, Trades: {out_of_sample.totalTrades}, "
+          f"DD: ${out_of_sample.maxDrawdown:.2f}, {args.rank_by}: {getattr(out_of_sample, args.rank_by):.4g}")
+    print(f"Tiempo: {elapsed:.2f}s, {sum(s.ticks for s in unit_stats):,} ticks x estrategia simulados")
+    print_workers(unit_stats)
+
+    with open(args.results_dir / "walk-forward.md", "w", encoding="utf-8") as f:
+        f.write(f"# Walk-forward ({len(windows)} ventanas, {args.train_months}+{args.test_months} meses"
+                f"{', anclado' if args.anchored else ''}, por {args.rank_by})\n\n")
+        f.write("| Train | Test | Mejor en train | Profit train | Profit test | Max DD test |\n")
+        f.write("|-------|------|----------------|--------------|-------------|-------------|\n")
+        for result in results:
+            pick = result.picks[0]
+            f.write(f"| {month_span(result.window.train_months)} | {month_span(result.window.test_months)} | "
+                    f"{configs[pick.index].strategyName} | ${pick.train.totalProfit:.2f} | "
+                    f"${pick.test.totalProfit:.2f} | ${pick.test.maxDrawdown:.2f} |\n")
+        f.write(f"\n**Fuera de muestra**: ${out_of_sample.totalProfit:.2f} en {out_of_sample.totalTrades} trades, "
+                f"max DD ${out_of_sample.maxDrawdown:.2f}\n")
+
+    print()
+    print(f"Resultados guardados en: {args.results_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from lib.backtest_engine import BacktestConfig  # noqa: E402
+from lib.parsers.signals_csv import TradingSignal  # noqa: E402
+from lib.ticks_store import DayTicks, scale_prices  # noqa: E402
+
+# Casos y señales de tests/fixtures/backtest-parity.json (los mismos que lib/backtest-engine.test.ts)
+PARITY = json.loads((ROOT / "tests" / "fixtures" / "backtest-parity.json").read_text())
+
+
+def pytest_generate_tests(metafunc):
+    """Un test por caso de la paridad en los que piden parity_case"""
+    if "parity_case" in metafunc.fixturenames:
+        metafunc.parametrize("parity_case", PARITY["cases"],
+                             ids=[case["config"]["strategyName"] for case in PARITY["cases"]])
+
+
+@pytest.fixture(scope="session")
+def parity_signals() -> list[dict]:
+    """Señales de la paridad con sus ticks en crudo ([ts, bid, ask])"""
+    return PARITY["signals"]
+
+
+@pytest.fixture(scope="session")
+def parity_source() -> str:
+    """Motor que generó los totales de la paridad (expectedSource)"""
+    return PARITY["expectedSource"]
+
+
+@pytest.fixture(scope="session")
+def configs() -> list[BacktestConfig]:
+    return [BacktestConfig(**case["config"]) for case in PARITY["cases"]]
+
+
+@pytest.fixture(scope="session")
+def replay(parity_signals) -> list[tuple[TradingSignal, DayTicks]]:
+    """(señal, ventana de ticks) de cada señal de la paridad, como load_windows"""
+    pairs = []
+    for i, raw in enumerate(parity_signals):
+        ticks = np.array(raw["ticks"])
+        window = DayTicks(ticks[:, 0].astype(np.int64), scale_prices(ticks[:, 1]), scale_prices(ticks[:, 2]))
+        entry = (raw["ticks"][0][1] + raw["ticks"][0][2]) / 2
+        signal = TradingSignal(str(i), datetime.fromisoformat(raw["timestamp"]), raw["side"], entry, str(i), 0.95)
+        pairs.append((signal, window))
+    return pairs
+
+
+@pytest.fixture(scope="session")
+def summary():
+    """Totales, operaciones y curva de un BacktestResult, para comparar ejecuciones exactas"""
+    def summarize(result) -> tuple:
+        return (result.totalTrades, result.totalProfit, result.maxDrawdown,
+                [(d.signalIndex, d.exitReason, d.totalProfit) for d in result.tradeDetails],
+                [(p.timestamp, p.equity, p.drawdown) for p in result.equityCurve])
+    return summarize
+
+
+@pytest.fixture(scope="session")
+def metrics():
+    """Métricas que no dependen del drawdown (que se compara con approx al partir las señales)"""
+    def pick(result) -> tuple:
+        return (result.totalTrades, result.totalProfit, result.profitFactor, result.sharpeRatio)
+    return pick
+
+
+@pytest.fixture(scope="session")
+def result_fields():
+    """Todas las métricas de un BacktestResult sin las listas (incremental y caché no las devuelven)"""
+    def pick(result) -> dict:
+        return {k: v for k, v in vars(result).items() if k not in ("trades", "tradeDetails", "equityCurve")}
+    return pick
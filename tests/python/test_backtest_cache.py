@@ -0,0 +1,80 @@
+"""
+Caché de resultados por señal frente a run_units
+"""
+
+from dataclasses import replace
+
+import pytest
+
+from lib.backtest_cache import ResultCache, plan_missing_units, run_cached, signal_key
+from lib.backtest_parallel import run_units
+
+
+@pytest.fixture
+def versions(replay):
+    return [["v1"]] * len(replay)
+
+
+@pytest.fixture
+def cached_view(result_fields):
+    """Métricas y curva: lo que devuelve run_cached (sin trades ni tradeDetails)"""
+    def pick(result) -> tuple:
+        return result_fields(result), [(p.timestamp, p.equity, p.balance, p.drawdown) for p in result.equityCurve]
+    return pick
+
+
+def test_plan_missing_units_groups_pending_strategies():
+    units = plan_missing_units([(0, 1, 2), (0, 1, 2), (), (1,), (0, 1, 2)], chunk_size=2, group_size=2)
+    assert [(u.strategies, u.start, u.stop) for u in units] == [
+        ((0, 1), 0, 2), ((2,), 0, 2), ((1,), 3, 4), ((0, 1), 4, 5), ((2,), 4, 5),
+    ]
+    assert all(u.per_signal for u in units)
+
+
+def test_rerun_only_reads_the_cache(tmp_path, configs, replay, versions, cached_view):
+    expected, _ = run_units(configs, replay, chunk_size=1)
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        cold, stats = run_cached(configs, replay, cache, versions)
+        assert stats and cache.stats()["misses"] == len(configs) * len(replay)
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        warm, stats = run_cached(configs, replay, cache, versions)
+        assert stats == [] and cache.stats()["hits"] == len(configs) * len(replay)
+    assert [cached_view(r) for r in cold] == [cached_view(r) for r in expected]
+    assert [cached_view(r) for r in warm] == [cached_view(r) for r in expected]
+    assert all(r.trades == [] and r.tradeDetails == [] for r in warm)
+
+
+def test_changed_inputs_only_simulate_their_pairs(tmp_path, configs, replay, versions):
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        run_cached(configs, replay, cache, versions)
+        configs = [replace(configs[0], takeProfitPips=configs[0].takeProfitPips + 5)] + configs[1:]
+        versions = versions[:-1] + [["v2"]]
+        _, stats = run_cached(configs, replay, cache, versions)
+    simulated = sorted((s, k) for st in stats for s in st.unit.strategies for k in range(st.unit.start, st.unit.stop))
+    expected = sorted({(0, k) for k in range(len(replay))} | {(s, len(replay) - 1) for s in range(len(configs))})
+    assert simulated == expected
+
+
+def test_hits_ignore_signal_position_and_strategy_name(tmp_path, configs, replay, versions, cached_view):
+    renamed = [replace(config, strategyName=f"{config.strategyName}-copia") for config in configs]
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        run_cached(configs, replay, cache, versions)
+        results, stats = run_cached(renamed, replay[1:], cache, versions[1:])
+    expected, _ = run_units(renamed, replay[1:], chunk_size=1)
+    assert stats == []
+    assert [cached_view(r) for r in results] == [cached_view(r) for r in expected]
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path, configs, replay, versions):
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        run_cached(configs[:1], replay[:1], cache, versions[:1])
+        record = next(iter(cache.get_many([signal_key(replay[0][0], configs[0], versions[0])]).values()))
+        cache.clear()
+        cache.put_many({"a": record})
+        cache.budget_bytes = int(cache.stats()["bytes"] * 2.5)
+        cache.put_many({"b": record})
+        cache.get_many(["a"])  # "a" pasa a ser la más reciente
+        cache.put_many({"c": record})
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["bytes"] <= cache.budget_bytes
+        assert sorted(cache.get_many(["a", "b", "c"])) == ["a", "c"]
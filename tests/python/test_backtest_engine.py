@@ -0,0 +1,165 @@
+"""
+Motor de backtest Python: processTick frente a los totales de
+tests/fixtures/backtest-parity.json (casos y señales en conftest.py) y los
+kernels de processTicks frente a processTick
+
+Los totales del fixture los genera el motor TS (expectedSource = "ts", caso
+de lib/backtest-engine.test.ts), así que el primer test es la paridad
+processTick Python frente a processTick TS.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from lib.backtest_engine import BacktestConfig, BacktestEngine, MultiBacktestEngine, run_signal
+from lib.backtest_kernel import HAS_NUMBA
+from lib.parsers.signals_csv import TradingSignal, groupSignalsByRange, parseSignalsCsv
+from lib.parsers.ticks_loader import ShardTicks, enrichSignalsWithRealPrices
+from lib.ticks_shards import ShardWriter, save_index
+from lib.ticks_store import TickStore, ms_to_iso
+
+KERNELS = ["numpy", "python", pytest.param("jit", marks=pytest.mark.skipif(not HAS_NUMBA, reason="numba no instalado"))]
+
+
+def _dt(ms: int) -> datetime:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+
+
+def _run(config: dict, parity_signals: list[dict], replay: list, per_tick: bool, kernel: str = "numpy"):
+    engine = BacktestEngine(BacktestConfig(**config), kernel)
+    for i, (raw, (signal, window)) in enumerate(zip(parity_signals, replay)):
+        if per_tick:
+            # Mismo flujo que run_signal, pero tick a tick con processTick
+            engine.startSignal(signal.side, signal.entryPrice, i, signal.timestamp)
+            engine.openInitialOrders(signal.entryPrice, _dt(raw["ticks"][0][0]))
+            for ts, bid, ask in raw["ticks"]:
+                engine.processTick({"timestamp": _dt(ts), "bid": bid, "ask": ask})
+            if engine.hasOpenPositions():
+                ts, bid, ask = raw["ticks"][-1]
+                engine.closeRemainingPositions(bid if signal.side == "BUY" else ask, _dt(ts))
+        else:
+            run_signal(engine, signal, i, window, entry_ms=raw["ticks"][0][0])
+    return engine.getResults()
+
+
+def test_process_tick_matches_reference(parity_case, parity_source, parity_signals, replay):
+    assert parity_source == "ts"
+    results = _run(parity_case["config"], parity_signals, replay, per_tick=True)
+    expected = parity_case["expected"]
+    assert results.totalTrades == expected["totalTrades"]
+    assert results.totalProfit == expected["totalProfit"]
+    assert results.maxDrawdown == expected["maxDrawdown"]
+
+
+@pytest.mark.parametrize("kernel_name", KERNELS)
+def test_vectorized_kernel_matches_process_tick(parity_case, kernel_name, parity_signals, replay):
+    scalar = _run(parity_case["config"], parity_signals, replay, per_tick=True)
+    kernel = _run(parity_case["config"], parity_signals, replay, per_tick=False, kernel=kernel_name)
+    assert kernel.totalTrades == scalar.totalTrades
+    assert kernel.totalProfit == scalar.totalProfit
+    assert [d.exitReason for d in kernel.tradeDetails] == [d.exitReason for d in scalar.tradeDetails]
+    assert [e.timestamp for e in kernel.equityCurve] == [e.timestamp for e in scalar.equityCurve]
+    assert kernel.maxDrawdown == pytest.approx(scalar.maxDrawdown, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("config", [
+    {"pipsDistance": 10, "maxLevels": 4, "takeProfitPips": 20},
+    {"pipsDistance": 20, "maxLevels": 2, "takeProfitPips": 30, "stopLossPips": 40},
+    {"pipsDistance": 10, "maxLevels": 4, "takeProfitPips": 20, "numOrders": 2, "trailingSLPercent": 30},
+], ids=["grid", "stop_loss", "trailing"])
+@pytest.mark.parametrize("kernel", KERNELS)
+def test_event_jumps_match_process_tick_on_long_window(config, kernel):
+    # Ventana de varios miles de ticks: rachas largas sin eventos entre cruces de nivel
+    rng = np.random.default_rng(7)
+    ts = 1717372800000 + np.cumsum(rng.integers(50, 3000, 4000))
+    bid = 2300 + np.cumsum(rng.integers(-150, 151, 4000)) / 1000
+    ask = bid + 0.2
+    results = []
+    for per_tick in (True, False):
+        engine = BacktestEngine(BacktestConfig("LONG", 0.03, **{"numOrders": 1, **config}), kernel)
+        engine.startSignal("SELL", ask[0], 0, _dt(int(ts[0])))
+        engine.openInitialOrders(ask[0], _dt(int(ts[0])))
+        if per_tick:
+            for k in range(len(ts)):
+                engine.processTick({"timestamp": _dt(int(ts[k])), "bid": float(bid[k]), "ask": float(ask[k])})
+        else:
+            engine.processTicks(ts, bid, ask)
+        results.append(engine.getResults())
+
+    scalar, kernel = results
+    assert kernel.totalTrades == scalar.totalTrades
+    assert kernel.totalProfit == scalar.totalProfit
+    assert [e.timestamp for e in kernel.equityCurve] == [e.timestamp for e in scalar.equityCurve]
+    assert [e.drawdown for e in kernel.equityCurve] == pytest.approx([e.drawdown for e in scalar.equityCurve])
+    assert kernel.maxDrawdown == pytest.approx(scalar.maxDrawdown, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("kernel", KERNELS)
+def test_multi_engine_matches_single_engines(kernel, configs, parity_signals, replay):
+    multi = MultiBacktestEngine(configs)
+    for i, (signal, window) in enumerate(replay):
+        run_signal(multi, signal, i, window, entry_ms=int(window.ts[0]))
+
+    for config, result in zip(configs, multi.getResults()):
+        single = _run(vars(config), parity_signals, replay, per_tick=False, kernel=kernel)
+        assert result.totalTrades == single.totalTrades
+        assert result.totalProfit == single.totalProfit
+        assert [d.exitReason for d in result.tradeDetails] == [d.exitReason for d in single.tradeDetails]
+        assert [e.timestamp for e in result.equityCurve] == [e.timestamp for e in single.equityCurve]
+        assert result.maxDrawdown == pytest.approx(single.maxDrawdown, rel=1e-9, abs=1e-9)
+
+
+def test_jit_kernel_requires_numba(configs):
+    if HAS_NUMBA:
+        pytest.skip("numba instalado")
+    with pytest.raises(ValueError, match="numba"):
+        BacktestEngine(configs[0], kernel="jit")
+
+
+def test_signals_csv_groups_ranges():
+    content = "\n".join([
+        "ts_utc;kind;side;price_hint;range_id;message_id;confidence;signal_number",
+        "2024-08-14T09:00:00Z;range_open;BUY;;r2;2;;",
+        "2024-08-14T07:33:34Z;range_open;SELL;2477.0;r1;1;0.9;",
+        "2024-08-14T09:31:08Z;range_close;;;r1;3;0.95;",
+        "2024-08-14T10:00:00Z;range_open;;2480.0;r3;4;0.9;",
+    ])
+    signals = groupSignalsByRange(parseSignalsCsv(content))
+    assert [s.id for s in signals] == ["r1", "r2"]
+    assert signals[0].closeTimestamp.hour == 9 and signals[0].closePrice == 2477.0
+    assert signals[1].entryPrice == 0 and signals[1].confidence == 0.95
+    assert signals[1].closeTimestamp is None
+
+
+def test_enrich_uses_nearest_tick_mid_price(tmp_path, replay):
+    signal, window = replay[0]
+    store = TickStore(tmp_path)
+    store.write_day("2024-10-01", window.ts, window.bid, window.ask)
+    far = TradingSignal("far", datetime.fromisoformat("2024-10-03T10:00:00+00:00"), "BUY", 2600.0, "far", 0.9)
+
+    enriched = enrichSignalsWithRealPrices([signal, far], store)
+    assert len(enriched) == 1
+    assert enriched[0].entryPrice == pytest.approx((window.bid[0] + window.ask[0]) / 2 / window.price_scale)
+    assert enrichSignalsWithRealPrices([far], store, filterUnavailable=False) == [far]
+
+
+def test_shard_windows_match_tick_store(tmp_path, replay):
+    _, window = replay[0]
+    store = TickStore(tmp_path / "store")
+    store.write_day("2024-10-01", window.ts, window.bid, window.ask)
+    lines = [f"{ms_to_iso(int(t))[:-1]},{b / 1000:.3f},{a / 1000:.3f},{(a - b) / 1000:.3f}"
+             for t, b, a in zip(window.ts, window.bid, window.ask)]
+    with ShardWriter(tmp_path / "XAUUSD_2024.csv.gz") as writer:
+        writer.write_day("2024-10-01", lines)
+    save_index(writer.entries, tmp_path / "ticks-index.json")
+
+    shards = ShardTicks(tmp_path, tmp_path / "ticks-index.json")
+    start, end = int(window.ts[10]), int(window.ts[200])
+    assert shards.days() == ["2024-10-01"]
+    # Con level: d<N>.npy del store frente al diezmado al vuelo de los shards
+    for level in (0, 5):
+        expected, got = store.window(start, end, level), shards.window(start, end, level)
+        for column in ("ts", "bid", "ask"):
+            assert np.array_equal(getattr(got, column), getattr(expected, column))
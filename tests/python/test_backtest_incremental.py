@@ -0,0 +1,55 @@
+"""
+Backtest incremental frente a simularlo todo con run_units
+"""
+
+from dataclasses import replace
+
+import pytest
+
+from lib.backtest_incremental import load_state, run_incremental, save_state
+from lib.backtest_parallel import run_units
+
+
+@pytest.fixture
+def long_replay(replay):
+    """Más señales que tramos para que haya tramos completos e incompletos"""
+    return [(replace(signal, id=f"{signal.id}-{k}"), window) for k in range(3) for signal, window in replay]
+
+
+@pytest.fixture
+def versions(long_replay):
+    return [["v1"]] * len(long_replay)
+
+
+def test_new_signals_match_a_full_run(tmp_path, configs, long_replay, versions, result_fields):
+    path = tmp_path / "state.pickle"
+    for n in (4, 5, 8, 9):
+        results, stats, state, summary = run_incremental(configs, long_replay[:n], versions[:n],
+                                                         load_state(path), chunk_size=2)
+        save_state(path, state)
+        expected, _ = run_units(configs, long_replay[:n], chunk_size=2)
+        assert [result_fields(r) for r in results] == [result_fields(r) for r in expected]
+    # De 8 a 9 señales solo se simula el tramo nuevo
+    assert (summary.stored, summary.simulated) == (8, 1)
+    assert {(u.start, u.stop) for u in (s.unit for s in stats)} == {(8, 9)}
+
+
+def test_changed_strategy_is_rebuilt_and_others_resume(configs, long_replay, versions, result_fields):
+    _, _, state, _ = run_incremental(configs, long_replay[:6], versions[:6], None, chunk_size=2)
+    changed = [replace(configs[0], maxLevels=configs[0].maxLevels + 1)] + configs[1:]
+    results, stats, _, summary = run_incremental(changed, long_replay, versions, state, chunk_size=2)
+    expected, _ = run_units(changed, long_replay, chunk_size=2)
+    assert [result_fields(r) for r in results] == [result_fields(r) for r in expected]
+    assert summary.rebuilt == [configs[0].strategyName]
+    assert min(s.unit.start for s in stats if s.unit.strategies != (0,)) == 6
+
+
+def test_changed_signal_or_rebuild_starts_over(configs, long_replay, versions):
+    _, _, state, _ = run_incremental(configs, long_replay[:6], versions[:6], None, chunk_size=2)
+    changed = [["v2"]] + versions[1:]
+    results, _, _, summary = run_incremental(configs, long_replay, changed, state, chunk_size=2)
+    assert summary.stored == 0 and summary.reason
+    _, _, _, summary = run_incremental(configs, long_replay, versions, state, chunk_size=2, rebuild=True)
+    assert (summary.stored, summary.reason) == (0, "--rebuild")
+    _, _, _, summary = run_incremental(configs, long_replay, versions, state, chunk_size=3)
+    assert summary.stored == 0
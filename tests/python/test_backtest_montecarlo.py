@@ -0,0 +1,71 @@
+"""
+Monte Carlo del orden de las señales frente a un cálculo camino a camino
+"""
+
+import numpy as np
+import pytest
+
+from lib.backtest_montecarlo import monte_carlo, path_stats, signal_pnl
+from lib.backtest_parallel import run_units
+
+
+def _reference(pnl, ruin_level):
+    """Drawdown, racha bajo el agua, fracción, profit final y ruina de un camino con un bucle"""
+    equity = peak = 0.0
+    max_dd = longest = run = under = 0
+    ruined = False
+    for p in pnl:
+        equity += p
+        peak = max(peak, equity)
+        max_dd = max(max_dd, peak - equity)
+        run = run + 1 if peak - equity > 0 else 0
+        under += run > 0
+        longest = max(longest, run)
+        ruined = ruined or equity <= -ruin_level
+    return max_dd, longest, under / len(pnl), equity, ruined
+
+
+def test_path_stats_of_a_known_path():
+    stats = path_stats(np.array([10.0, -5, -10, 20, -3]), ruin_level=5)
+    assert (stats.max_drawdown[0], stats.longest_underwater[0], stats.underwater_fraction[0]) == (15, 2, 0.6)
+    assert (stats.final_profit[0], stats.ruined[0]) == (12, True)
+    stats = path_stats(np.array([-1.0, -1.0]), ruin_level=5)
+    assert (stats.max_drawdown[0], stats.longest_underwater[0], stats.ruined[0]) == (2, 2, False)
+
+
+def test_path_stats_match_the_loop_row_by_row():
+    paths = np.random.default_rng(7).normal(0.5, 10, size=(50, 40))
+    stats = path_stats(paths, ruin_level=30)
+    for k, row in enumerate(paths):
+        max_dd, longest, fraction, final, ruined = _reference(row, 30)
+        assert stats.max_drawdown[k] == pytest.approx(max_dd)
+        assert (stats.longest_underwater[k], stats.underwater_fraction[k], stats.ruined[k]) == \
+            (longest, fraction, ruined)
+        assert stats.final_profit[k] == pytest.approx(final)
+
+
+def test_permutations_keep_the_final_profit_and_batches_cover_all_resamples():
+    pnl = np.random.default_rng(3).normal(1, 20, 300)
+    mc = monte_carlo(pnl, resamples=1000, method="permutation", seed=1, batch_bytes=8 * 300 * 64)
+    assert mc.paths.max_drawdown.shape == (1000,)
+    assert mc.paths.final_profit == pytest.approx(np.full(1000, pnl.sum()))
+    assert mc.historical.max_drawdown[0] == path_stats(pnl, mc.ruin_level).max_drawdown[0]
+    again = monte_carlo(pnl, resamples=1000, method="permutation", seed=1, batch_bytes=8 * 300 * 64)
+    assert (again.paths.max_drawdown == mc.paths.max_drawdown).all()
+    summary = mc.summary()
+    assert summary["maxDrawdown"]["p5"] <= summary["maxDrawdown"]["p50"] <= summary["maxDrawdown"]["p95"]
+
+
+def test_ruin_probability():
+    assert monte_carlo(np.full(10, -200.0), resamples=100, initial_capital=1000, seed=0).ruin_probability == 1
+    assert monte_carlo(np.full(10, 5.0), resamples=100, seed=0).ruin_probability == 0
+    with pytest.raises(ValueError):
+        monte_carlo(np.ones(3), method="shuffle")
+
+
+def test_signal_pnl_adds_up_to_the_backtest(configs, replay):
+    results, _ = run_units(configs, replay, chunk_size=1)
+    for result in results:
+        pnl = signal_pnl(result, len(replay))
+        assert len(pnl) == len(replay)
+        assert pnl.sum() == pytest.approx(result.totalProfit)
@@ -0,0 +1,67 @@
+"""
+Backtests por unidades en paralelo frente al motor de una sola pasada
+"""
+
+import pytest
+
+from lib.backtest_engine import BacktestEngine, run_signal
+from lib.backtest_parallel import SharedWindows, plan_units, run_units
+from lib.ticks_cache import start_cache_server
+from lib.ticks_store import TickStore, day_key
+
+
+def test_plan_units_covers_every_strategy_and_signal():
+    units = plan_units(n_configs=10, n_signals=7, chunk_size=3, group_size=4)
+    assert [(u.strategies, u.start, u.stop) for u in units[:3]] == [
+        ((0, 1, 2, 3), 0, 3), ((4, 5, 6, 7), 0, 3), ((8, 9), 0, 3),
+    ]
+    assert sorted((s, k) for u in units for s in u.strategies for k in range(u.start, u.stop)) == \
+        [(s, k) for s in range(10) for k in range(7)]
+
+
+def _same_ticks(a, b) -> bool:
+    return (a.ts == b.ts).all() and (a.bid == b.bid).all() and (a.ask == b.ask).all()
+
+
+def test_shared_windows_round_trip(replay):
+    windows = [window for _, window in replay]
+    with SharedWindows.create(windows) as shared:
+        attached = SharedWindows.attach(*shared.spec())
+        assert all(_same_ticks(attached.window(k), window) for k, window in enumerate(windows))
+        attached.close()
+
+
+def test_workers_match_serial_run(configs, replay, summary):
+    serial, _ = run_units(configs, replay, workers=1, chunk_size=1)
+    parallel, stats = run_units(configs, replay, workers=2, chunk_size=1)
+    assert len(stats) == len(replay)
+    assert [summary(r) for r in parallel] == [summary(r) for r in serial]
+
+
+@pytest.mark.parametrize("level", [0, 5])
+def test_workers_read_windows_from_tick_cache(tmp_path, configs, replay, summary, level):
+    store = TickStore(tmp_path)
+    for _, window in replay:
+        store.write_day(day_key(int(window.ts[0])), window.ts, window.bid, window.ask)
+    windows = [(signal, store.window(int(w.ts[0]), int(w.ts[-1]), level)) for signal, w in replay]
+
+    serial, _ = run_units(configs, windows, workers=1, chunk_size=1)
+    with start_cache_server(tmp_path, budget_mb=16) as server:
+        cached, _ = run_units(configs, windows, workers=2, chunk_size=1, tick_cache=server, level=level)
+        stats = server.stats()
+    assert [summary(r) for r in cached] == [summary(r) for r in serial]
+    assert stats["entries"] == len(replay) and stats["misses"] >= len(replay)
+
+
+def test_chunks_merge_like_one_engine(configs, replay):
+    merged, _ = run_units(configs, replay, workers=1, chunk_size=1)
+    for config, result in zip(configs, merged):
+        engine = BacktestEngine(config)
+        for i, (signal, window) in enumerate(replay):
+            run_signal(engine, signal, i, window, entry_ms=int(window.ts[0]))
+        single = engine.getResults()
+        assert result.totalTrades == single.totalTrades
+        assert result.totalProfit == single.totalProfit
+        assert result.finalCapital == single.finalCapital
+        assert result.maxDrawdown == pytest.approx(single.maxDrawdown, rel=1e-9, abs=1e-9)
+        assert [p.equity for p in result.equityCurve] == pytest.approx([p.equity for p in single.equityCurve])
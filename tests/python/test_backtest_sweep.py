@@ -0,0 +1,101 @@
+"""
+Barrido de parámetros: espacios, etapas y poda frente a run_units
+"""
+
+import pytest
+
+from lib.backtest_parallel import run_units
+from lib.backtest_sweep import (
+    COMPLETE,
+    DOMINATED,
+    DRAWDOWN,
+    HALVED,
+    dominated,
+    grid_space,
+    parse_range,
+    random_space,
+    run_sweep,
+    stage_stops,
+    sweep_config,
+)
+
+RANGES = {
+    "pipsDistance": [3.0, 5.0],
+    "maxLevels": [4, 6],
+    "takeProfitPips": [6.0],
+    "lotajeBase": [0.03],
+    "numOrders": [1, 2],
+    "stopLossPips": [0.0, 20.0],
+}
+CONFIGS = [sweep_config(params) for params in grid_space(RANGES)]
+
+
+def test_parse_range():
+    assert parse_range("8:12:2") == [8.0, 10.0, 12.0]
+    assert parse_range("0.01:0.03:0.01") == [0.01, 0.02, 0.03]
+    assert parse_range("1:3", integer=True) == [1, 2, 3]
+    assert parse_range("8,10,8") == [8.0, 10.0]
+    with pytest.raises(ValueError):
+        parse_range("10:8")
+
+
+def test_random_space_is_a_seeded_subset_of_the_grid():
+    grid = grid_space(RANGES)
+    sample = random_space(RANGES, 5, seed=3)
+    assert len(sample) == 5 and all(params in grid for params in sample)
+    assert len({tuple(params.values()) for params in sample}) == 5
+    assert sample == random_space(RANGES, 5, seed=3)
+    assert len(random_space(RANGES, 100)) == len(grid)
+
+
+def test_stage_stops():
+    assert stage_stops(100, 10, 3) == [10, 30, 90, 100]
+    assert stage_stops(3, 1, 2) == [1, 2, 3]
+    assert stage_stops(5, 10, 2) == [5]
+
+
+def test_dominated_needs_the_margin():
+    points = {"a": (100.0, 50.0), "b": (80.0, 60.0), "c": (95.0, 50.0), "d": (200.0, 300.0)}
+    assert dominated(points, margin=10) == {"b"}
+    assert dominated(points, margin=1) == {"b", "c"}
+
+
+def test_sweep_without_pruning_matches_run_units(replay, metrics):
+    expected, _ = run_units(CONFIGS, replay, chunk_size=1)
+    entries, _ = run_sweep(CONFIGS, replay, stage_stops(len(replay), 1, 2), chunk_size=1, group_size=3)
+    assert all(e.status == COMPLETE and e.signals == len(replay) for e in entries)
+    by_index = {e.index: e.result for e in entries}
+    for s, result in enumerate(expected):
+        assert metrics(by_index[s]) == metrics(result)
+        assert by_index[s].maxDrawdown == pytest.approx(result.maxDrawdown, rel=1e-9, abs=1e-9)
+    profits = [e.result.totalProfit for e in entries]
+    assert profits == sorted(profits, reverse=True)
+
+
+def test_pruning_after_the_first_stage(replay):
+    first, _ = run_units(CONFIGS, replay[:1], chunk_size=1)
+    ceiling = sorted(r.maxDrawdown for r in first)[len(first) // 2 - 1]
+    assert any(r.maxDrawdown > ceiling for r in first)
+    streamed = []
+    entries, _ = run_sweep(CONFIGS, replay, [1, len(replay)], max_drawdown=ceiling, on_entry=streamed.append)
+    assert streamed and len(entries) == len(CONFIGS)
+    for entry in entries:
+        if first[entry.index].maxDrawdown > ceiling:
+            assert (entry.status, entry.signals) == (DRAWDOWN, 1)
+        else:
+            assert entry.status == COMPLETE
+
+    entries, _ = run_sweep(CONFIGS, replay, [1, len(replay)], margin=1.0)
+    points = {s: (r.totalProfit, r.maxDrawdown) for s, r in enumerate(first)}
+    assert {e.index for e in entries if e.status == DOMINATED} == dominated(points, 1.0) != set()
+
+    entries, _ = run_sweep(CONFIGS, replay, [1, 2, len(replay)], keep=0.5)
+    assert sum(1 for e in entries if e.status == COMPLETE) == len(CONFIGS) // 4
+    assert sum(1 for e in entries if e.status == HALVED) == len(CONFIGS) - len(CONFIGS) // 4
+
+
+def test_workers_match_serial_sweep(replay, metrics):
+    serial, _ = run_sweep(CONFIGS, replay, [1, len(replay)], keep=0.5)
+    parallel, _ = run_sweep(CONFIGS, replay, [1, len(replay)], keep=0.5, workers=2)
+    assert [(e.index, e.status, metrics(e.result)) for e in parallel] == \
+        [(e.index, e.status, metrics(e.result)) for e in serial]
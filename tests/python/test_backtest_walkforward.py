@@ -0,0 +1,71 @@
+"""
+Walk-forward: ventanas por mes y métricas frente a run_units por ventana
+"""
+
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import pytest
+
+from lib.backtest_cache import ResultCache
+from lib.backtest_parallel import run_units
+from lib.backtest_sweep import rank_value
+from lib.backtest_walkforward import plan_windows, run_walk_forward, signal_months
+
+
+@pytest.fixture
+def monthly_replay(replay):
+    """Dos señales por mes, de enero a abril"""
+    return [
+        (replace(signal, id=f"{signal.id}-{k}", timestamp=datetime(2024, 1 + k // 2, 1 + k % 2, tzinfo=timezone.utc)),
+         window)
+        for k, (signal, window) in enumerate(replay * 3)
+    ][:8]
+
+
+def test_plan_windows_rolling_and_anchored():
+    months = ["2024-01"] * 2 + ["2024-02"] * 3 + ["2024-03"] + ["2024-04"] * 2
+    rolling = plan_windows(months, train_months=2)
+    assert [(w.train_start, w.train_stop, w.test_start, w.test_stop) for w in rolling] == [(0, 5, 5, 6), (2, 6, 6, 8)]
+    assert rolling[1].train_months == ("2024-02", "2024-03") and rolling[1].test_months == ("2024-04",)
+    anchored = plan_windows(months, train_months=1, test_months=2, anchored=True)
+    assert [(w.train_start, w.train_stop, w.test_start, w.test_stop) for w in anchored] == [(0, 2, 2, 6), (0, 6, 6, 8)]
+    with pytest.raises(ValueError):
+        plan_windows(["2024-02", "2024-01"], train_months=1)
+
+
+def test_windows_match_run_units_on_their_signals(configs, monthly_replay, metrics):
+    windows = plan_windows(signal_months(monthly_replay), train_months=2)
+    results, out_of_sample, stats = run_walk_forward(configs, monthly_replay, windows, top=2)
+    assert sum(s.unit.stop - s.unit.start for s in stats) == len(monthly_replay)  # cada señal una vez
+    for result in results:
+        w = result.window
+        train, _ = run_units(configs, monthly_replay[w.train_start:w.train_stop], chunk_size=1)
+        test, _ = run_units(configs, monthly_replay[w.test_start:w.test_stop], chunk_size=1)
+        best = sorted(range(len(configs)), key=lambda s: rank_value(train[s], "totalProfit"))[:2]
+        assert [pick.index for pick in result.picks] == best
+        for pick in result.picks:
+            assert metrics(pick.train) == metrics(train[pick.index])
+            assert metrics(pick.test) == metrics(test[pick.index])
+            assert pick.train.maxDrawdown == pytest.approx(train[pick.index].maxDrawdown, rel=1e-9, abs=1e-9)
+    assert out_of_sample.totalTrades == sum(r.picks[0].test.totalTrades for r in results)
+    assert out_of_sample.totalProfit == pytest.approx(sum(r.picks[0].test.totalProfit for r in results))
+
+
+def test_workers_and_cache_match_serial(tmp_path, configs, monthly_replay, metrics):
+    windows = plan_windows(signal_months(monthly_replay), train_months=1)
+    serial, oos, _ = run_walk_forward(configs, monthly_replay, windows)
+    parallel, parallel_oos, _ = run_walk_forward(configs, monthly_replay, windows, workers=2)
+    versions = [["v1"]] * len(monthly_replay)
+    with ResultCache(tmp_path / "cache.sqlite") as cache:
+        run_walk_forward(configs, monthly_replay, windows, cache=cache, versions=versions)
+        cached, cached_oos, stats = run_walk_forward(configs, monthly_replay, windows, cache=cache,
+                                                     versions=versions)
+    assert stats == []
+
+    def summary(results, out_of_sample):
+        return [[(p.index, metrics(p.train), metrics(p.test)) for p in r.picks] for r in results], \
+            metrics(out_of_sample)
+
+    assert summary(parallel, parallel_oos) == summary(serial, oos)
+    assert summary(cached, cached_oos) == summary(serial, oos)
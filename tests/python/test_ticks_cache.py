@@ -0,0 +1,84 @@
+"""
+Caché de ticks en memoria compartida
+"""
+
+import numpy as np
+import pytest
+
+from lib.ticks_cache import TICK_BYTES, TickCache, TickCacheClient, start_cache_server
+from lib.ticks_store import MS_PER_DAY, TickStore
+
+DAY0 = 1717372800000  # 2024-06-03
+DATES = ["2024-06-03", "2024-06-04", "2024-06-05"]
+N = 1000
+
+
+@pytest.fixture
+def store_root(tmp_path):
+    store = TickStore(tmp_path)
+    for i, date in enumerate(DATES):
+        ts = DAY0 + i * MS_PER_DAY + np.arange(N, dtype=np.int64) * 1000
+        bid = np.full(N, 2300_000 + i, dtype=np.int32)
+        store.write_day(date, ts, bid, bid + 150, save_index=False)
+    store.save_index()
+    return tmp_path
+
+
+def test_lru_budget_evicts_oldest(store_root):
+    cache = TickCache(store_root, budget_bytes=2 * N * TICK_BYTES)
+    try:
+        first = cache.get("XAUUSD", DATES[0])
+        cache.get("XAUUSD", DATES[1])
+        assert cache.get("XAUUSD", DATES[0]) == first  # hit: pasa a ser el más reciente
+        cache.get("XAUUSD", DATES[2])  # expulsa DATES[1]
+        assert cache.get("XAUUSD", "2024-06-08") is None
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 4, 1, 2)
+    finally:
+        cache.clear()
+
+
+def test_client_views_are_shared_and_read_only(store_root):
+    with start_cache_server(store_root, budget_mb=16) as server:
+        client = TickCacheClient(server.address, server.authkey)
+        day = client.load_day(DATES[1])
+        assert day.bid[0] == 2300_001 and not day.bid.flags.writeable
+        window = client.window(DAY0 + MS_PER_DAY - 5000, DAY0 + MS_PER_DAY + 5000)
+        assert window.ts.tolist() == TickStore(store_root).window(DAY0 + MS_PER_DAY - 5000,
+                                                                  DAY0 + MS_PER_DAY + 5000).ts.tolist()
+        client.close()
+        assert server.stats()["hits"] >= 1
+
+
+def test_day_loads_outside_the_lock(store_root):
+    cache = TickCache(store_root, budget_bytes=16 * N * TICK_BYTES)
+    store = cache._store("XAUUSD")
+    load_day = store.load_day
+    inner = []
+
+    def concurrent_load(date):
+        # Con el lock tomado durante la carga esta llamada se bloquearía
+        if not inner:
+            inner.append(None)
+            inner[0] = cache.get("XAUUSD", date)
+        return load_day(date)
+
+    store.load_day = concurrent_load
+    try:
+        assert cache.get("XAUUSD", DATES[0]) == inner[0]  # se queda el bloque del primero que termina
+        stats = cache.stats()
+        assert (stats["misses"], stats["entries"], stats["bytes"]) == (2, 1, N * TICK_BYTES)
+    finally:
+        cache.clear()
+
+
+def test_client_keeps_at_most_max_attached_days(store_root):
+    with start_cache_server(store_root, budget_mb=16) as server:
+        client = TickCacheClient(server.address, server.authkey, max_attached=2)
+        days = [client.load_day(date) for date in DATES]
+        assert [date for _, date in client._attached] == DATES[1:]
+        assert days[0].bid[0] == 2300_000  # las vistas de un día soltado siguen siendo válidas
+        window = client.window(DAY0, DAY0 + 2 * MS_PER_DAY + 5000, level=5)
+        assert window.ts.tolist() == TickStore(store_root).window(DAY0, DAY0 + 2 * MS_PER_DAY + 5000,
+                                                                  level=5).ts.tolist()
+        client.close()
@@ -0,0 +1,43 @@
+"""
+Pirámide de velas: cada resolución agregada debe coincidir con calcularla
+directamente desde los ticks
+"""
+
+import numpy as np
+
+from lib.ticks_candles import RESOLUTIONS, CandleStore, build_pyramid, candles_from_ticks
+
+DAY = 1717372800000  # 2024-06-03
+
+
+def _day_ticks(n=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = np.sort(DAY + rng.integers(0, 86_400_000, n)).astype(np.int64)
+    bid = (2_300_000 + np.cumsum(rng.integers(-50, 51, n))).astype(np.int32)
+    ask = bid + rng.integers(50, 300, n).astype(np.int32)
+    return ts, bid, ask
+
+
+def test_pyramid_matches_direct_aggregation():
+    ts, bid, ask = _day_ticks()
+    pyramid = build_pyramid(ts, bid, ask)
+    for name, step in RESOLUTIONS.items():
+        direct = candles_from_ticks(ts, bid, ask, step)
+        got = pyramid[name]
+        for field in ("ts", "open", "high", "low", "close", "ticks"):
+            assert np.array_equal(got[field], direct[field]), (name, field)
+        np.testing.assert_allclose(got["spread"], direct["spread"], rtol=1e-5)
+    assert pyramid["1d"]["ticks"][0] == len(ts)
+
+
+def test_store_roundtrip_and_window(tmp_path):
+    ts, bid, ask = _day_ticks(seed=1)
+    store = CandleStore(tmp_path, price_scale=1000)
+    entry = store.write_day("2024-06-03", ts, bid, ask)
+    assert entry["ticks"] == len(ts) and entry["bars"]["1d"] == 1
+    assert entry["high"] == bid.max() / 1000
+
+    reopened = CandleStore(tmp_path)
+    assert reopened.days() == ["2024-06-03"]
+    window = reopened.load("1h", DAY + 3_600_000, DAY + 5 * 3_600_000)
+    assert window["ts"].tolist() == [DAY + h * 3_600_000 for h in range(1, 6)]
@@ -0,0 +1,58 @@
+"""
+Codec delta/entero de ticks y su uso en el tick store
+"""
+
+import numpy as np
+import pytest
+
+from lib.ticks_codec import (
+    decode_ticks,
+    encode_ticks,
+    varint_decode,
+    varint_encode,
+    zigzag_decode,
+    zigzag_encode,
+)
+from lib.ticks_store import TickStore
+
+
+def _day(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = 1717372800000 + np.cumsum(rng.integers(0, 3000, n))
+    bid = 2300_000 + np.cumsum(rng.integers(-40, 41, n))
+    ask = bid + rng.integers(50, 400, n)
+    return ts, bid.astype(np.int32), ask.astype(np.int32)
+
+
+def test_varint_and_zigzag_roundtrip_extremes():
+    values = np.array([0, 1, 127, 128, 16383, 16384, 2**63, 2**64 - 1], dtype=np.uint64)
+    assert varint_decode(varint_encode(values)).tolist() == values.tolist()
+    signed = np.array([0, -1, 1, -(2**62), 2**62, np.iinfo(np.int64).min], dtype=np.int64)
+    assert zigzag_decode(zigzag_encode(signed)).tolist() == signed.tolist()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_encode_decode_roundtrip(compress):
+    ts, bid, ask = _day()
+    data = encode_ticks(ts, bid, ask, 1000, compress=compress)
+    out = decode_ticks(data)
+    assert [a.tolist() for a in out] == [ts.tolist(), bid.tolist(), ask.tolist()]
+    assert len(data) < (ts.nbytes + bid.nbytes + ask.nbytes) / 2
+
+
+def test_encode_rejects_unsorted_timestamps():
+    with pytest.raises(ValueError):
+        encode_ticks(np.array([2, 1]), np.array([1, 1]), np.array([2, 2]), 1000)
+
+
+def test_store_delta_codec_replaces_npy_day(tmp_path):
+    ts, bid, ask = _day(seed=1)
+    TickStore(tmp_path).write_day("2024-06-03", ts, bid, ask)
+    store = TickStore(tmp_path, codec="delta")
+    store.write_day("2024-06-03", ts[:100], bid[:100], ask[:100])
+
+    day_dir = store.day_dir("2024-06-03")
+    assert sorted(p.name for p in day_dir.iterdir()) == ["d1.npy", "d10.npy", "d5.npy", "ticks.tkd"]
+    window = TickStore(tmp_path).window(int(ts[0]), int(ts[99]))
+    assert window.ts.tolist() == ts[:100].tolist()
+    assert window.ask.tolist() == ask[:100].tolist()
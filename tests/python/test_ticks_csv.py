@@ -0,0 +1,105 @@
+"""
+Tests del parser vectorizado de ticks (lib/ticks_csv.py)
+
+Los contadores aceptados/rechazados deben coincidir exactamente con los de
+parse_tick_line en scripts/migrate_ticks_python.py, leyendo en modo texto.
+"""
+
+import gzip
+import importlib.util
+import io
+import random
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lib.ticks_csv import iter_text_blocks, iter_tick_blocks, parse_tick_block  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def load_migrate_script():
+    spec = importlib.util.spec_from_file_location(
+        "migrate_ticks_python", ROOT / "scripts" / "migrate_ticks_python.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+migrate = load_migrate_script()
+
+LINES = [
+    "2024-06-03T00:00:00.1,2330.50000,2330.70000,20.00000",
+    "2024-06-03T00:00:01,2330.5,2330.7,20",
+    "2024-06-03T00:00:02,0,2330.7,20",
+    "2024-06-03T00:00:03,2330.5,-1,20",
+    "timestamp,bid,ask,spread",
+    "",
+    "   ",
+    "corrupta",
+    "a,b,c,d",
+    " 2024-06-03T00:00:04, 2330.5 ,2330.7,20",
+    "2024-06-03T00:00:05,2330.5,2330.7,20,extra",
+    "2024-06-03T00:00:06,2330.5,2330.7",
+    "2024-06-03T00:00:07,2330.5,2330.7,",
+    "2024-06-03T00:00:08,nan,2330.7,20",
+    "2024-06-03T00:00:09,1_000,2330.7,20",
+    "2024-06-03T00:00:10,+2330.5,.5,5.",
+    "t,1,2,3",
+    "é,1,2,3",
+]
+
+
+def reference_counts(data: bytes) -> tuple[int, int]:
+    accepted = rejected = 0
+    for line in io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="ignore"):
+        if migrate.parse_tick_line(line):
+            accepted += 1
+        elif line.strip() and not line.strip().startswith("timestamp"):
+            rejected += 1
+    return accepted, rejected
+
+
+def block_counts(data: bytes, block_size: int) -> tuple[int, int]:
+    accepted = rejected = 0
+    for block in iter_text_blocks(io.BytesIO(data), block_size):
+        parsed = parse_tick_block(block)
+        accepted += parsed.accepted
+        rejected += parsed.rejected
+    return accepted, rejected
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_counts_match_line_parser(seed):
+    rng = random.Random(seed)
+    text = "".join(
+        rng.choice(LINES) + rng.choice(["\n", "\r\n", "\r"]) for _ in range(rng.randint(0, 60))
+    )
+    data = text.encode("utf-8")
+    block_size = rng.choice([8, 33, 256, 1 << 20])
+    assert block_counts(data, block_size) == reference_counts(data)
+
+
+def test_values_match_line_parser(tmp_path):
+    rows = [
+        f"2024-06-03T00:00:{i // 1000:02d}.{i % 1000:03d},{2330 + i * 0.01:.5f},{2330.2 + i * 0.01:.5f},20.00000"
+        for i in range(5000)
+    ]
+    path = tmp_path / "XAUUSD_2024.csv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("timestamp,bid,ask,spread\n" + "\n".join(rows) + "\n")
+
+    blocks = list(iter_tick_blocks(path, block_size=4096))
+    assert all(b.vectorized for b in blocks)
+
+    expected = [migrate.parse_tick_line(r) for r in rows]
+    timestamps = [t for b in blocks for t in b.timestamp_strings()]
+    bids = np.concatenate([b.bid for b in blocks])
+    spreads = np.concatenate([b.spread for b in blocks])
+
+    assert timestamps == [e[1] for e in expected]
+    assert bids.tolist() == [e[2] for e in expected]
+    assert spreads.tolist() == [e[4] for e in expected]
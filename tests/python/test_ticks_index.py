@@ -0,0 +1,56 @@
+"""
+Índice de ticks generado desde Python: mismas entradas que ShardWriter y
+reescaneo solo de los shards modificados
+"""
+
+import gzip
+import os
+
+import numpy as np
+
+from lib.ticks_index import plan_index_update, scan_shard
+from lib.ticks_shards import CSV_HEADER, decompress_members, load_index
+from lib.ticks_writer import StreamingShardWriter
+
+DAY_MS = 86_400_000
+START = 1717372800000  # 2024-06-03
+
+
+def _write_shards(tmp_path):
+    rng = np.random.default_rng(5)
+    ts = np.sort(START + rng.integers(0, 4 * DAY_MS, 4000)).astype(np.int64)
+    bid = np.round(2300 + rng.random(len(ts)) * 10, 2)
+    ask = bid + 0.15
+    with StreamingShardWriter(tmp_path, "XAUUSD", tmp_path / "index.json") as writer:
+        writer.write_chunk(ts, bid, ask)
+    return load_index(tmp_path / "index.json")
+
+
+def test_scan_matches_writer_entries(tmp_path):
+    index = _write_shards(tmp_path)
+    shard = tmp_path / "XAUUSD_2024.csv.gz"
+    assert scan_shard(shard) == index["days"]
+
+    # Mismo contenido en un único miembro gzip: mismas líneas y stats, sin byteOffset
+    legacy = tmp_path / "LEGACY_2024.csv.gz"
+    legacy.write_bytes(gzip.compress(decompress_members(shard.read_bytes())))
+    for scanned, written in zip(scan_shard(legacy), index["days"]):
+        assert "byteOffset" not in scanned
+        expected = {k: v for k, v in written.items() if k not in ("byteOffset", "byteLength", "file")}
+        assert {k: v for k, v in scanned.items() if k != "file"} == expected
+
+
+def test_plan_only_rescans_changed_shards(tmp_path):
+    index = _write_shards(tmp_path)
+    shard = tmp_path / "XAUUSD_2024.csv.gz"
+    assert "sha256" in index["files"][shard.name]
+    assert plan_index_update([shard], index) == ([], [shard])
+    assert plan_index_update([shard], index, checksum=True) == ([], [shard])
+    # Firma sin sha256 (índices anteriores): --checksum compara tamaño + mtime
+    del index["files"][shard.name]["sha256"]
+    assert plan_index_update([shard], index, checksum=True) == ([], [shard])
+
+    with gzip.open(shard, "ab") as f:
+        f.write(CSV_HEADER.encode())
+    os.utime(shard, ns=(0, 0))
+    assert plan_index_update([shard], index) == ([shard], [])
@@ -0,0 +1,117 @@
+"""
+Esquema compacto TickDataCompact
+"""
+
+import sqlite3
+
+import numpy as np
+
+from lib.ticks_sqlite import (
+    TickBulkLoader,
+    create_compact_schema,
+    get_symbol_id,
+    insert_compact_batch,
+    load_window,
+    parse_timestamps_ms,
+    sequence_numbers,
+    unique_tick_order,
+)
+
+
+def test_sequence_numbers_continue_across_batches():
+    ts = np.array([5, 5, 6, 7, 7, 7], dtype=np.int64)
+    assert sequence_numbers(ts).tolist() == [0, 1, 0, 0, 1, 2]
+    assert sequence_numbers(ts, prev_ts=5, prev_seq=3).tolist() == [4, 5, 0, 0, 1, 2]
+
+
+def test_parse_timestamps_variants():
+    ms, valid = parse_timestamps_ms(["2024-06-03T10:00:00.5", "2024-06-03 10:00:00.500Z", "x"])
+    assert valid.tolist() == [True, True, False]
+    assert ms[0] == ms[1] == 1717408800500
+
+
+def test_insert_collision_keeps_every_row():
+    conn = sqlite3.connect(":memory:")
+    create_compact_schema(conn)
+    symbol_id = get_symbol_id(conn, "XAUUSD")
+    ts = np.array([1000, 1000, 2000], dtype=np.int64)
+    prices = np.array([2300_000, 2300_010, 2300_020], dtype=np.int64)
+    insert_compact_batch(conn, symbol_id, ts, sequence_numbers(ts), prices, prices + 150)
+    # Mismo ms con seq que ya existe: se reasigna el siguiente libre
+    insert_compact_batch(conn, symbol_id, ts[:1], np.zeros(1, dtype=np.int64), prices[:1], prices[:1])
+
+    window = load_window(conn, "XAUUSD", 1000, 1000)
+    assert window.bid.tolist() == [2300_000, 2300_010, 2300_000]
+    spread = conn.execute("SELECT spread FROM TickDataCompactView WHERE ts = 2000").fetchone()[0]
+    assert abs(spread - 15.0) < 1e-9
+
+
+def test_unique_tick_order_keeps_first_and_arrival_order():
+    ts = np.array([20, 10, 10, 10, 20], dtype=np.int64)
+    bid = np.array([1.0, 2.0, 3.0, 2.0, 1.0])
+    ask = bid + 0.5
+    assert unique_tick_order(ts, bid, ask).tolist() == [1, 2, 0]
+
+
+def test_bulk_loader_skips_only_ticks_already_in_db():
+    conn = sqlite3.connect(":memory:")
+    day = 1717372800000  # 2024-06-03
+    ts = day + np.array([100, 200, 300, 300, 400], dtype=np.int64)
+    bid = np.array([2300.0, 2300.1, 2300.2, 2300.2, 2300.3])
+    ask = bid + 0.15
+    text = np.array([b"t%d" % i for i in range(len(ts))])
+
+    loader = TickBulkLoader(conn, "XAUUSD", compact=True)
+    assert loader.load_day("2024-06-03", ts[1:4], bid[1:4], ask[1:4], ask[1:4] - bid[1:4], text[1:4]) == (2, 1, 0)
+    loader.commit()
+
+    reloaded = TickBulkLoader(conn, "XAUUSD", compact=True)
+    assert reloaded.ranges == {"2024-06-03": (day + 200, day + 300)}
+    # 200 y 300 ya están en la BD; el segundo 300 es duplicado exacto del día
+    assert reloaded.load_day("2024-06-03", ts, bid, ask, ask - bid, text) == (2, 1, 2)
+    reloaded.commit()
+    assert load_window(conn, "XAUUSD", day, day + 1000).ts.tolist() == [day + t for t in (100, 200, 300, 400)]
+
+
+def test_bulk_loader_fills_gap_inside_existing_range():
+    conn = sqlite3.connect(":memory:")
+    day = 1717372800000  # 2024-06-03
+    ts = day + np.array([100, 200, 300, 300, 400, 500], dtype=np.int64)
+    bid = np.array([2300.0, 2300.1, 2300.2, 2300.25, 2300.3, 2300.4])
+    ask = bid + 0.15
+    text = np.array([b"t%d" % i for i in range(len(ts))])
+    gap = np.array([0, 1, 2, 5])  # falta el tramo 300-400, con un ms que ya está en la BD
+
+    loader = TickBulkLoader(conn, "XAUUSD", compact=True)
+    assert loader.load_day("2024-06-03", ts[gap], bid[gap], ask[gap], ask[gap] - bid[gap], text[gap]) == (4, 0, 0)
+    loader.commit()
+
+    reloaded = TickBulkLoader(conn, "XAUUSD", compact=True)
+    assert reloaded.load_day("2024-06-03", ts, bid, ask, ask - bid, text) == (2, 0, 4)
+    reloaded.commit()
+    window = load_window(conn, "XAUUSD", day, day + 1000)
+    assert window.ts.tolist() == ts.tolist()
+    assert window.bid.tolist() == [2300_000, 2300_100, 2300_200, 2300_250, 2300_300, 2300_400]
+    seqs = conn.execute("SELECT seq FROM TickDataCompact WHERE ts = ? ORDER BY seq", (day + 300,)).fetchall()
+    assert seqs == [(0,), (1,)]
+
+
+def test_bulk_loader_fills_gap_in_tickdata():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE TickData (id INTEGER PRIMARY KEY, symbol TEXT, timestamp TEXT, "
+                 "bid REAL, ask REAL, spread REAL)")
+    day = 1717372800000  # 2024-06-03
+    ts = day + np.array([100, 200, 300], dtype=np.int64)
+    bid = np.array([2300.0, 2300.1, 2300.2])
+    ask = bid + 0.15
+    text = np.array([b"2024-06-03T00:00:00.%03d" % (t - day) for t in ts])
+
+    loader = TickBulkLoader(conn, "XAUUSD")
+    assert loader.load_day("2024-06-03", ts[::2], bid[::2], ask[::2], (ask - bid)[::2], text[::2]) == (2, 0, 0)
+    loader.commit()
+
+    reloaded = TickBulkLoader(conn, "XAUUSD")
+    assert reloaded.load_day("2024-06-03", ts, bid, ask, ask - bid, text) == (1, 0, 2)
+    reloaded.commit()
+    rows = conn.execute("SELECT timestamp FROM TickData ORDER BY timestamp").fetchall()
+    assert [r[0] for r in rows] == [t.decode() for t in text]
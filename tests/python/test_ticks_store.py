@@ -0,0 +1,134 @@
+"""
+Tick store columnar: escritura, lectura por día, ventanas, índice y niveles
+diezmados
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from lib.ticks_store import MS_PER_DAY, TickStore, day_start_ms, decimate, decimation_level
+
+DAY = "2024-06-03"
+
+
+def _day(date=DAY, n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = day_start_ms(date) + np.sort(rng.integers(0, MS_PER_DAY, n))
+    bid = 2300_000 + np.cumsum(rng.integers(-8, 9, n))
+    ask = bid + 150 + rng.integers(0, 3, n) * 10
+    return ts, bid.astype(np.int32), ask.astype(np.int32)
+
+
+def test_write_day_scales_floats_and_indexes(tmp_path):
+    store = TickStore(tmp_path)
+    ts = day_start_ms(DAY) + np.array([1000, 2000, 3000])
+    entry = store.write_day(DAY, ts, np.array([2300.1, 2300.2, 2300.3]), np.array([2300.25, 2300.35, 2300.45]))
+    assert entry == {
+        "date": DAY,
+        "file": f"XAUUSD/{DAY}",
+        "ticks": 3,
+        "firstTimestamp": "2024-06-03T00:00:01.000Z",
+        "lastTimestamp": "2024-06-03T00:00:03.000Z",
+        "decimated": {"1": 3, "5": 3, "10": 3},
+    }
+    index = json.loads(store.index_path.read_text())
+    assert index["totalDays"] == 1 and index["days"] == [entry]
+    assert store.load_day(DAY).bid.tolist() == [2300_100, 2300_200, 2300_300]
+    with pytest.raises(ValueError):
+        store.write_day("2024-06-04", ts[:0], ts[:0], ts[:0])
+
+
+@pytest.mark.parametrize("codec", ["npy", "delta"])
+def test_load_day_roundtrip(tmp_path, codec):
+    ts, bid, ask = _day()
+    store = TickStore(tmp_path, codec=codec)
+    store.write_day(DAY, ts, bid, ask)
+    day = TickStore(tmp_path).load_day(DAY)
+    assert [day.ts.tolist(), day.bid.tolist(), day.ask.tolist()] == [ts.tolist(), bid.tolist(), ask.tolist()]
+    assert isinstance(day.ts, np.memmap) == (codec == "npy")
+
+
+def test_window_across_midnight(tmp_path):
+    store = TickStore(tmp_path)
+    first, second = _day(seed=1), _day("2024-06-04", seed=2)
+    store.write_day(DAY, *first)
+    store.write_day("2024-06-04", *second)
+
+    start, end = day_start_ms("2024-06-04") - 3_600_000, day_start_ms("2024-06-04") + 3_600_000
+    window = store.window(start, end)
+    all_ts = np.concatenate([first[0], second[0]])
+    expected = all_ts[(all_ts >= start) & (all_ts <= end)]
+    assert window.ts.tolist() == expected.tolist()
+    # Dentro de un solo día son vistas del mmap
+    assert isinstance(store.window(start, start + 600_000).ts, np.memmap)
+    assert len(store.window(end + MS_PER_DAY, end + 2 * MS_PER_DAY)) == 0
+
+
+def test_rebuild_index_from_day_dirs(tmp_path):
+    store = TickStore(tmp_path)
+    entries = [store.write_day(date, *_day(date, seed=i), save_index=False)
+               for i, date in enumerate(["2024-06-04", DAY])]
+    assert not store.index_path.exists()
+
+    index = TickStore(tmp_path).rebuild_index()
+    assert [d["date"] for d in index["days"]] == [DAY, "2024-06-04"]
+    assert index["days"] == sorted(entries, key=lambda e: e["date"])
+    assert TickStore(tmp_path).days() == [DAY, "2024-06-04"]
+
+
+def test_has_day_for_both_codecs(tmp_path):
+    TickStore(tmp_path).write_day(DAY, *_day())
+    TickStore(tmp_path, codec="delta").write_day("2024-06-04", *_day("2024-06-04"))
+    store = TickStore(tmp_path)
+    assert store.has_day(DAY) and store.has_day("2024-06-04")
+    assert not store.has_day("2024-06-05")
+    assert len(store.load_day("2024-06-05")) == 0
+
+
+def test_dropped_ticks_stay_within_step_of_last_kept():
+    _, bid, ask = _day(n=20000)
+    step = 50
+    keep = decimate(bid, ask, step)
+    assert keep[0] == 0 and keep[-1] == len(bid) - 1
+    last_kept = keep[np.searchsorted(keep, np.arange(len(bid)), side="right") - 1]
+    assert (np.abs(bid - bid[last_kept]) < step).all()
+    assert (np.abs(ask - ask[last_kept]) < step).all()
+    assert len(keep) < len(bid) / 2
+
+
+def test_decimation_level_below_pips_distance():
+    assert decimation_level(8) == 10
+    assert decimation_level(0.8) == 5
+    assert decimation_level(0.05) == 0
+    assert decimation_level(8, levels=(1, 5)) == 5
+
+
+def test_level_window_keeps_ends_and_matches_on_the_fly(tmp_path):
+    first, second = _day(n=20000, seed=1), _day("2024-06-04", n=20000, seed=2)
+    store = TickStore(tmp_path)
+    entry = store.write_day(DAY, *first)
+    store.write_day("2024-06-04", *second)
+    assert entry["ticks"] > entry["decimated"]["1"] > entry["decimated"]["10"]
+
+    start, end = int(first[0][5000]) + 1, int(second[0][3000])
+    full = store.window(start, end)
+    coarse = store.window(start, end, level=10)
+    assert len(coarse) < len(full) / 2
+    assert coarse.ts[0] == full.ts[0] and coarse.ts[-1] == full.ts[-1]
+    assert np.isin(coarse.ts, full.ts).all()
+    # Sin d<N>.npy (días escritos sin niveles) se diezma al vuelo con el mismo resultado
+    plain = TickStore(tmp_path / "plain", decimation=())
+    plain.write_day(DAY, *first)
+    plain.write_day("2024-06-04", *second)
+    assert not any(plain.day_dir(DAY).glob("d*.npy"))
+    assert plain.window(start, end, level=10).ts.tolist() == coarse.ts.tolist()
+
+
+def test_rewrite_without_levels_drops_stale_indices(tmp_path):
+    TickStore(tmp_path).write_day(DAY, *_day())
+    entry = TickStore(tmp_path, decimation=(5,)).write_day(DAY, *_day(n=500, seed=3))
+    assert sorted(p.name for p in TickStore(tmp_path).day_dir(DAY).glob("d*.npy")) == ["d5.npy"]
+    assert list(entry["decimated"]) == ["5"]
+    assert TickStore(tmp_path).rebuild_index()["days"][0]["decimated"] == entry["decimated"]
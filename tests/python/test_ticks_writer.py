@@ -0,0 +1,104 @@
+"""
+Escritura en streaming y sincronización incremental de los shards de ticks
+"""
+
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from lib.ticks_shards import load_index, read_day_text
+from lib.ticks_store import TickStore
+from lib.ticks_writer import StreamingShardWriter, StreamingStoreWriter, format_prices, sync_ranges
+
+DAY_MS = 86_400_000
+
+
+def _ticks(first_day: date, days: int, per_day: int, seed: int):
+    rng = np.random.default_rng(seed)
+    start = int(datetime(first_day.year, first_day.month, first_day.day, tzinfo=timezone.utc).timestamp() * 1000)
+    ts = np.sort(start + rng.integers(0, days * DAY_MS, days * per_day)).astype(np.int64)
+    bid = np.round(2000 + rng.random(len(ts)) * 50, 2)
+    ask = bid + np.round(rng.random(len(ts)), 2)
+    return ts, bid, ask
+
+
+def _write(tmp_path, ts, bid, ask, merge=False, chunks=3):
+    with StreamingShardWriter(tmp_path, "XAUUSD", tmp_path / "index.json", merge=merge) as writer:
+        for part in np.array_split(np.arange(len(ts)), chunks):
+            writer.write_chunk(ts[part], bid[part], ask[part])
+    return load_index(tmp_path / "index.json")["days"]
+
+
+def _day_texts(tmp_path, days):
+    return {d["date"]: read_day_text(d, tmp_path) for d in days}
+
+
+def test_format_prices_matches_printf():
+    values = np.random.default_rng(0).normal(size=10_000) * 1000
+    assert format_prices(values).tolist() == [f"{v:.5f}" for v in values]
+
+
+def test_streaming_splits_years_and_days(tmp_path):
+    ts, bid, ask = _ticks(date(2023, 12, 29), 5, 200, seed=1)
+    days = _write(tmp_path, ts, bid, ask, chunks=7)
+
+    assert {d["file"] for d in days} == {"XAUUSD_2023.csv.gz", "XAUUSD_2024.csv.gz"}
+    lines = "".join(_day_texts(tmp_path, days).values()).splitlines()
+    assert len(lines) == len(ts)
+    assert lines[0].split(",")[1:] == [f"{bid[0]:.5f}", f"{ask[0]:.5f}", f"{(ask[0] - bid[0]) * 100:.5f}"]
+
+
+def test_merge_keeps_existing_days_and_replaces_refetched(tmp_path):
+    ts, bid, ask = _ticks(date(2024, 3, 4), 6, 100, seed=2)
+    before = _day_texts(tmp_path, _write(tmp_path, ts, bid, ask))
+
+    # Nueva descarga: 2024-03-06 (sustituye) y 2024-03-11 (nuevo)
+    new_ts, new_bid, new_ask = _ticks(date(2024, 3, 6), 1, 50, seed=3)
+    tail_ts, tail_bid, tail_ask = _ticks(date(2024, 3, 11), 1, 50, seed=4)
+    days = _write(
+        tmp_path,
+        np.concatenate([new_ts, tail_ts]),
+        np.concatenate([new_bid, tail_bid]),
+        np.concatenate([new_ask, tail_ask]),
+        merge=True,
+    )
+    after = _day_texts(tmp_path, days)
+
+    assert sorted(after) == sorted(set(before) | {"2024-03-11"})
+    assert len(after["2024-03-06"].splitlines()) == 50
+    for key in before:
+        if key != "2024-03-06":
+            assert after[key] == before[key]
+    starts = [d["startLine"] for d in sorted(days, key=lambda d: d["date"])]
+    assert starts == sorted(starts) and starts[0] == 1
+
+
+def test_store_writer_takes_mt5_columns_directly(tmp_path):
+    ts, bid, ask = _ticks(date(2024, 3, 4), 3, 200, seed=3)
+    ticks = np.zeros(len(ts), dtype=[("time", "i8"), ("bid", "f8"), ("ask", "f8"), ("time_msc", "i8")])
+    ticks["time_msc"], ticks["bid"], ticks["ask"] = ts, bid, ask
+
+    store = TickStore(tmp_path, "XAUUSD")
+    with StreamingStoreWriter(store) as writer:
+        for chunk in np.array_split(ticks, 4):
+            writer.write_chunk(chunk["time_msc"], chunk["bid"], chunk["ask"])
+
+    assert writer.total_ticks == len(ts)
+    reloaded = TickStore(tmp_path, "XAUUSD")
+    assert reloaded.days() == ["2024-03-04", "2024-03-05", "2024-03-06"]
+    window = reloaded.window(int(ts[0]), int(ts[-1]))
+    assert window.ts.tolist() == ts.tolist()
+    assert np.array_equal(window.bid, np.rint(bid * 1000).astype(np.int32))
+
+
+def test_sync_ranges_skips_weekends_and_refetches_last_day():
+    indexed = ["2024-03-04", "2024-03-05", "2024-03-07", "2024-03-08", "2024-03-11"]
+    ranges = sync_ranges(indexed, date(2024, 3, 4), date(2024, 3, 13))
+    assert ranges == [
+        (date(2024, 3, 6), date(2024, 3, 6)),
+        (date(2024, 3, 11), date(2024, 3, 13)),
+    ]
+
+
+def test_sync_ranges_empty_index_is_one_range():
+    assert sync_ranges([], date(2024, 3, 2), date(2024, 3, 12)) == [(date(2024, 3, 4), date(2024, 3, 12))]